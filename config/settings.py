@@ -46,6 +46,7 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'logs.middleware.DesempenhoMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -202,6 +203,12 @@ LOGGING = {
             "level": "WARNING",
             "propagate": True,
         },
+        # Requisições acima do orçamento de tempo/consultas (logs/desempenho.py)
+        "logs.desempenho": {
+            "handlers": ["console"],
+            "level": "WARNING",
+            "propagate": False,
+        },
         "": {
             "handlers": ["console", "error_file"],
             "level": "ERROR",
@@ -210,5 +217,72 @@ LOGGING = {
     },
 }
 
+# Cache compartilhado entre os processos (workers web, comandos e o worker de
+# PDFs): as versões do calendário, dos eventos e das unidades de negócio ficam
+# aqui, e um cache local por processo serviria dados antigos nos demais
+# (ver core/checks.py). Com REDIS_URL definido usa o Redis; senão, arquivos.
+if os.getenv("REDIS_URL"):
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": os.getenv("REDIS_URL"),
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", BASE_DIR / "cache"),
+            "OPTIONS": {"MAX_ENTRIES": 5000},
+        }
+    }
+
+# Logs de visualização do AuditMiddleware gravados em lote por uma thread (logs/buffer.py)
+AUDIT_LOG_BUFFER = {
+    "ATIVO": True,
+    "LOTE": 200,
+    "INTERVALO_SEGUNDOS": 2.0,
+    "MAX_PENDENTES": 10000,
+    "OVERFLOW": "descartar_antigos",  # ou "descartar_novos"
+}
+
+# Detalhes dos logs de alteração com o texto dos relacionados (FK/M2M) em vez
+# dos ids, e o __str__ do objeto como nome do recurso. Custa uma consulta por FK
+# alterada, mais as do __str__ (logs/signals.py).
+AUDIT_LOG_EXIBIR_RELACIONADOS = False
+
+# Medição de tempo e consultas por requisição (DesempenhoMiddleware, logs/desempenho.py).
+# Orçamentos por view no formato {"app:view": {"ms": ..., "consultas": ...}}.
+DESEMPENHO = {
+    "ATIVO": True,
+    "AMOSTRAGEM": 1.0,
+    "CONSULTAS_LENTAS": 3,
+    "ORCAMENTO_PADRAO": {"ms": 1000, "consultas": 50},
+    "ORCAMENTOS": {
+        "scheduler:dashboard": {"ms": 800, "consultas": 40},
+        "scheduler:get_calendario_html": {"ms": 300, "consultas": 10},
+        "finances:mensalidades_list": {"ms": 800, "consultas": 30},
+    },
+    "RETENCAO_DIAS": 14,
+}
+
+# Fila de PDFs (recibos, DRE, relatório anual) processada pelo comando
+# processar_pdfs; os arquivos ficam em cache no DIRETORIO (core/pdfs.py).
+PDF_FILA = {
+    "DIRETORIO": BASE_DIR / "pdf_cache",
+    "INTERVALO": 2,
+    "TIMEOUT_SEGUNDOS": 600,
+    "MAX_TENTATIVAS": 3,
+    "RETENCAO_DIAS": 30,
+    "SINCRONO": False,
+}
+
+# Retenção do AuditLog: registros mais antigos vão para arquivos mensais
+# compactados (comando arquivar_logs, logs/arquivo.py)
+AUDIT_LOG_RETENCAO_DIAS = 90
+AUDIT_LOG_ARQUIVO_DIR = BASE_DIR / "logs" / "arquivo"
+# Busca com filtros no arquivo morto: quantos meses (os mais recentes) percorre
+AUDIT_LOG_ARQUIVO_MESES_BUSCA = 6
+
 CRISPY_ALLOWED_TEMPLATE_PACKS = "bootstrap5"
 CRISPY_TEMPLATE_PACK = "bootstrap5"
@@ -0,0 +1,37 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def auditoria_sincrona(settings):
+    """
+    Nos testes os logs de visualização são gravados na própria requisição:
+    a thread do buffer (logs/buffer.py) usaria outra conexão com o banco de teste.
+    """
+    settings.AUDIT_LOG_BUFFER = {**settings.AUDIT_LOG_BUFFER, "ATIVO": False}
+
+
+@pytest.fixture(autouse=True)
+def cache_limpo(settings, tmp_path):
+    """
+    Cada teste usa um cache em arquivos próprio (mesmo tipo de backend da
+    produção), então calendário e resumo de notificações não passam de um
+    teste para outro.
+    """
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": tmp_path / "cache",
+        }
+    }
+
+
+@pytest.fixture(autouse=True)
+def sem_medicao_de_desempenho(settings):
+    """A amostra do DesempenhoMiddleware mudaria a contagem de consultas dos testes."""
+    settings.DESEMPENHO = {**settings.DESEMPENHO, "ATIVO": False}
+
+
+@pytest.fixture(autouse=True)
+def arquivo_de_logs_temporario(settings, tmp_path):
+    """O arquivo morto do AuditLog (logs/arquivo.py) de cada teste fica no tmp_path."""
+    settings.AUDIT_LOG_ARQUIVO_DIR = tmp_path / "arquivo"
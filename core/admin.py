@@ -1,5 +1,6 @@
 from django.contrib import admin
 from .models import UnidadeNegocio, Notificacao  # <<< 1. Importar o modelo Notificacao
+from .notificacoes import invalidar_resumo
 
 
 @admin.register(UnidadeNegocio)
@@ -29,5 +30,20 @@ class NotificacaoAdmin(admin.ModelAdmin):
     # Deixa o campo de texto de mensagem mais fácil de ler
     readonly_fields = ("data_criacao",)
 
+    # Edições pelo admin também mudam o resumo do sino (core/notificacoes.py)
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        # Se o destinatário mudou, o resumo do anterior também muda
+        invalidar_resumo(*{obj.usuario_id, form.initial.get("usuario")} - {None})
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        invalidar_resumo(obj.usuario_id)
+
+    def delete_queryset(self, request, queryset):
+        usuario_ids = set(queryset.values_list("usuario_id", flat=True))
+        super().delete_queryset(request, queryset)
+        invalidar_resumo(*usuario_ids)
+
 
 # --- FIM DA ADIÇÃO ---
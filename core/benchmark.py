@@ -0,0 +1,221 @@
+"""
+Benchmark das views e funções mais pesadas em várias escalas.
+
+Para cada escala (1 = 40 alunos, 4 professores, 1 ano de aulas; 10 e 100
+multiplicam alunos e professores) é criado um banco de teste novo (SQLite em
+memória, tabelas direto dos models) com a escola sintética de
+core/sintetico.py, sempre com a mesma semente e a mesma data de referência
+(`hoje`, gravada no relatório), para que dois relatórios comparem os mesmos
+dados independentemente do dia em que rodaram. As medições rodam com o
+relógio parado em `hoje` (`relogio_parado`), então as views que usam o mês
+ou o dia corrente leem o período dos dados sintéticos. Cada alvo roda
+`repeticoes` vezes com o cache limpo; o relatório guarda mediana, mínimo, máximo e o
+número de consultas. O JSON gerado pode ser comparado com o de outro commit
+(`comparar`).
+
+Usado pelo comando `rodar_benchmark`.
+"""
+import statistics
+import subprocess
+import time
+from contextlib import ExitStack, contextmanager
+from datetime import date, datetime, timedelta
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from finances.views import get_dre_data
+from scheduler.models import Aluno, CustomUser
+
+from .models import UnidadeNegocio
+from .sintetico import PREFIXO_USUARIO, gerar_escola
+
+ESCALA_BASE = {"alunos": 40, "professores": 4, "anos": 1}
+
+# Data de referência dos dados sintéticos e do período do get_dre_data
+HOJE_PADRAO = date(2025, 6, 30)
+
+# Alvo -> (url name, argumento) para views; funções auxiliares ficam em _executar_alvo
+ALVOS_VIEWS = {
+    "dashboard": ("scheduler:dashboard", None),
+    "listar_aulas": ("scheduler:aula_listar", None),
+    "detalhe_aluno": ("scheduler:aluno_detalhe", "aluno"),
+    "detalhe_professor": ("scheduler:professor_detalhe", "professor"),
+    "mensalidades_list": ("finances:mensalidades_list", None),
+    "aging_report_view": ("finances:aging_report", None),
+    "get_horario_fixo_data": ("scheduler:get_horario_fixo_data", None),
+    "logs_page": ("logs:logs_page", None),
+}
+ALVOS_FUNCOES = ["get_dre_data"]
+ALVOS = [*ALVOS_VIEWS, *ALVOS_FUNCOES]
+
+ESCALAS_PADRAO = (1, 10, 100)
+
+# "Agora" consultado pelas views medidas, incluindo apelidos de `from django.utils.timezone import now`
+# (localdate e localtime chamam o timezone.now do próprio módulo)
+RELOGIOS = ["django.utils.timezone.now", "finances.views.now"]
+
+
+class _SemMigracoes:
+    """Cria as tabelas direto dos models (como `pytest --nomigrations`)."""
+
+    def __contains__(self, app):
+        return True
+
+    def __getitem__(self, app):
+        return None
+
+
+def parametros_da_escala(escala):
+    return {
+        "alunos": ESCALA_BASE["alunos"] * escala,
+        "professores": ESCALA_BASE["professores"] * escala,
+        "anos": ESCALA_BASE["anos"],
+    }
+
+
+def commit_atual():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class _Contexto:
+    def __init__(self, hoje):
+        self.hoje = hoje
+        self.unidade = UnidadeNegocio.objects.get(nome="Escola")
+        self.admin = CustomUser.objects.get(username=f"{PREFIXO_USUARIO}admin")
+        # O aluno ativo e o professor com mais aulas são os piores casos das páginas de detalhe
+        self.aluno = (
+            Aluno.objects.filter(status="ativo").order_by("-aulas_aluno__data_hora", "pk").first()
+        )
+        self.professor = (
+            CustomUser.objects.filter(tipo="professor").order_by("pk").first()
+        )
+        self.client = Client()
+        self.client.force_login(self.admin)
+        session = self.client.session
+        session["unidade_ativa_id"] = self.unidade.pk
+        session.save()
+
+
+@contextmanager
+def relogio_parado(hoje):
+    """Congela o "agora" em `hoje`, ao meio-dia no fuso local, durante o bloco."""
+    agora = timezone.make_aware(datetime(hoje.year, hoje.month, hoje.day, 12))
+    with ExitStack() as pilha:
+        for alvo in RELOGIOS:
+            pilha.enter_context(mock.patch(alvo, lambda: agora))
+        yield agora
+
+
+def _executar_alvo(alvo, contexto):
+    """Executa o alvo uma vez; retorna o status HTTP (ou None para funções)."""
+    if alvo == "get_dre_data":
+        get_dre_data(contexto.unidade.pk, contexto.hoje - timedelta(days=365), contexto.hoje)
+        return None
+    nome, argumento = ALVOS_VIEWS[alvo]
+    args = [getattr(contexto, argumento).pk] if argumento else []
+    resposta = contexto.client.get(reverse(nome, args=args))
+    return resposta.status_code
+
+
+def medir(alvo, contexto, repeticoes):
+    tempos, consultas, status = [], 0, None
+    with relogio_parado(contexto.hoje):
+        for _ in range(repeticoes):
+            cache.clear()
+            with CaptureQueriesContext(connection) as capturadas:
+                inicio = time.perf_counter()
+                status = _executar_alvo(alvo, contexto)
+                tempos.append((time.perf_counter() - inicio) * 1000)
+            consultas = len(capturadas.captured_queries)
+    return {
+        "mediana_ms": round(statistics.median(tempos), 2),
+        "min_ms": round(min(tempos), 2),
+        "max_ms": round(max(tempos), 2),
+        "consultas": consultas,
+        "status": status,
+    }
+
+
+def _rodar_escala(escala, semente, hoje, repeticoes, alvos, saida):
+    parametros = parametros_da_escala(escala)
+    saida(f"Escala {escala}x: gerando {parametros['alunos']} alunos, {parametros['professores']} professores...")
+    inicio = time.perf_counter()
+    contagens = gerar_escola(semente=semente, hoje=hoje, **parametros)
+    geracao_s = time.perf_counter() - inicio
+
+    contexto = _Contexto(hoje)
+    resultados = {}
+    for alvo in alvos:
+        resultados[alvo] = medir(alvo, contexto, repeticoes)
+        saida(
+            f"  {alvo:<24} {resultados[alvo]['mediana_ms']:>10.1f} ms  "
+            f"{resultados[alvo]['consultas']:>5} consultas"
+        )
+    return {
+        "parametros": parametros,
+        "geracao_s": round(geracao_s, 2),
+        "contagens": contagens,
+        "alvos": resultados,
+    }
+
+
+def rodar(escalas=ESCALAS_PADRAO, repeticoes=5, semente=42, hoje=HOJE_PADRAO, alvos=None, saida=print):
+    """Roda o benchmark em bancos de teste descartáveis e retorna o relatório."""
+    alvos = alvos or ALVOS
+    relatorio = {
+        "gerado_em": timezone.now().isoformat(),
+        "commit": commit_atual(),
+        "semente": semente,
+        "hoje": hoje.isoformat(),
+        "repeticoes": repeticoes,
+        "escalas": {},
+    }
+    configuracao = override_settings(
+        MIGRATION_MODULES=_SemMigracoes(),
+        ALLOWED_HOSTS=["testserver"],
+        # Sem threads de gravação nem amostras de desempenho medindo o próprio benchmark
+        AUDIT_LOG_BUFFER={**getattr(settings, "AUDIT_LOG_BUFFER", {}), "ATIVO": False},
+        DESEMPENHO={**getattr(settings, "DESEMPENHO", {}), "ATIVO": False},
+    )
+    with configuracao:
+        for escala in escalas:
+            nome_original = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+            try:
+                relatorio["escalas"][str(escala)] = _rodar_escala(escala, semente, hoje, repeticoes, alvos, saida)
+            finally:
+                connection.creation.destroy_test_db(nome_original, verbosity=0)
+                cache.clear()
+    return relatorio
+
+
+def comparar(atual, anterior):
+    """Linhas (escala, alvo, mediana anterior, mediana atual, variação %, consultas antes/depois)."""
+    linhas = []
+    for escala, dados in atual["escalas"].items():
+        anteriores = anterior.get("escalas", {}).get(escala, {}).get("alvos", {})
+        for alvo, medida in dados["alvos"].items():
+            antes = anteriores.get(alvo)
+            if not antes:
+                continue
+            variacao = (
+                (medida["mediana_ms"] - antes["mediana_ms"]) / antes["mediana_ms"] * 100
+                if antes["mediana_ms"] else 0
+            )
+            linhas.append((
+                escala, alvo, antes["mediana_ms"], medida["mediana_ms"], variacao,
+                antes["consultas"], medida["consultas"],
+            ))
+    return linhas
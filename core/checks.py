@@ -0,0 +1,37 @@
+"""
+Verificações de configuração (`manage.py check`).
+
+O calendário, o ETag dos eventos e a lista de unidades guardam "versões" no
+cache do Django; a troca de versão feita por um processo (worker web,
+comando, worker de PDFs) só chega aos outros se o cache for compartilhado.
+"""
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Backends que guardam os dados na memória de cada processo (ou não guardam)
+BACKENDS_LOCAIS = {
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+}
+
+
+def cache_compartilhado(alias="default"):
+    """True se o cache `alias` é visto por todos os processos."""
+    return settings.CACHES[alias]["BACKEND"] not in BACKENDS_LOCAIS
+
+
+@register()
+def verificar_cache_compartilhado(app_configs, **kwargs):
+    if cache_compartilhado():
+        return []
+    return [
+        Warning(
+            "O cache padrão é local ao processo.",
+            hint=(
+                "Invalidações do calendário e das unidades feitas em um processo não "
+                "chegam aos outros. Configure CACHES com um backend compartilhado "
+                "(arquivo, banco ou Redis)."
+            ),
+            id="core.W001",
+        )
+    ]
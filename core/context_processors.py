@@ -1,98 +1,44 @@
-from .models import UnidadeNegocio, Notificacao
-from django.urls import reverse
+from django.utils.functional import SimpleLazyObject
+
 from leads.forms import LeadForm
-from finances.models import Despesa, Receita
-from django.utils import timezone
-from datetime import timedelta
 
+from .notificacoes import resumo_nao_lidas
+from .unidades import listar_unidades, obter_unidade
 
-def unidades_negocio_processor(request):
-    unidades = UnidadeNegocio.objects.all()
-    unidade_ativa_id = request.session.get("unidade_ativa_id")
-    unidade_ativa = None
+# Os valores abaixo são preguiçosos (SimpleLazyObject): o banco só é
+# consultado, e o formulário só é montado, se o template usar a variável.
 
-    if unidade_ativa_id:
-        try:
-            unidade_ativa = UnidadeNegocio.objects.get(pk=unidade_ativa_id)
-        except UnidadeNegocio.DoesNotExist:
+
+def unidades_negocio_processor(request):
+    def unidade_ativa():
+        unidade_ativa_id = request.session.get("unidade_ativa_id")
+        if not unidade_ativa_id:
+            return None
+        unidade = obter_unidade(unidade_ativa_id)
+        if unidade is None:
             request.session.pop("unidade_ativa_id", None)
+        return unidade
 
-    return {"unidades_de_negocio": unidades, "unidade_ativa": unidade_ativa}
+    return {
+        "unidades_de_negocio": SimpleLazyObject(listar_unidades),
+        "unidade_ativa": SimpleLazyObject(unidade_ativa),
+    }
 
 
 def add_lead_form_processor(request):
     if request.user.is_authenticated:
-        return {'add_lead_form': LeadForm()}
+        return {'add_lead_form': SimpleLazyObject(LeadForm)}
     return {}
 
 
 def notificacoes_vencimento(request):
-    if not request.user.is_authenticated or not hasattr(request.user, 'tipo') or request.user.tipo != 'admin':
+    # As notificações são geradas pelo comando gerar_notificacoes_vencimento;
+    # aqui só se lê o resumo do usuário, que fica em cache (core/notificacoes.py)
+    if not request.user.is_authenticated or getattr(request.user, 'tipo', None) != 'admin':
         return {}
 
-    unidade_ativa_id = request.session.get('unidade_ativa_id')
-    if not unidade_ativa_id:
-        return {}
-
-    # --- DICIONÁRIO DE TRADUÇÃO ADICIONADO ---
-    MESES_PT_ABREV = {
-        1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
-        7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez",
-    }
-
-    hoje = timezone.now().date()
-    data_limite = hoje + timedelta(days=5)
-    
-    # LÓGICA PARA RECEITAS A VENCER
-    receitas_a_vencer = Receita.objects.filter(
-        unidade_negocio_id=unidade_ativa_id, status='a_receber',
-        data_competencia__gte=hoje, data_competencia__lte=data_limite
-    )
-    for receita in receitas_a_vencer:
-        # --- LÓGICA DO TÍTULO ALTERADA ---
-        mes_abrev = MESES_PT_ABREV[receita.data_competencia.month]
-        ano = receita.data_competencia.year
-        titulo = f"Vencimento: {receita.descricao} ({mes_abrev}/{ano})"
-        
-        mensagem = f"Conta de R$ {receita.valor} vence em {receita.data_competencia.strftime('%d/%m')}."
-        
-        Notificacao.objects.get_or_create(
-            usuario=request.user,
-            titulo=titulo,
-            tipo='receita',
-            defaults={
-                'mensagem': mensagem, 
-                'url': reverse('finances:receita_list') + f'?descricao={receita.descricao}'
-            }
-        )
-
-    # LÓGICA PARA DESPESAS A VENCER
-    despesas_a_vencer = Despesa.objects.filter(
-        unidade_negocio_id=unidade_ativa_id, status='a_pagar',
-        data_competencia__gte=hoje, data_competencia__lte=data_limite
-    )
-    for despesa in despesas_a_vencer:
-        # --- LÓGICA DO TÍTULO ALTERADA ---
-        mes_abrev = MESES_PT_ABREV[despesa.data_competencia.month]
-        ano = despesa.data_competencia.year
-        titulo = f"Pagamento: {despesa.descricao} ({mes_abrev}/{ano})"
-
-        mensagem = f"Conta de R$ {despesa.valor} vence em {despesa.data_competencia.strftime('%d/%m')}."
-        
-        Notificacao.objects.get_or_create(
-            usuario=request.user,
-            titulo=titulo,
-            tipo='despesa',
-            defaults={
-                'mensagem': mensagem, 
-                'url': reverse('finances:despesa_list') + f'?descricao={despesa.descricao}'
-            }
-        )
-
-    # A busca das notificações não lidas para exibir
-    notificacoes_nao_lidas = request.user.notificacoes.filter(lida=False)
-    
+    resumo = SimpleLazyObject(lambda: resumo_nao_lidas(request.user))
     return {
-        'notificacoes_dropdown': notificacoes_nao_lidas.order_by('-data_criacao')[:5], 
-        'contagem_notificacoes_nao_lidas': notificacoes_nao_lidas.count(),
+        'notificacoes_dropdown': SimpleLazyObject(lambda: resumo[1]),
+        'contagem_notificacoes_nao_lidas': SimpleLazyObject(lambda: resumo[0]),
     }
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from core.notificacoes import DIAS_ANTECEDENCIA, gerar_notificacoes_vencimento
+
+
+class Command(BaseCommand):
+    help = (
+        'Gera para os administradores as notificações de receitas e despesas em aberto '
+        'que vencem nos próximos dias. Deve rodar uma vez por dia (cron).'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=DIAS_ANTECEDENCIA, help='Antecedência em dias (padrão: 5).')
+        parser.add_argument('--data', help='Data de referência (AAAA-MM-DD); padrão: hoje.')
+
+    def handle(self, *args, **options):
+        hoje = None
+        if options['data']:
+            try:
+                hoje = datetime.strptime(options['data'], '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError(f"Data inválida: {options['data']} (use AAAA-MM-DD).")
+
+        criadas = gerar_notificacoes_vencimento(hoje=hoje, dias=options['dias'])
+        self.stdout.write(self.style.SUCCESS(f'{criadas} notificação(ões) criada(s).'))
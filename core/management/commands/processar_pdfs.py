@@ -0,0 +1,48 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from core.pdfs import (
+    config_pdfs,
+    limpar_cache,
+    processar_pendentes,
+    recuperar_travadas,
+    rodar_worker,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Worker da fila de PDFs (TarefaPDF): gera os recibos, DREs e relatórios '
+        'pendentes e grava os arquivos no cache em disco.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--uma-vez', action='store_true',
+            help='Processa o que estiver pendente e sai (para cron), em vez de ficar escutando a fila.',
+        )
+        parser.add_argument(
+            '--limpar', action='store_true',
+            help='Apaga arquivos e tarefas mais antigos que PDF_FILA["RETENCAO_DIAS"] e sai.',
+        )
+
+    def handle(self, *args, **options):
+        if options['limpar']:
+            antes_de = timezone.now() - timedelta(days=config_pdfs()['RETENCAO_DIAS'])
+            apagados = limpar_cache(antes_de)
+            self.stdout.write(self.style.SUCCESS(f"{apagados} arquivo(s) removido(s) do cache de PDFs."))
+            return
+
+        if options['uma_vez']:
+            recuperar_travadas()
+            geradas, falhas = processar_pendentes()
+            self.stdout.write(self.style.SUCCESS(f"{geradas} PDF(s) gerado(s), {falhas} falha(s)."))
+            return
+
+        self.stdout.write("Aguardando tarefas de PDF (Ctrl+C para sair)...")
+        try:
+            rodar_worker(saida=self.stdout.write)
+        except KeyboardInterrupt:
+            self.stdout.write("Worker encerrado.")
@@ -0,0 +1,78 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils.dateparse import parse_date
+
+from core.benchmark import ALVOS, ESCALAS_PADRAO, HOJE_PADRAO, comparar, rodar
+
+
+def _lista(valor, tipo=str):
+    return [tipo(item) for item in valor.split(',') if item.strip()]
+
+
+class Command(BaseCommand):
+    help = (
+        'Mede as principais views e funções em bancos sintéticos descartáveis nas escalas '
+        'pedidas (1x = 40 alunos, 4 professores, 1 ano) e grava um relatório JSON.'
+    )
+
+    def add_arguments(self, parser):
+        escalas_padrao = ','.join(map(str, ESCALAS_PADRAO))
+        parser.add_argument(
+            '--escalas', default=escalas_padrao,
+            help=f'Escalas separadas por vírgula (padrão: {escalas_padrao}).',
+        )
+        parser.add_argument('--repeticoes', type=int, default=5, help='Execuções por alvo (padrão: 5).')
+        parser.add_argument('--semente', type=int, default=42, help='Semente dos dados sintéticos (padrão: 42).')
+        parser.add_argument(
+            '--hoje', default=HOJE_PADRAO.isoformat(),
+            help=f'Data de referência dos dados sintéticos, AAAA-MM-DD (padrão: {HOJE_PADRAO.isoformat()}).',
+        )
+        parser.add_argument('--alvos', help=f"Subconjunto dos alvos, separados por vírgula ({', '.join(ALVOS)}).")
+        parser.add_argument('--saida', default='benchmark.json', help='Arquivo do relatório (padrão: benchmark.json).')
+        parser.add_argument('--comparar', help='Relatório JSON de outro commit para comparação.')
+
+    def handle(self, *args, **options):
+        try:
+            escalas = _lista(options['escalas'], int)
+        except ValueError:
+            raise CommandError('Escalas devem ser números inteiros (ex: 1,10,100).')
+        alvos = _lista(options['alvos']) if options['alvos'] else None
+        desconhecidos = set(alvos or []) - set(ALVOS)
+        if desconhecidos:
+            raise CommandError(f"Alvo(s) desconhecido(s): {', '.join(sorted(desconhecidos))}.")
+        if options['repeticoes'] < 1:
+            raise CommandError('É preciso pelo menos 1 repetição.')
+        try:
+            hoje = parse_date(options['hoje'])
+        except ValueError:
+            hoje = None
+        if hoje is None:
+            raise CommandError('Data de referência inválida; use AAAA-MM-DD.')
+
+        anterior = None
+        if options['comparar']:
+            with open(options['comparar'], encoding='utf-8') as arquivo:
+                anterior = json.load(arquivo)
+
+        relatorio = rodar(
+            escalas=escalas, repeticoes=options['repeticoes'], semente=options['semente'],
+            hoje=hoje, alvos=alvos, saida=self.stdout.write,
+        )
+        with open(options['saida'], 'w', encoding='utf-8') as arquivo:
+            json.dump(relatorio, arquivo, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS(f"Relatório gravado em {options['saida']}."))
+
+        if anterior:
+            self.stdout.write(f"\nComparação com {anterior.get('commit') or options['comparar']}:")
+            if anterior.get('semente') != relatorio['semente'] or anterior.get('hoje') != relatorio['hoje']:
+                self.stdout.write(self.style.WARNING(
+                    f"  Dados diferentes: semente {anterior.get('semente')} e data {anterior.get('hoje') or '?'} "
+                    f"no anterior, {relatorio['semente']} e {relatorio['hoje']} agora."
+                ))
+            for escala, alvo, antes, depois, variacao, consultas_antes, consultas_depois in comparar(relatorio, anterior):
+                estilo = self.style.ERROR if variacao > 10 else self.style.SUCCESS if variacao < -10 else str
+                self.stdout.write(estilo(
+                    f"  {escala:>4}x {alvo:<24} {antes:>9.1f} -> {depois:>9.1f} ms ({variacao:+.0f}%)  "
+                    f"consultas {consultas_antes} -> {consultas_depois}"
+                ))
@@ -35,4 +35,42 @@ class Notificacao(models.Model):
         verbose_name_plural = "Notificações"
 
     def __str__(self):
-        return f"Notificação para {self.usuario.username}: {self.titulo}"
\ No newline at end of file
+        return f"Notificação para {self.usuario.username}: {self.titulo}"
+
+class TarefaPDF(models.Model):
+    """
+    Geração de PDF fora da requisição (core/pdfs.py). A chave é o hash das
+    entradas do documento: o mesmo recibo/DRE/relatório com os mesmos dados
+    reaproveita a tarefa e o arquivo já gerado. Processada pelo comando
+    `processar_pdfs`.
+    """
+    STATUS_CHOICES = (
+        ('pendente', 'Pendente'),
+        ('processando', 'Processando'),
+        ('concluida', 'Concluída'),
+        ('erro', 'Erro'),
+    )
+
+    chave = models.CharField(max_length=64, unique=True)
+    tipo = models.CharField(max_length=30)
+    entradas = models.JSONField(default=dict)
+    nome_arquivo = models.CharField(max_length=255)
+    inline = models.BooleanField(default=False, help_text="Abrir no navegador em vez de baixar.")
+    status = models.CharField(max_length=12, choices=STATUS_CHOICES, default='pendente')
+    erro = models.TextField(blank=True)
+    tentativas = models.PositiveIntegerField(default=0)
+    solicitado_por = models.ForeignKey(
+        settings.AUTH_USER_MODEL, on_delete=models.SET_NULL, null=True, blank=True, related_name='tarefas_pdf'
+    )
+    criado_em = models.DateTimeField(auto_now_add=True)
+    iniciado_em = models.DateTimeField(null=True, blank=True)
+    concluido_em = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['criado_em']
+        indexes = [models.Index(fields=['status', 'criado_em'])]
+        verbose_name = "Tarefa de PDF"
+        verbose_name_plural = "Tarefas de PDF"
+
+    def __str__(self):
+        return f"{self.tipo} {self.chave[:12]} ({self.get_status_display()})"
@@ -0,0 +1,108 @@
+"""
+Notificações de vencimento e o resumo exibido no sino do menu.
+
+As notificações de contas a vencer são geradas uma vez por dia pelo comando
+`gerar_notificacoes_vencimento`, em lote, para todos os administradores. O
+context processor só lê o resumo (contagem de não lidas + 5 mais recentes),
+guardado no cache por usuário e invalidado quando notificações são criadas,
+marcadas como lidas/não lidas, excluídas ou editadas pelo admin do Django.
+"""
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.urls import reverse
+from django.utils import timezone
+
+from finances.models import Despesa, Receita
+
+from .models import Notificacao
+
+DIAS_ANTECEDENCIA = 5
+RESUMO_CACHE_TIMEOUT = 60 * 10
+QUANTIDADE_DROPDOWN = 5
+
+MESES_PT_ABREV = {
+    1: "Jan", 2: "Fev", 3: "Mar", 4: "Abr", 5: "Mai", 6: "Jun",
+    7: "Jul", 8: "Ago", 9: "Set", 10: "Out", 11: "Nov", 12: "Dez",
+}
+
+
+def _chave_resumo(usuario_id):
+    return f"notificacoes:resumo:{usuario_id}"
+
+
+def invalidar_resumo(*usuario_ids):
+    cache.delete_many([_chave_resumo(usuario_id) for usuario_id in usuario_ids])
+
+
+def resumo_nao_lidas(usuario):
+    """(contagem de não lidas, 5 mais recentes), do cache quando possível."""
+    chave = _chave_resumo(usuario.pk)
+    resumo = cache.get(chave)
+    if resumo is None:
+        nao_lidas = Notificacao.objects.filter(usuario=usuario, lida=False)
+        resumo = (
+            nao_lidas.count(),
+            list(nao_lidas.order_by("-data_criacao")[:QUANTIDADE_DROPDOWN]),
+        )
+        cache.set(chave, resumo, RESUMO_CACHE_TIMEOUT)
+    return resumo
+
+
+def _avisos_vencimento(hoje, dias):
+    """(titulo, tipo, mensagem, url) de cada receita/despesa em aberto que vence na janela."""
+    data_limite = hoje + timedelta(days=dias)
+    contas = [
+        (Receita, "a_receber", "receita", "Vencimento", "finances:receita_list"),
+        (Despesa, "a_pagar", "despesa", "Pagamento", "finances:despesa_list"),
+    ]
+    avisos = []
+    for model, status, tipo, prefixo, url_name in contas:
+        url_lista = reverse(url_name)
+        lancamentos = model.objects.filter(
+            status=status, data_competencia__gte=hoje, data_competencia__lte=data_limite
+        ).only("descricao", "valor", "data_competencia")
+        for lancamento in lancamentos:
+            competencia = lancamento.data_competencia
+            avisos.append((
+                f"{prefixo}: {lancamento.descricao} ({MESES_PT_ABREV[competencia.month]}/{competencia.year})",
+                tipo,
+                f"Conta de R$ {lancamento.valor} vence em {competencia.strftime('%d/%m')}.",
+                url_lista + f"?descricao={lancamento.descricao}",
+            ))
+    return avisos
+
+
+def gerar_notificacoes_vencimento(hoje=None, dias=DIAS_ANTECEDENCIA):
+    """
+    Cria, para cada administrador ativo, as notificações das contas que vencem
+    nos próximos `dias` dias e que ele ainda não recebeu (mesmo título e tipo).
+    Retorna a quantidade criada.
+    """
+    hoje = hoje or timezone.localdate()
+    avisos = _avisos_vencimento(hoje, dias)
+    admin_ids = list(
+        get_user_model().objects.filter(tipo="admin", is_active=True).values_list("pk", flat=True)
+    )
+    if not avisos or not admin_ids:
+        return 0
+
+    existentes = set(
+        Notificacao.objects.filter(
+            usuario_id__in=admin_ids, titulo__in={titulo for titulo, *_ in avisos}
+        ).values_list("usuario_id", "titulo", "tipo")
+    )
+    novas = []
+    for usuario_id in admin_ids:
+        for titulo, tipo, mensagem, url in avisos:
+            if (usuario_id, titulo, tipo) in existentes:
+                continue
+            existentes.add((usuario_id, titulo, tipo))
+            novas.append(Notificacao(
+                usuario_id=usuario_id, titulo=titulo, tipo=tipo, mensagem=mensagem, url=url
+            ))
+
+    Notificacao.objects.bulk_create(novas, batch_size=500)
+    invalidar_resumo(*{notificacao.usuario_id for notificacao in novas})
+    return len(novas)
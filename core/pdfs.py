@@ -0,0 +1,271 @@
+"""
+Fila de geração de PDFs no banco (TarefaPDF) com cache dos arquivos em disco.
+
+A view monta as `entradas` do documento: dados pequenos e serializáveis em
+JSON, com tudo de que o PDF depende. O hash SHA-256 do tipo, das entradas e
+da data de modificação do template vira a chave da tarefa e o nome do arquivo.
+Se o arquivo da chave já existe, a view o devolve na hora; senão a tarefa é
+enfileirada (uma por chave) e o usuário vai para uma página que consulta o
+status até o download ficar pronto.
+
+O comando `processar_pdfs` pega as tarefas pendentes, chama o gerador do
+tipo (GERADORES), converte o HTML com o xhtml2pdf e grava o arquivo de forma
+atômica. Geradores recebem as entradas e devolvem (html, link_callback).
+Documentos que não são um único PDF (o ZIP de recibos do mês) usam a mesma
+fila, o mesmo cache e as mesmas páginas de acompanhamento, com um gerador de
+GERADORES_DE_ARQUIVO, que grava o conteúdo direto no arquivo temporário.
+
+Configuração em `settings.PDF_FILA` (ver CONFIG_PADRAO).
+"""
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.http import FileResponse
+from django.shortcuts import redirect
+from django.template.loader import get_template
+from django.utils import timezone
+from django.utils.module_loading import import_string
+from xhtml2pdf import pisa
+
+from .models import TarefaPDF
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PADRAO = {
+    "DIRETORIO": settings.BASE_DIR / "pdf_cache",
+    # Segundos entre consultas à fila quando ela está vazia
+    "INTERVALO": 2,
+    # Tarefas "processando" há mais tempo que isso voltam para a fila (worker caiu)
+    "TIMEOUT_SEGUNDOS": 600,
+    "MAX_TENTATIVAS": 3,
+    # Arquivos e tarefas concluídas mais antigos são apagados por `processar_pdfs --limpar`
+    "RETENCAO_DIAS": 30,
+    # Gera na própria requisição (desenvolvimento sem worker rodando)
+    "SINCRONO": False,
+}
+
+# tipo -> gerador (caminho pontuado)
+GERADORES = {
+    "recibo": "finances.pdfs.html_recibo",
+    "dre": "finances.pdfs.html_dre",
+    "relatorio_anual": "scheduler.pdfs.html_relatorio_anual",
+}
+
+# tipo -> gerador que grava o próprio arquivo (caminho pontuado); recebe as
+# entradas e o arquivo binário aberto
+GERADORES_DE_ARQUIVO = {
+    "recibos_mes": "finances.recibos.gravar_pacote",
+}
+
+# tipo -> content type do download (padrão: PDF)
+TIPOS_DE_CONTEUDO = {
+    "recibos_mes": "application/zip",
+}
+
+# Tipo -> quem pode acompanhar e baixar a tarefa além de quem a pediu: a
+# mesma regra da view que a cria (tipos ausentes: qualquer usuário logado)
+PERMISSOES = {
+    "dre": lambda usuario: getattr(usuario, "tipo", None) == "admin",  # export_dre_pdf é @admin_required
+    "recibos_mes": lambda usuario: getattr(usuario, "tipo", None) != "professor",
+}
+
+
+def pode_acessar(usuario, tarefa):
+    """A tarefa é compartilhada por chave: vale o solicitante ou a regra do tipo."""
+    if tarefa.solicitado_por_id is not None and tarefa.solicitado_por_id == usuario.pk:
+        return True
+    permissao = PERMISSOES.get(tarefa.tipo)
+    return permissao is None or permissao(usuario)
+
+
+def config_pdfs():
+    return {**CONFIG_PADRAO, **getattr(settings, "PDF_FILA", {})}
+
+
+def diretorio_pdfs():
+    return config_pdfs()["DIRETORIO"]
+
+
+def caminho_do_arquivo(chave):
+    return os.path.join(diretorio_pdfs(), f"{chave}.pdf")
+
+
+def calcular_chave(tipo, entradas):
+    """
+    Hash do tipo, das entradas e do template (campo "template" das entradas),
+    para que uma alteração no layout não sirva PDFs antigos do cache.
+    """
+    versao_template = None
+    if entradas.get("template"):
+        origem = get_template(entradas["template"]).origin.name
+        versao_template = os.path.getmtime(origem)
+    conteudo = json.dumps([tipo, entradas, versao_template], sort_keys=True, default=str)
+    return hashlib.sha256(conteudo.encode("utf-8")).hexdigest()
+
+
+def solicitar_pdf(tipo, entradas, nome_arquivo, usuario=None, inline=False):
+    """
+    Tarefa do documento: a já existente para as mesmas entradas (recolocada
+    na fila se falhou ou se o arquivo sumiu do cache) ou uma nova, pendente.
+    """
+    chave = calcular_chave(tipo, entradas)
+    tarefa, criada = TarefaPDF.objects.get_or_create(
+        chave=chave,
+        defaults={
+            "tipo": tipo,
+            "entradas": entradas,
+            "nome_arquivo": nome_arquivo,
+            "inline": inline,
+            "solicitado_por": usuario if usuario and usuario.is_authenticated else None,
+        },
+    )
+    if criada:
+        return tarefa
+
+    if os.path.isfile(caminho_do_arquivo(chave)):
+        if tarefa.status != "concluida":
+            TarefaPDF.objects.filter(pk=tarefa.pk).update(status="concluida", concluido_em=timezone.now())
+            tarefa.status = "concluida"
+    elif tarefa.status in ("concluida", "erro"):
+        TarefaPDF.objects.filter(pk=tarefa.pk).update(status="pendente", erro="", tentativas=0)
+        tarefa.status = "pendente"
+    return tarefa
+
+
+def resposta_arquivo(tarefa):
+    return FileResponse(
+        open(caminho_do_arquivo(tarefa.chave), "rb"),
+        content_type=TIPOS_DE_CONTEUDO.get(tarefa.tipo, "application/pdf"),
+        as_attachment=not tarefa.inline,
+        filename=tarefa.nome_arquivo,
+    )
+
+
+def resposta_pdf(tarefa):
+    """O PDF direto do cache, se pronto; senão a página de acompanhamento da tarefa."""
+    if tarefa.status == "pendente" and config_pdfs()["SINCRONO"]:
+        reservada = TarefaPDF.objects.filter(pk=tarefa.pk, status="pendente").update(
+            status="processando", iniciado_em=timezone.now(), tentativas=F("tentativas") + 1
+        )
+        if reservada:
+            tarefa.refresh_from_db()
+            processar_tarefa(tarefa)
+            tarefa.refresh_from_db()
+    if tarefa.status == "concluida":
+        return resposta_arquivo(tarefa)
+    return redirect("core:tarefa_pdf", chave=tarefa.chave)
+
+
+# --- WORKER ---
+
+
+def _reservar_proxima():
+    """Marca a tarefa pendente mais antiga como "processando" e a devolve (ou None)."""
+    while True:
+        candidata = (
+            TarefaPDF.objects.filter(status="pendente").order_by("criado_em", "pk").values_list("pk", flat=True).first()
+        )
+        if candidata is None:
+            return None
+        # O UPDATE condicional garante que só um worker fica com a tarefa
+        reservada = TarefaPDF.objects.filter(pk=candidata, status="pendente").update(
+            status="processando", iniciado_em=timezone.now(), tentativas=F("tentativas") + 1
+        )
+        if reservada:
+            return TarefaPDF.objects.get(pk=candidata)
+
+
+def recuperar_travadas(config=None):
+    """Devolve à fila (ou marca como erro) tarefas "processando" além do timeout."""
+    config = config or config_pdfs()
+    limite = timezone.now() - timedelta(seconds=config["TIMEOUT_SEGUNDOS"])
+    travadas = TarefaPDF.objects.filter(status="processando", iniciado_em__lt=limite)
+    esgotadas = travadas.filter(tentativas__gte=config["MAX_TENTATIVAS"]).update(
+        status="erro", erro="Tempo de processamento esgotado."
+    )
+    return travadas.update(status="pendente") + esgotadas
+
+
+def gerar_arquivo(tarefa):
+    """Renderiza o PDF da tarefa e grava em disco (arquivo temporário + rename)."""
+    os.makedirs(diretorio_pdfs(), exist_ok=True)
+    destino = caminho_do_arquivo(tarefa.chave)
+    descritor, temporario = tempfile.mkstemp(dir=diretorio_pdfs(), suffix=".tmp")
+    try:
+        with os.fdopen(descritor, "wb") as arquivo:
+            if tarefa.tipo in GERADORES_DE_ARQUIVO:
+                import_string(GERADORES_DE_ARQUIVO[tarefa.tipo])(tarefa.entradas, arquivo)
+            else:
+                html, link_callback = import_string(GERADORES[tarefa.tipo])(tarefa.entradas)
+                status = pisa.CreatePDF(html, dest=arquivo, link_callback=link_callback)
+                if status.err:
+                    raise RuntimeError(f"xhtml2pdf retornou {status.err} erro(s).")
+        os.replace(temporario, destino)
+    except BaseException:
+        if os.path.exists(temporario):
+            os.remove(temporario)
+        raise
+    return destino
+
+
+def processar_tarefa(tarefa, config=None):
+    config = config or config_pdfs()
+    try:
+        gerar_arquivo(tarefa)
+    except Exception as erro:
+        logger.exception("Falha ao gerar o PDF %s (%s).", tarefa.chave, tarefa.tipo)
+        # Erros de geração são definitivos depois de MAX_TENTATIVAS
+        novo_status = "erro" if tarefa.tentativas >= config["MAX_TENTATIVAS"] else "pendente"
+        TarefaPDF.objects.filter(pk=tarefa.pk).update(status=novo_status, erro=str(erro)[:2000])
+        return False
+    TarefaPDF.objects.filter(pk=tarefa.pk).update(status="concluida", erro="", concluido_em=timezone.now())
+    return True
+
+
+def processar_pendentes(limite=None, config=None):
+    """Processa as tarefas pendentes (até `limite`); retorna (geradas, falhas)."""
+    config = config or config_pdfs()
+    geradas = falhas = 0
+    while limite is None or geradas + falhas < limite:
+        tarefa = _reservar_proxima()
+        if tarefa is None:
+            break
+        if processar_tarefa(tarefa, config):
+            geradas += 1
+        else:
+            falhas += 1
+    return geradas, falhas
+
+
+def rodar_worker(parar=lambda: False, saida=None):
+    """Laço do worker: processa a fila e dorme INTERVALO segundos quando ela esvazia."""
+    config = config_pdfs()
+    while not parar():
+        recuperar_travadas(config)
+        geradas, falhas = processar_pendentes(config=config)
+        if saida and (geradas or falhas):
+            saida(f"{geradas} PDF(s) gerado(s), {falhas} falha(s).")
+        if not geradas and not falhas:
+            time.sleep(config["INTERVALO"])
+
+
+def limpar_cache(antes_de):
+    """Apaga arquivos e tarefas concluídas/com erro anteriores a `antes_de`."""
+    antigas = TarefaPDF.objects.filter(
+        Q(status="concluida", concluido_em__lt=antes_de) | Q(status="erro", criado_em__lt=antes_de)
+    )
+    apagados = 0
+    for chave in antigas.values_list("chave", flat=True).iterator():
+        caminho = caminho_do_arquivo(chave)
+        if os.path.exists(caminho):
+            os.remove(caminho)
+            apagados += 1
+    antigas.delete()
+    return apagados
@@ -0,0 +1,220 @@
+"""
+Exportação de planilhas .xlsx em modo write-only.
+
+Um relatório é uma aba com larguras de coluna fixas, um título opcional e
+uma sequência de seções (título, cabeçalho, linhas de dados e totais). As
+linhas podem vir de geradores ou de `queryset.iterator()`: o openpyxl grava
+cada linha no XML temporário da aba assim que ela é escrita, então a memória
+não cresce com o tamanho do relatório. Os estilos são `NamedStyle`s
+registrados uma vez por arquivo (ESTILOS), referenciados pelo nome.
+
+A resposta não é streaming de verdade: o .xlsx é um ZIP que só fica válido
+depois de fechado, então a planilha inteira é gravada num arquivo temporário
+antes do primeiro byte sair. O que se ganha é memória constante (disco no
+lugar de RAM), não o tempo até o primeiro byte.
+
+Uso:
+
+    relatorio = RelatorioPlanilha("DRE", larguras=[50, 20], titulo="DRE")
+    relatorio.secao(
+        colunas=[Coluna("Descrição"), Coluna("Valor", formato=FORMATO_MOEDA)],
+        linhas=([nome, total] for nome, total in ...),
+        totais=["Total", total_geral],
+    )
+    return relatorio.resposta("DRE.xlsx")
+"""
+import tempfile
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Alignment, Font, NamedStyle, PatternFill
+from openpyxl.utils import get_column_letter
+
+CONTENT_TYPE_XLSX = "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+
+FORMATO_MOEDA = "R$ #,##0.00"
+FORMATO_PERCENTUAL = '0.0"%"'
+FORMATO_INTEIRO = "0"
+
+TAMANHO_PARTE = 64 * 1024
+
+
+def _preenchimento(cor):
+    return PatternFill(start_color=cor, end_color=cor, fill_type="solid")
+
+
+ESTILOS = {
+    "titulo": {"font": Font(bold=True, size=16), "alignment": Alignment(horizontal="center")},
+    "subtitulo": {"alignment": Alignment(horizontal="center")},
+    "secao": {
+        "font": Font(bold=True, color="FFFFFF"),
+        "fill": _preenchimento("2F75B5"),
+        "alignment": Alignment(horizontal="center"),
+    },
+    "cabecalho": {"font": Font(bold=True), "fill": _preenchimento("EAEAEA")},
+    "subcabecalho": {"font": Font(bold=True), "fill": _preenchimento("DDEBF7")},
+    "rotulo": {"font": Font(bold=True)},
+    "total": {"font": Font(bold=True), "fill": _preenchimento("F5F5F5")},
+    "final": {"font": Font(bold=True, color="FFFFFF"), "fill": _preenchimento("424242")},
+}
+
+ALINHAR_DIREITA = Alignment(horizontal="right")
+
+
+class Coluna:
+    """Coluna de uma seção: título do cabeçalho, formato numérico e estilo das células."""
+
+    def __init__(self, titulo="", formato=None, estilo=None):
+        self.titulo = titulo
+        self.formato = formato
+        self.estilo = estilo
+
+
+class Linha:
+    """Linha de dados com estilo nomeado (ex: "total") e recuo da primeira coluna."""
+
+    def __init__(self, valores, estilo=None, recuo=0):
+        self.valores = valores
+        self.estilo = estilo
+        self.recuo = recuo
+
+
+class Secao:
+    """
+    Bloco da aba: linhas em branco antes, título (mesclado sobre as colunas),
+    cabeçalho com os títulos das colunas, as linhas de dados e uma linha de
+    totais. `totais` pode ser uma função chamada depois das linhas, para
+    somar enquanto elas são escritas.
+    """
+
+    def __init__(
+        self, colunas, linhas=(), titulo=None, cabecalho=True,
+        estilo_cabecalho="cabecalho", totais=None, espaco_antes=0,
+    ):
+        self.colunas = colunas
+        self.linhas = linhas
+        self.titulo = titulo
+        self.cabecalho = cabecalho
+        self.estilo_cabecalho = estilo_cabecalho
+        self.totais = totais
+        self.espaco_antes = espaco_antes
+
+
+class RelatorioPlanilha:
+    """Uma aba .xlsx escrita em modo write-only a partir de seções."""
+
+    def __init__(self, aba, larguras, titulo=None, subtitulo=None, coluna_inicial=1):
+        self.aba = aba
+        self.larguras = larguras
+        self.titulo = titulo
+        self.subtitulo = subtitulo
+        # Colunas à esquerda deixadas em branco (margem)
+        self.coluna_inicial = coluna_inicial
+        self.secoes = []
+
+    def secao(self, *args, **kwargs):
+        secao = Secao(*args, **kwargs)
+        self.secoes.append(secao)
+        return secao
+
+    # --- Escrita ---
+
+    def _celula(self, ws, valor, estilo=None, formato=None, alinhamento=None):
+        celula = WriteOnlyCell(ws, valor)
+        if estilo:
+            celula.style = estilo
+        if formato and isinstance(valor, (int, float, Decimal)) and not isinstance(valor, bool):
+            celula.number_format = formato
+        if alinhamento:
+            celula.alignment = alinhamento
+        return celula
+
+    def _escrever_linha(self, ws, celulas):
+        ws.append([None] * (self.coluna_inicial - 1) + celulas)
+        self._linha_atual += 1
+
+    def _mesclar(self, ws, largura):
+        if largura > 1:
+            inicio = get_column_letter(self.coluna_inicial)
+            fim = get_column_letter(self.coluna_inicial + largura - 1)
+            ws.merged_cells.add(f"{inicio}{self._linha_atual}:{fim}{self._linha_atual}")
+
+    def _escrever_faixa(self, ws, texto, estilo, largura):
+        self._escrever_linha(ws, [self._celula(ws, texto, estilo)])
+        self._mesclar(ws, largura)
+
+    def _escrever_dados(self, ws, colunas, valores, estilo=None, recuo=0):
+        celulas = []
+        for indice, valor in enumerate(valores):
+            coluna = colunas[indice] if indice < len(colunas) else Coluna()
+            if indice == 0 and recuo and isinstance(valor, str):
+                valor = f"{'  ' * recuo}{valor}"
+            celulas.append(self._celula(
+                ws,
+                valor,
+                estilo or coluna.estilo,
+                coluna.formato,
+                ALINHAR_DIREITA if estilo and coluna.formato else None,
+            ))
+        self._escrever_linha(ws, celulas)
+
+    def _escrever_secao(self, ws, secao):
+        for _ in range(secao.espaco_antes):
+            self._escrever_linha(ws, [])
+        if secao.titulo:
+            self._escrever_faixa(ws, secao.titulo, "secao", len(secao.colunas))
+        if secao.cabecalho:
+            self._escrever_linha(ws, [
+                self._celula(
+                    ws, coluna.titulo, secao.estilo_cabecalho,
+                    alinhamento=ALINHAR_DIREITA if coluna.formato else None,
+                )
+                for coluna in secao.colunas
+            ])
+        for linha in secao.linhas:
+            if isinstance(linha, Linha):
+                self._escrever_dados(ws, secao.colunas, linha.valores, linha.estilo, linha.recuo)
+            else:
+                self._escrever_dados(ws, secao.colunas, linha)
+        if secao.totais is not None:
+            totais = secao.totais() if callable(secao.totais) else secao.totais
+            self._escrever_dados(ws, secao.colunas, totais, "total")
+
+    def salvar(self, destino):
+        """Escreve o arquivo em `destino` (caminho ou arquivo binário)."""
+        wb = Workbook(write_only=True)
+        for nome, atributos in ESTILOS.items():
+            wb.add_named_style(NamedStyle(name=nome, **atributos))
+        ws = wb.create_sheet(self.aba)
+        # No modo write-only as larguras precisam vir antes da primeira linha
+        for indice, largura in enumerate(self.larguras, self.coluna_inicial):
+            ws.column_dimensions[get_column_letter(indice)].width = largura
+
+        self._linha_atual = 0
+        largura_total = len(self.larguras)
+        if self.titulo:
+            self._escrever_faixa(ws, self.titulo, "titulo", largura_total)
+        if self.subtitulo:
+            self._escrever_faixa(ws, self.subtitulo, "subtitulo", largura_total)
+        for secao in self.secoes:
+            self._escrever_secao(ws, secao)
+        wb.save(destino)
+
+    def partes(self, tamanho=TAMANHO_PARTE):
+        """
+        Gera o arquivo em pedaços de `tamanho` bytes. Ao pedir a primeira parte
+        a planilha inteira é gravada num arquivo temporário em disco; só a
+        leitura desse arquivo é feita aos pedaços.
+        """
+        with tempfile.TemporaryFile() as arquivo:
+            self.salvar(arquivo)
+            arquivo.seek(0)
+            while parte := arquivo.read(tamanho):
+                yield parte
+
+    def resposta(self, nome_arquivo):
+        response = StreamingHttpResponse(self.partes(), content_type=CONTENT_TYPE_XLSX)
+        response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
+        return response
@@ -0,0 +1,10 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import UnidadeNegocio
+from .unidades import invalidar_unidades
+
+
+@receiver([post_save, post_delete], sender=UnidadeNegocio)
+def unidade_negocio_alterada(sender, **kwargs):
+    invalidar_unidades()
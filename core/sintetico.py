@@ -0,0 +1,405 @@
+"""
+Gerador de uma escola sintética para testes de carga e benchmarks.
+
+Cria professores, alunos com horário semanal fixo, aulas de `anos` anos (com
+relatórios, itens de exercício e presenças), mensalidades, despesas, leads e
+logs de auditoria. Tudo sai de um `random.Random(semente)` e é gravado com
+`bulk_create`, sem signals: a mesma semente, os mesmos parâmetros e o mesmo
+`hoje` geram exatamente os mesmos dados. As tabelas derivadas (estatísticas
+mensais, grade de horários e resumo financeiro) são recalculadas no fim.
+
+Usado pelo comando `gerar_dados_sinteticos` e pelo benchmark (core/benchmark.py).
+"""
+import random
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from finances.models import Category, Despesa, Receita, Transaction
+from finances.razao import recalcular_resumo
+from leads.models import Lead
+from logs.models import AuditLog
+from scheduler.estatisticas import recalcular_todas
+from scheduler.models import (
+    Aluno,
+    Aula,
+    CustomUser,
+    ItemRitmo,
+    ItemRudimento,
+    ItemVirada,
+    Modalidade,
+    PresencaAluno,
+    PresencaProfessor,
+    RelatorioAula,
+    extrair_bpm,
+)
+from scheduler.ocupacao import recalcular_ocupacao
+
+from .models import UnidadeNegocio
+
+PREFIXO_USUARIO = "sint_"
+SENHA_PADRAO = "sintetico123"
+LOTE = 2000
+
+PRIMEIROS_NOMES = [
+    "Ana", "Bruno", "Carla", "Daniel", "Eduarda", "Felipe", "Gabriela", "Heitor",
+    "Isabela", "João", "Karina", "Lucas", "Mariana", "Nicolas", "Olívia", "Pedro",
+    "Rafaela", "Samuel", "Tatiane", "Vinícius", "Yasmin", "Thiago", "Letícia", "Caio",
+]
+SOBRENOMES = [
+    "Silva", "Souza", "Oliveira", "Santos", "Pereira", "Lima", "Carvalho", "Ferreira",
+    "Rodrigues", "Almeida", "Costa", "Gomes", "Martins", "Araújo", "Barbosa", "Ribeiro",
+]
+
+# (nome, valor pago ao professor, tipo de pagamento, peso no sorteio)
+MODALIDADES = [
+    ("Bateria", Decimal("60.00"), "aula", 6),
+    ("Percussão em Grupo", Decimal("15.00"), "aluno", 2),
+    ("Teoria Musical", Decimal("45.00"), "aula", 1),
+]
+
+CATEGORIAS = [
+    ("Mensalidade", "income", "despesa"),
+    ("Venda de Produtos", "income", "despesa"),
+    ("Pagamento de Professores", "expense", "custo"),
+    ("Aluguel", "expense", "despesa"),
+    ("Contas de Consumo", "expense", "despesa"),
+    ("Marketing", "expense", "despesa"),
+]
+
+RUDIMENTOS = ["Toque simples", "Toque duplo", "Paradiddle", "Flam", "Drag", "Rufo"]
+RITMOS = ["Rock básico", "Samba", "Bossa nova", "Funk", "Shuffle", "Baião"]
+VIRADAS = ["Virada em semicolcheias", "Virada nos tons", "Virada com prato", "Virada em tercinas"]
+CONTEUDOS = ["Leitura rítmica", "Figuras musicais", "Compasso composto", "Dinâmica", "Independência"]
+MUSICAS = ["Back in Black", "Garota de Ipanema", "Billie Jean", "Seven Nation Army", "Aquarela"]
+FORMAS_PAGAMENTO = ["pix", "cartao", "especie", "transferencia", "boleto"]
+FONTES_LEAD = ["Instagram", "Indicação", "Google", "Site", "Evento"]
+
+HORAS_AULA = range(8, 21)
+SEMANAS_FUTURAS = 4
+
+
+def _mes_seguinte(mes):
+    return date(mes.year + (mes.month == 12), mes.month % 12 + 1, 1)
+
+
+def _meses(inicio, fim):
+    mes = inicio.replace(day=1)
+    while mes <= fim:
+        yield mes
+        mes = _mes_seguinte(mes)
+
+
+def _nome(rng):
+    return f"{rng.choice(PRIMEIROS_NOMES)} {rng.choice(SOBRENOMES)} {rng.choice(SOBRENOMES)}"
+
+
+def _aware(dia, hora, minuto=0):
+    return timezone.make_aware(datetime.combine(dia, time(hora, minuto)))
+
+
+def _criar(model, objetos):
+    model.objects.bulk_create(objetos, batch_size=LOTE)
+    return objetos
+
+
+class GeradorEscola:
+    def __init__(self, alunos=40, professores=4, anos=1, semente=42, hoje=None):
+        self.rng = random.Random(semente)
+        self.qtd_alunos = alunos
+        self.qtd_professores = professores
+        self.anos = anos
+        self.hoje = hoje or timezone.localdate()
+        inicio = self.hoje - timedelta(days=365 * anos)
+        self.inicio = inicio - timedelta(days=inicio.weekday())
+        self.fim_aulas = self.hoje + timedelta(weeks=SEMANAS_FUTURAS)
+        # Com `hoje` fixo (testes, reprodução) o dia inteiro conta como passado
+        self.agora = timezone.now() if hoje is None else _aware(hoje, 23, 59)
+        self.contagens = {}
+
+    def _contar(self, nome, objetos):
+        self.contagens[nome] = self.contagens.get(nome, 0) + len(objetos)
+        return objetos
+
+    # --- Cadastros ---------------------------------------------------------
+
+    def _cadastros(self):
+        self.unidade, _ = UnidadeNegocio.objects.get_or_create(nome="Escola")
+        self.categorias = {}
+        for nome, tipo, tipo_dre in CATEGORIAS:
+            self.categorias[nome], _ = Category.objects.get_or_create(
+                name=nome,
+                defaults={"type": tipo, "tipo_dre": tipo_dre, "unidade_negocio": self.unidade},
+            )
+        self.modalidades = []
+        for nome, valor, tipo_pagamento, peso in MODALIDADES:
+            modalidade, _ = Modalidade.objects.get_or_create(
+                nome=nome, defaults={"valor_pagamento_professor": valor, "tipo_pagamento": tipo_pagamento}
+            )
+            self.modalidades.append((modalidade, peso))
+
+        senha = make_password(SENHA_PADRAO)
+        self.admin = CustomUser.objects.create(
+            username=f"{PREFIXO_USUARIO}admin", password=senha, tipo="admin",
+            is_staff=True, first_name="Admin", last_name="Sintético",
+        )
+        professores = []
+        for i in range(self.qtd_professores):
+            primeiro, sobrenome = self.rng.choice(PRIMEIROS_NOMES), self.rng.choice(SOBRENOMES)
+            professores.append(CustomUser(
+                username=f"{PREFIXO_USUARIO}prof_{i:04d}", password=senha, tipo="professor",
+                first_name=primeiro, last_name=sobrenome,
+            ))
+        self.professores = self._contar("professores", _criar(CustomUser, professores))
+
+        alunos = []
+        for i in range(self.qtd_alunos):
+            matricula = self.inicio + timedelta(days=self.rng.randrange(0, 120))
+            status = self.rng.choices(["ativo", "inativo", "trancado"], weights=[85, 10, 5])[0]
+            alunos.append(Aluno(
+                nome_completo=_nome(self.rng),
+                telefone=f"(11) 9{self.rng.randrange(10**7, 10**8)}",
+                email=f"aluno{i:06d}@sintetico.test",
+                valor_mensalidade=Decimal(self.rng.choice([250, 300, 350, 400])),
+                dia_vencimento=self.rng.choice([5, 10, 15, 20]),
+                data_criacao=matricula,
+                status=status,
+            ))
+        self.alunos = self._contar("alunos", _criar(Aluno, alunos))
+
+        # Horário semanal fixo de cada aluno; quem saiu tem aulas só até a saída
+        self.horarios = []
+        periodo = (self.hoje - self.inicio).days
+        for aluno in self.alunos:
+            saida = None
+            if aluno.status != "ativo":
+                saida = self.inicio + timedelta(days=self.rng.randrange(periodo // 3, periodo))
+            self.horarios.append({
+                "aluno": aluno,
+                "dia_semana": self.rng.randrange(6),
+                "hora": self.rng.choice(HORAS_AULA),
+                "professor": self.rng.choice(self.professores),
+                "modalidade": self.rng.choices(
+                    [m for m, _ in self.modalidades], weights=[p for _, p in self.modalidades]
+                )[0],
+                "saida": saida,
+            })
+
+    # --- Aulas -------------------------------------------------------------
+
+    def _status_aula(self, data_hora):
+        if data_hora >= self.agora:
+            return "Agendada"
+        return self.rng.choices(["Realizada", "Aluno Ausente", "Cancelada"], weights=[80, 10, 10])[0]
+
+    def _aulas(self):
+        aulas, dados = [], []
+        for horario in self.horarios:
+            dia = self.inicio + timedelta(days=horario["dia_semana"])
+            limite = horario["saida"] or self.fim_aulas
+            while dia <= limite:
+                data_hora = _aware(dia, horario["hora"])
+                aulas.append(Aula(
+                    modalidade=horario["modalidade"],
+                    data_hora=data_hora,
+                    status=self._status_aula(data_hora),
+                ))
+                dados.append(horario)
+                dia += timedelta(weeks=1)
+        self._contar("aulas", _criar(Aula, aulas))
+
+        AlunoAula = Aula.alunos.through
+        ProfessorAula = Aula.professores.through
+        _criar(AlunoAula, [AlunoAula(aula_id=a.pk, aluno_id=h["aluno"].pk) for a, h in zip(aulas, dados)])
+        _criar(ProfessorAula, [
+            ProfessorAula(aula_id=a.pk, customuser_id=h["professor"].pk) for a, h in zip(aulas, dados)
+        ])
+
+        relatorios, presencas, presencas_prof = [], [], []
+        for aula, horario in zip(aulas, dados):
+            professor_id = horario["professor"].pk
+            if aula.status in ("Realizada", "Aluno Ausente"):
+                presencas_prof.append(PresencaProfessor(aula_id=aula.pk, professor_id=professor_id))
+            if aula.status == "Aluno Ausente":
+                presencas.append(PresencaAluno(
+                    aula_id=aula.pk, aluno_id=horario["aluno"].pk, status="ausente",
+                    tipo_falta=self.rng.choices(["justificada", "injustificada"], weights=[40, 60])[0],
+                ))
+            elif aula.status == "Realizada":
+                presencas.append(PresencaAluno(aula_id=aula.pk, aluno_id=horario["aluno"].pk))
+                relatorios.append(RelatorioAula(
+                    aula_id=aula.pk,
+                    professor_que_validou_id=professor_id,
+                    ultimo_editor_id=professor_id,
+                    conteudo_teorico=self.rng.choice(CONTEUDOS),
+                    repertorio_musicas=self.rng.choice(MUSICAS),
+                    observacoes_gerais="Aula gerada para benchmark.",
+                ))
+        self._contar("presencas_alunos", _criar(PresencaAluno, presencas))
+        self._contar("presencas_professores", _criar(PresencaProfessor, presencas_prof))
+        self._contar("relatorios", _criar(RelatorioAula, relatorios))
+
+        for model, nomes, chave in [
+            (ItemRudimento, RUDIMENTOS, "itens_rudimento"),
+            (ItemRitmo, RITMOS, "itens_ritmo"),
+            (ItemVirada, VIRADAS, "itens_virada"),
+        ]:
+            itens = []
+            for relatorio in relatorios:
+                for _ in range(self.rng.choice([0, 1, 1, 2])):
+                    bpm = str(self.rng.randrange(60, 180, 5))
+                    # bulk_create não passa pelo save() que preenche os campos numéricos
+                    bpm_valor, bpm_min, bpm_max = extrair_bpm(bpm)
+                    itens.append(model(
+                        relatorio_id=relatorio.pk, descricao=self.rng.choice(nomes), bpm=bpm,
+                        bpm_valor=bpm_valor, bpm_min=bpm_min, bpm_max=bpm_max,
+                        duracao_min=self.rng.choice([5, 10, 15]),
+                    ))
+            self._contar(chave, _criar(model, itens))
+
+    # --- Financeiro --------------------------------------------------------
+
+    def _lancamento(self, valor, categoria, data, descricao, aluno=None, professor=None):
+        return Transaction(
+            description=descricao, amount=valor, category=categoria, transaction_date=data,
+            forma_pagamento=self.rng.choice(FORMAS_PAGAMENTO), student=aluno, professor=professor,
+            created_by=self.admin, unidade_negocio=self.unidade,
+        )
+
+    def _pago(self, mes):
+        """Meses passados quase sempre pagos; o mês corrente pela metade."""
+        if mes.year == self.hoje.year and mes.month == self.hoje.month:
+            return self.rng.random() < 0.5
+        return self.rng.random() < 0.92
+
+    def _financeiro(self):
+        mensalidade = self.categorias["Mensalidade"]
+        receitas, transacoes_receitas = [], []
+        for mes in _meses(self.inicio, self.hoje):
+            for horario in self.horarios:
+                aluno = horario["aluno"]
+                if aluno.data_criacao > _mes_seguinte(mes) or (horario["saida"] and horario["saida"] < mes):
+                    continue
+                receita = Receita(
+                    unidade_negocio=self.unidade, categoria=mensalidade, aluno=aluno,
+                    descricao=aluno.nome_completo, valor=aluno.valor_mensalidade,
+                    data_competencia=mes, status="a_receber",
+                )
+                if self._pago(mes):
+                    vencimento = mes.replace(day=aluno.dia_vencimento)
+                    recebimento = min(vencimento + timedelta(days=self.rng.randrange(-5, 8)), self.hoje)
+                    receita.status, receita.data_recebimento = "recebido", recebimento
+                    transacoes_receitas.append((receita, self._lancamento(
+                        aluno.valor_mensalidade, mensalidade, recebimento, f"Mensalidade {aluno.nome_completo}",
+                        aluno=aluno,
+                    )))
+                receitas.append(receita)
+
+        despesas, transacoes_despesas = [], []
+        fixas = [("Aluguel", Decimal("4500.00"), 5), ("Contas de Consumo", Decimal("650.00"), 10)]
+        for mes in _meses(self.inicio, self.hoje):
+            lancamentos = [
+                (self.categorias[nome], valor + Decimal(self.rng.randrange(0, 200)), nome, dia, None)
+                for nome, valor, dia in fixas
+            ]
+            for _ in range(self.rng.randrange(1, 4)):
+                lancamentos.append((
+                    self.categorias["Marketing"], Decimal(self.rng.randrange(100, 1500)),
+                    "Campanha de marketing", self.rng.randrange(1, 28), None,
+                ))
+            for professor in self.professores:
+                lancamentos.append((
+                    self.categorias["Pagamento de Professores"], Decimal(self.rng.randrange(1500, 4500)),
+                    f"Pagamento {professor.get_full_name()}", 5, professor,
+                ))
+            for categoria, valor, descricao, dia, professor in lancamentos:
+                data = mes.replace(day=dia)
+                despesa = Despesa(
+                    unidade_negocio=self.unidade, categoria=categoria, descricao=f"{descricao} {mes:%m/%Y}",
+                    valor=valor, data_competencia=data, status="a_pagar", professor=professor,
+                )
+                if data <= self.hoje and self._pago(mes):
+                    despesa.status, despesa.data_pagamento = "pago", data
+                    transacoes_despesas.append((despesa, self._lancamento(
+                        -valor, categoria, data, despesa.descricao, professor=professor
+                    )))
+                despesas.append(despesa)
+
+        _criar(Transaction, [t for _, t in transacoes_receitas + transacoes_despesas])
+        for conta, lancamento in transacoes_receitas + transacoes_despesas:
+            conta.transacao_id = lancamento.pk
+        self._contar("transacoes", transacoes_receitas + transacoes_despesas)
+        self._contar("receitas", _criar(Receita, receitas))
+        self._contar("despesas", _criar(Despesa, despesas))
+
+    # --- Leads e auditoria -------------------------------------------------
+
+    def _leads(self):
+        leads = []
+        por_mes = max(3, self.qtd_alunos // 10)
+        for mes in _meses(self.inicio, self.hoje):
+            for _ in range(por_mes):
+                leads.append(Lead(
+                    nome_interessado=_nome(self.rng),
+                    contato=f"(11) 9{self.rng.randrange(10**7, 10**8)}",
+                    idade=self.rng.randrange(8, 60),
+                    fonte=self.rng.choice(FONTES_LEAD),
+                    curso_interesse=self.rng.choice(Lead.CURSO_CHOICES)[0],
+                    status=self.rng.choice(Lead.STATUS_CHOICES)[0],
+                    data_criacao=min(mes + timedelta(days=self.rng.randrange(28)), self.hoje),
+                    criado_por=self.admin,
+                    unidade_negocio=self.unidade,
+                ))
+        self._contar("leads", _criar(Lead, leads))
+
+    def _auditoria(self):
+        usuarios = [self.admin, *self.professores]
+        por_dia = max(5, self.qtd_alunos // 4)
+        registros = []
+        dia = self.inicio
+        while dia <= self.hoje:
+            for _ in range(por_dia):
+                usuario = self.rng.choice(usuarios)
+                acao = self.rng.choices(["visualizou", "atualizou", "criou", "deletou"], weights=[70, 18, 10, 2])[0]
+                momento = _aware(dia, self.rng.randrange(8, 22), self.rng.randrange(60))
+                if acao == "visualizou":
+                    path = self.rng.choice(["/", "/aulas/", "/alunos/", "/finances/mensalidades/"])
+                    registros.append(AuditLog(
+                        timestamp=momento, user=usuario, username=usuario.get_full_name(), path=path,
+                        method="GET", action=acao, resource_type="http",
+                        resource_name=f"Página {path}", detail={}, tags=f"http,{acao}",
+                    ))
+                else:
+                    aluno = self.rng.choice(self.alunos)
+                    registros.append(AuditLog(
+                        timestamp=momento, user=usuario, username=usuario.get_full_name(), path="/alunos/",
+                        method="POST", action=acao, resource_type="Aluno", resource_id=str(aluno.pk),
+                        resource_name=aluno.nome_completo,
+                        detail={"status": {"old": "ativo", "new": aluno.status}}, tags=f"aluno,{acao}",
+                    ))
+            dia += timedelta(days=1)
+        self._contar("logs", _criar(AuditLog, registros))
+
+    def gerar(self):
+        with transaction.atomic():
+            self._cadastros()
+            self._aulas()
+            self._financeiro()
+            self._leads()
+            self._auditoria()
+        self.contagens["estatisticas_mensais"] = recalcular_todas()
+        self.contagens["horarios_ocupados"] = recalcular_ocupacao()
+        self.contagens["resumos_financeiros"] = recalcular_resumo()
+        return self.contagens
+
+
+def ja_gerado():
+    return CustomUser.objects.filter(username__startswith=PREFIXO_USUARIO).exists()
+
+
+def gerar_escola(alunos=40, professores=4, anos=1, semente=42, hoje=None):
+    """Gera a escola sintética e retorna {tabela: quantidade criada}."""
+    return GeradorEscola(alunos, professores, anos, semente, hoje).gerar()
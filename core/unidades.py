@@ -0,0 +1,54 @@
+"""
+Cache local (por processo) das unidades de negócio exibidas no menu.
+
+A lista é lida do banco uma vez e reaproveitada enquanto a "versão" guardada
+no cache do Django não mudar, por no máximo TTL_LOCAL segundos. Os signals de
+`core.signals` trocam a versão a cada alteração em UnidadeNegocio; com um
+cache compartilhado entre processos a troca vale para todos eles. O TTL cobre
+o que a versão não vê: alterações sem signals (update(), shell, outro
+sistema) ou um cache local por processo.
+"""
+import time
+
+from django.core.cache import cache
+
+from .models import UnidadeNegocio
+
+VERSAO_KEY = "unidades_negocio:versao"
+TTL_LOCAL = 60
+
+# (versão, lido em, tupla de unidades); trocado por inteiro para ser seguro entre threads
+_local = (None, 0.0, ())
+
+
+def invalidar_unidades():
+    global _local
+    cache.set(VERSAO_KEY, time.time_ns(), None)
+    _local = (None, 0.0, ())
+
+
+def _versao_atual():
+    versao = cache.get(VERSAO_KEY)
+    if versao is None:
+        cache.add(VERSAO_KEY, time.time_ns(), None)
+        versao = cache.get(VERSAO_KEY)
+    return versao
+
+
+def listar_unidades():
+    global _local
+    versao = _versao_atual()
+    versao_local, lido_em, unidades = _local
+    agora = time.monotonic()
+    if versao_local is None or versao_local != versao or agora - lido_em > TTL_LOCAL:
+        unidades = tuple(UnidadeNegocio.objects.all())
+        _local = (versao, agora, unidades)
+    return unidades
+
+
+def obter_unidade(pk):
+    """Unidade do cache pelo id (None se não existir)."""
+    for unidade in listar_unidades():
+        if unidade.pk == pk:
+            return unidade
+    return None
@@ -10,4 +10,7 @@ urlpatterns = [
     path('notificacoes/', views.notificacao_list_view, name='notificacao_list'),
     path('notificacoes/<int:pk>/marcar-nao-lida/', views.marcar_notificacao_nao_lida, name='marcar_notificacao_nao_lida'),
     path('notificacoes/<int:pk>/excluir/', views.excluir_notificacao, name='excluir_notificacao'),
+    path('pdfs/<str:chave>/', views.tarefa_pdf, name='tarefa_pdf'),
+    path('pdfs/<str:chave>/status/', views.tarefa_pdf_status, name='tarefa_pdf_status'),
+    path('pdfs/<str:chave>/baixar/', views.baixar_tarefa_pdf, name='baixar_tarefa_pdf'),
 ]
@@ -1,11 +1,15 @@
-from django.http import JsonResponse
+import os
+
+from django.http import Http404, JsonResponse
 from django.contrib.auth.decorators import login_required
 from django.http import HttpResponseRedirect
 from django.urls import reverse
 from django.shortcuts import render
 from django.views.decorators.http import require_POST
 from django.shortcuts import get_object_or_404
-from .models import Notificacao
+from .models import Notificacao, TarefaPDF
+from .notificacoes import invalidar_resumo
+from .pdfs import caminho_do_arquivo, pode_acessar, resposta_arquivo
 from django.utils import timezone
 from datetime import timedelta
 from collections import defaultdict
@@ -22,6 +26,7 @@ def set_unidade_negocio(request, pk):
 def marcar_notificacoes_como_lidas(request):
     if request.method == "POST":
         request.user.notificacoes.filter(lida=False).update(lida=True)
+        invalidar_resumo(request.user.pk)
         return JsonResponse({"status": "success"})
     return JsonResponse({"status": "error"}, status=400)
 
@@ -32,6 +37,7 @@ def marcar_notificacao_nao_lida(request, pk):
     notificacao = get_object_or_404(Notificacao, pk=pk, usuario=request.user)
     notificacao.lida = False
     notificacao.save()
+    invalidar_resumo(request.user.pk)
     return JsonResponse({'status': 'success'})
 
 
@@ -40,6 +46,7 @@ def marcar_notificacao_nao_lida(request, pk):
 def excluir_notificacao(request, pk):
     notificacao = get_object_or_404(Notificacao, pk=pk, usuario=request.user)
     notificacao.delete()
+    invalidar_resumo(request.user.pk)
     return JsonResponse({'status': 'success'})
 
 
@@ -87,3 +94,41 @@ def notificacao_list_view(request):
         'filtro_ativo': filtro_ativo,
     }
     return render(request, 'core/notificacao_list.html', context)
+
+
+# --- PDFs GERADOS EM SEGUNDO PLANO (core/pdfs.py) ---
+
+
+def _tarefa_do_usuario(request, chave, **filtros):
+    """Tarefa que o usuário pode ver (404 para as outras, sem revelar que existem)."""
+    tarefa = get_object_or_404(TarefaPDF, chave=chave, **filtros)
+    if not pode_acessar(request.user, tarefa):
+        raise Http404("Tarefa não encontrada.")
+    return tarefa
+
+
+@login_required
+def tarefa_pdf(request, chave):
+    """Página de espera: consulta o status da tarefa até o PDF ficar pronto."""
+    tarefa = _tarefa_do_usuario(request, chave)
+    if tarefa.status == "concluida":
+        return resposta_arquivo(tarefa)
+    return render(request, "core/tarefa_pdf.html", {"tarefa": tarefa})
+
+
+@login_required
+def tarefa_pdf_status(request, chave):
+    tarefa = _tarefa_do_usuario(request, chave)
+    return JsonResponse({
+        "status": tarefa.status,
+        "erro": tarefa.erro if tarefa.status == "erro" else "",
+        "url": reverse("core:baixar_tarefa_pdf", args=[tarefa.chave]) if tarefa.status == "concluida" else None,
+    })
+
+
+@login_required
+def baixar_tarefa_pdf(request, chave):
+    tarefa = _tarefa_do_usuario(request, chave, status="concluida")
+    if not os.path.isfile(caminho_do_arquivo(tarefa.chave)):
+        raise Http404("Arquivo não está mais no cache.")
+    return resposta_arquivo(tarefa)
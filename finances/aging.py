@@ -0,0 +1,157 @@
+"""
+Relatório de vencimentos (aging) de contas a receber e a pagar.
+
+A classificação por faixa de atraso e o agrupamento por entidade são feitos
+no banco: cada faixa é uma soma condicional (`Case/When` sobre intervalos de
+`data_competencia`) e o GROUP BY é feito pela entidade, ou seja, o aluno (nas
+receitas com aluno) ou a descrição em minúsculas (demais receitas e
+despesas). O Python recebe uma linha por entidade e só soma os totais das
+colunas; o custo não cresce com o número de lançamentos em aberto.
+
+O LOWER do SQLite só converte ASCII: "AÇÃO" e "ação" chegam do banco em
+linhas separadas. `_fundir_linhas` junta as linhas com a mesma descrição em
+minúsculas no Python antes de montar a matriz.
+
+Os dias de atraso são contados da competência até a data-base:
+competência na data-base ou depois é "A Vencer"; 1 a 30 dias, 31 a 60,
+61 a 90 e mais de 90 dias formam as outras faixas.
+
+Com uma data-base no passado o relatório é uma foto histórica: entram os
+lançamentos ainda em aberto e os quitados depois da data-base (pela data de
+recebimento/pagamento ou, na falta dela, pela data da transação). Não há
+data de criação dos lançamentos, então os cadastrados depois da data-base
+também entram (como "A Vencer" ou atrasados, conforme a competência).
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.db.models import Case, DecimalField, F, Max, Q, Sum, Value, When
+from django.db.models.functions import Coalesce, Lower
+
+from .models import Despesa, Receita
+
+# (chave usada no template, rótulo, dias mínimos de atraso, dias máximos ou None)
+FAIXAS = [
+    ("a_vencer", "A Vencer", None, 0),
+    ("d1_30", "1-30 dias", 1, 30),
+    ("d31_60", "31-60 dias", 31, 60),
+    ("d61_90", "61-90 dias", 61, 90),
+    ("d90_plus", "90+ dias", 91, None),
+]
+
+ZERO = Decimal("0.00")
+
+
+def _q_faixa(campo_data, data_base, minimo, maximo):
+    """Atraso entre `minimo` e `maximo` dias, como intervalo de datas (usa o índice da coluna)."""
+    q = Q()
+    if minimo is not None:
+        q &= Q(**{f"{campo_data}__lte": data_base - timedelta(days=minimo)})
+    if maximo is not None:
+        q &= Q(**{f"{campo_data}__gte": data_base - timedelta(days=maximo)})
+    return q
+
+
+def _soma_faixa(campo_data, data_base, minimo, maximo):
+    return Sum(
+        Case(
+            When(_q_faixa(campo_data, data_base, minimo, maximo), then=F("valor")),
+            default=Value(ZERO),
+            output_field=DecimalField(max_digits=12, decimal_places=2),
+        )
+    )
+
+
+def _matriz(queryset, data_base, campo_data, campo_aluno=None):
+    """Uma linha por entidade com as somas de cada faixa, maiores totais primeiro."""
+    grupo_descricao = Lower("descricao")
+    agrupamento = ["grupo_descricao"]
+    agregados = {
+        chave: _soma_faixa(campo_data, data_base, minimo, maximo)
+        for chave, _, minimo, maximo in FAIXAS
+    }
+    if campo_aluno:
+        # Lançamentos com aluno são agrupados só pelo aluno
+        grupo_descricao = Case(
+            When(**{f"{campo_aluno}__isnull": True}, then=Lower("descricao")),
+            default=Value(""),
+        )
+        agrupamento.insert(0, campo_aluno)
+        agregados["nome_aluno"] = Max(f"{campo_aluno}__nome_completo")
+
+    return (
+        queryset.annotate(grupo_descricao=grupo_descricao)
+        .order_by()
+        .values(*agrupamento)
+        .annotate(descricao_exibicao=Max("descricao"), total_geral=Sum("valor"), **agregados)
+        .order_by("-total_geral")
+    )
+
+
+def _fundir_linhas(linhas, campo_aluno=None):
+    """Soma as linhas da mesma entidade que o LOWER do banco separou e refaz a ordem por total."""
+    colunas = [chave for chave, *_ in FAIXAS] + ["total_geral"]
+    fundidas = {}
+    for linha in linhas:
+        chave = (linha[campo_aluno] if campo_aluno else None, linha["grupo_descricao"].lower())
+        atual = fundidas.get(chave)
+        if atual is None:
+            fundidas[chave] = dict(linha)
+            continue
+        for coluna in colunas:
+            atual[coluna] = (atual[coluna] or ZERO) + (linha[coluna] or ZERO)
+        atual["descricao_exibicao"] = max(atual["descricao_exibicao"], linha["descricao_exibicao"])
+    return sorted(fundidas.values(), key=lambda linha: linha["total_geral"], reverse=True)
+
+
+def aging(queryset, data_base, campo_data="data_competencia", campo_aluno=None):
+    """
+    Matriz do aging no formato do template: entidades (nome, total e valor
+    por faixa), totais por faixa, total geral e rótulos das faixas.
+    """
+    column_totals = {chave: ZERO for chave, *_ in FAIXAS}
+    grand_total = ZERO
+    entities = []
+    for linha in _fundir_linhas(_matriz(queryset, data_base, campo_data, campo_aluno), campo_aluno):
+        buckets = {chave: linha[chave] or ZERO for chave, *_ in FAIXAS}
+        entities.append({
+            "entity": linha.get("nome_aluno") or linha["descricao_exibicao"],
+            "total_geral": linha["total_geral"],
+            "buckets": buckets,
+        })
+        for chave, valor in buckets.items():
+            column_totals[chave] += valor
+        grand_total += linha["total_geral"]
+
+    return {
+        "entities": entities,
+        "column_totals": column_totals,
+        "grand_total": grand_total,
+        "bucket_labels": [rotulo for _, rotulo, *_ in FAIXAS],
+    }
+
+
+def _abertos(queryset, data_base, status_aberto, campo_quitacao, hoje):
+    """Em aberto na data-base: em aberto hoje ou quitados depois da data-base."""
+    if data_base >= hoje:
+        return queryset.filter(status=status_aberto)
+    quitado_em = Coalesce(campo_quitacao, "transacao__transaction_date")
+    return queryset.annotate(quitado_em=quitado_em).filter(
+        Q(status=status_aberto) | Q(quitado_em__gt=data_base)
+    )
+
+
+def aging_recebiveis(unidade_id, data_base, hoje):
+    receitas = _abertos(
+        Receita.objects.filter(unidade_negocio_id=unidade_id),
+        data_base, "a_receber", "data_recebimento", hoje,
+    )
+    return aging(receitas, data_base, campo_aluno="aluno")
+
+
+def aging_pagaveis(unidade_id, data_base, hoje):
+    despesas = _abertos(
+        Despesa.objects.filter(unidade_negocio_id=unidade_id),
+        data_base, "a_pagar", "data_pagamento", hoje,
+    )
+    return aging(despesas, data_base)
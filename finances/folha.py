@@ -0,0 +1,166 @@
+"""
+Folha de pagamento dos professores.
+
+As regras são as da calculadora de pagamento da tela de despesas:
+
+- aula comum "Realizada": paga ao professor que validou o relatório;
+- "Atividade Complementar" realizada: paga a cada professor com presença
+  "presente" registrada na aula;
+- modalidade com `tipo_pagamento == "aluno"`: quantidade = alunos presentes;
+  caso contrário, quantidade = aulas.
+
+`calcular_folha` resolve todos os professores do período com uma única
+consulta agrupada por (professor, modalidade), independente do número de
+professores. `gerar_despesas_folha` grava as despesas resultantes com um
+único `bulk_create`.
+"""
+from collections import defaultdict
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, F, Q
+
+from scheduler.models import Aula, CustomUser, Modalidade
+
+from .models import Despesa
+from .razao import atualizar_resumo
+
+ATIVIDADE_COMPLEMENTAR = "atividade complementar"
+
+UNIDADE_CONTAGEM = {
+    "aluno": "aluno(s) presente(s)",
+    "aula": "aula(s)",
+}
+
+
+def _contagens(data_inicial, data_final, professor_ids=None):
+    """(professor_id, modalidade_id, aulas, alunos_presentes) dos dois tipos de aula."""
+    realizadas = Aula.objects.filter(
+        status="Realizada",
+        data_hora__date__gte=data_inicial,
+        data_hora__date__lte=data_final,
+    )
+    contagens = {
+        "aulas": Count("pk", distinct=True),
+        "presentes": Count("presencas", filter=Q(presencas__status="presente"), distinct=True),
+    }
+
+    filtro_comum = Q(relatorioaula__professor_que_validou__isnull=False)
+    filtro_ac = Q(presencas_professores__status="presente")
+    if professor_ids is not None:
+        filtro_comum &= Q(relatorioaula__professor_que_validou__in=professor_ids)
+        filtro_ac &= Q(presencas_professores__professor__in=professor_ids)
+
+    comuns = (
+        realizadas.exclude(modalidade__nome__icontains=ATIVIDADE_COMPLEMENTAR)
+        .filter(filtro_comum)
+        .annotate(professor_pago=F("relatorioaula__professor_que_validou"))
+        .values("professor_pago", "modalidade_id")
+        .annotate(**contagens)
+        .values_list("professor_pago", "modalidade_id", "aulas", "presentes")
+        .order_by()
+    )
+    complementares = (
+        realizadas.filter(filtro_ac, modalidade__nome__icontains=ATIVIDADE_COMPLEMENTAR)
+        .annotate(professor_pago=F("presencas_professores__professor"))
+        .values("professor_pago", "modalidade_id")
+        .annotate(**contagens)
+        .values_list("professor_pago", "modalidade_id", "aulas", "presentes")
+        .order_by()
+    )
+    # Os dois grupos têm modalidades disjuntas: nenhuma chave se repete
+    return comuns.union(complementares, all=True)
+
+
+def calcular_folha(data_inicial, data_final, professor_ids=None):
+    """
+    Linhas de pagamento por professor no período (datas inclusivas).
+
+    Retorna {professor_id: {"professor", "nome", "linhas", "total"}}, com as
+    linhas no formato usado pela calculadora da tela de despesas e valores
+    em Decimal. Professores sem nada a receber não aparecem.
+    """
+    contagens = list(_contagens(data_inicial, data_final, professor_ids))
+    if not contagens:
+        return {}
+
+    modalidades = Modalidade.objects.in_bulk({modalidade_id for _, modalidade_id, _, _ in contagens})
+    professores = CustomUser.objects.in_bulk({professor_id for professor_id, _, _, _ in contagens})
+
+    linhas_por_professor = defaultdict(list)
+    for professor_id, modalidade_id, aulas, presentes in contagens:
+        modalidade = modalidades[modalidade_id]
+        quantidade = presentes if modalidade.tipo_pagamento == "aluno" else aulas
+        if quantidade <= 0:
+            continue
+        linhas_por_professor[professor_id].append({
+            "modalidade_nome": modalidade.nome,
+            "tipo_pagamento_display": modalidade.get_tipo_pagamento_display(),
+            "valor_unitario": modalidade.valor_pagamento_professor,
+            "unidade_contagem": UNIDADE_CONTAGEM.get(modalidade.tipo_pagamento, "aula(s)"),
+            "quantidade": quantidade,
+            "subtotal": Decimal(quantidade) * modalidade.valor_pagamento_professor,
+        })
+
+    folha = {}
+    for professor_id, linhas in linhas_por_professor.items():
+        professor = professores[professor_id]
+        linhas.sort(key=lambda linha: linha["modalidade_nome"])
+        folha[professor_id] = {
+            "professor": professor,
+            "nome": professor.get_full_name() or professor.username,
+            "linhas": linhas,
+            "total": sum((linha["subtotal"] for linha in linhas), Decimal("0.00")),
+        }
+    return folha
+
+
+def descricao_pagamento(nome_professor, data_inicial, data_final):
+    """Mesma descrição que a calculadora aplica ao lançamento de despesa."""
+    return (
+        f"Pagamento Prof. {nome_professor} - Período "
+        f"{data_inicial:%d/%m/%Y} a {data_final:%d/%m/%Y}"
+    )
+
+
+def gerar_despesas_folha(
+    unidade_id, categoria, data_inicial, data_final, data_competencia=None, professor_ids=None
+):
+    """
+    Grava com um único `bulk_create` uma despesa "a pagar" por professor com
+    valor a receber no período. Professores que já têm a despesa do período
+    (mesma descrição) na unidade são ignorados, então rodar de novo é seguro.
+    Retorna as despesas criadas.
+    """
+    data_competencia = data_competencia or data_final
+    folha = calcular_folha(data_inicial, data_final, professor_ids)
+
+    descricoes = {
+        professor_id: descricao_pagamento(item["nome"], data_inicial, data_final)
+        for professor_id, item in folha.items()
+    }
+    with transaction.atomic():
+        ja_lancadas = set(
+            Despesa.objects.filter(
+                unidade_negocio_id=unidade_id,
+                professor_id__in=list(descricoes),
+                descricao__in=list(descricoes.values()),
+            ).values_list("professor_id", "descricao")
+        )
+        despesas = [
+            Despesa(
+                unidade_negocio_id=unidade_id,
+                categoria=categoria,
+                professor_id=professor_id,
+                descricao=descricoes[professor_id],
+                valor=folha[professor_id]["total"],
+                data_competencia=data_competencia,
+                status="a_pagar",
+            )
+            for professor_id in sorted(folha, key=lambda pk: folha[pk]["nome"])
+            if (professor_id, descricoes[professor_id]) not in ja_lancadas
+        ]
+        criadas = Despesa.objects.bulk_create(despesas)
+        # bulk_create não dispara os signals do resumo financeiro
+        atualizar_resumo(criadas)
+        return criadas
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from finances.folha import gerar_despesas_folha
+from finances.models import Category
+
+
+def _data(valor):
+    try:
+        return datetime.strptime(valor, '%Y-%m-%d').date()
+    except ValueError:
+        raise CommandError(f"Data inválida: {valor} (use AAAA-MM-DD).")
+
+
+class Command(BaseCommand):
+    help = 'Lança em lote as despesas de pagamento de todos os professores no período (padrão: mês anterior).'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--categoria', required=True, help='Nome da categoria de despesa usada nos lançamentos.')
+        parser.add_argument('--data-inicial', help='Início do período (AAAA-MM-DD).')
+        parser.add_argument('--data-final', help='Fim do período (AAAA-MM-DD).')
+
+    def handle(self, *args, **options):
+        fim_mes_anterior = timezone.localdate().replace(day=1) - timedelta(days=1)
+        data_inicial = _data(options['data_inicial']) if options['data_inicial'] else fim_mes_anterior.replace(day=1)
+        data_final = _data(options['data_final']) if options['data_final'] else fim_mes_anterior
+        if data_inicial > data_final:
+            raise CommandError('A data inicial deve ser anterior à final.')
+
+        categorias = Category.objects.filter(
+            name__iexact=options['categoria'], type='expense', unidade_negocio__isnull=False
+        ).select_related('unidade_negocio')
+        if not categorias:
+            raise CommandError(f"Categoria de despesa '{options['categoria']}' não encontrada.")
+
+        for categoria in categorias:
+            criadas = gerar_despesas_folha(categoria.unidade_negocio_id, categoria, data_inicial, data_final)
+            self.stdout.write(self.style.SUCCESS(
+                f"{categoria.unidade_negocio}: {len(criadas)} pagamento(s) lançado(s) "
+                f"de {data_inicial:%d/%m/%Y} a {data_final:%d/%m/%Y}."
+            ))
@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from finances.mensalidades import materializar_mes
+from finances.models import Category
+
+
+class Command(BaseCommand):
+    help = 'Gera em lote as receitas de mensalidade que faltam no mês, para todas as unidades de negócio.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ano', type=int, help='Ano de competência (padrão: ano atual).')
+        parser.add_argument('--mes', type=int, help='Mês de competência (padrão: mês atual).')
+
+    def handle(self, *args, **options):
+        hoje = timezone.localdate()
+        ano = options['ano'] or hoje.year
+        mes = options['mes'] or hoje.month
+        if not 1 <= mes <= 12:
+            raise CommandError('Mês inválido.')
+
+        categorias = Category.objects.filter(
+            name__iexact='Mensalidade', unidade_negocio__isnull=False
+        ).select_related('unidade_negocio')
+
+        for categoria in categorias:
+            criadas = materializar_mes(categoria.unidade_negocio_id, categoria, ano, mes)
+            self.stdout.write(self.style.SUCCESS(
+                f"{categoria.unidade_negocio}: {criadas} mensalidade(s) gerada(s) para {mes:02d}/{ano}."
+            ))
+
+        self.stdout.write("Geração concluída.")
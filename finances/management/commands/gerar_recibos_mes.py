@@ -0,0 +1,43 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import UnidadeNegocio
+from finances.recibos import PROCESSOS_PADRAO, gerar_pacote
+
+
+class Command(BaseCommand):
+    help = 'Gera em paralelo os recibos das mensalidades pagas de uma unidade no mês, em um ZIP com manifesto.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--unidade', type=int, required=True, help='ID da unidade de negócio.')
+        parser.add_argument('--ano', type=int, help='Ano de competência (padrão: ano atual).')
+        parser.add_argument('--mes', type=int, help='Mês de competência (padrão: mês atual).')
+        parser.add_argument('--saida', help='Arquivo ZIP de saída (padrão: Recibos_AAAA-MM.zip).')
+        parser.add_argument(
+            '--processos', type=int, default=PROCESSOS_PADRAO,
+            help=f'Processos em paralelo (padrão: {PROCESSOS_PADRAO}).',
+        )
+
+    def handle(self, *args, **options):
+        hoje = timezone.localdate()
+        ano = options['ano'] or hoje.year
+        mes = options['mes'] or hoje.month
+        if not 1 <= mes <= 12:
+            raise CommandError('Mês inválido.')
+        if options['processos'] < 1:
+            raise CommandError('--processos deve ser pelo menos 1.')
+        if not UnidadeNegocio.objects.filter(pk=options['unidade']).exists():
+            raise CommandError(f"Unidade de negócio {options['unidade']} não encontrada.")
+
+        saida = options['saida'] or f'Recibos_{ano}-{mes:02d}.zip'
+        inicio = time.perf_counter()
+        gerados, falhas = gerar_pacote(options['unidade'], ano, mes, saida, processos=options['processos'])
+        duracao = time.perf_counter() - inicio
+
+        self.stdout.write(self.style.SUCCESS(
+            f"{gerados} recibo(s) de {mes:02d}/{ano} gravado(s) em {saida} ({duracao:.1f}s)."
+        ))
+        if falhas:
+            self.stdout.write(self.style.WARNING(f"{falhas} recibo(s) com erro; ver manifesto.csv."))
@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+
+from finances.razao import recalcular_resumo
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói do zero o resumo financeiro mensal (ResumoFinanceiroMes) a partir de receitas, despesas e transações.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--unidade', type=int, help='ID da unidade de negócio (padrão: todas).')
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recalculando o resumo financeiro mensal...")
+        total = recalcular_resumo(options['unidade'])
+        self.stdout.write(self.style.SUCCESS(f"{total} linha(s) de resumo gravada(s)."))
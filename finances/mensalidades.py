@@ -0,0 +1,233 @@
+"""
+Situação das mensalidades de um mês.
+
+A classificação (Paga / Atrasada / Em aberto) é feita no banco, como uma
+anotação sobre o queryset de alunos, e os totais dos KPIs saem de um único
+GROUP BY. Assim o custo em consultas não cresce com o número de alunos e o
+dashboard e a listagem de mensalidades usam exatamente as mesmas regras:
+
+- existe `Receita` do mês com transação vinculada ou marcada como
+  recebida (lançamentos antigos sem transação): Paga;
+- existe `Receita` do mês sem transação: Atrasada se o vencimento passou,
+  senão Em aberto;
+- não existe `Receita`, mas há um recebimento avulso (`Transaction` sem
+  receita) na categoria no mês: Paga;
+- não existe nada, mas o aluno tem valor e dia de vencimento configurados:
+  a mensalidade é projetada com o valor do cadastro (Atrasada / Em aberto);
+- caso contrário: Não configurado (fica fora dos KPIs).
+
+As receitas que faltam (projeções e recebimentos avulsos) são gravadas em
+lote por `materializar_mes`, fora da listagem, que é somente leitura.
+"""
+import calendar
+from datetime import date
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import (
+    Case,
+    CharField,
+    Count,
+    DecimalField,
+    OuterRef,
+    Q,
+    Subquery,
+    Sum,
+    Value,
+    When,
+)
+from django.utils import timezone
+
+from scheduler.models import Aluno
+
+from .models import Receita, Transaction
+from .razao import atualizar_resumo
+
+STATUS_PAGA = "paga"
+STATUS_ATRASADA = "atrasada"
+STATUS_EM_ABERTO = "em_aberto"
+STATUS_NAO_CONFIGURADO = "nao_configurado"
+
+# slug -> (texto exibido, classe de cor do badge)
+STATUS_EXIBICAO = {
+    STATUS_PAGA: ("Paga", "success"),
+    STATUS_ATRASADA: ("Atrasada", "danger"),
+    STATUS_EM_ABERTO: ("Em aberto", "warning"),
+    STATUS_NAO_CONFIGURADO: ("Não configurado", "secondary"),
+}
+
+# slug -> sufixo das chaves kpi_*/count_* usadas nos templates
+KPI_POR_STATUS = {
+    STATUS_PAGA: "recebido",
+    STATUS_ATRASADA: "atrasado",
+    STATUS_EM_ABERTO: "em_aberto",
+}
+
+_VALOR = DecimalField(max_digits=10, decimal_places=2)
+
+
+def vencimento_mensalidade(ano, mes, dia_vencimento):
+    """Data de vencimento no mês, limitada ao último dia (ex: dia 31 em fevereiro)."""
+    if not dia_vencimento:
+        return None
+    _, ultimo_dia = calendar.monthrange(ano, mes)
+    return date(ano, mes, min(dia_vencimento, ultimo_dia))
+
+
+def _q_vencida(ano, mes, hoje):
+    """
+    Alunos cujo vencimento do mês já passou em `hoje`. Equivale a
+    `hoje > vencimento_mensalidade(...)` sem precisar calcular a data no banco.
+    """
+    if (ano, mes) < (hoje.year, hoje.month):
+        return Q(dia_vencimento__gt=0)
+    if (ano, mes) == (hoje.year, hoje.month):
+        return Q(dia_vencimento__gt=0, dia_vencimento__lt=hoje.day)
+    return Q(pk__in=[])
+
+
+def situacao_mensalidades(unidade_id, categoria, ano, mes, hoje=None, alunos=None):
+    """
+    Anota cada aluno ativo (ou de `alunos`) com a situação da mensalidade do mês:
+
+    - `receita_mes_id`: primeira `Receita` do mês (ou None);
+    - `mensalidade_status`: um dos slugs STATUS_*;
+    - `mensalidade_valor`: valor considerado nos KPIs.
+    """
+    hoje = hoje or timezone.localdate()
+    if alunos is None:
+        alunos = Aluno.objects.filter(status="ativo")
+
+    receitas_do_mes = Receita.objects.filter(
+        unidade_negocio_id=unidade_id,
+        categoria=categoria,
+        aluno=OuterRef("pk"),
+        data_competencia__year=ano,
+        data_competencia__month=mes,
+    ).order_by("pk")
+    avulsas_do_mes = Transaction.objects.filter(
+        unidade_negocio_id=unidade_id,
+        category=categoria,
+        student=OuterRef("pk"),
+        transaction_date__year=ano,
+        transaction_date__month=mes,
+        receita__isnull=True,
+    ).order_by("pk")
+
+    alunos = alunos.annotate(
+        receita_mes_id=Subquery(receitas_do_mes.values("pk")[:1]),
+        receita_mes_valor=Subquery(receitas_do_mes.values("valor")[:1]),
+        receita_mes_transacao_id=Subquery(receitas_do_mes.values("transacao_id")[:1]),
+        receita_mes_status=Subquery(receitas_do_mes.values("status")[:1]),
+        avulsa_mes_id=Subquery(avulsas_do_mes.values("pk")[:1]),
+        avulsa_mes_valor=Subquery(avulsas_do_mes.values("amount")[:1]),
+        avulsa_mes_data=Subquery(avulsas_do_mes.values("transaction_date")[:1]),
+    )
+
+    vencida = _q_vencida(ano, mes, hoje)
+    tem_receita = Q(receita_mes_id__isnull=False)
+    receita_quitada = Q(receita_mes_transacao_id__isnull=False) | Q(receita_mes_status="recebido")
+    configurado = Q(valor_mensalidade__gt=0, dia_vencimento__gt=0)
+
+    return alunos.annotate(
+        mensalidade_status=Case(
+            When(tem_receita & receita_quitada, then=Value(STATUS_PAGA)),
+            When(tem_receita & vencida, then=Value(STATUS_ATRASADA)),
+            When(tem_receita, then=Value(STATUS_EM_ABERTO)),
+            When(avulsa_mes_valor__isnull=False, then=Value(STATUS_PAGA)),
+            When(configurado & vencida, then=Value(STATUS_ATRASADA)),
+            When(configurado, then=Value(STATUS_EM_ABERTO)),
+            default=Value(STATUS_NAO_CONFIGURADO),
+            output_field=CharField(),
+        ),
+        mensalidade_valor=Case(
+            When(tem_receita, then="receita_mes_valor"),
+            When(avulsa_mes_valor__isnull=False, then="avulsa_mes_valor"),
+            When(configurado, then="valor_mensalidade"),
+            default=Value(None),
+            output_field=_VALOR,
+        ),
+    )
+
+
+def resumo_vazio():
+    resumo = {}
+    for chave in [*KPI_POR_STATUS.values(), "previsto"]:
+        resumo[f"kpi_{chave}"] = Decimal("0.00")
+        resumo[f"count_{chave}"] = 0
+    return resumo
+
+
+def resumo_mensalidades(situacao_qs):
+    """
+    Totais e quantidades por situação (recebido/atrasado/em aberto/previsto)
+    de um queryset vindo de `situacao_mensalidades`, em uma única consulta.
+    """
+    resumo = resumo_vazio()
+    totais = (
+        situacao_qs.filter(mensalidade_status__in=list(KPI_POR_STATUS))
+        .values("mensalidade_status")
+        .annotate(total=Sum("mensalidade_valor"), quantidade=Count("pk"))
+        .order_by()
+    )
+    for linha in totais:
+        chave = KPI_POR_STATUS[linha["mensalidade_status"]]
+        resumo[f"kpi_{chave}"] = linha["total"] or Decimal("0.00")
+        resumo[f"count_{chave}"] = linha["quantidade"]
+
+    resumo["kpi_previsto"] = resumo["kpi_recebido"] + resumo["kpi_atrasado"] + resumo["kpi_em_aberto"]
+    resumo["count_previsto"] = (
+        resumo["count_recebido"] + resumo["count_atrasado"] + resumo["count_em_aberto"]
+    )
+    return resumo
+
+
+def pendentes_de_geracao(situacao_qs):
+    """Alunos que entram nos KPIs mas ainda não têm a `Receita` do mês gravada."""
+    return situacao_qs.filter(
+        receita_mes_id__isnull=True, mensalidade_status__in=list(KPI_POR_STATUS)
+    )
+
+
+def materializar_mes(unidade_id, categoria, ano, mes, hoje=None, alunos=None):
+    """
+    Grava com um único `bulk_create` as receitas de mensalidade que faltam no
+    mês: recebimentos avulsos viram receitas recebidas vinculadas à transação
+    e alunos configurados recebem a receita "a receber" com o valor do
+    cadastro. Retorna a quantidade de receitas criadas.
+    """
+    data_competencia = date(ano, mes, 1)
+    with transaction.atomic():
+        pendentes = pendentes_de_geracao(
+            situacao_mensalidades(unidade_id, categoria, ano, mes, hoje=hoje, alunos=alunos)
+        ).values(
+            "pk",
+            "nome_completo",
+            "valor_mensalidade",
+            "avulsa_mes_id",
+            "avulsa_mes_valor",
+            "avulsa_mes_data",
+        )
+
+        receitas = []
+        for aluno in pendentes:
+            receita = Receita(
+                unidade_negocio_id=unidade_id,
+                categoria=categoria,
+                aluno_id=aluno["pk"],
+                descricao=aluno["nome_completo"],
+                data_competencia=data_competencia,
+            )
+            if aluno["avulsa_mes_id"]:
+                receita.valor = aluno["avulsa_mes_valor"]
+                receita.status = "recebido"
+                receita.data_recebimento = aluno["avulsa_mes_data"]
+                receita.transacao_id = aluno["avulsa_mes_id"]
+            else:
+                receita.valor = aluno["valor_mensalidade"]
+                receita.status = "a_receber"
+            receitas.append(receita)
+
+        Receita.objects.bulk_create(receitas)
+        atualizar_resumo(receitas)
+    return len(receitas)
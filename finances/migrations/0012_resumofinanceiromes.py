@@ -0,0 +1,35 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:47
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_notificacao'),
+        ('finances', '0011_transaction_forma_pagamento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoFinanceiroMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mês (primeiro dia)')),
+                ('origem', models.CharField(choices=[('receita', 'Receita'), ('despesa', 'Despesa'), ('transacao', 'Transação')], max_length=10)),
+                ('tipo', models.CharField(choices=[('income', 'Entrada'), ('expense', 'Saída')], max_length=10)),
+                ('tipo_dre', models.CharField(choices=[('custo', 'Custo Direto'), ('despesa', 'Despesa Operacional')], max_length=10)),
+                ('total', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('quantidade', models.PositiveIntegerField(default=0)),
+                ('categoria', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_mensais', to='finances.category')),
+                ('unidade_negocio', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumos_financeiros', to='core.unidadenegocio')),
+            ],
+            options={
+                'verbose_name': 'Resumo Financeiro Mensal',
+                'verbose_name_plural': 'Resumos Financeiros Mensais',
+                'indexes': [models.Index(fields=['unidade_negocio', 'origem', 'mes'], name='finances_re_unidade_6dc79e_idx')],
+                'constraints': [models.UniqueConstraint(fields=('unidade_negocio', 'mes', 'categoria', 'origem'), name='resumo_financeiro_mes_unico')],
+            },
+        ),
+    ]
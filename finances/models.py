@@ -195,3 +195,40 @@ class ReceitaRecorrente(models.Model):
             return f"Recorrente: Mensalidade - {self.aluno.nome_completo}"
         else:
             return f"Recorrente: {self.descricao} (Todo dia {self.dia_do_mes})"
+
+
+class ResumoFinanceiroMes(models.Model):
+    """
+    Totais mensais por unidade, categoria e origem do lançamento. Receitas e
+    despesas entram pelo mês de competência, transações pela data. Mantido
+    pelos signals de finances/signals.py (ver finances/razao.py) e refeito
+    pelo comando `recalcular_resumo_financeiro`.
+    """
+    ORIGEM_CHOICES = (
+        ("receita", "Receita"),
+        ("despesa", "Despesa"),
+        ("transacao", "Transação"),
+    )
+    unidade_negocio = models.ForeignKey(UnidadeNegocio, on_delete=models.CASCADE, related_name="resumos_financeiros")
+    mes = models.DateField(verbose_name="Mês (primeiro dia)")
+    categoria = models.ForeignKey(Category, on_delete=models.CASCADE, related_name="resumos_mensais")
+    origem = models.CharField(max_length=10, choices=ORIGEM_CHOICES)
+    # Cópias de Category.type e Category.tipo_dre, para os relatórios não precisarem do JOIN
+    tipo = models.CharField(max_length=10, choices=Category.TYPE_CHOICES)
+    tipo_dre = models.CharField(max_length=10, choices=Category.TIPO_DRE_CHOICES)
+    total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    quantidade = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        verbose_name = "Resumo Financeiro Mensal"
+        verbose_name_plural = "Resumos Financeiros Mensais"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["unidade_negocio", "mes", "categoria", "origem"],
+                name="resumo_financeiro_mes_unico",
+            ),
+        ]
+        indexes = [models.Index(fields=["unidade_negocio", "origem", "mes"])]
+
+    def __str__(self):
+        return f"{self.get_origem_display()} {self.mes:%m/%Y} - {self.categoria_id}: {self.total}"
@@ -0,0 +1,177 @@
+"""
+Geradores dos PDFs financeiros (recibo de mensalidade e DRE) para a fila de
+core/pdfs.py.
+
+`entradas_*` roda na requisição e devolve, em JSON, tudo de que o documento
+depende (a chave do cache sai delas); `html_*` roda no worker e monta o HTML
+que o xhtml2pdf converte.
+"""
+import base64
+import logging
+import os
+from datetime import date
+from functools import lru_cache
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .models import Receita
+
+logger = logging.getLogger(__name__)
+
+TEMPLATE_RECIBO = "finances/pdf/recibo_pagamento.html"
+TEMPLATE_DRE = "finances/dre_pdf_template.html"
+
+CHAVES_VARIACAO = ["total_receitas", "total_custos", "lucro_bruto", "total_despesas", "resultado"]
+LISTAS_DRE = ["receitas_por_categoria", "custos_por_categoria", "despesas_por_categoria"]
+
+
+@lru_cache(maxsize=1)
+def _logo_base64():
+    """Logo do recibo em base64, lido do disco uma vez por processo."""
+    logo_path = os.path.join(
+        settings.BASE_DIR, "scheduler", "static", "scheduler", "img", "logo_relatorio.png"
+    )
+    if not os.path.exists(logo_path):
+        logger.error("Logo não encontrado no caminho: %s", logo_path)
+        return None
+    with open(logo_path, "rb") as image_file:
+        return base64.b64encode(image_file.read()).decode("utf-8")
+
+
+def _json(valor):
+    return DjangoJSONEncoder().default(valor) if isinstance(valor, (Decimal, date)) else valor
+
+
+# --- RECIBO ---
+
+
+def entradas_recibo(receita):
+    """Receita (com aluno, transação e unidade já carregados) -> entradas do recibo."""
+    aluno, transacao = receita.aluno, receita.transacao
+    return {
+        "template": TEMPLATE_RECIBO,
+        "receita_id": receita.pk,
+        "dados": [
+            _json(valor)
+            for valor in (
+                receita.valor,
+                receita.descricao,
+                receita.data_competencia,
+                aluno.pk,
+                aluno.nome_completo,
+                aluno.responsavel_nome,
+                aluno.telefone,
+                transacao.pk,
+                transacao.transaction_date,
+                transacao.forma_pagamento,
+                receita.unidade_negocio_id,
+            )
+        ],
+    }
+
+
+def html_recibo(entradas):
+    receita = Receita.objects.select_related("aluno", "transacao", "unidade_negocio").get(
+        pk=entradas["receita_id"]
+    )
+    context = {
+        "receita": receita,
+        "aluno": receita.aluno,
+        "transacao": receita.transacao,
+        "unidade": receita.unidade_negocio,
+        # Emissão = momento da geração; downloads seguintes reaproveitam o arquivo
+        "data_emissao": timezone.now(),
+        "logo_base64": _logo_base64(),
+    }
+    return render_to_string(TEMPLATE_RECIBO, context), None
+
+
+# --- DRE ---
+
+
+def _dre_para_json(dre):
+    if dre is None:
+        return None
+    dados = {chave: _json(valor) for chave, valor in dre.items() if chave not in LISTAS_DRE}
+    for chave in LISTAS_DRE:
+        dados[chave] = [
+            {"categoria__name": item["categoria__name"], "total_cat": _json(item["total_cat"])}
+            for item in dre[chave]
+        ]
+    return dados
+
+
+def _dre_de_json(dados):
+    if dados is None:
+        return None
+    dre = {chave: Decimal(valor) for chave, valor in dados.items() if chave not in LISTAS_DRE}
+    for chave in LISTAS_DRE:
+        dre[chave] = [
+            {"categoria__name": item["categoria__name"], "total_cat": Decimal(item["total_cat"])}
+            for item in dados[chave]
+        ]
+    return dre
+
+
+def entradas_dre(dre_principal, dre_comp, start_date, end_date, start_date_comp=None, end_date_comp=None):
+    """Os números do DRE (e do comparativo) fazem parte das entradas: mudou um lançamento, muda a chave."""
+    return {
+        "template": TEMPLATE_DRE,
+        "periodo": [_json(start_date), _json(end_date)],
+        "periodo_comp": [_json(start_date_comp), _json(end_date_comp)] if dre_comp else None,
+        "dre_principal": _dre_para_json(dre_principal),
+        "dre_comp": _dre_para_json(dre_comp),
+    }
+
+
+def html_dre(entradas):
+    from .views import merge_and_compare_categories
+
+    dre_principal = _dre_de_json(entradas["dre_principal"])
+    dre_comp = _dre_de_json(entradas["dre_comp"])
+    start_date, end_date = (date.fromisoformat(d) for d in entradas["periodo"])
+    start_date_comp = end_date_comp = None
+    if entradas["periodo_comp"]:
+        start_date_comp, end_date_comp = (date.fromisoformat(d) for d in entradas["periodo_comp"])
+
+    context = {
+        "start_date": start_date,
+        "end_date": end_date,
+        "dre_principal": dre_principal,
+        "dre_comp": dre_comp,
+        "start_date_comp": start_date_comp,
+        "end_date_comp": end_date_comp,
+    }
+
+    if dre_comp:
+        variacoes = {}
+        for key in CHAVES_VARIACAO:
+            val_principal = dre_principal.get(key, Decimal("0.00"))
+            val_comp = dre_comp.get(key, Decimal("0.00"))
+            var_abs = val_principal - val_comp
+            var_perc = (
+                (var_abs / val_comp * 100)
+                if val_comp != 0
+                else (Decimal("100.0") if val_principal != 0 else Decimal("0.0"))
+            )
+            variacoes[key] = {"abs": var_abs, "perc": var_perc}
+        context["variacoes"] = variacoes
+
+        context["merged_receitas"] = merge_and_compare_categories(
+            dre_principal.get("receitas_por_categoria", []),
+            dre_comp.get("receitas_por_categoria", []),
+        )
+        context["merged_custos"] = merge_and_compare_categories(
+            dre_principal.get("custos_por_categoria", []),
+            dre_comp.get("custos_por_categoria", []),
+        )
+        context["merged_despesas"] = merge_and_compare_categories(
+            dre_principal.get("despesas_por_categoria", []),
+            dre_comp.get("despesas_por_categoria", []),
+        )
+
+    return render_to_string(TEMPLATE_DRE, context), None
@@ -0,0 +1,226 @@
+"""
+Razão mensal pré-agregado (`ResumoFinanceiroMes`).
+
+Cada linha guarda o total e a quantidade de lançamentos de uma origem
+(receita, despesa ou transação) em uma unidade, mês e categoria. Receitas e
+despesas entram pelo mês de competência; transações pela data da transação.
+Lançamentos sem unidade de negócio ficam de fora, como sempre ficaram dos
+relatórios.
+
+Os signals de `finances.signals` recalculam só as chaves (unidade, mês,
+categoria, origem) afetadas a cada save/delete; caminhos que usam
+`bulk_create` chamam `atualizar_resumo` e o comando
+`recalcular_resumo_financeiro` reconstrói a tabela inteira.
+
+DRE e fluxo de caixa leem os meses inteiros do período daqui e somam as
+pontas de meses parciais direto das tabelas de lançamentos (`totais`).
+"""
+from collections import defaultdict
+from datetime import date, timedelta
+from decimal import Decimal
+
+from django.db import transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+
+from .models import Despesa, Receita, ResumoFinanceiroMes, Transaction
+
+# origem -> (model, campo de data, campo de valor, campo da categoria)
+ORIGENS = {
+    "receita": (Receita, "data_competencia", "valor", "categoria"),
+    "despesa": (Despesa, "data_competencia", "valor", "categoria"),
+    "transacao": (Transaction, "transaction_date", "amount", "category"),
+}
+ORIGEM_DO_MODEL = {model: origem for origem, (model, *_) in ORIGENS.items()}
+
+
+def inicio_do_mes(dia):
+    return date(dia.year, dia.month, 1)
+
+
+def _mes_seguinte(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def chave_do_lancamento(instance):
+    """
+    (unidade_id, mês, categoria_id, origem) do lançamento, ou None se ele não
+    entra no resumo. Também é None se algum campo da chave não foi carregado
+    (`only()`/`defer()`), para não disparar consultas extras no post_init.
+    """
+    origem = ORIGEM_DO_MODEL[type(instance)]
+    _, campo_data, _, campo_categoria = ORIGENS[origem]
+    campos = instance.__dict__
+    unidade_id = campos.get("unidade_negocio_id")
+    categoria_id = campos.get(f"{campo_categoria}_id")
+    dia = campos.get(campo_data)
+    if not (unidade_id and categoria_id and dia):
+        return None
+    # Pode ser string ou datetime (default=timezone.now) antes de recarregar do banco
+    dia = instance._meta.get_field(campo_data).to_python(dia)
+    return (unidade_id, inicio_do_mes(dia), categoria_id, origem)
+
+
+def _agregado(origem, filtro):
+    model, campo_data, campo_valor, campo_categoria = ORIGENS[origem]
+    return (
+        model.objects.filter(filtro, unidade_negocio__isnull=False)
+        .annotate(mes=TruncMonth(campo_data))
+        .values(
+            "unidade_negocio_id",
+            "mes",
+            f"{campo_categoria}_id",
+            f"{campo_categoria}__type",
+            f"{campo_categoria}__tipo_dre",
+        )
+        .annotate(total=Sum(campo_valor), quantidade=Count("pk"))
+        .order_by()
+    )
+
+
+def _linhas_do_agregado(origem, agregado):
+    campo_categoria = ORIGENS[origem][3]
+    for linha in agregado:
+        yield ResumoFinanceiroMes(
+            unidade_negocio_id=linha["unidade_negocio_id"],
+            mes=linha["mes"],
+            categoria_id=linha[f"{campo_categoria}_id"],
+            origem=origem,
+            tipo=linha[f"{campo_categoria}__type"],
+            tipo_dre=linha[f"{campo_categoria}__tipo_dre"],
+            total=linha["total"] or 0,
+            quantidade=linha["quantidade"],
+        )
+
+
+def recalcular_chaves(chaves):
+    """Recalcula as linhas do resumo das chaves informadas (None é ignorado)."""
+    por_origem = defaultdict(set)
+    for chave in chaves:
+        if chave:
+            por_origem[chave[3]].add(chave)
+    if not por_origem:
+        return
+
+    with transaction.atomic():
+        for origem, chaves_origem in por_origem.items():
+            _, campo_data, _, campo_categoria = ORIGENS[origem]
+            filtro = Q()
+            for unidade_id, mes, categoria_id, _ in chaves_origem:
+                filtro |= Q(
+                    unidade_negocio_id=unidade_id,
+                    **{
+                        f"{campo_categoria}_id": categoria_id,
+                        f"{campo_data}__gte": mes,
+                        f"{campo_data}__lt": _mes_seguinte(mes),
+                    },
+                )
+            linhas = list(_linhas_do_agregado(origem, _agregado(origem, filtro)))
+            if linhas:
+                ResumoFinanceiroMes.objects.bulk_create(
+                    linhas,
+                    update_conflicts=True,
+                    unique_fields=["unidade_negocio", "mes", "categoria", "origem"],
+                    update_fields=["tipo", "tipo_dre", "total", "quantidade"],
+                )
+
+            # Chaves que ficaram sem lançamentos saem do resumo
+            vazias = chaves_origem - {
+                (linha.unidade_negocio_id, linha.mes, linha.categoria_id, origem) for linha in linhas
+            }
+            if vazias:
+                remover = Q()
+                for unidade_id, mes, categoria_id, _ in vazias:
+                    remover |= Q(unidade_negocio_id=unidade_id, mes=mes, categoria_id=categoria_id)
+                ResumoFinanceiroMes.objects.filter(remover, origem=origem).delete()
+
+
+def atualizar_resumo(lancamentos):
+    """Atualiza o resumo para lançamentos gravados sem signals (bulk_create/update)."""
+    recalcular_chaves({chave_do_lancamento(lancamento) for lancamento in lancamentos})
+
+
+def atualizar_categoria(categoria):
+    """Propaga mudanças de tipo/classificação no DRE de uma categoria."""
+    ResumoFinanceiroMes.objects.filter(categoria=categoria).exclude(
+        tipo=categoria.type, tipo_dre=categoria.tipo_dre
+    ).update(tipo=categoria.type, tipo_dre=categoria.tipo_dre)
+
+
+def recalcular_resumo(unidade_id=None):
+    """Reconstrói o resumo (de uma unidade ou de todas). Retorna o número de linhas."""
+    filtro = Q(unidade_negocio_id=unidade_id) if unidade_id else Q()
+    with transaction.atomic():
+        ResumoFinanceiroMes.objects.filter(filtro).delete()
+        linhas = [
+            linha
+            for origem in ORIGENS
+            for linha in _linhas_do_agregado(origem, _agregado(origem, filtro))
+        ]
+        ResumoFinanceiroMes.objects.bulk_create(linhas, batch_size=1000)
+    return len(linhas)
+
+
+def _meses_do_periodo(inicio, fim):
+    """
+    Divide [inicio, fim] em meses inteiros (primeiro e último mês, ou None) e
+    nas pontas de meses parciais, que são lidas direto dos lançamentos.
+    """
+    primeiro = inicio if inicio.day == 1 else _mes_seguinte(inicio)
+    ultimo_dia = fim if (fim + timedelta(days=1)).day == 1 else inicio_do_mes(fim) - timedelta(days=1)
+    if primeiro > ultimo_dia:
+        return None, [(inicio, fim)]
+    pontas = []
+    if inicio < primeiro:
+        pontas.append((inicio, primeiro - timedelta(days=1)))
+    if ultimo_dia < fim:
+        pontas.append((ultimo_dia + timedelta(days=1), fim))
+    return (primeiro, inicio_do_mes(ultimo_dia)), pontas
+
+
+def totais(unidade_id, inicio, fim, origens, por_mes=False):
+    """
+    Totais por origem e categoria (e mês, com `por_mes`) de uma unidade no
+    período, como dicts com origem, categoria__name, tipo, tipo_dre, total
+    (e mes). Uma consulta ao resumo mais uma por origem quando o período
+    começa ou termina no meio de um mês.
+    """
+    meses, pontas = _meses_do_periodo(inicio, fim)
+    acumulado = defaultdict(lambda: Decimal("0.00"))
+
+    if meses:
+        agrupamento = ["origem", "categoria__name", "tipo", "tipo_dre"] + (["mes"] if por_mes else [])
+        resumo = (
+            ResumoFinanceiroMes.objects.filter(
+                unidade_negocio_id=unidade_id, origem__in=origens, mes__range=meses
+            )
+            .values(*agrupamento)
+            .annotate(soma=Sum("total"))
+            .order_by()
+        )
+        for linha in resumo:
+            chave = (linha["origem"], linha["categoria__name"], linha["tipo"], linha["tipo_dre"], linha.get("mes"))
+            acumulado[chave] += linha["soma"]
+
+    if pontas:
+        for origem in origens:
+            model, campo_data, campo_valor, campo_categoria = ORIGENS[origem]
+            filtro = Q()
+            for ponta in pontas:
+                filtro |= Q(**{f"{campo_data}__range": ponta})
+            lancamentos = model.objects.filter(filtro, unidade_negocio_id=unidade_id)
+            agrupamento = [f"{campo_categoria}__name", f"{campo_categoria}__type", f"{campo_categoria}__tipo_dre"]
+            if por_mes:
+                lancamentos = lancamentos.annotate(mes=TruncMonth(campo_data))
+                agrupamento.append("mes")
+            for linha in lancamentos.values(*agrupamento).annotate(soma=Sum(campo_valor)).order_by():
+                chave = (origem, *(linha[campo] for campo in agrupamento[:3]), linha.get("mes"))
+                acumulado[chave] += linha["soma"]
+
+    resultado = []
+    for (origem, nome, tipo, tipo_dre, mes), total in acumulado.items():
+        linha = {"origem": origem, "categoria__name": nome, "tipo": tipo, "tipo_dre": tipo_dre, "total": total}
+        if por_mes:
+            linha["mes"] = mes
+        resultado.append(linha)
+    return resultado
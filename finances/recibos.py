@@ -0,0 +1,183 @@
+"""
+Pacote mensal de recibos: todos os recibos das mensalidades pagas de uma
+unidade em um mês, num único ZIP com um manifesto.
+
+As receitas são lidas em uma consulta (`values()`), e cada recibo vira um
+dicionário simples. Os recibos são renderizados em paralelo por um
+ProcessPoolExecutor: cada processo carrega o logo e compila o template uma
+vez só (finances.renderizacao) e depois só renderiza e converte; os
+processos não acessam o banco. O processo principal grava os PDFs no ZIP na
+ordem dos alunos, à medida que ficam prontos, e no fim o `manifesto.csv`.
+
+Recibo com erro de conversão não interrompe o pacote: fica fora do ZIP e
+aparece no manifesto com a mensagem.
+
+O pool é usado pelo comando `gerar_recibos_mes`, com processos "spawn" (sem
+herdar conexões e threads do processo principal). A view enfileira o pacote
+na fila de core.pdfs (tipo "recibos_mes"), e o worker o gera num processo só
+(`gravar_pacote`).
+"""
+import csv
+import hashlib
+import io
+import json
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+
+from django.utils import timezone
+from django.utils.text import get_valid_filename
+
+from .models import Receita
+from .pdfs import TEMPLATE_RECIBO
+from .renderizacao import iniciar_processo, renderizar
+
+PROCESSOS_PADRAO = min(4, os.cpu_count() or 1)
+NOME_MANIFESTO = "manifesto.csv"
+
+CABECALHO_MANIFESTO = [
+    "Arquivo",
+    "Recibo",
+    "Aluno",
+    "Competência",
+    "Valor",
+    "Data do Pagamento",
+    "Forma de Pagamento",
+    "Situação",
+]
+
+CAMPOS_RECEITA = [
+    "pk",
+    "descricao",
+    "valor",
+    "data_competencia",
+    "aluno_id",
+    "aluno__nome_completo",
+    "aluno__responsavel_nome",
+    "aluno__telefone",
+    "transacao_id",
+    "transacao__transaction_date",
+    "transacao__forma_pagamento",
+    "unidade_negocio__nome",
+]
+
+
+def receitas_pagas(unidade_id, ano, mes):
+    """Mensalidades pagas (com transação) da unidade no mês, por aluno."""
+    return (
+        Receita.objects.filter(
+            unidade_negocio_id=unidade_id,
+            categoria__name__iexact="Mensalidade",
+            data_competencia__year=ano,
+            data_competencia__month=mes,
+            transacao__isnull=False,
+            aluno__isnull=False,
+        )
+        .order_by("aluno__nome_completo", "pk")
+        .values(*CAMPOS_RECEITA)
+    )
+
+
+def dados_recibo(receita, data_emissao):
+    """Linha de `receitas_pagas` -> contexto do template (dicionários no lugar dos models)."""
+    return {
+        "arquivo": get_valid_filename(f"Recibo_{receita['aluno__nome_completo']}_{receita['pk']}.pdf"),
+        "receita": {
+            "id": receita["pk"],
+            "descricao": receita["descricao"],
+            "valor": receita["valor"],
+            "data_competencia": receita["data_competencia"],
+        },
+        "aluno": {
+            "id": receita["aluno_id"],
+            "nome_completo": receita["aluno__nome_completo"],
+            "responsavel_nome": receita["aluno__responsavel_nome"],
+            "telefone": receita["aluno__telefone"],
+        },
+        "transacao": {
+            "id": receita["transacao_id"],
+            "transaction_date": receita["transacao__transaction_date"],
+            "forma_pagamento": receita["transacao__forma_pagamento"],
+        },
+        "unidade": {"nome": receita["unidade_negocio__nome"]},
+        "data_emissao": data_emissao,
+    }
+
+
+def _linha_manifesto(dados, erro):
+    return [
+        "" if erro else dados["arquivo"],
+        dados["receita"]["id"],
+        dados["aluno"]["nome_completo"],
+        dados["receita"]["data_competencia"].strftime("%m/%Y"),
+        f"{dados['receita']['valor']:.2f}".replace(".", ","),
+        dados["transacao"]["transaction_date"].strftime("%d/%m/%Y"),
+        dados["transacao"]["forma_pagamento"] or "",
+        f"Erro: {erro}" if erro else "Gerado",
+    ]
+
+
+def gerar_pacote(unidade_id, ano, mes, destino, processos=None):
+    """
+    Grava em `destino` (caminho ou arquivo binário) o ZIP com os recibos do
+    mês e o manifesto. Retorna (gerados, falhas).
+    """
+    data_emissao = timezone.now()
+    recibos = [dados_recibo(receita, data_emissao) for receita in receitas_pagas(unidade_id, ano, mes)]
+    processos = max(1, min(processos or PROCESSOS_PADRAO, len(recibos)))
+
+    manifesto = []
+    with zipfile.ZipFile(destino, "w", compression=zipfile.ZIP_DEFLATED) as pacote:
+        if processos == 1:
+            resultados = map(renderizar, recibos)
+            executor = None
+        else:
+            executor = ProcessPoolExecutor(
+                max_workers=processos, initializer=iniciar_processo, mp_context=get_context("spawn")
+            )
+            chunksize = max(1, len(recibos) // (processos * 4))
+            resultados = executor.map(renderizar, recibos, chunksize=chunksize)
+        try:
+            for dados, (pdf, erro) in zip(recibos, resultados):
+                if pdf is not None:
+                    # PDF já é comprimido: guardado sem recompressão
+                    pacote.writestr(dados["arquivo"], pdf, compress_type=zipfile.ZIP_STORED)
+                manifesto.append(_linha_manifesto(dados, erro))
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+        conteudo = io.StringIO()
+        conteudo.write("\ufeff")  # BOM para o Excel
+        escritor = csv.writer(conteudo, delimiter=";")
+        escritor.writerow(CABECALHO_MANIFESTO)
+        escritor.writerows(manifesto)
+        pacote.writestr(NOME_MANIFESTO, conteudo.getvalue().encode("utf-8"))
+
+    falhas = sum(1 for linha in manifesto if not linha[0])
+    return len(manifesto) - falhas, falhas
+
+
+def entradas_pacote(unidade_id, ano, mes):
+    """
+    Entradas da tarefa "recibos_mes" da fila de PDFs, ou None se não há
+    mensalidade paga no mês. O hash das receitas faz um pagamento novo ou uma
+    correção gerar outro pacote em vez de servir o do cache.
+    """
+    receitas = list(receitas_pagas(unidade_id, ano, mes))
+    if not receitas:
+        return None
+    conteudo = json.dumps(receitas, sort_keys=True, default=str)
+    return {
+        "template": TEMPLATE_RECIBO,
+        "unidade_id": unidade_id,
+        "ano": ano,
+        "mes": mes,
+        "receitas": hashlib.sha256(conteudo.encode("utf-8")).hexdigest(),
+    }
+
+
+def gravar_pacote(entradas, arquivo):
+    """Gerador da fila de PDFs (GERADORES_DE_ARQUIVO): o pacote no próprio worker."""
+    gerar_pacote(entradas["unidade_id"], entradas["ano"], entradas["mes"], arquivo, processos=1)
@@ -0,0 +1,45 @@
+"""
+Funções dos processos do pool de `finances.recibos`.
+
+Com "spawn", o processo filho importa este módulo para achar `renderizar`
+antes de rodar o inicializador, ou seja, antes do `django.setup()`: por isso
+nada aqui importa models no topo do arquivo.
+"""
+import io
+
+from django.apps import apps
+from xhtml2pdf import pisa
+
+# Estado de cada processo do pool, preenchido por iniciar_processo
+_template = None
+_logo = None
+
+
+def iniciar_processo():
+    """Inicializador do pool: Django pronto, template compilado e logo em memória."""
+    global _template, _logo
+    if not apps.ready:  # processos criados com "spawn" começam do zero
+        import django
+
+        django.setup()
+    from django.template.loader import get_template
+
+    from .pdfs import TEMPLATE_RECIBO, _logo_base64
+
+    _template = get_template(TEMPLATE_RECIBO)
+    _logo = _logo_base64()
+
+
+def renderizar(dados):
+    """Recibo -> (bytes do PDF, None) ou (None, mensagem de erro)."""
+    if _template is None:
+        iniciar_processo()
+    try:
+        html = _template.render({**dados, "logo_base64": _logo})
+        buffer = io.BytesIO()
+        status = pisa.CreatePDF(html, dest=buffer)
+        if status.err:
+            return None, f"xhtml2pdf retornou {status.err} erro(s)."
+        return buffer.getvalue(), None
+    except Exception as erro:
+        return None, str(erro)
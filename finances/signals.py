@@ -0,0 +1,38 @@
+from django.db.models.signals import post_delete, post_init, post_save
+from django.dispatch import receiver
+
+from .models import Category, Despesa, Receita, Transaction
+from .razao import atualizar_categoria, chave_do_lancamento, recalcular_chaves
+
+LANCAMENTOS = (Receita, Despesa, Transaction)
+
+
+# --- RESUMO FINANCEIRO MENSAL ---
+
+
+def _guardar_chave(sender, instance, **kwargs):
+    # Guarda a chave carregada do banco para recalcular também o mês/categoria
+    # antigos quando o lançamento for movido.
+    instance._chave_resumo_original = chave_do_lancamento(instance)
+
+
+def _lancamento_salvo(sender, instance, **kwargs):
+    chave = chave_do_lancamento(instance)
+    recalcular_chaves({getattr(instance, "_chave_resumo_original", None), chave})
+    instance._chave_resumo_original = chave
+
+
+def _lancamento_excluido(sender, instance, **kwargs):
+    recalcular_chaves({getattr(instance, "_chave_resumo_original", None), chave_do_lancamento(instance)})
+
+
+for _model in LANCAMENTOS:
+    post_init.connect(_guardar_chave, sender=_model, dispatch_uid=f"resumo_init_{_model.__name__}")
+    post_save.connect(_lancamento_salvo, sender=_model, dispatch_uid=f"resumo_save_{_model.__name__}")
+    post_delete.connect(_lancamento_excluido, sender=_model, dispatch_uid=f"resumo_delete_{_model.__name__}")
+
+
+@receiver(post_save, sender=Category)
+def categoria_salva(sender, instance, created, **kwargs):
+    if not created:
+        atualizar_categoria(instance)
@@ -0,0 +1,105 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+from finances.aging import aging_pagaveis, aging_recebiveis
+from finances.models import Despesa, Receita
+
+HOJE = date(2025, 6, 30)
+
+
+def _receita(unidade, categoria, valor, competencia, aluno=None, descricao='Mensalidade', **extra):
+    return Receita.objects.create(
+        unidade_negocio=unidade, categoria=categoria, aluno=aluno, descricao=descricao,
+        valor=Decimal(valor), data_competencia=competencia, **extra,
+    )
+
+
+def _despesa(unidade, categoria, valor, competencia, descricao, **extra):
+    return Despesa.objects.create(
+        unidade_negocio=unidade, categoria=categoria, descricao=descricao,
+        valor=Decimal(valor), data_competencia=competencia, **extra,
+    )
+
+
+@pytest.mark.django_db
+def test_faixas_e_entidades_agregadas_no_banco(unidade_negocio, categoria_receita, categoria_despesa, aluno_ativo):
+    """
+    GIVEN receitas em aberto de um aluno em várias faixas, uma receita avulsa e despesas com a mesma descrição em caixas diferentes
+    WHEN o aging de hoje é calculado
+    THEN cada entidade vira uma linha com os valores por faixa, e a matriz sai de uma consulta por relatório.
+    """
+    _receita(unidade_negocio, categoria_receita, '100.00', date(2025, 7, 10), aluno=aluno_ativo)  # a vencer
+    _receita(unidade_negocio, categoria_receita, '200.00', date(2025, 6, 1), aluno=aluno_ativo)   # 29 dias
+    _receita(unidade_negocio, categoria_receita, '300.00', date(2025, 3, 1), aluno=aluno_ativo)   # 121 dias
+    _receita(unidade_negocio, categoria_receita, '50.00', date(2025, 5, 31), descricao='Venda de baquetas')  # 30 dias
+    _receita(unidade_negocio, categoria_receita, '999.00', date(2025, 3, 1), aluno=aluno_ativo, status='recebido')
+    _despesa(unidade_negocio, categoria_despesa, '400.00', date(2025, 5, 1), 'Aluguel')   # 60 dias
+    _despesa(unidade_negocio, categoria_despesa, '400.00', date(2025, 4, 1), 'ALUGUEL')   # 90 dias
+
+    with CaptureQueriesContext(connection) as ctx:
+        recebiveis = aging_recebiveis(unidade_negocio.id, HOJE, HOJE)
+    assert len(ctx.captured_queries) == 1
+
+    aluno, avulsa = recebiveis['entities']
+    assert aluno['entity'] == aluno_ativo.nome_completo
+    assert aluno['total_geral'] == Decimal('600.00')
+    assert aluno['buckets'] == {
+        'a_vencer': Decimal('100.00'), 'd1_30': Decimal('200.00'), 'd31_60': 0, 'd61_90': 0,
+        'd90_plus': Decimal('300.00'),
+    }
+    assert avulsa['entity'] == 'Venda de baquetas'
+    assert avulsa['buckets']['d1_30'] == Decimal('50.00')
+    assert recebiveis['column_totals']['d1_30'] == Decimal('250.00')
+    assert recebiveis['grand_total'] == Decimal('650.00')
+    assert recebiveis['bucket_labels'][0] == 'A Vencer'
+
+    pagaveis = aging_pagaveis(unidade_negocio.id, HOJE, HOJE)
+    (aluguel,) = pagaveis['entities']
+    assert aluguel['buckets']['d31_60'] == Decimal('400.00')
+    assert aluguel['buckets']['d61_90'] == Decimal('400.00')
+    assert pagaveis['grand_total'] == Decimal('800.00')
+
+
+@pytest.mark.django_db
+def test_posicao_historica(unidade_negocio, categoria_despesa):
+    """
+    GIVEN uma despesa paga em junho e outra paga em março, ambas com competência em fevereiro
+    WHEN o aging é calculado na posição de 30/04
+    THEN só a despesa paga depois da data-base aparece em aberto, com o atraso contado até 30/04.
+    """
+    _despesa(unidade_negocio, categoria_despesa, '150.00', date(2025, 2, 20), 'Luz',
+             status='pago', data_pagamento=date(2025, 6, 5))
+    _despesa(unidade_negocio, categoria_despesa, '80.00', date(2025, 2, 20), 'Água',
+             status='pago', data_pagamento=date(2025, 3, 10))
+
+    pagaveis = aging_pagaveis(unidade_negocio.id, date(2025, 4, 30), HOJE)
+
+    (luz,) = pagaveis['entities']
+    assert luz['entity'] == 'Luz'
+    assert luz['buckets']['d61_90'] == Decimal('150.00')
+    assert aging_pagaveis(unidade_negocio.id, HOJE, HOJE)['entities'] == []
+
+
+@pytest.mark.django_db
+def test_descricoes_com_acento_em_caixas_diferentes(unidade_negocio, categoria_despesa):
+    """
+    GIVEN despesas "MANUTENÇÃO" e "manutenção" (o LOWER do SQLite não converte o "Ç" e o "Ã")
+    WHEN o aging é calculado
+    THEN as duas viram uma única entidade, com os valores somados.
+    """
+    _despesa(unidade_negocio, categoria_despesa, '120.00', date(2025, 6, 10), 'MANUTENÇÃO')
+    _despesa(unidade_negocio, categoria_despesa, '80.00', date(2025, 5, 10), 'manutenção')
+    _despesa(unidade_negocio, categoria_despesa, '150.00', date(2025, 6, 10), 'Luz')
+
+    pagaveis = aging_pagaveis(unidade_negocio.id, HOJE, HOJE)
+
+    manutencao, luz = pagaveis['entities']
+    assert manutencao['total_geral'] == Decimal('200.00')
+    assert manutencao['buckets']['d1_30'] == Decimal('120.00')
+    assert manutencao['buckets']['d31_60'] == Decimal('80.00')
+    assert luz['entity'] == 'Luz'
+    assert pagaveis['grand_total'] == Decimal('350.00')
@@ -0,0 +1,46 @@
+import io
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+from openpyxl import load_workbook
+
+from finances.models import Despesa, Receita
+from scheduler.models import CustomUser
+
+
+@pytest.mark.django_db
+def test_dre_xlsx_enviado_em_partes(client, unidade_negocio, categoria_receita, categoria_despesa):
+    """
+    GIVEN uma receita e uma despesa operacional em março
+    WHEN o DRE de março é exportado para Excel
+    THEN a resposta sai em partes (do arquivo temporário) e a planilha traz título, cabeçalho, categorias e resultado formatados.
+    """
+    Receita.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_receita, descricao='Mensalidade',
+        valor=Decimal('900.00'), data_competencia=date(2025, 3, 5),
+    )
+    Despesa.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_despesa, descricao='Aluguel',
+        valor=Decimal('400.00'), data_competencia=date(2025, 3, 10),
+    )
+    CustomUser.objects.create_user(username='admin_fin', password='password123', tipo='admin')
+    client.login(username='admin_fin', password='password123')
+    session = client.session
+    session['unidade_ativa_id'] = unidade_negocio.id
+    session.save()
+
+    resposta = client.get(reverse('finances:export_dre_xlsx'), {'start_date': '2025-03-01', 'end_date': '2025-03-31'})
+
+    assert resposta.status_code == 200
+    assert resposta.streaming
+    ws = load_workbook(io.BytesIO(b''.join(resposta.streaming_content)))['DRE']
+    linhas = [linha for linha in ws.iter_rows(values_only=True)]
+    assert linhas[0][0] == 'Demonstrativo de Resultados (DRE)'
+    assert linhas[3] == ('Descrição', 'Período Principal')
+    assert ('  + Mensalidade', 900) in linhas
+    assert ('  - Aluguel', -400) in linhas
+    assert linhas[-1] == ('(=) Resultado do Período', 500)
+    assert ws.cell(row=len(linhas), column=2).number_format == 'R$ #,##0.00'
+    assert 'A1:B1' in {str(intervalo) for intervalo in ws.merged_cells.ranges}
@@ -0,0 +1,98 @@
+import os
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from core.models import TarefaPDF
+from core.pdfs import caminho_do_arquivo, processar_pendentes
+from finances.models import Receita, Transaction
+from scheduler.models import CustomUser
+
+
+@pytest.fixture
+def cliente_financeiro(client, unidade_negocio, settings, tmp_path):
+    settings.PDF_FILA = {"DIRETORIO": tmp_path}
+    CustomUser.objects.create_user(username='admin_fin', password='password123', tipo='admin')
+    client.login(username='admin_fin', password='password123')
+    session = client.session
+    session['unidade_ativa_id'] = unidade_negocio.id
+    session.save()
+    return client
+
+
+@pytest.fixture
+def mensalidade_paga(unidade_negocio, categoria_receita, aluno_ativo):
+    transacao = Transaction.objects.create(
+        description='Mensalidade março', amount=Decimal('300.00'), category=categoria_receita,
+        transaction_date=date(2025, 3, 10), forma_pagamento='pix', student=aluno_ativo,
+        unidade_negocio=unidade_negocio,
+    )
+    return Receita.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_receita, aluno=aluno_ativo,
+        descricao='Mensalidade março', valor=Decimal('300.00'), data_competencia=date(2025, 3, 1),
+        status='recebido', transacao=transacao,
+    )
+
+
+@pytest.mark.django_db
+def test_recibo_gerado_pela_fila_e_servido_do_cache(cliente_financeiro, mensalidade_paga):
+    """
+    GIVEN uma mensalidade paga
+    WHEN o recibo é pedido, o worker processa a fila e o recibo é pedido de novo
+    THEN o primeiro pedido vai para a página de espera, o status passa a "concluida"
+         e o segundo pedido devolve o PDF do cache sem criar outra tarefa.
+    """
+    url = reverse('finances:gerar_recibo_pdf', args=[mensalidade_paga.pk])
+
+    resposta = cliente_financeiro.get(url)
+
+    tarefa = TarefaPDF.objects.get()
+    assert tarefa.tipo == 'recibo' and tarefa.status == 'pendente'
+    assert resposta.status_code == 302
+    assert resposta.url == reverse('core:tarefa_pdf', args=[tarefa.chave])
+
+    assert processar_pendentes() == (1, 0)
+    assert os.path.isfile(caminho_do_arquivo(tarefa.chave))
+    status = cliente_financeiro.get(reverse('core:tarefa_pdf_status', args=[tarefa.chave])).json()
+    assert status['status'] == 'concluida'
+    assert status['url'] == reverse('core:baixar_tarefa_pdf', args=[tarefa.chave])
+
+    resposta = cliente_financeiro.get(url)
+
+    assert resposta.status_code == 200
+    assert resposta['Content-Type'] == 'application/pdf'
+    assert b''.join(resposta.streaming_content).startswith(b'%PDF')
+    assert TarefaPDF.objects.count() == 1
+
+
+@pytest.fixture
+def tarefa_dre(unidade_negocio):
+    dono = CustomUser.objects.create_user(username='admin_dre', password='password123', tipo='admin')
+    return TarefaPDF.objects.create(
+        chave='dre-teste', tipo='dre', entradas={}, nome_arquivo='DRE.pdf', solicitado_por=dono,
+    )
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('username, tipo, status_esperado', [
+    ('admin_dre', 'admin', 200),
+    ('outro_admin', 'admin', 200),
+    ('professor_dre', 'professor', 404),
+])
+def test_tarefa_de_dre_so_para_o_solicitante_ou_admin(client, tarefa_dre, username, tipo, status_esperado):
+    """
+    GIVEN uma tarefa de DRE pedida por um admin
+    WHEN o solicitante, outro admin ou um professor consultam a tarefa
+    THEN só o professor (que não pode exportar a DRE) recebe 404, inclusive no download.
+    """
+    if username != 'admin_dre':
+        CustomUser.objects.create_user(username=username, password='password123', tipo=tipo)
+    client.login(username=username, password='password123')
+
+    for nome in ('core:tarefa_pdf', 'core:tarefa_pdf_status'):
+        assert client.get(reverse(nome, args=[tarefa_dre.chave])).status_code == status_esperado
+    if status_esperado == 404:
+        TarefaPDF.objects.filter(pk=tarefa_dre.pk).update(status='concluida')
+        assert client.get(reverse('core:baixar_tarefa_pdf', args=[tarefa_dre.chave])).status_code == 404
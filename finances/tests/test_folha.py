@@ -0,0 +1,128 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from finances.folha import calcular_folha, gerar_despesas_folha
+from finances.models import Despesa
+from scheduler.models import (
+    Aula,
+    CustomUser,
+    Modalidade,
+    PresencaAluno,
+    PresencaProfessor,
+    RelatorioAula,
+)
+
+
+def _aula(modalidade, dia, professor_validou=None, presentes=(), ausentes=()):
+    aula = Aula.objects.create(
+        modalidade=modalidade,
+        data_hora=timezone.make_aware(timezone.datetime(2025, 8, dia, 10, 0)),
+        status="Realizada",
+    )
+    RelatorioAula.objects.create(aula=aula, professor_que_validou=professor_validou)
+    for aluno in presentes:
+        PresencaAluno.objects.create(aula=aula, aluno=aluno, status="presente")
+    for aluno in ausentes:
+        PresencaAluno.objects.create(aula=aula, aluno=aluno, status="ausente")
+    return aula
+
+
+@pytest.fixture
+def cenario(db, aluno_ativo, aluno_inativo):
+    ana = CustomUser.objects.create_user(username="ana", password="x", tipo="professor")
+    beto = CustomUser.objects.create_user(username="beto", password="x", tipo="professor")
+    por_aula = Modalidade.objects.create(nome="Bateria", valor_pagamento_professor=Decimal("50.00"))
+    por_aluno = Modalidade.objects.create(
+        nome="Oficina", valor_pagamento_professor=Decimal("20.00"), tipo_pagamento="aluno"
+    )
+    complementar = Modalidade.objects.create(
+        nome="Atividade Complementar", valor_pagamento_professor=Decimal("30.00")
+    )
+
+    _aula(por_aula, 4, ana, presentes=[aluno_ativo])
+    _aula(por_aula, 5, ana, presentes=[aluno_ativo, aluno_inativo])
+    _aula(por_aluno, 6, ana, presentes=[aluno_ativo], ausentes=[aluno_inativo])
+    _aula(por_aula, 7, beto)
+    agendada = _aula(por_aula, 20, beto)
+    Aula.objects.filter(pk=agendada.pk).update(status="Agendada")  # não entra na folha
+    ac = _aula(complementar, 8, presentes=[aluno_ativo, aluno_inativo])
+    PresencaProfessor.objects.create(aula=ac, professor=beto, status="presente")
+    PresencaProfessor.objects.create(aula=ac, professor=ana, status="ausente")
+    return ana, beto
+
+
+@pytest.mark.django_db
+def test_folha_de_todos_os_professores_em_uma_consulta_agrupada(cenario):
+    """
+    GIVEN aulas por aula, por aluno e de atividade complementar de dois professores
+    WHEN a folha do mês é calculada
+    THEN cada professor recebe pelas regras da modalidade, com um nº fixo de consultas.
+    """
+    ana, beto = cenario
+
+    with CaptureQueriesContext(connection) as consultas:
+        folha = calcular_folha(date(2025, 8, 1), date(2025, 8, 31))
+    assert len(consultas) == 3
+
+    assert [(l["modalidade_nome"], l["quantidade"], l["subtotal"]) for l in folha[ana.pk]["linhas"]] == [
+        ("Bateria", 2, Decimal("100.00")),
+        ("Oficina", 1, Decimal("20.00")),
+    ]
+    assert [(l["modalidade_nome"], l["quantidade"], l["subtotal"]) for l in folha[beto.pk]["linhas"]] == [
+        ("Atividade Complementar", 1, Decimal("30.00")),
+        ("Bateria", 1, Decimal("50.00")),
+    ]
+    assert folha[ana.pk]["total"] == Decimal("120.00")
+
+
+@pytest.mark.django_db
+def test_gera_despesas_em_lote_sem_duplicar(cenario, unidade_negocio, categoria_despesa):
+    """
+    GIVEN a folha de agosto
+    WHEN as despesas são geradas duas vezes
+    THEN há uma despesa "a pagar" por professor, criada só na primeira vez.
+    """
+    ana, beto = cenario
+    periodo = (date(2025, 8, 1), date(2025, 8, 31))
+
+    criadas = gerar_despesas_folha(unidade_negocio.pk, categoria_despesa, *periodo)
+    assert gerar_despesas_folha(unidade_negocio.pk, categoria_despesa, *periodo) == []
+
+    assert len(criadas) == 2
+    assert list(Despesa.objects.order_by("descricao").values_list("professor_id", "valor", "status", "descricao")) == [
+        (ana.pk, Decimal("120.00"), "a_pagar", "Pagamento Prof. ana - Período 01/08/2025 a 31/08/2025"),
+        (beto.pk, Decimal("80.00"), "a_pagar", "Pagamento Prof. beto - Período 01/08/2025 a 31/08/2025"),
+    ]
+
+
+@pytest.mark.django_db
+def test_calculadora_ajax_mantem_formato(client, cenario):
+    """
+    GIVEN um administrador na tela de despesas
+    WHEN a calculadora é usada para um professor
+    THEN o JSON mantém o formato esperado pelo front-end.
+    """
+    ana, _ = cenario
+    CustomUser.objects.create_user(username="admin", password="x", tipo="admin")
+    client.login(username="admin", password="x")
+
+    resposta = client.get(
+        reverse("finances:ajax_calcular_pagamento_professor"),
+        {"professor_id": ana.pk, "data_inicial": "2025-08-01", "data_final": "2025-08-31"},
+    ).json()
+
+    assert resposta["status"] == "success"
+    assert resposta["calculo"][1] == {
+        "modalidade_nome": "Oficina",
+        "tipo_pagamento_display": "Por Aluno (Valor por Presença)",
+        "valor_unitario": 20.0,
+        "unidade_contagem": "aluno(s) presente(s)",
+        "quantidade": 1,
+        "subtotal": 20.0,
+    }
@@ -0,0 +1,156 @@
+import pytest
+from datetime import date
+from decimal import Decimal
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from finances.mensalidades import materializar_mes, resumo_mensalidades, situacao_mensalidades
+from finances.models import Receita, Transaction
+from scheduler.models import Aluno, CustomUser
+
+HOJE = date(2025, 3, 15)
+
+
+@pytest.fixture
+def mes_com_mensalidades(unidade_negocio, categoria_receita, aluno_inativo):
+    """Um aluno em cada situação possível para março/2025."""
+    paga = Aluno.objects.create(nome_completo='Aluno Pago', dia_vencimento=10, valor_mensalidade=300)
+    atrasada = Aluno.objects.create(nome_completo='Aluno Atrasado', dia_vencimento=10, valor_mensalidade=200)
+    em_aberto = Aluno.objects.create(nome_completo='Aluno Em Aberto', dia_vencimento=20, valor_mensalidade=150)
+    avulso = Aluno.objects.create(nome_completo='Aluno Avulso')
+    Aluno.objects.create(nome_completo='Aluno Sem Cadastro')
+
+    transacao = Transaction.objects.create(
+        unidade_negocio=unidade_negocio, description='Mensalidade', amount=300,
+        category=categoria_receita, transaction_date=date(2025, 3, 8), student=paga,
+    )
+    Receita.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_receita, aluno=paga,
+        descricao='Aluno Pago', valor=300, data_competencia=date(2025, 3, 1),
+        status='recebido', transacao=transacao,
+    )
+    Receita.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_receita, aluno=atrasada,
+        descricao='Aluno Atrasado', valor=200, data_competencia=date(2025, 3, 1),
+    )
+    Transaction.objects.create(
+        unidade_negocio=unidade_negocio, description='Pagamento avulso', amount=80,
+        category=categoria_receita, transaction_date=date(2025, 3, 2), student=avulso,
+    )
+    return categoria_receita
+
+
+@pytest.mark.django_db
+def test_situacao_por_aluno(unidade_negocio, mes_com_mensalidades):
+    """
+    GIVEN alunos com mensalidade paga, vencida, a vencer, paga avulsa e sem cadastro
+    WHEN a situação do mês é calculada
+    THEN cada aluno ativo recebe o status correspondente.
+    """
+    situacao = situacao_mensalidades(unidade_negocio.id, mes_com_mensalidades, 2025, 3, hoje=HOJE)
+    status = dict(situacao.values_list('nome_completo', 'mensalidade_status'))
+
+    assert status == {
+        'Aluno Pago': 'paga',
+        'Aluno Atrasado': 'atrasada',
+        'Aluno Em Aberto': 'em_aberto',
+        'Aluno Avulso': 'paga',
+        'Aluno Sem Cadastro': 'nao_configurado',
+    }
+
+
+@pytest.mark.django_db
+def test_receita_recebida_sem_transacao_conta_como_paga(unidade_negocio, categoria_receita):
+    """
+    GIVEN uma mensalidade vencida marcada como recebida, mas sem transação vinculada
+    WHEN a situação do mês é calculada
+    THEN ela continua paga (como antes do motor em lote) e entra no KPI de recebidos.
+    """
+    aluno = Aluno.objects.create(nome_completo='Aluno Legado', dia_vencimento=5, valor_mensalidade=250)
+    Receita.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_receita, aluno=aluno,
+        descricao='Aluno Legado', valor=250, data_competencia=date(2025, 3, 1),
+        status='recebido', data_recebimento=date(2025, 3, 4),
+    )
+
+    situacao = situacao_mensalidades(unidade_negocio.id, categoria_receita, 2025, 3, hoje=HOJE)
+
+    assert situacao.get(pk=aluno.pk).mensalidade_status == 'paga'
+    resumo = resumo_mensalidades(situacao)
+    assert resumo['count_recebido'] == 1
+    assert resumo['kpi_recebido'] == Decimal('250.00')
+
+@pytest.mark.django_db
+def test_resumo_em_uma_consulta(unidade_negocio, mes_com_mensalidades):
+    """
+    GIVEN as mensalidades de um mês
+    WHEN o resumo dos KPIs é gerado
+    THEN totais e contadores saem de uma única consulta agregada.
+    """
+    situacao = situacao_mensalidades(unidade_negocio.id, mes_com_mensalidades, 2025, 3, hoje=HOJE)
+
+    with CaptureQueriesContext(connection) as ctx:
+        resumo = resumo_mensalidades(situacao)
+
+    assert len(ctx.captured_queries) == 1
+    assert resumo['kpi_recebido'] == Decimal('380.00')
+    assert resumo['count_recebido'] == 2
+    assert resumo['kpi_atrasado'] == Decimal('200.00')
+    assert resumo['count_atrasado'] == 1
+    assert resumo['kpi_em_aberto'] == Decimal('150.00')
+    assert resumo['count_em_aberto'] == 1
+    assert resumo['kpi_previsto'] == Decimal('730.00')
+    assert resumo['count_previsto'] == 4
+
+
+@pytest.mark.django_db
+def test_materializar_mes_gera_receitas_em_lote(unidade_negocio, mes_com_mensalidades):
+    """
+    GIVEN alunos sem a receita do mês (projetada e paga avulsa)
+    WHEN o mês é materializado duas vezes
+    THEN as receitas faltantes são criadas uma única vez, com o avulso já vinculado.
+    """
+    criadas = materializar_mes(unidade_negocio.id, mes_com_mensalidades, 2025, 3, hoje=HOJE)
+
+    assert criadas == 2
+    avulsa = Receita.objects.get(aluno__nome_completo='Aluno Avulso')
+    assert avulsa.status == 'recebido'
+    assert avulsa.transacao.amount == Decimal('80.00')
+    em_aberto = Receita.objects.get(aluno__nome_completo='Aluno Em Aberto')
+    assert em_aberto.status == 'a_receber'
+    assert em_aberto.valor == Decimal('150.00')
+    assert materializar_mes(unidade_negocio.id, mes_com_mensalidades, 2025, 3, hoje=HOJE) == 0
+
+
+@pytest.mark.django_db
+def test_listagem_somente_leitura_com_consultas_constantes(client, unidade_negocio, mes_com_mensalidades):
+    """
+    GIVEN a listagem de mensalidades de um mês ainda não materializado
+    WHEN a página é aberta com poucos e com muitos alunos
+    THEN nenhuma receita é gravada e o número de consultas não muda.
+    """
+    CustomUser.objects.create_user(username='admin_fin', password='password123', tipo='admin')
+    client.login(username='admin_fin', password='password123')
+    session = client.session
+    session['unidade_ativa_id'] = unidade_negocio.id
+    session.save()
+    url = reverse('finances:mensalidades_list') + '?ano=2025&mes=3'
+    receitas_antes = Receita.objects.count()
+    # Primeira visita preenche os caches do menu (ex: resumo de notificações)
+    client.get(url)
+
+    with CaptureQueriesContext(connection) as poucos:
+        resposta = client.get(url)
+    assert resposta.status_code == 200
+    assert resposta.context['pendentes_geracao'] == 2
+
+    Aluno.objects.bulk_create(
+        Aluno(nome_completo=f'Aluno Extra {i}', dia_vencimento=5, valor_mensalidade=100)
+        for i in range(20)
+    )
+    with CaptureQueriesContext(connection) as muitos:
+        client.get(url)
+
+    assert Receita.objects.count() == receitas_antes
+    assert len(muitos.captured_queries) == len(poucos.captured_queries)
@@ -0,0 +1,135 @@
+from datetime import date, timedelta
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from core.models import Notificacao
+from core.notificacoes import gerar_notificacoes_vencimento, resumo_nao_lidas
+from finances.models import Despesa, Receita
+from scheduler.models import CustomUser
+
+HOJE = date(2025, 3, 10)
+
+
+@pytest.fixture
+def admins(db):
+    return [
+        CustomUser.objects.create_user(username=f"admin{i}", password="password123", tipo="admin",
+                                       is_staff=True, is_superuser=True)
+        for i in (1, 2)
+    ]
+
+
+@pytest.fixture
+def contas_a_vencer(unidade_negocio, categoria_receita, categoria_despesa):
+    Receita.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_receita, descricao="Mensalidade Ana",
+        valor=Decimal("300.00"), data_competencia=HOJE + timedelta(days=2),
+    )
+    Despesa.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_despesa, descricao="Aluguel",
+        valor=Decimal("1500.00"), data_competencia=HOJE + timedelta(days=5),
+    )
+    # Fora da janela de 5 dias
+    Despesa.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_despesa, descricao="Seguro",
+        valor=Decimal("90.00"), data_competencia=HOJE + timedelta(days=6),
+    )
+
+
+@pytest.mark.django_db
+def test_todos_os_admins_ativos_recebem(admins, contas_a_vencer):
+    """
+    GIVEN dois admins ativos, um admin inativo e um professor
+    WHEN as notificações de vencimento são geradas
+    THEN cada admin ativo recebe uma por conta na janela, e os outros nenhuma.
+    """
+    CustomUser.objects.create_user(username="admin_inativo", password="x", tipo="admin", is_active=False)
+    CustomUser.objects.create_user(username="prof", password="x", tipo="professor")
+
+    assert gerar_notificacoes_vencimento(hoje=HOJE) == 4
+
+    for admin in admins:
+        assert sorted(Notificacao.objects.filter(usuario=admin).values_list("tipo", flat=True)) == [
+            "despesa", "receita",
+        ]
+    assert Notificacao.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_gerar_de_novo_nao_duplica(admins, contas_a_vencer):
+    """
+    GIVEN notificações já geradas hoje (uma delas já lida)
+    WHEN o comando roda de novo
+    THEN nenhuma notificação é criada.
+    """
+    gerar_notificacoes_vencimento(hoje=HOJE)
+    Notificacao.objects.filter(usuario=admins[0], tipo="receita").update(lida=True)
+
+    assert gerar_notificacoes_vencimento(hoje=HOJE) == 0
+    assert Notificacao.objects.count() == 4
+
+
+@pytest.mark.django_db
+def test_gerar_invalida_o_resumo_em_cache(admins, contas_a_vencer):
+    """
+    GIVEN o resumo do sino já em cache, sem notificações
+    WHEN as notificações são geradas
+    THEN o resumo seguinte mostra as novas.
+    """
+    assert resumo_nao_lidas(admins[0])[0] == 0
+
+    gerar_notificacoes_vencimento(hoje=HOJE)
+
+    contagem, recentes = resumo_nao_lidas(admins[0])
+    assert contagem == 2
+    assert len(recentes) == 2
+
+
+@pytest.mark.django_db
+def test_views_invalidam_o_resumo(client, admins, contas_a_vencer):
+    """
+    GIVEN o resumo do sino em cache
+    WHEN o usuário marca como lidas, marca uma como não lida e exclui uma
+    THEN cada ação é refletida no resumo seguinte.
+    """
+    admin = admins[0]
+    gerar_notificacoes_vencimento(hoje=HOJE)
+    client.login(username=admin.username, password="password123")
+    assert resumo_nao_lidas(admin)[0] == 2
+
+    client.post(reverse("core:marcar_notificacoes_lidas"))
+    assert resumo_nao_lidas(admin)[0] == 0
+
+    notificacao = Notificacao.objects.filter(usuario=admin).first()
+    client.post(reverse("core:marcar_notificacao_nao_lida", args=[notificacao.pk]))
+    assert resumo_nao_lidas(admin)[0] == 1
+
+    client.post(reverse("core:excluir_notificacao", args=[notificacao.pk]))
+    assert resumo_nao_lidas(admin) == (0, [])
+
+
+@pytest.mark.django_db
+def test_edicoes_pelo_admin_invalidam_o_resumo(client, admins, contas_a_vencer):
+    """
+    GIVEN o resumo do sino em cache
+    WHEN uma notificação é marcada como lida e outra excluída pelo admin do Django
+    THEN o resumo seguinte reflete as duas mudanças.
+    """
+    admin = admins[0]
+    gerar_notificacoes_vencimento(hoje=HOJE)
+    client.login(username=admin.username, password="password123")
+    receita, despesa = (Notificacao.objects.get(usuario=admin, tipo=tipo) for tipo in ("receita", "despesa"))
+    assert resumo_nao_lidas(admin)[0] == 2
+
+    client.post(reverse("admin:core_notificacao_change", args=[receita.pk]), {
+        "usuario": admin.pk, "titulo": receita.titulo, "mensagem": receita.mensagem,
+        "url": "", "tipo": receita.tipo, "lida": "on",
+    })
+    assert resumo_nao_lidas(admin)[0] == 1
+
+    client.post(reverse("admin:core_notificacao_changelist"), {
+        "action": "delete_selected", "_selected_action": [despesa.pk], "post": "yes",
+    })
+    assert resumo_nao_lidas(admin) == (0, [])
@@ -0,0 +1,107 @@
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.core.management import call_command
+from django.db.models import Sum
+
+from finances.models import Category, Despesa, Receita, ResumoFinanceiroMes, Transaction
+from finances.views import get_dre_data
+from logs.models import AuditLog
+
+
+def _resumo(origem):
+    return {
+        (linha.mes, linha.categoria_id): (linha.total, linha.quantidade)
+        for linha in ResumoFinanceiroMes.objects.filter(origem=origem)
+    }
+
+
+@pytest.fixture
+def categoria_custo(db, unidade_negocio):
+    return Category.objects.create(name='Professores', type='expense', tipo_dre='custo', unidade_negocio=unidade_negocio)
+
+
+@pytest.fixture
+def lancamentos(unidade_negocio, categoria_receita, categoria_despesa, categoria_custo):
+    for dia, valor in [(date(2025, 3, 5), '300.00'), (date(2025, 3, 20), '250.00'), (date(2025, 4, 2), '300.00')]:
+        Receita.objects.create(
+            unidade_negocio=unidade_negocio, categoria=categoria_receita, descricao='Mensalidade',
+            valor=Decimal(valor), data_competencia=dia,
+        )
+    Despesa.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_despesa, descricao='Aluguel',
+        valor=Decimal('1000.00'), data_competencia=date(2025, 3, 10),
+    )
+    Despesa.objects.create(
+        unidade_negocio=unidade_negocio, categoria=categoria_custo, descricao='Folha',
+        valor=Decimal('400.00'), data_competencia=date(2025, 4, 25),
+    )
+
+
+@pytest.mark.django_db
+def test_resumo_acompanha_criacao_edicao_e_exclusao(unidade_negocio, categoria_receita, lancamentos):
+    """
+    GIVEN receitas de março e abril já resumidas por mês
+    WHEN uma receita de março é movida para abril e outra é excluída
+    THEN o resumo de cada mês reflete os lançamentos restantes e meses vazios somem.
+    """
+    assert _resumo('receita') == {
+        (date(2025, 3, 1), categoria_receita.pk): (Decimal('550.00'), 2),
+        (date(2025, 4, 1), categoria_receita.pk): (Decimal('300.00'), 1),
+    }
+
+    movida = Receita.objects.get(data_competencia=date(2025, 3, 20))
+    movida.data_competencia = date(2025, 4, 20)
+    movida.save()
+    assert _resumo('receita') == {
+        (date(2025, 3, 1), categoria_receita.pk): (Decimal('300.00'), 1),
+        (date(2025, 4, 1), categoria_receita.pk): (Decimal('550.00'), 2),
+    }
+
+    Receita.objects.get(data_competencia=date(2025, 3, 5)).delete()
+    assert date(2025, 3, 1) not in {mes for mes, _ in _resumo('receita')}
+    # O resumo é derivado dos lançamentos: recalculá-lo não gera logs de auditoria
+    assert not AuditLog.objects.filter(resource_type='Resumofinanceiromes').exists()
+
+
+@pytest.mark.django_db
+def test_dre_com_meses_parciais_bate_com_os_lancamentos(unidade_negocio, lancamentos):
+    """
+    GIVEN receitas e despesas (custo e despesa operacional) em março e abril
+    WHEN o DRE é pedido de 10/03 a 30/04 (março parcial, abril inteiro)
+    THEN os totais são os mesmos da soma direta dos lançamentos no período.
+    """
+    dre = get_dre_data(unidade_negocio.pk, date(2025, 3, 10), date(2025, 4, 30))
+
+    receitas = Receita.objects.filter(data_competencia__range=[date(2025, 3, 10), date(2025, 4, 30)])
+    assert dre['total_receitas'] == receitas.aggregate(total=Sum('valor'))['total'] == Decimal('550.00')
+    assert dre['total_custos'] == Decimal('400.00')
+    assert dre['total_despesas'] == Decimal('1000.00')
+    assert dre['resultado'] == Decimal('-850.00')
+    assert dre['custos_por_categoria'] == [{'categoria__name': 'Professores', 'total_cat': Decimal('400.00')}]
+
+
+@pytest.mark.django_db
+def test_mudanca_de_classificacao_e_comando_de_reconstrucao(unidade_negocio, categoria_despesa, lancamentos):
+    """
+    GIVEN despesas já resumidas e transações gravadas
+    WHEN a categoria muda para custo e o resumo é apagado e reconstruído pelo comando
+    THEN o DRE passa a tratá-la como custo e o resumo volta com as mesmas linhas.
+    """
+    Transaction.objects.create(
+        unidade_negocio=unidade_negocio, category=categoria_despesa, description='Aluguel',
+        amount=Decimal('-1000.00'), transaction_date=date(2025, 3, 10),
+    )
+    categoria_despesa.tipo_dre = 'custo'
+    categoria_despesa.save()
+
+    dre = get_dre_data(unidade_negocio.pk, date(2025, 3, 1), date(2025, 3, 31))
+    assert dre['total_custos'] == Decimal('1000.00')
+    assert dre['total_despesas'] == Decimal('0.00')
+
+    antes = {origem: _resumo(origem) for origem in ('receita', 'despesa', 'transacao')}
+    ResumoFinanceiroMes.objects.all().delete()
+    call_command('recalcular_resumo_financeiro')
+    assert {origem: _resumo(origem) for origem in ('receita', 'despesa', 'transacao')} == antes
+    assert antes['transacao'] == {(date(2025, 3, 1), categoria_despesa.pk): (Decimal('-1000.00'), 1)}
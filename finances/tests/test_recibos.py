@@ -0,0 +1,110 @@
+import csv
+import io
+import zipfile
+from datetime import date
+from decimal import Decimal
+
+import pytest
+from django.urls import reverse
+
+from core.models import TarefaPDF
+from core.pdfs import processar_pendentes
+from finances.models import Receita, Transaction
+from finances.recibos import NOME_MANIFESTO, entradas_pacote, gerar_pacote
+from scheduler.models import Aluno, CustomUser
+
+
+def _mensalidade(unidade, categoria, aluno, paga=True):
+    transacao = None
+    if paga:
+        transacao = Transaction.objects.create(
+            description=f'Mensalidade {aluno.nome_completo}', amount=Decimal('300.00'), category=categoria,
+            transaction_date=date(2025, 3, 10), forma_pagamento='pix', student=aluno,
+            unidade_negocio=unidade,
+        )
+    return Receita.objects.create(
+        unidade_negocio=unidade, categoria=categoria, aluno=aluno, descricao='Mensalidade março',
+        valor=Decimal('300.00'), data_competencia=date(2025, 3, 1),
+        status='recebido' if paga else 'a_receber', transacao=transacao,
+    )
+
+
+@pytest.fixture
+def mes_com_pagamentos(unidade_negocio, categoria_receita):
+    alunos = [
+        Aluno.objects.create(nome_completo=nome, status='ativo', dia_vencimento=10, valor_mensalidade=300)
+        for nome in ('Bruno Pago', 'Ana Paga', 'Carla Devendo')
+    ]
+    return [
+        _mensalidade(unidade_negocio, categoria_receita, alunos[0]),
+        _mensalidade(unidade_negocio, categoria_receita, alunos[1]),
+        _mensalidade(unidade_negocio, categoria_receita, alunos[2], paga=False),
+    ]
+
+
+@pytest.mark.django_db
+def test_pacote_de_recibos_em_paralelo(unidade_negocio, mes_com_pagamentos):
+    """
+    GIVEN duas mensalidades pagas e uma em aberto em março
+    WHEN o pacote de recibos de março é gerado com dois processos
+    THEN o ZIP traz um PDF por mensalidade paga, em ordem alfabética dos alunos, e o manifesto.
+    """
+    bruno, ana, _ = mes_com_pagamentos
+    destino = io.BytesIO()
+
+    assert gerar_pacote(unidade_negocio.id, 2025, 3, destino, processos=2) == (2, 0)
+
+    with zipfile.ZipFile(destino) as pacote:
+        nomes = pacote.namelist()
+        assert nomes == [f'Recibo_Ana_Paga_{ana.pk}.pdf', f'Recibo_Bruno_Pago_{bruno.pk}.pdf', NOME_MANIFESTO]
+        assert pacote.read(nomes[0]).startswith(b'%PDF')
+        manifesto = list(csv.reader(io.StringIO(pacote.read(NOME_MANIFESTO).decode('utf-8-sig')), delimiter=';'))
+
+    assert manifesto[0][0] == 'Arquivo'
+    assert manifesto[1] == [nomes[0], str(ana.pk), 'Ana Paga', '03/2025', '300,00', '10/03/2025', 'pix', 'Gerado']
+    assert len(manifesto) == 3
+
+
+@pytest.mark.django_db
+def test_view_enfileira_o_zip_dos_recibos(client, settings, tmp_path, unidade_negocio, mes_com_pagamentos):
+    """
+    GIVEN mensalidades pagas em março na unidade ativa
+    WHEN o admin pede os recibos do mês e o worker de PDFs processa a fila
+    THEN a requisição só cria a tarefa e vai para a página de espera, e o
+         download da tarefa concluída é o ZIP com os recibos.
+    """
+    settings.PDF_FILA = {"DIRETORIO": tmp_path}
+    CustomUser.objects.create_user(username='admin_fin', password='password123', tipo='admin')
+    client.login(username='admin_fin', password='password123')
+    session = client.session
+    session['unidade_ativa_id'] = unidade_negocio.id
+    session.save()
+
+    resposta = client.get(reverse('finances:mensalidades_recibos_mes'), {'mes': 3, 'ano': 2025})
+
+    tarefa = TarefaPDF.objects.get()
+    assert tarefa.tipo == 'recibos_mes' and tarefa.status == 'pendente'
+    assert resposta.url == reverse('core:tarefa_pdf', args=[tarefa.chave])
+
+    assert processar_pendentes() == (1, 0)
+    resposta = client.get(reverse('core:baixar_tarefa_pdf', args=[tarefa.chave]))
+
+    assert resposta['Content-Type'] == 'application/zip'
+    assert resposta['Content-Disposition'] == 'attachment; filename="Recibos_2025-03.zip"'
+    with zipfile.ZipFile(io.BytesIO(b''.join(resposta.streaming_content))) as pacote:
+        assert len(pacote.namelist()) == 3
+
+
+@pytest.mark.django_db
+def test_novo_pagamento_gera_outro_pacote(unidade_negocio, categoria_receita, mes_com_pagamentos):
+    """
+    GIVEN as entradas do pacote de março
+    WHEN mais uma mensalidade do mês é paga
+    THEN as entradas mudam, e o pacote antigo do cache não é reaproveitado.
+    """
+    antes = entradas_pacote(unidade_negocio.id, 2025, 3)
+    aluno = Aluno.objects.create(nome_completo='Duda Nova', status='ativo', dia_vencimento=10, valor_mensalidade=300)
+    _mensalidade(unidade_negocio, categoria_receita, aluno)
+
+    assert entradas_pacote(unidade_negocio.id, 2025, 3) != antes
+    assert entradas_pacote(unidade_negocio.id, 2025, 4) is None
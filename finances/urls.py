@@ -9,11 +9,14 @@ urlpatterns = [
     path('ajax/add-category/', views.add_category_ajax, name='add_category_ajax'),
     path('ajax/get-aluno-details/<int:aluno_id>/', views.get_aluno_details, name='ajax_get_aluno_details'),
     path('ajax/calcular-pagamento-professor/', views.calcular_pagamento_professor_ajax, name='ajax_calcular_pagamento_professor'),
+    path('contas-a-pagar/folha-professores/', views.gerar_folha_professores, name='gerar_folha_professores'),
     path('aluno/<int:pk>/configurar-modal/', views.configurar_aluno_modal, name='configurar_aluno_modal'),
     path('receitas/add/mensalidade/', views.add_mensalidade, name='add_mensalidade'),
     path('receitas/add/venda/', views.add_venda, name='add_venda'),
     path("mensalidades/", views.mensalidades_list, name="mensalidades_list"),
     path("mensalidades/receber/", views.mensalidade_receber, name="mensalidade_receber"),
+    path("mensalidades/gerar/", views.mensalidades_gerar_mes, name="mensalidades_gerar_mes"),
+    path("mensalidades/recibos/", views.mensalidades_recibos_mes, name="mensalidades_recibos_mes"),
     path('contas-a-pagar/', views.despesa_list_view, name='despesa_list'),
     path('contas-a-pagar/baixar/<int:pk>/', views.baixar_despesa_view, name='baixar_despesa'),
     path('contas-a-receber/', views.receita_list_view, name='receita_list'),
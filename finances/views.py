@@ -32,6 +32,19 @@ from scheduler.models import Aluno
 from django.utils import timezone
 from scheduler.models import Aluno
 from .models import Receita, Category, Transaction
+from .mensalidades import (
+    STATUS_EXIBICAO,
+    STATUS_NAO_CONFIGURADO,
+    STATUS_PAGA,
+    materializar_mes,
+    pendentes_de_geracao,
+    resumo_mensalidades,
+    situacao_mensalidades,
+    vencimento_mensalidade,
+)
+from .folha import calcular_folha, gerar_despesas_folha
+from . import aging, pdfs, razao
+from .recibos import entradas_pacote
 
 from django.shortcuts import render, get_object_or_404, redirect
 from django.forms.models import model_to_dict
@@ -40,22 +53,25 @@ from django.db import transaction
 from django.core.paginator import Paginator
 from django.db.models.functions import TruncMonth
 from datetime import date, timedelta, datetime
-from django.db.models import Q
-from scheduler.models import Aula, CustomUser, Modalidade, PresencaAluno
+from django.db.models import Q, Prefetch
+from django.urls import reverse
+from scheduler.models import CustomUser
 from django.utils.timezone import now
-from django.http import JsonResponse, HttpResponse
+from django.http import FileResponse, JsonResponse, HttpResponse
 from functools import wraps
 from django.contrib.auth.decorators import login_required
 from django.views.decorators.http import require_POST
 from scheduler.models import Aluno
 
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
-from openpyxl.styles import Border, Side
-from openpyxl.cell.rich_text import TextBlock, Text
+from core.pdfs import resposta_pdf, solicitar_pdf
+from core.planilhas import (
+    FORMATO_MOEDA,
+    FORMATO_PERCENTUAL,
+    Coluna,
+    Linha,
+    RelatorioPlanilha,
+)
 from django.template.loader import render_to_string, get_template
-from xhtml2pdf import pisa
 from django.conf import settings
 from django.contrib.staticfiles import finders
 
@@ -152,20 +168,21 @@ def transaction_list_view(request):
     # ==============================================================================
     # --- FLUXO DE CAIXA REALISTA (COM MESES EM PORTUGUÊS) ---
     # ==============================================================================
-    def get_monthly_data(transactions, tipo):
-        qs = transactions.filter(category__type=tipo)
-        monthly = (
-            qs.annotate(month=TruncMonth("transaction_date"))
-            .values("month")
-            .annotate(total=Sum("amount"))
-            .order_by("month")
-        )
+    # Meses inteiros vêm do resumo mensal; pontas de meses parciais, das transações
+    linhas_fluxo = razao.totais(
+        unidade_ativa_id, start_date, end_date, ["transacao"], por_mes=True
+    )
+
+    def get_monthly_data(tipo):
         # ★ ALTERAÇÃO 1: Usar o objeto 'date' como chave, em vez de uma string formatada
-        month_map = {d["month"]: float(d["total"]) for d in monthly}
-        return month_map
+        month_map = defaultdict(float)
+        for linha in linhas_fluxo:
+            if linha["tipo"] == tipo:
+                month_map[linha["mes"]] += float(linha["total"])
+        return dict(month_map)
 
-    income_map = get_monthly_data(transactions, "income")
-    expense_map = get_monthly_data(transactions, "expense")
+    income_map = get_monthly_data("income")
+    expense_map = get_monthly_data("expense")
 
     # Obtém um conjunto de todas as datas (objetos date)
     months_set = set(income_map.keys()).union(expense_map.keys())
@@ -202,23 +219,20 @@ def transaction_list_view(request):
 
     balance = total_income + total_expenses
 
-    expenses_by_category = (
-        transactions.filter(category__type="expense")
-        .values("category__name")
-        .annotate(total=Sum("amount"))
-        .order_by("-total")
-    )
-    chart_labels = [item["category__name"] for item in expenses_by_category]
-    chart_data = [float(item["total"]) for item in expenses_by_category]
-
-    income_by_category = (
-        transactions.filter(category__type="income")
-        .values("category__name")
-        .annotate(total=Sum("amount"))
-        .order_by("-total")
-    )
-    income_chart_labels = [item["category__name"] for item in income_by_category]
-    income_chart_data = [float(item["total"]) for item in income_by_category]
+    def by_category(tipo):
+        totals = defaultdict(Decimal)
+        for linha in linhas_fluxo:
+            if linha["tipo"] == tipo:
+                totals[linha["categoria__name"]] += linha["total"]
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+    expenses_by_category = by_category("expense")
+    chart_labels = [name for name, _ in expenses_by_category]
+    chart_data = [float(total) for _, total in expenses_by_category]
+
+    income_by_category = by_category("income")
+    income_chart_labels = [name for name, _ in income_by_category]
+    income_chart_data = [float(total) for _, total in income_by_category]
 
     paginator = Paginator(transactions.order_by("-transaction_date"), 20)
     page_obj = paginator.get_page(request.GET.get("page"))
@@ -1053,42 +1067,29 @@ def get_dre_data(unidade_negocio_id, start_date, end_date):
     if not all([unidade_negocio_id, start_date, end_date]):
         return None
 
-    receitas_periodo = Receita.objects.filter(
-        unidade_negocio_id=unidade_negocio_id,
-        data_competencia__range=[start_date, end_date],
-    )
-    despesas_periodo = Despesa.objects.filter(
-        unidade_negocio_id=unidade_negocio_id,
-        data_competencia__range=[start_date, end_date],
-    )
+    # Meses inteiros vêm do resumo mensal; pontas de meses parciais, dos lançamentos
+    linhas = razao.totais(unidade_negocio_id, start_date, end_date, ["receita", "despesa"])
+
+    def por_categoria(filtro):
+        itens = [
+            {"categoria__name": linha["categoria__name"], "total_cat": linha["total"]}
+            for linha in linhas
+            if filtro(linha)
+        ]
+        itens.sort(key=lambda item: item["total_cat"], reverse=True)
+        return itens, sum((item["total_cat"] for item in itens), Decimal("0.00"))
 
     data = {}
-    data["receitas_por_categoria"] = list(
-        receitas_periodo.values("categoria__name")
-        .annotate(total_cat=Sum("valor"))
-        .order_by("-total_cat")
+    data["receitas_por_categoria"], data["total_receitas"] = por_categoria(
+        lambda linha: linha["origem"] == "receita"
     )
-    data["total_receitas"] = receitas_periodo.aggregate(total=Sum("valor"))[
-        "total"
-    ] or Decimal("0.00")
-
-    custos_q = despesas_periodo.filter(categoria__tipo_dre="custo")
-    despesas_q = despesas_periodo.filter(categoria__tipo_dre="despesa")
-
-    data["custos_por_categoria"] = list(
-        custos_q.values("categoria__name").annotate(total_cat=Sum("valor"))
+    data["custos_por_categoria"], data["total_custos"] = por_categoria(
+        lambda linha: linha["origem"] == "despesa" and linha["tipo_dre"] == "custo"
     )
-    data["total_custos"] = custos_q.aggregate(total=Sum("valor"))["total"] or Decimal(
-        "0.00"
+    data["despesas_por_categoria"], data["total_despesas"] = por_categoria(
+        lambda linha: linha["origem"] == "despesa" and linha["tipo_dre"] == "despesa"
     )
 
-    data["despesas_por_categoria"] = list(
-        despesas_q.values("categoria__name").annotate(total_cat=Sum("valor"))
-    )
-    data["total_despesas"] = despesas_q.aggregate(total=Sum("valor"))[
-        "total"
-    ] or Decimal("0.00")
-
     data["lucro_bruto"] = data["total_receitas"] - data["total_custos"]
     data["resultado"] = data["lucro_bruto"] - data["total_despesas"]
 
@@ -1331,228 +1332,99 @@ def export_dre_xlsx(request):
         end_date_comp = date.fromisoformat(end_date_comp_str)
         dre_comp = get_dre_data(unidade_ativa_id, start_date_comp, end_date_comp)
 
-    wb = Workbook()
-    ws = wb.active
-    ws.title = "DRE"
-
-    # --- Estilos (sem alterações) ---
-    bold_font = Font(bold=True)
-    white_font_bold = Font(color="FFFFFF", bold=True)
-    header_fill = PatternFill(
-        start_color="EAEAEA", end_color="EAEAEA", fill_type="solid"
-    )
-    total_fill = PatternFill(
-        start_color="F5F5F5", end_color="F5F5F5", fill_type="solid"
-    )
-    final_fill = PatternFill(
-        start_color="424242", end_color="424242", fill_type="solid"
-    )
-    right_align = Alignment(horizontal="right")
-    center_align = Alignment(horizontal="center")
-
-    headers = ["Descrição", "Período Principal"]
+    colunas = [Coluna("Descrição"), Coluna("Período Principal", formato=FORMATO_MOEDA)]
     if dre_comp:
-        headers.extend(["Período Comparativo", "Variação (R$)", "Variação (%)"])
-    num_cols = len(headers)
-
-    # --- Cabeçalho do Arquivo (sem alterações) ---
-    ws["A1"] = "Demonstrativo de Resultados (DRE)"
-    ws.merge_cells(start_row=1, start_column=1, end_row=1, end_column=num_cols)
-    ws["A1"].font = Font(bold=True, size=16)
-    ws["A1"].alignment = center_align
+        colunas += [
+            Coluna("Período Comparativo", formato=FORMATO_MOEDA),
+            Coluna("Variação (R$)", formato=FORMATO_MOEDA),
+            Coluna("Variação (%)", formato=FORMATO_PERCENTUAL),
+        ]
+
     periodo_str = f'Principal: {start_date.strftime("%d/%m/%Y")} a {end_date.strftime("%d/%m/%Y")}'
     if dre_comp:
         periodo_str += f' | Comparativo: {start_date_comp.strftime("%d/%m/%Y")} a {end_date_comp.strftime("%d/%m/%Y")}'
-    ws["A2"] = periodo_str
-    ws.merge_cells(start_row=2, start_column=1, end_row=2, end_column=num_cols)
-    ws["A2"].alignment = center_align
-
-    # --- Cabeçalho da Tabela (sem alterações) ---
-    for col_idx, header_title in enumerate(headers, 1):
-        cell = ws.cell(row=4, column=col_idx)
-        cell.value = header_title
-        cell.font = bold_font
-        cell.fill = header_fill
-        cell.alignment = right_align if col_idx > 1 else Alignment(horizontal="left")
-
-    row_cursor = 5
-
-    def apply_row_styles(row_idx, is_total=False, is_final=False):
-        fill = total_fill if is_total else (final_fill if is_final else None)
-        font = bold_font if is_total else (white_font_bold if is_final else None)
-        for col_idx in range(1, num_cols + 1):
-            cell = ws.cell(row=row_idx, column=col_idx)
-            if fill:
-                cell.fill = fill
-            if font:
-                cell.font = font
-            if col_idx > 1:
-                cell.alignment = right_align
-
-    # ===================== INÍCIO DA CORREÇÃO =====================
-    def add_data_row(data, indent=0):
-        nonlocal row_cursor
-        ws.cell(row=row_cursor, column=1).value = f'{"  " * indent}{data[0]}'
-        for i, value in enumerate(data[1:], 2):
-            cell = ws.cell(row=row_cursor, column=i)
-            cell.value = value
-            if isinstance(value, (Decimal, float)):
-                # Lógica corrigida: só formata como % se for a última coluna E houver comparação
-                if dre_comp and i == num_cols:
-                    cell.number_format = '0.0"%"'
-                else:
-                    cell.number_format = "R$ #,##0.00"
-        row_cursor += 1
-
-    # ===================== FIM DA CORREÇÃO =====================
-
-    # --- Lógica para preencher os dados (sem alterações) ---
-    if dre_comp:
-        variacoes = {}
-        for key in [
-            "total_receitas",
-            "total_custos",
-            "lucro_bruto",
-            "total_despesas",
-            "resultado",
-        ]:
-            val_principal = dre_data.get(key, Decimal("0.00"))
-            val_comp = dre_comp.get(key, Decimal("0.00"))
-            var_abs = val_principal - val_comp
-            var_perc = (
-                (var_abs / val_comp * 100)
-                if val_comp != 0
-                else (Decimal("100.0") if val_principal != 0 else Decimal("0.0"))
-            )
-            variacoes[key] = {"abs": var_abs, "perc": var_perc}
-
-        merged_receitas = merge_and_compare_categories(
-            dre_data.get("receitas_por_categoria", []),
-            dre_comp.get("receitas_por_categoria", []),
-        )
-        merged_custos = merge_and_compare_categories(
-            dre_data.get("custos_por_categoria", []),
-            dre_comp.get("custos_por_categoria", []),
-        )
-        merged_despesas = merge_and_compare_categories(
-            dre_data.get("despesas_por_categoria", []),
-            dre_comp.get("despesas_por_categoria", []),
-        )
-
-        add_data_row(
-            [
-                "(+) Receita Operacional Bruta",
-                dre_data["total_receitas"],
-                dre_comp["total_receitas"],
-                variacoes["total_receitas"]["abs"],
-                variacoes["total_receitas"]["perc"],
-            ]
-        )
-        apply_row_styles(row_cursor - 1, is_total=True)
-        for r in merged_receitas:
-            add_data_row(
-                [
-                    f"+ {r['name']}",
-                    r["principal"],
-                    r["comparativo"],
-                    r["var_abs"],
-                    r["var_perc"],
-                ],
-                indent=1,
-            )
-
-        add_data_row(
-            [
-                "(-) Custos Diretos",
-                -dre_data["total_custos"],
-                -dre_comp["total_custos"],
-                -variacoes["total_custos"]["abs"],
-                -variacoes["total_custos"]["perc"],
-            ]
-        )
-        apply_row_styles(row_cursor - 1, is_total=True)
-        for c in merged_custos:
-            add_data_row(
-                [
-                    f"- {c['name']}",
-                    -c["principal"],
-                    -c["comparativo"],
-                    -c["var_abs"],
-                    -c["var_perc"],
-                ],
-                indent=1,
-            )
-
-        add_data_row(
-            [
-                "(=) Lucro Bruto",
-                dre_data["lucro_bruto"],
-                dre_comp["lucro_bruto"],
-                variacoes["lucro_bruto"]["abs"],
-                variacoes["lucro_bruto"]["perc"],
-            ]
-        )
-        apply_row_styles(row_cursor - 1, is_total=True)
-
-        add_data_row(
-            [
-                "(-) Despesas Operacionais",
-                -dre_data["total_despesas"],
-                -dre_comp["total_despesas"],
-                -variacoes["total_despesas"]["abs"],
-                -variacoes["total_despesas"]["perc"],
-            ]
-        )
-        apply_row_styles(row_cursor - 1, is_total=True)
-        for d in merged_despesas:
-            add_data_row(
-                [
-                    f"- {d['name']}",
-                    -d["principal"],
-                    -d["comparativo"],
-                    -d["var_abs"],
-                    -d["var_perc"],
-                ],
-                indent=1,
-            )
 
-        add_data_row(
-            [
-                "(=) Resultado do Período",
-                dre_data["resultado"],
-                dre_comp["resultado"],
-                variacoes["resultado"]["abs"],
-                variacoes["resultado"]["perc"],
-            ]
-        )
-        apply_row_styles(row_cursor - 1, is_final=True)
-
-    else:  # Lógica para período único
-        add_data_row(["(+) Receita Operacional Bruta", dre_data["total_receitas"]])
-        apply_row_styles(row_cursor - 1, is_total=True)
-        for r in dre_data["receitas_por_categoria"]:
-            add_data_row([f"+ {r['categoria__name']}", r["total_cat"]], indent=1)
-
-        add_data_row(["(-) Custos Diretos", -dre_data["total_custos"]])
-        apply_row_styles(row_cursor - 1, is_total=True)
-        for c in dre_data["custos_por_categoria"]:
-            add_data_row([f"- {c['categoria__name']}", -c["total_cat"]], indent=1)
-
-        add_data_row(["(=) Lucro Bruto", dre_data["lucro_bruto"]])
-        apply_row_styles(row_cursor - 1, is_total=True)
-
-        add_data_row(["(-) Despesas Operacionais", -dre_data["total_despesas"]])
-        apply_row_styles(row_cursor - 1, is_total=True)
-        for d in dre_data["despesas_por_categoria"]:
-            add_data_row([f"- {d['categoria__name']}", -d["total_cat"]], indent=1)
+    def linhas_dre():
+        if dre_comp:
+            variacoes = {}
+            for key in [
+                "total_receitas",
+                "total_custos",
+                "lucro_bruto",
+                "total_despesas",
+                "resultado",
+            ]:
+                val_principal = dre_data.get(key, Decimal("0.00"))
+                val_comp = dre_comp.get(key, Decimal("0.00"))
+                var_abs = val_principal - val_comp
+                var_perc = (
+                    (var_abs / val_comp * 100)
+                    if val_comp != 0
+                    else (Decimal("100.0") if val_principal != 0 else Decimal("0.0"))
+                )
+                variacoes[key] = {"abs": var_abs, "perc": var_perc}
+
+            def total(descricao, key, sinal=1, estilo="total"):
+                return Linha(
+                    [
+                        descricao,
+                        sinal * dre_data[key],
+                        sinal * dre_comp[key],
+                        sinal * variacoes[key]["abs"],
+                        sinal * variacoes[key]["perc"],
+                    ],
+                    estilo,
+                )
 
-        add_data_row(["(=) Resultado do Período", dre_data["resultado"]])
-        apply_row_styles(row_cursor - 1, is_final=True)
+            def categorias(chave, prefixo, sinal=1):
+                merged = merge_and_compare_categories(
+                    dre_data.get(chave, []), dre_comp.get(chave, [])
+                )
+                for item in merged:
+                    yield Linha(
+                        [
+                            f"{prefixo} {item['name']}",
+                            sinal * item["principal"],
+                            sinal * item["comparativo"],
+                            sinal * item["var_abs"],
+                            sinal * item["var_perc"],
+                        ],
+                        recuo=1,
+                    )
 
-    # --- Ajuste final de colunas e cores (sem alterações) ---
-    ws.column_dimensions["A"].width = 50
-    for i in range(2, num_cols + 1):
-        ws.column_dimensions[get_column_letter(i)].width = 20
+            yield total("(+) Receita Operacional Bruta", "total_receitas")
+            yield from categorias("receitas_por_categoria", "+")
+            yield total("(-) Custos Diretos", "total_custos", -1)
+            yield from categorias("custos_por_categoria", "-", -1)
+            yield total("(=) Lucro Bruto", "lucro_bruto")
+            yield total("(-) Despesas Operacionais", "total_despesas", -1)
+            yield from categorias("despesas_por_categoria", "-", -1)
+            yield total("(=) Resultado do Período", "resultado", estilo="final")
+
+        else:  # Lógica para período único
+            yield Linha(["(+) Receita Operacional Bruta", dre_data["total_receitas"]], "total")
+            for r in dre_data["receitas_por_categoria"]:
+                yield Linha([f"+ {r['categoria__name']}", r["total_cat"]], recuo=1)
+
+            yield Linha(["(-) Custos Diretos", -dre_data["total_custos"]], "total")
+            for c in dre_data["custos_por_categoria"]:
+                yield Linha([f"- {c['categoria__name']}", -c["total_cat"]], recuo=1)
+
+            yield Linha(["(=) Lucro Bruto", dre_data["lucro_bruto"]], "total")
+
+            yield Linha(["(-) Despesas Operacionais", -dre_data["total_despesas"]], "total")
+            for d in dre_data["despesas_por_categoria"]:
+                yield Linha([f"- {d['categoria__name']}", -d["total_cat"]], recuo=1)
+
+            yield Linha(["(=) Resultado do Período", dre_data["resultado"]], "final")
+
+    relatorio = RelatorioPlanilha(
+        "DRE",
+        larguras=[50] + [20] * (len(colunas) - 1),
+        titulo="Demonstrativo de Resultados (DRE)",
+        subtitulo=periodo_str,
+    )
+    relatorio.secao(colunas, linhas_dre(), espaco_antes=1)
 
     if dre_comp:
         file_name = (
@@ -1566,13 +1438,8 @@ def export_dre_xlsx(request):
             f"{start_date.strftime('%d-%m-%Y')} a {end_date.strftime('%d-%m-%Y')}.xlsx"
         )
 
-    # Resposta HTTP com o nome de arquivo correto e sem linhas duplicadas
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-    )
-    response["Content-Disposition"] = f'attachment; filename="{file_name}"'
-    wb.save(response)
-    return response
+    # A planilha é escrita em modo write-only e enviada em partes
+    return relatorio.resposta(file_name)
 
 
 @admin_required
@@ -1596,53 +1463,6 @@ def export_dre_pdf(request):
         end_date_comp = date.fromisoformat(end_date_comp_str)
         dre_comp = get_dre_data(unidade_ativa_id, start_date_comp, end_date_comp)
 
-    # Contexto agora usa 'dre_principal', que é o nome esperado pelo template
-    context = {
-        "start_date": start_date,
-        "end_date": end_date,
-        "dre_principal": dre_principal,
-        "dre_comp": dre_comp,
-        "start_date_comp": start_date_comp,
-        "end_date_comp": end_date_comp,
-    }
-
-    if dre_comp:
-        variacoes = {}
-        for key in [
-            "total_receitas",
-            "total_custos",
-            "lucro_bruto",
-            "total_despesas",
-            "resultado",
-        ]:
-            val_principal = dre_principal.get(key, Decimal("0.00"))
-            val_comp = dre_comp.get(key, Decimal("0.00"))
-            var_abs = val_principal - val_comp
-            var_perc = (
-                (var_abs / val_comp * 100)
-                if val_comp != 0
-                else (Decimal("100.0") if val_principal != 0 else Decimal("0.0"))
-            )
-            variacoes[key] = {"abs": var_abs, "perc": var_perc}
-        context["variacoes"] = variacoes
-
-        # Adicionando as listas detalhadas ao contexto (a parte que estava faltando)
-        context["merged_receitas"] = merge_and_compare_categories(
-            dre_principal.get("receitas_por_categoria", []),
-            dre_comp.get("receitas_por_categoria", []),
-        )
-        context["merged_custos"] = merge_and_compare_categories(
-            dre_principal.get("custos_por_categoria", []),
-            dre_comp.get("custos_por_categoria", []),
-        )
-        context["merged_despesas"] = merge_and_compare_categories(
-            dre_principal.get("despesas_por_categoria", []),
-            dre_comp.get("despesas_por_categoria", []),
-        )
-
-    html_string = render_to_string("finances/dre_pdf_template.html", context)
-    response = HttpResponse(content_type="application/pdf")
-
     def format_date_for_filename(d):
         # Converte date para dd-mm-yyyy
         return d.strftime("%d-%m-%Y")
@@ -1655,12 +1475,16 @@ def export_dre_pdf(request):
     else:
         file_name = f"DRE {format_date_for_filename(start_date)} a {format_date_for_filename(end_date)}.pdf"
 
-    response["Content-Disposition"] = f'attachment; filename="{file_name}"'
-
-    pisa_status = pisa.CreatePDF(html_string, dest=response)
-    if pisa_status.err:
-        return HttpResponse("Ocorreu um erro ao gerar o PDF.")
-    return response
+    # Gerado pelo worker (processar_pdfs); o mesmo DRE com os mesmos números vem do cache
+    tarefa = solicitar_pdf(
+        "dre",
+        pdfs.entradas_dre(
+            dre_principal, dre_comp, start_date, end_date, start_date_comp, end_date_comp
+        ),
+        file_name,
+        usuario=request.user,
+    )
+    return resposta_pdf(tarefa)
 
 
 @login_required
@@ -1728,57 +1552,15 @@ def calcular_pagamento_professor_ajax(request):
             {"status": "error", "message": "Parâmetros inválidos."}, status=400
         )
 
-    # 1. Filtra aulas realizadas
-    q_realizadas_normal = Q(
-        status="Realizada", relatorioaula__professor_que_validou=professor
-    ) & ~Q(modalidade__nome__icontains="atividade complementar")
-    q_realizadas_ac = Q(
-        status="Realizada",
-        modalidade__nome__icontains="atividade complementar",
-        presencas_professores__professor=professor,
-        presencas_professores__status="presente",
-    )
-
-    aulas_realizadas = (
-        Aula.objects.filter(
-            data_hora__date__gte=data_inicial, data_hora__date__lte=data_final
-        )
-        .filter(q_realizadas_normal | q_realizadas_ac)
-        .distinct()
-    )
-
-    # 2. Agrupa por modalidade
-    calculo_detalhado = []
-    modalidades_envolvidas = Modalidade.objects.filter(
-        aula__in=aulas_realizadas
-    ).distinct()
-
-    for modalidade in modalidades_envolvidas:
-        aulas_nesta_modalidade = aulas_realizadas.filter(modalidade=modalidade)
-
-        item_calculo = {
-            "modalidade_nome": modalidade.nome,
-            "tipo_pagamento_display": modalidade.get_tipo_pagamento_display(),
-            "valor_unitario": float(modalidade.valor_pagamento_professor),
+    folha = calcular_folha(data_inicial, data_final, professor_ids=[professor.pk])
+    calculo_detalhado = [
+        {
+            **linha,
+            "valor_unitario": float(linha["valor_unitario"]),
+            "subtotal": float(linha["subtotal"]),
         }
-
-        # 3. Aplica a regra
-        if modalidade.tipo_pagamento == "aluno":
-            quantidade = PresencaAluno.objects.filter(
-                aula__in=aulas_nesta_modalidade, status="presente"
-            ).count()
-            item_calculo["unidade_contagem"] = "aluno(s) presente(s)"
-        else:
-            quantidade = aulas_nesta_modalidade.count()
-            item_calculo["unidade_contagem"] = "aula(s)"
-
-        item_calculo["quantidade"] = quantidade
-        item_calculo["subtotal"] = float(
-            Decimal(quantidade) * modalidade.valor_pagamento_professor
-        )
-
-        if quantidade > 0:
-            calculo_detalhado.append(item_calculo)
+        for linha in folha.get(professor.pk, {}).get("linhas", [])
+    ]
 
     return JsonResponse(
         {
@@ -1789,116 +1571,150 @@ def calcular_pagamento_professor_ajax(request):
     )
 
 
-def _process_aging_data(queryset, date_field_name, today):
-    """
-    Função auxiliar para processar uma queryset de contas (Receita ou Despesa)
-    e retornar os dados agrupados por entidade e por faixa de vencimento.
-    """
-    # --- CORRIGIDO: Chaves do dicionário renomeadas para serem válidas no template ---
-    buckets = {
-        "a_vencer": {"min": -9999, "max": 0, "label": "A Vencer"},
-        "d1_30": {"min": 1, "max": 30, "label": "1-30 dias"},
-        "d31_60": {"min": 31, "max": 60, "label": "31-60 dias"},
-        "d61_90": {"min": 61, "max": 90, "label": "61-90 dias"},
-        "d90_plus": {"min": 91, "max": 9999, "label": "90+ dias"},
-    }
-
-    entity_data = defaultdict(
-        lambda: {
-            "entity": None,
-            "total_geral": Decimal("0.00"),
-            "buckets": {key: Decimal("0.00") for key in buckets},
-        }
-    )
-
-    column_totals = {key: Decimal("0.00") for key in buckets}
-    grand_total = Decimal("0.00")
-
-    for item in queryset:
-        days_overdue = (today - getattr(item, date_field_name)).days
-
-        for key, limits in buckets.items():
-            if limits["min"] <= days_overdue <= limits["max"]:
-                bucket_key = key
-                break
-        else:
-            continue
-
-        if isinstance(item, Receita) and item.aluno:
-            entity_id = item.aluno.id
-            entity_name = item.aluno.nome_completo
-        else:
-            entity_id = item.descricao.lower()
-            entity_name = item.descricao
-
-        entity_data[entity_id]["entity"] = entity_name
-        entity_data[entity_id]["buckets"][bucket_key] += item.valor
-        entity_data[entity_id]["total_geral"] += item.valor
-
-        column_totals[bucket_key] += item.valor
-        grand_total += item.valor
-
-    sorted_entities = sorted(
-        entity_data.values(), key=lambda x: x["total_geral"], reverse=True
-    )
+@admin_required
+@require_POST
+def gerar_folha_professores(request):
+    """Lança de uma vez as despesas de pagamento de todos os professores no período."""
+    unidade_ativa_id = request.session.get("unidade_ativa_id")
+    if not unidade_ativa_id:
+        messages.warning(request, "Selecione uma Unidade de Negócio.")
+        return redirect("scheduler:dashboard")
 
-    return {
-        "entities": sorted_entities,
-        "column_totals": column_totals,
-        "grand_total": grand_total,
-        "bucket_labels": [b["label"] for b in buckets.values()],
-    }
+    try:
+        data_inicial = datetime.strptime(request.POST.get("data_inicial", ""), "%Y-%m-%d").date()
+        data_final = datetime.strptime(request.POST.get("data_final", ""), "%Y-%m-%d").date()
+    except ValueError:
+        messages.error(request, "Período inválido.")
+        return redirect("finances:despesa_list")
+    categoria = get_object_or_404(Category, pk=request.POST.get("categoria"), type="expense")
+
+    criadas = gerar_despesas_folha(unidade_ativa_id, categoria, data_inicial, data_final)
+    if criadas:
+        total = sum((despesa.valor for despesa in criadas), Decimal("0.00"))
+        messages.success(
+            request, f"{len(criadas)} pagamento(s) de professor lançado(s), total R$ {total:.2f}."
+        )
+    else:
+        messages.info(request, "Nenhum pagamento novo a lançar no período.")
+    return redirect("finances:despesa_list")
 
 
 @admin_required
 def aging_report_view(request):
+    """
+    Vencimentos por entidade e faixa de atraso, agregados no banco
+    (finances/aging.py). `?data=AAAA-MM-DD` gera a posição em uma data passada.
+    """
     unidade_ativa_id = request.session.get("unidade_ativa_id")
     if not unidade_ativa_id:
         messages.warning(request, "Selecione uma Unidade de Negócio.")
         return redirect("scheduler:dashboard")
 
     today = now().date()
-
-    # Processa Contas a Receber
-    recebiveis_abertos = Receita.objects.filter(
-        unidade_negocio_id=unidade_ativa_id, status="a_receber"
-    ).select_related("aluno")
-    aging_recebiveis = _process_aging_data(
-        recebiveis_abertos, "data_competencia", today
-    )
-
-    # Processa Contas a Pagar
-    pagaveis_abertos = Despesa.objects.filter(
-        unidade_negocio_id=unidade_ativa_id, status="a_pagar"
-    )
-    aging_pagaveis = _process_aging_data(pagaveis_abertos, "data_competencia", today)
+    report_date = today
+    data_str = request.GET.get("data", "").strip()
+    if data_str:
+        try:
+            report_date = date.fromisoformat(data_str)
+        except ValueError:
+            messages.warning(request, "Data inválida; exibindo a posição de hoje.")
 
     context = {
-        "aging_recebiveis": aging_recebiveis,
-        "aging_pagaveis": aging_pagaveis,
-        "report_date": today,
+        "aging_recebiveis": aging.aging_recebiveis(unidade_ativa_id, report_date, today),
+        "aging_pagaveis": aging.aging_pagaveis(unidade_ativa_id, report_date, today),
+        "report_date": report_date,
+        "is_historico": report_date < today,
     }
 
     return render(request, "finances/aging_report.html", context)
 
 
-@login_required
-def mensalidades_list(request):
-    MESES_PT = {
-        1: "Janeiro",
-        2: "Fevereiro",
-        3: "Março",
-        4: "Abril",
-        5: "Maio",
-        6: "Junho",
-        7: "Julho",
-        8: "Agosto",
-        9: "Setembro",
-        10: "Outubro",
-        11: "Novembro",
-        12: "Dezembro",
+MESES_PT = {
+    1: "Janeiro",
+    2: "Fevereiro",
+    3: "Março",
+    4: "Abril",
+    5: "Maio",
+    6: "Junho",
+    7: "Julho",
+    8: "Agosto",
+    9: "Setembro",
+    10: "Outubro",
+    11: "Novembro",
+    12: "Dezembro",
+}
+
+
+def _linha_mensalidade(aluno, ano, mes):
+    """Monta a linha da listagem a partir do aluno anotado e das receitas pré-carregadas."""
+    receita = aluno.receitas_mes[0] if aluno.receitas_mes else None
+    status_slug = aluno.mensalidade_status
+    status, status_color = STATUS_EXIBICAO[status_slug]
+    paga = status_slug == STATUS_PAGA
+    vencimento = vencimento_mensalidade(ano, mes, aluno.dia_vencimento)
+
+    item = {
+        "aluno": aluno,
+        "responsavel": aluno.responsavel_nome or "—",
+        "telefone": aluno.telefone,
+        "whatsapp_url": None,
+        "competencia": f"{mes:02d}/{ano}",
+        "receita_id": receita.id if receita else None,
+        # Sem receita gravada não há o que receber: o mês precisa ser gerado
+        "gerada": receita is not None,
+        "valor": aluno.mensalidade_valor if aluno.mensalidade_valor is not None else "—",
+        "vencimento": vencimento,
+        "status": status,
+        "status_slug": status_slug,
+        "status_color": status_color,
+        "forma_pagamento": "—",
+        "data_pagamento": None,
+        "pode_receber": receita is not None and not paga,
     }
 
+    if status_slug == STATUS_NAO_CONFIGURADO:
+        item["vencimento"] = "—"
+        return item
+
+    if paga:
+        transacao = receita.transacao if receita else None
+        item["forma_pagamento"] = transacao.forma_pagamento if transacao else "—"
+        if transacao:
+            item["data_pagamento"] = transacao.transaction_date
+        else:
+            item["data_pagamento"] = receita.data_recebimento if receita else aluno.avulsa_mes_data
+    elif aluno.telefone:
+        responsavel = (aluno.responsavel_nome or "").strip()
+        venc_str = (
+            f'{vencimento.strftime("%d/%m/%Y")}' if vencimento else f"{mes:02d}/{ano}"
+        )
+        if not responsavel or responsavel.lower() == aluno.nome_completo.strip().lower():
+            msg = f"Olá, *{aluno.nome_completo}!* 👋\n\nEstamos entrando em contato sobre a mensalidade referente a {MESES_PT[mes]}, com vencimento em *{venc_str}*."
+        else:
+            msg = f"Olá, {responsavel}! 👋\n\nEstamos entrando em contato sobre a mensalidade do aluno {aluno.nome_completo}, referente a {MESES_PT[mes]}, com vencimento em *{venc_str}*."
+        item["whatsapp_url"] = f"https://wa.me/55{aluno.telefone}?text={quote(msg)}"
+
+    return item
+
+
+def _mes_ano_mensalidades(dados, hoje):
+    ano_get = dados.get("ano", str(hoje.year)).replace(".", "")
+    try:
+        ano = int(ano_get)
+    except ValueError:
+        ano = hoje.year
+    mes = int(dados.get("mes", hoje.month))
+    return ano, mes
+
+
+@login_required
+def mensalidades_list(request):
+    """
+    Listagem somente leitura: a situação de cada aluno vem anotada do banco e
+    as receitas da página são pré-carregadas, então o número de consultas não
+    depende do número de alunos. Receitas que faltam são geradas em lote por
+    `mensalidades_gerar_mes` (ou pelo comando `gerar_mensalidades_mes`).
+    """
     if request.user.tipo == "professor":
         return redirect("scheduler:dashboard")
 
@@ -1908,19 +1724,10 @@ def mensalidades_list(request):
         return redirect("scheduler:dashboard")
 
     hoje = timezone.localdate()
-    primeiro_dia_mes_atual = date(hoje.year, hoje.month, 1)
 
     search_query = request.GET.get("search", "").strip()
     status_filter = request.GET.get("status", "")
-    ano_get = request.GET.get("ano", str(hoje.year)).replace(".", "")
-    try:
-        ano = int(ano_get)
-    except ValueError:
-        ano = hoje.year
-    mes = int(request.GET.get("mes", hoje.month))
-
-    mes_extenso = MESES_PT[mes]
-    data_competencia_base = date(ano, mes, 1)
+    ano, mes = _mes_ano_mensalidades(request.GET, hoje)
 
     meses_list = [(i, MESES_PT[i]) for i in range(1, 13)]
     ano_atual = timezone.localdate().year
@@ -1937,181 +1744,30 @@ def mensalidades_list(request):
             | Q(responsavel_nome__icontains=search_query)
             | Q(telefone__icontains=search_query)
         )
-    alunos = alunos_qs.order_by("nome_completo")
-
-    lista = []
-
-    # --- INÍCIO ADIÇÃO DE CONTADORES ---
-    kpi_recebido = Decimal("0.00")
-    count_recebido = 0  # <--- NOVO
-    
-    kpi_atrasado = Decimal("0.00")
-    count_atrasado = 0  # <--- NOVO
-    
-    kpi_em_aberto = Decimal("0.00")
-    count_em_aberto = 0 # <--- NOVO
-    # --- FIM ADIÇÃO DE CONTADORES ---
-
-    with transaction.atomic():
-        for aluno in alunos:
-            receita = (
-                Receita.objects.filter(
-                    unidade_negocio_id=unidade_ativa_id,
-                    categoria=categoria_mensalidade,
-                    aluno=aluno,
-                    data_competencia__year=ano,
-                    data_competencia__month=mes,
-                )
-                .select_related("transacao")
-                .first()
-            )
-
-            transacao_avulsa = None
-            if not receita:
-                transacao_avulsa = Transaction.objects.filter(
-                    unidade_negocio_id=unidade_ativa_id,
-                    student=aluno,
-                    category=categoria_mensalidade,
-                    transaction_date__year=ano,
-                    transaction_date__month=mes,
-                    receita__isnull=True,
-                ).first()
-
-            tem_valor = bool(aluno.valor_mensalidade)
-            tem_vencimento = bool(aluno.dia_vencimento)
-
-            if transacao_avulsa and not receita:
-                receita = Receita.objects.create(
-                    unidade_negocio_id=unidade_ativa_id,
-                    categoria=categoria_mensalidade,
-                    aluno=aluno,
-                    descricao=f"{aluno.nome_completo}",
-                    valor=transacao_avulsa.amount,
-                    data_competencia=data_competencia_base,
-                    status="recebido",
-                    data_recebimento=transacao_avulsa.transaction_date,
-                    transacao=transacao_avulsa,
-                )
-            elif not receita and tem_valor and tem_vencimento:
-                receita = Receita.objects.create(
-                    unidade_negocio_id=unidade_ativa_id,
-                    categoria=categoria_mensalidade,
-                    aluno=aluno,
-                    descricao=f"{aluno.nome_completo}",
-                    valor=aluno.valor_mensalidade,
-                    data_competencia=data_competencia_base,
-                    status="a_receber",
-                )
-
-            item = {
-                "aluno": aluno,
-                "responsavel": aluno.responsavel_nome or "—",
-                "telefone": aluno.telefone,
-                "whatsapp_url": None,
-                "competencia": f"{mes:02d}/{ano}",
-                "pode_receber": False,
-            }
-
-            if not receita:
-
-                status_slug = "nao_configurado"
-                status_display = "Não configurado"
-                status_color = "secondary"
-
-                if tem_valor and tem_vencimento:
-                    status_slug = "nao_gerado"
-                    status_display = "Não gerado"
-                    status_color = "light text-muted border"
-
-                item.update(
-                    {
-                        "status": status_display,
-                        "status_slug": status_slug,
-                        "status_color": status_color,
-                        "valor": aluno.valor_mensalidade if tem_valor else "—",
-                        "vencimento": "—",
-                    }
-                )
-                lista.append(item)
-                continue
-
-            transacao = receita.transacao
-            paga = transacao is not None
-            vencimento = None
-            atrasada = False
-
-            if aluno.dia_vencimento:
-                try:
-                    vencimento = date(ano, mes, aluno.dia_vencimento)
-                except ValueError:
-                    vencimento = (date(ano, mes, 1) + timedelta(days=32)).replace(
-                        day=1
-                    ) - timedelta(days=1)
-                atrasada = (not paga) and (hoje > vencimento)
-
-            valor_real = receita.valor or Decimal("0.00")
-
-            if paga:
-                status = "Paga"
-                status_slug = "paga"
-                status_color = "success"
-                kpi_recebido += valor_real
-                count_recebido += 1 # <--- SOMA CONTADOR
-            elif atrasada:
-                status = "Atrasada"
-                status_slug = "atrasada"
-                status_color = "danger"
-                kpi_atrasado += valor_real
-                count_atrasado += 1 # <--- SOMA CONTADOR
-            else:
-                status = "Em aberto"
-                status_slug = "em_aberto"
-                status_color = "warning"
-                kpi_em_aberto += valor_real
-                count_em_aberto += 1 # <--- SOMA CONTADOR
-
-            whatsapp_url = None
-            if aluno.telefone and not paga:
-                telefone = aluno.telefone
-                responsavel = (aluno.responsavel_nome or "").strip()
-                venc_str = (
-                    f'{vencimento.strftime("%d/%m/%Y")}'
-                    if vencimento
-                    else f"{mes:02d}/{ano}"
-                )
-                aluno_nome_norm = aluno.nome_completo.strip().lower()
-                responsavel_norm = responsavel.lower()
-                if not responsavel or responsavel_norm == aluno_nome_norm:
-                    msg = f"Olá, *{aluno.nome_completo}!* 👋\n\nEstamos entrando em contato sobre a mensalidade referente a {mes_extenso}, com vencimento em *{venc_str}*."
-                else:
-                    msg = f"Olá, {responsavel}! 👋\n\nEstamos entrando em contato sobre a mensalidade do aluno {aluno.nome_completo}, referente a {mes_extenso}, com vencimento em *{venc_str}*."
-                whatsapp_url = f"https://wa.me/55{telefone}?text={quote(msg)}"
-
-            item.update(
-                {
-                    "receita_id": receita.id,
-                    "valor": valor_real,
-                    "vencimento": vencimento,
-                    "status": status,
-                    "status_slug": status_slug,
-                    "status_color": status_color,
-                    "forma_pagamento": transacao.forma_pagamento if paga else "—",
-                    "data_pagamento": transacao.transaction_date if paga else None,
-                    "pode_receber": not paga,
-                    "whatsapp_url": whatsapp_url,
-                }
-            )
-            lista.append(item)
+    alunos = situacao_mensalidades(
+        unidade_ativa_id, categoria_mensalidade, ano, mes, hoje=hoje, alunos=alunos_qs
+    )
 
-    kpi_previsto = kpi_recebido + kpi_atrasado + kpi_em_aberto
-    count_previsto = count_recebido + count_atrasado + count_em_aberto # <--- SOMA TOTAL
+    kpis = resumo_mensalidades(alunos)
+    pendentes_geracao = pendentes_de_geracao(alunos).count()
 
     if status_filter:
-        lista = [i for i in lista if i["status_slug"] == status_filter]
+        alunos = alunos.filter(mensalidade_status=status_filter)
 
-    paginator = Paginator(lista, 50)
+    receitas_do_mes = Receita.objects.filter(
+        unidade_negocio_id=unidade_ativa_id,
+        categoria=categoria_mensalidade,
+        data_competencia__year=ano,
+        data_competencia__month=mes,
+    ).select_related("transacao").order_by("pk")
+    alunos = alunos.prefetch_related(
+        Prefetch("receitas", queryset=receitas_do_mes, to_attr="receitas_mes")
+    ).order_by("nome_completo")
+
+    paginator = Paginator(alunos, 50)
     page_number = request.GET.get("page")
     page_obj = paginator.get_page(page_number)
+    page_obj.object_list = [_linha_mensalidade(aluno, ano, mes) for aluno in page_obj]
 
     context = {
         "page_obj": page_obj,
@@ -2121,21 +1777,62 @@ def mensalidades_list(request):
         "anos": anos,
         "search_query": search_query,
         "status_filter": status_filter,
-        # KPIs Valores
-        "kpi_recebido": kpi_recebido,
-        "kpi_atrasado": kpi_atrasado,
-        "kpi_em_aberto": kpi_em_aberto,
-        "kpi_previsto": kpi_previsto,
-        # KPIs Contadores (NOVOS)
-        "count_recebido": count_recebido,
-        "count_atrasado": count_atrasado,
-        "count_em_aberto": count_em_aberto,
-        "count_previsto": count_previsto,
+        "pendentes_geracao": pendentes_geracao,
+        # KPIs (valores e contadores)
+        **kpis,
     }
 
     return render(request, "finances/mensalidades_list.html", context)
 
 
+@login_required
+@require_POST
+def mensalidades_gerar_mes(request):
+    """Grava de uma vez as receitas de mensalidade que faltam no mês selecionado."""
+    if request.user.tipo == "professor":
+        return redirect("scheduler:dashboard")
+
+    unidade_ativa_id = request.session.get("unidade_ativa_id")
+    if not unidade_ativa_id:
+        messages.warning(request, "Selecione uma Unidade de Negócio.")
+        return redirect("scheduler:dashboard")
+
+    ano, mes = _mes_ano_mensalidades(request.POST, timezone.localdate())
+    categoria_mensalidade = get_object_or_404(
+        Category, name__iexact="Mensalidade", unidade_negocio_id=unidade_ativa_id
+    )
+
+    criadas = materializar_mes(unidade_ativa_id, categoria_mensalidade, ano, mes)
+    if criadas:
+        messages.success(request, f"{criadas} mensalidade(s) gerada(s) para {mes:02d}/{ano}.")
+    else:
+        messages.info(request, "Todas as mensalidades do mês já estavam geradas.")
+
+    return redirect(f"{reverse('finances:mensalidades_list')}?mes={mes}&ano={ano}")
+
+
+@login_required
+def mensalidades_recibos_mes(request):
+    """ZIP com os recibos de todas as mensalidades pagas do mês (gerado pelo worker de PDFs)."""
+    if request.user.tipo == "professor":
+        return redirect("scheduler:dashboard")
+
+    unidade_ativa_id = request.session.get("unidade_ativa_id")
+    if not unidade_ativa_id:
+        messages.warning(request, "Selecione uma Unidade de Negócio.")
+        return redirect("scheduler:dashboard")
+
+    ano, mes = _mes_ano_mensalidades(request.GET, timezone.localdate())
+    entradas = entradas_pacote(unidade_ativa_id, ano, mes)
+    if entradas is None:
+        messages.info(request, f"Nenhuma mensalidade paga em {mes:02d}/{ano}.")
+        return redirect(f"{reverse('finances:mensalidades_list')}?mes={mes}&ano={ano}")
+
+    # Como os PDFs, vai para a fila (processar_pdfs) e é servido do cache
+    tarefa = solicitar_pdf("recibos_mes", entradas, f"Recibos_{ano}-{mes:02d}.zip", usuario=request.user)
+    return resposta_pdf(tarefa)
+
+
 def mensalidade_receber(request):
     if request.method != "POST":
         return JsonResponse({"error": "Método inválido"}, status=405)
@@ -2281,50 +1978,9 @@ def gerar_recibo_pdf(request, pk):
         messages.error(request, "Apenas mensalidades pagas podem gerar recibo.")
         return redirect("finances:mensalidades_list")
 
-    # --- LÓGICA PARA CARREGAR A IMAGEM EM BASE64 ---
-    # Caminho absoluto do arquivo no disco
-    # Ajuste o caminho se sua pasta 'static' estiver em outro lugar
-    logo_path = os.path.join(
-        settings.BASE_DIR,
-        "scheduler",
-        "static",
-        "scheduler",
-        "img",
-        "logo_relatorio.png",
-    )
-
-    logo_data = None
-    if os.path.exists(logo_path):
-        with open(logo_path, "rb") as image_file:
-            # Lê o arquivo e converte para string base64
-            logo_data = base64.b64encode(image_file.read()).decode("utf-8")
-    else:
-        print(f"ERRO: Logo não encontrado no caminho: {logo_path}")
-
-    template_path = "finances/pdf/recibo_pagamento.html"
-
-    context = {
-        "receita": receita,
-        "aluno": receita.aluno,
-        "transacao": receita.transacao,
-        "unidade": receita.unidade_negocio,
-        "usuario_logado": request.user,
-        "data_emissao": timezone.now(),
-        # Passamos a imagem convertida
-        "logo_base64": logo_data,
-    }
-
-    response = HttpResponse(content_type="application/pdf")
+    # Gerado pelo worker (processar_pdfs); downloads repetidos vêm do cache em disco
     filename = f"Recibo_{receita.aluno.nome_completo}_{receita.id}.pdf"
-    response["Content-Disposition"] = f'inline; filename="{filename}"'
-
-    template = get_template(template_path)
-    html = template.render(context)
-
-    # Não precisamos mais do link_callback complexo para a imagem principal
-    pisa_status = pisa.CreatePDF(html, dest=response)
-
-    if pisa_status.err:
-        return HttpResponse("Erro ao gerar PDF <pre>" + html + "</pre>")
-
-    return response
+    tarefa = solicitar_pdf(
+        "recibo", pdfs.entradas_recibo(receita), filename, usuario=request.user, inline=True
+    )
+    return resposta_pdf(tarefa)
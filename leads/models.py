@@ -1,15 +1,19 @@
 from django.db import models
 from django.conf import settings
 from core.models import UnidadeNegocio
+from core.unidades import listar_unidades
 from scheduler.models import Aluno
 from datetime import date
 
 
 def get_escola_unidade_negocio():
-    try:
-        return UnidadeNegocio.objects.get(nome="Escola")
-    except UnidadeNegocio.DoesNotExist:
-        return None
+    # Lida do cache de unidades (core/unidades.py): o default é avaliado a
+    # cada Lead() instanciado, inclusive ao montar o LeadForm. Devolve só o id,
+    # para não entregar ao Lead uma instância guardada no cache do processo
+    for unidade in listar_unidades():
+        if unidade.nome == "Escola":
+            return unidade.pk
+    return None
 
 
 def smart_title(text):
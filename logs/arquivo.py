@@ -0,0 +1,426 @@
+"""
+Arquivo morto do AuditLog.
+
+Registros mais antigos que o período de retenção saem da tabela e vão para
+arquivos mensais `auditlog-AAAA-MM.jsonl.gz` (um JSON por linha, gzip),
+apenas com acréscimo: cada execução grava um novo membro gzip no fim do
+arquivo do mês e depois apaga do banco, em lotes, as linhas gravadas.
+
+Ao lado de cada mês fica um índice `auditlog-AAAA-MM.indice.json` com o
+total de registros e as contagens por (hora local, ação). As views leem o
+arquivo morto sob demanda (`Arquivados`), a partir da hora cheia do início
+do período: sem filtros de texto, contagens e gráfico vêm do índice e só os
+meses que caem na página pedida são descompactados; com filtros, a busca
+percorre no máximo AUDIT_LOG_ARQUIVO_MESES_BUSCA meses.
+
+Se uma execução for interrompida entre a gravação e a exclusão, a repetição
+grava o lote de novo; a leitura descarta ids repetidos. O índice guarda o
+tamanho do arquivo que ele cobre e é refeito na leitura quando não bate
+(execução interrompida ou arquivo gravado antes do índice existir). Um
+membro gzip truncado no fim do arquivo (gravação interrompida) é ignorado
+com um aviso no log.
+"""
+import gzip
+import heapq
+import json
+import logging
+import os
+import zlib
+from collections import Counter
+from datetime import date
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from .models import AuditLog
+
+logger = logging.getLogger(__name__)
+
+CAMPOS = [
+    "id",
+    "timestamp",
+    "user_id",
+    "username",
+    "ip_address",
+    "user_agent",
+    "path",
+    "method",
+    "action",
+    "resource_type",
+    "resource_id",
+    "resource_name",
+    "detail",
+    "metadata",
+    "tags",
+]
+
+
+def diretorio_arquivo():
+    return getattr(settings, "AUDIT_LOG_ARQUIVO_DIR", settings.BASE_DIR / "logs" / "arquivo")
+
+
+def caminho_do_mes(mes):
+    return os.path.join(diretorio_arquivo(), f"auditlog-{mes:%Y-%m}.jsonl.gz")
+
+
+def caminho_do_indice(mes):
+    return os.path.join(diretorio_arquivo(), f"auditlog-{mes:%Y-%m}.indice.json")
+
+
+def meses_busca():
+    """Quantos meses arquivados (os mais recentes) a busca com filtros percorre."""
+    return getattr(settings, "AUDIT_LOG_ARQUIVO_MESES_BUSCA", 6)
+
+
+def hora_do_registro(timestamp):
+    """Chave da hora local usada no índice, ex.: "2025-01-31T14"."""
+    return timezone.localtime(timestamp).strftime("%Y-%m-%dT%H")
+
+
+def mes_do_registro(timestamp):
+    local = timezone.localtime(timestamp)
+    return date(local.year, local.month, 1)
+
+
+def meses_arquivados():
+    """Meses (primeiro dia) com arquivo gravado, do mais recente ao mais antigo."""
+    diretorio = diretorio_arquivo()
+    if not os.path.isdir(diretorio):
+        return []
+    meses = []
+    for nome in os.listdir(diretorio):
+        if nome.startswith("auditlog-") and nome.endswith(".jsonl.gz"):
+            ano, mes = nome[len("auditlog-"):-len(".jsonl.gz")].split("-")
+            meses.append(date(int(ano), int(mes), 1))
+    return sorted(meses, reverse=True)
+
+
+def _tamanho(mes):
+    try:
+        return os.path.getsize(caminho_do_mes(mes))
+    except FileNotFoundError:
+        return 0
+
+
+def _acrescentar(mes, registros):
+    """Grava os registros no fim do arquivo do mês. Retorna o tamanho anterior do arquivo."""
+    os.makedirs(diretorio_arquivo(), exist_ok=True)
+    with open(caminho_do_mes(mes), "ab") as bruto:
+        tamanho_anterior = bruto.tell()
+        with gzip.GzipFile(fileobj=bruto, mode="ab") as arquivo:
+            for registro in registros:
+                linha = json.dumps(registro, cls=DjangoJSONEncoder, ensure_ascii=False)
+                arquivo.write(linha.encode("utf-8") + b"\n")
+        bruto.flush()
+        os.fsync(bruto.fileno())
+    return tamanho_anterior
+
+
+def _somar(indice, registros):
+    indice["total"] += len(registros)
+    for registro in registros:
+        por_acao = indice["por_hora"].setdefault(hora_do_registro(registro["timestamp"]), {})
+        acao = registro["action"].lower()
+        por_acao[acao] = por_acao.get(acao, 0) + 1
+
+
+def _salvar_indice(mes, indice):
+    caminho = caminho_do_indice(mes)
+    with open(caminho + ".tmp", "w", encoding="utf-8") as arquivo:
+        json.dump(indice, arquivo)
+    os.replace(caminho + ".tmp", caminho)
+
+
+def _ler_indice(mes):
+    try:
+        with open(caminho_do_indice(mes), encoding="utf-8") as arquivo:
+            return json.load(arquivo)
+    except (FileNotFoundError, ValueError):
+        return None
+
+
+def _refazer_indice(mes):
+    indice = {"tamanho": _tamanho(mes), "total": 0, "por_hora": {}}
+    vistos = set()
+    registros = []
+    for dados in _ler_mes(mes):
+        if dados["id"] not in vistos:
+            vistos.add(dados["id"])
+            dados["timestamp"] = parse_datetime(dados["timestamp"])
+            registros.append(dados)
+    _somar(indice, registros)
+    _salvar_indice(mes, indice)
+    return indice
+
+
+def indice_do_mes(mes):
+    """Índice do mês ({"tamanho", "total", "por_hora"}), refeito se não cobrir o arquivo inteiro."""
+    indice = _ler_indice(mes)
+    if indice is None or indice.get("tamanho") != _tamanho(mes):
+        indice = _refazer_indice(mes)
+    return indice
+
+
+def _atualizar_indice(mes, registros, tamanho_anterior):
+    """
+    Soma ao índice os registros recém-gravados e apagados da tabela. Se o
+    índice não cobria exatamente o arquivo antes desta gravação (pode haver
+    registros repetidos), fica como está e é refeito na próxima leitura.
+    """
+    indice = _ler_indice(mes)
+    if tamanho_anterior == 0:
+        indice = {"tamanho": 0, "total": 0, "por_hora": {}}
+    if indice is None or indice.get("tamanho") != tamanho_anterior:
+        return
+    _somar(indice, registros)
+    indice["tamanho"] = _tamanho(mes)
+    _salvar_indice(mes, indice)
+
+
+def arquivar(antes_de, lote=1000):
+    """
+    Move para o arquivo morto os registros com timestamp anterior a `antes_de`,
+    em lotes de `lote` linhas. Retorna {mês: quantidade arquivada}.
+    """
+    arquivados = {}
+    ultimo_id = 0
+    while True:
+        registros = list(
+            AuditLog.objects.filter(timestamp__lt=antes_de, pk__gt=ultimo_id)
+            .order_by("pk")
+            .values(*CAMPOS)[:lote]
+        )
+        if not registros:
+            break
+
+        por_mes = {}
+        for registro in registros:
+            por_mes.setdefault(mes_do_registro(registro["timestamp"]), []).append(registro)
+        tamanhos_anteriores = {}
+        for mes, do_mes in sorted(por_mes.items()):
+            tamanhos_anteriores[mes] = _acrescentar(mes, do_mes)
+            arquivados[mes] = arquivados.get(mes, 0) + len(do_mes)
+
+        ids = [registro["id"] for registro in registros]
+        with transaction.atomic():
+            AuditLog.objects.filter(pk__in=ids).delete()
+        # Só depois de apagar: uma gravação sem exclusão deixa o índice para ser refeito
+        for mes, do_mes in por_mes.items():
+            _atualizar_indice(mes, do_mes, tamanhos_anteriores[mes])
+        ultimo_id = ids[-1]
+    return arquivados
+
+
+def _ler_mes(mes):
+    caminho = caminho_do_mes(mes)
+    try:
+        with gzip.open(caminho, "rt", encoding="utf-8") as arquivo:
+            for linha in arquivo:
+                if linha.strip():
+                    yield json.loads(linha)
+    except FileNotFoundError:
+        return
+    except (EOFError, gzip.BadGzipFile, zlib.error, json.JSONDecodeError) as erro:
+        # Gravação interrompida no meio de um membro: os registros anteriores valem
+        logger.warning("Arquivo de logs %s corrompido ou truncado: %s", caminho, erro)
+
+
+def _contem(valor, termo):
+    return termo in str(valor or "").lower()
+
+
+class Arquivados:
+    """
+    Registros arquivados a partir da hora de `inicio` (datetime), com os
+    mesmos filtros "contém" das views, do mais recente ao mais antigo, como
+    instâncias de AuditLog não salvas. Sem filtros, contagens vêm do índice
+    e uma página só descompacta os meses que alcança, montando e ordenando
+    apenas os registros das horas que ela cobre; com filtros, os meses
+    buscados são lidos para contar, sem guardar os registros.
+    """
+
+    def __init__(self, inicio, username="", resource="", tags=""):
+        # Começa na hora cheia, a menor unidade do índice
+        self.inicio = timezone.localtime(inicio).replace(minute=0, second=0, microsecond=0)
+        self.primeira_hora = hora_do_registro(self.inicio)
+        self.username, self.resource, self.tags = username.lower(), resource.lower(), tags.lower()
+        self.filtrado = bool(self.username or self.resource or self.tags)
+        self.mes_inicial = mes_do_registro(self.inicio)
+
+        meses = [mes for mes in meses_arquivados() if mes >= self.mes_inicial]
+        # Meses arquivados que a busca com filtros deixou de fora
+        self.meses_fora_da_busca = []
+        if self.filtrado:
+            meses, self.meses_fora_da_busca = meses[:meses_busca()], meses[meses_busca():]
+        self.meses = meses
+        self._indices = {}
+        self._contagens = None
+
+    def _passa(self, dados):
+        if dados["timestamp"] < self.inicio:
+            return False
+        if self.username and not _contem(dados["username"], self.username):
+            return False
+        if self.resource and not (
+            _contem(dados["resource_name"], self.resource)
+            or _contem(json.dumps(dados["detail"], ensure_ascii=False), self.resource)
+            or _contem(dados["resource_id"], self.resource)
+        ):
+            return False
+        if self.tags and not _contem(dados["tags"], self.tags):
+            return False
+        return True
+
+    def _linhas_do_mes(self, mes, horas=None):
+        """
+        Registros do mês (dicionários) que passam nos filtros, sem repetidos;
+        com `horas`, só os dessas horas locais. Nada é acumulado além dos ids
+        já devolvidos (para descartar repetidos).
+        """
+        vistos = set()
+        for dados in _ler_mes(mes):
+            dados["timestamp"] = parse_datetime(dados["timestamp"])
+            if horas is not None and hora_do_registro(dados["timestamp"]) not in horas:
+                continue
+            if dados["id"] in vistos or not self._passa(dados):
+                continue
+            vistos.add(dados["id"])
+            yield dados
+
+    def _por_hora_do_indice(self, mes):
+        """{hora: {ação: total}} do índice do mês, a partir da primeira hora do período."""
+        if mes not in self._indices:
+            por_hora = indice_do_mes(mes)["por_hora"]
+            if mes == self.mes_inicial:
+                por_hora = {hora: por_acao for hora, por_acao in por_hora.items() if hora >= self.primeira_hora}
+            self._indices[mes] = por_hora
+        return self._indices[mes]
+
+    def _horas_da_fatia(self, mes, inicio, fim):
+        """
+        Horas (pelo índice) que contêm as posições [inicio, fim) do mês, do
+        mais recente ao mais antigo, e quantos registros vêm antes da primeira.
+        """
+        horas, antes, acumulado = set(), None, 0
+        for hora, por_acao in sorted(self._por_hora_do_indice(mes).items(), reverse=True):
+            if acumulado >= fim:
+                break
+            total = sum(por_acao.values())
+            if acumulado + total > inicio:
+                horas.add(hora)
+                if antes is None:
+                    antes = acumulado
+            acumulado += total
+        return horas, antes or 0
+
+    def registros_do_mes(self, mes, inicio=0, fim=None):
+        """
+        Posições [inicio, fim) do mês, do mais recente ao mais antigo, como
+        instâncias de AuditLog. Sem filtros, o índice diz quais horas contêm a
+        fatia e só elas são ordenadas; com filtros, um heap guarda os `fim`
+        mais recentes.
+        """
+        def ordem(dados):
+            return (dados["timestamp"], dados["id"])
+
+        if fim is None:
+            linhas = sorted(self._linhas_do_mes(mes), key=ordem, reverse=True)[inicio:]
+        elif self.filtrado:
+            linhas = heapq.nlargest(fim, self._linhas_do_mes(mes), key=ordem)[inicio:]
+        else:
+            horas, antes = self._horas_da_fatia(mes, inicio, fim)
+            if not horas:
+                return []
+            linhas = sorted(self._linhas_do_mes(mes, horas), key=ordem, reverse=True)
+            linhas = linhas[inicio - antes:fim - antes]
+        return [AuditLog(**dados) for dados in linhas]
+
+    def contagens(self):
+        """Quantidade de registros por mês, na ordem de `meses`."""
+        if self._contagens is None:
+            self._contagens = [
+                sum(1 for _ in self._linhas_do_mes(mes)) if self.filtrado
+                else sum(sum(por_acao.values()) for por_acao in self._por_hora_do_indice(mes).values())
+                for mes in self.meses
+            ]
+        return self._contagens
+
+    def __len__(self):
+        return sum(self.contagens())
+
+    def por_hora(self):
+        """Contagens {(hora local "AAAA-MM-DDTHH", ação): total}, do índice quando não há filtros."""
+        contagens = Counter()
+        for mes in self.meses:
+            if self.filtrado:
+                for dados in self._linhas_do_mes(mes):
+                    contagens[(hora_do_registro(dados["timestamp"]), dados["action"].lower())] += 1
+            else:
+                for hora, por_acao in self._por_hora_do_indice(mes).items():
+                    for acao, total in por_acao.items():
+                        contagens[(hora, acao)] += total
+        return contagens
+
+    def __iter__(self):
+        for mes in self.meses:
+            yield from self.registros_do_mes(mes)
+
+    def __getitem__(self, fatia):
+        if not isinstance(fatia, slice):
+            return self[fatia:fatia + 1][0]
+        inicio, fim = fatia.start or 0, fatia.stop if fatia.stop is not None else len(self)
+        resultado = []
+        deslocamento = 0
+        for mes, quantidade in zip(self.meses, self.contagens()):
+            if deslocamento >= fim:
+                break
+            if deslocamento + quantidade > inicio:
+                resultado.extend(self.registros_do_mes(
+                    mes, max(inicio - deslocamento, 0), min(fim - deslocamento, quantidade)
+                ))
+            deslocamento += quantidade
+        return resultado
+
+def ler_arquivados(inicio, username="", resource="", tags=""):
+    """Todos os registros de `Arquivados` em uma lista."""
+    return list(Arquivados(inicio, username=username, resource=resource, tags=tags))
+
+
+class RegistrosComArquivo:
+    """
+    Sequência paginável com os registros da tabela (queryset) seguidos dos
+    arquivados, que são sempre mais antigos. Usada com o Paginator.
+    """
+
+    def __init__(self, queryset, arquivados):
+        self.queryset = queryset
+        self.arquivados = arquivados
+        self._total_tabela = None
+
+    @property
+    def total_tabela(self):
+        if self._total_tabela is None:
+            self._total_tabela = self.queryset.count()
+        return self._total_tabela
+
+    def count(self):
+        return self.total_tabela + len(self.arquivados)
+
+    def __len__(self):
+        return self.count()
+
+    def __getitem__(self, fatia):
+        if not isinstance(fatia, slice):
+            return self[fatia:fatia + 1][0]
+        inicio, fim = fatia.start or 0, fatia.stop if fatia.stop is not None else self.count()
+        resultado = []
+        if inicio < self.total_tabela:
+            resultado.extend(self.queryset[inicio:min(fim, self.total_tabela)])
+        if fim > self.total_tabela:
+            resultado.extend(
+                self.arquivados[max(inicio - self.total_tabela, 0):fim - self.total_tabela]
+            )
+        return resultado
@@ -0,0 +1,183 @@
+"""
+Gravação em lote dos registros de auditoria do AuditMiddleware.
+
+Visualizações de página (inclusive o polling AJAX do calendário) não gravam
+mais no banco durante a requisição: o registro vai para uma fila em memória
+e uma thread em segundo plano faz `bulk_create` quando o lote enche ou
+quando o intervalo vence. A fila tem tamanho máximo; quando lota, a
+política de overflow decide se descarta os registros mais antigos ou os
+novos. Ao encerrar o processo a fila é esvaziada no banco.
+
+Configuração em `settings.AUDIT_LOG_BUFFER` (ver CONFIG_PADRAO). Com
+"ATIVO": False cada registro é gravado na hora, como antes.
+"""
+import atexit
+import logging
+import os
+import queue
+import threading
+import time
+
+from django.conf import settings
+from django.db import close_old_connections
+
+
+logger = logging.getLogger(__name__)
+
+DESCARTAR_ANTIGOS = "descartar_antigos"
+DESCARTAR_NOVOS = "descartar_novos"
+
+CONFIG_PADRAO = {
+    "ATIVO": True,
+    "LOTE": 200,
+    "INTERVALO_SEGUNDOS": 2.0,
+    "MAX_PENDENTES": 10000,
+    "OVERFLOW": DESCARTAR_ANTIGOS,
+}
+
+# Tempo máximo que o encerramento do processo espera pela última gravação
+ESPERA_ENCERRAMENTO_SEGUNDOS = 10
+
+# {model: função(registros)} chamada depois de gravar registros do model,
+# ex.: os resumos por hora das amostras de desempenho (logs/desempenho.py)
+APOS_GRAVAR = {}
+
+
+def _apos_gravar(model, registros):
+    funcao = APOS_GRAVAR.get(model)
+    if funcao is None:
+        return
+    try:
+        funcao(registros)
+    except Exception:
+        logger.exception("Falha ao processar %s registro(s) gravado(s) de %s.", len(registros), model.__name__)
+
+
+def config_buffer():
+    return {**CONFIG_PADRAO, **getattr(settings, "AUDIT_LOG_BUFFER", {})}
+
+
+class BufferAuditoria:
+    def __init__(self, lote, intervalo, max_pendentes, overflow):
+        self.lote = lote
+        self.intervalo = intervalo
+        self.overflow = overflow
+        self.fila = queue.Queue(maxsize=max_pendentes)
+        self.descartados = 0
+        self._parar = threading.Event()
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def enfileirar(self, registro):
+        self._iniciar()
+        try:
+            self.fila.put_nowait(registro)
+        except queue.Full:
+            self._transbordar(registro)
+
+    def _transbordar(self, registro):
+        if self.overflow == DESCARTAR_ANTIGOS:
+            try:
+                self.fila.get_nowait()
+            except queue.Empty:
+                pass
+            try:
+                self.fila.put_nowait(registro)
+            except queue.Full:
+                pass
+        self.descartados += 1
+        if self.descartados % 1000 == 1:
+            logger.warning(
+                "Fila de auditoria cheia (%s pendentes): %s registro(s) descartado(s) até agora.",
+                self.fila.maxsize,
+                self.descartados,
+            )
+
+    def _iniciar(self):
+        # Após um fork (ex: workers do gunicorn) a thread do processo pai não existe no filho
+        if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive() and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._parar.clear()
+            self._thread = threading.Thread(
+                target=self._executar, name="audit-log-buffer", daemon=True
+            )
+            self._thread.start()
+
+    def _executar(self):
+        pendentes = []
+        prazo = time.monotonic() + self.intervalo
+        while True:
+            parando = self._parar.is_set()
+            # Acorda a cada 0,5 s no máximo para perceber o pedido de encerramento
+            espera = 0 if parando else min(max(prazo - time.monotonic(), 0), 0.5)
+            try:
+                pendentes.append(self.fila.get(timeout=espera))
+            except queue.Empty:
+                if parando:
+                    break
+
+            if len(pendentes) >= self.lote or time.monotonic() >= prazo:
+                self._gravar(pendentes)
+                pendentes = []
+                prazo = time.monotonic() + self.intervalo
+        self._gravar(pendentes)
+
+    def _gravar(self, registros):
+        if not registros:
+            return
+        # A fila também recebe as amostras de desempenho (logs/desempenho.py)
+        por_model = {}
+        for registro in registros:
+            por_model.setdefault(type(registro), []).append(registro)
+        try:
+            for model, do_model in por_model.items():
+                try:
+                    model.objects.bulk_create(do_model, batch_size=self.lote)
+                except Exception:
+                    logger.exception("Falha ao gravar %s registro(s) de %s.", len(do_model), model.__name__)
+                else:
+                    _apos_gravar(model, do_model)
+        finally:
+            close_old_connections()
+
+    def encerrar(self, timeout=ESPERA_ENCERRAMENTO_SEGUNDOS):
+        """Para a thread depois de gravar tudo o que está na fila."""
+        thread = self._thread
+        if thread is None or not thread.is_alive():
+            return
+        self._parar.set()
+        thread.join(timeout)
+
+
+_buffer = None
+_buffer_lock = threading.Lock()
+
+
+def obter_buffer():
+    global _buffer
+    if _buffer is None:
+        with _buffer_lock:
+            if _buffer is None:
+                config = config_buffer()
+                _buffer = BufferAuditoria(
+                    lote=config["LOTE"],
+                    intervalo=config["INTERVALO_SEGUNDOS"],
+                    max_pendentes=config["MAX_PENDENTES"],
+                    overflow=config["OVERFLOW"],
+                )
+                atexit.register(_buffer.encerrar)
+    return _buffer
+
+
+def registrar(registro):
+    """Grava um registro ainda não salvo (AuditLog, AmostraRequisicao): em lote (padrão) ou na hora."""
+    if config_buffer()["ATIVO"]:
+        obter_buffer().enfileirar(registro)
+    else:
+        registro.save()
+        _apos_gravar(type(registro), [registro])
@@ -0,0 +1,59 @@
+"""
+Índice de texto da busca profunda do AuditLog.
+
+No SQLite os registros são copiados, por triggers, para a tabela FTS5
+`logs_auditlog_busca` (tokenizador trigram) com resource_name, resource_id,
+username, tags e os valores do JSON `detail` achatados. Com o trigram, uma
+consulta entre aspas equivale ao antigo `icontains` (substring, sem
+diferenciar maiúsculas), mas usa o índice em vez de varrer a tabela.
+
+Termos com menos de 3 caracteres não cabem num trigrama e, assim como em
+outros bancos ou sem a migração aplicada, caem no `icontains`.
+"""
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+TABELA = "logs_auditlog_busca"
+
+CAMPOS_INDEXADOS = ["resource_name", "resource_id", "username", "tags", "detail"]
+
+TAMANHO_MINIMO = 3
+
+# (alias, nome do banco) -> índice existe
+_DISPONIVEL = {}
+
+
+def indice_disponivel(using=DEFAULT_DB_ALIAS):
+    conexao = connections[using]
+    if conexao.vendor != "sqlite":
+        return False
+    chave = (using, str(conexao.settings_dict["NAME"]))
+    if chave not in _DISPONIVEL:
+        with conexao.cursor() as cursor:
+            _DISPONIVEL[chave] = TABELA in conexao.introspection.table_names(cursor)
+    return _DISPONIVEL[chave]
+
+
+def expressao_fts(campos, termo):
+    """Consulta FTS5 por `termo` como substring em qualquer um dos `campos`."""
+    frase = '"' + termo.replace('"', '""') + '"'
+    return "{%s} : %s" % (" ".join(campos), frase)
+
+
+def filtrar_contem(queryset, campos, termo):
+    """
+    Filtra os registros em que algum dos `campos` contém `termo`, pelo
+    índice FTS quando possível e por `icontains` caso contrário.
+    """
+    if len(termo) >= TAMANHO_MINIMO and indice_disponivel(queryset.db):
+        return queryset.filter(
+            pk__in=RawSQL(
+                f"SELECT rowid FROM {TABELA} WHERE {TABELA} MATCH %s",
+                [expressao_fts(campos, termo)],
+            )
+        )
+    condicao = Q()
+    for campo in campos:
+        condicao |= Q(**{f"{campo}__icontains": termo})
+    return queryset.filter(condicao)
@@ -0,0 +1,269 @@
+"""
+Medição de desempenho por requisição.
+
+O DesempenhoMiddleware (logs/middleware.py) instala um `execute_wrapper` em
+todas as conexões durante a requisição e mede o tempo total, o número de
+consultas, o tempo gasto em SQL e as consultas mais lentas. Cada medição
+vira uma AmostraRequisicao, marcada com o nome da view resolvida (ex:
+"scheduler:dashboard") e gravada em lote pelo mesmo buffer do AuditLog.
+
+Cada view pode ter um orçamento de tempo e de consultas; medições acima dele
+são marcadas e registradas no logger "logs.desempenho".
+
+Cada lote de amostras gravado é somado a um ResumoDesempenhoHora por (view,
+hora), com histogramas do tempo (baldes logarítmicos de BASE_HISTOGRAMA, erro
+relativo de no máximo 2%) e do número de consultas (exato). A página de
+desempenho calcula p50/p95/p99 desses resumos, em horas cheias, sem ler as
+amostras: o custo depende do número de views e de horas da janela.
+
+Configuração em `settings.DESEMPENHO` (ver CONFIG_PADRAO).
+"""
+import heapq
+import logging
+import math
+import time
+from collections import Counter, defaultdict
+from datetime import timezone
+
+from django.conf import settings
+from django.db import transaction
+
+from .buffer import APOS_GRAVAR, registrar
+from .models import AmostraRequisicao, ResumoDesempenhoHora
+
+logger = logging.getLogger(__name__)
+
+CONFIG_PADRAO = {
+    "ATIVO": True,
+    # Fração das requisições medidas (1.0 = todas)
+    "AMOSTRAGEM": 1.0,
+    # Quantas consultas mais lentas guardar por requisição
+    "CONSULTAS_LENTAS": 3,
+    "TAMANHO_SQL": 500,
+    "ORCAMENTO_PADRAO": {"ms": 1000, "consultas": 50},
+    # {"app:view": {"ms": ..., "consultas": ...}}
+    "ORCAMENTOS": {},
+    # Amostras mais antigas são apagadas pelo comando arquivar_logs
+    "RETENCAO_DIAS": 14,
+}
+
+IGNORED_PATHS = ("/static/", "/media/", "/favicon.ico", "/__debug__/")
+
+VIEW_NAO_RESOLVIDA = "(não resolvida)"
+
+# Razão entre os limites de baldes vizinhos do histograma de tempo
+BASE_HISTOGRAMA = 1.02
+MENOR_DURACAO_MS = 0.01
+
+
+def config_desempenho():
+    return {**CONFIG_PADRAO, **getattr(settings, "DESEMPENHO", {})}
+
+
+class ColetorConsultas:
+    """execute_wrapper que conta as consultas e guarda as `limite` mais lentas."""
+
+    def __init__(self, limite, tamanho_sql=500):
+        self.limite = limite
+        self.tamanho_sql = tamanho_sql
+        self.total = 0
+        self.tempo_ms = 0.0
+        self._lentas = []  # heap de (ms, ordem, sql)
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            ms = (time.perf_counter() - inicio) * 1000
+            self.total += 1
+            self.tempo_ms += ms
+            item = (ms, self.total, sql)
+            if len(self._lentas) < self.limite:
+                heapq.heappush(self._lentas, item)
+            elif self._lentas and ms > self._lentas[0][0]:
+                heapq.heapreplace(self._lentas, item)
+
+    def mais_lentas(self):
+        return [
+            {"ms": round(ms, 2), "sql": sql[: self.tamanho_sql]}
+            for ms, _, sql in sorted(self._lentas, reverse=True)
+        ]
+
+
+def nome_da_view(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return VIEW_NAO_RESOLVIDA
+    return match.view_name or match._func_path
+
+
+def orcamento_da_view(view, config=None):
+    config = config or config_desempenho()
+    return {**config["ORCAMENTO_PADRAO"], **config["ORCAMENTOS"].get(view, {})}
+
+
+def registrar_medicao(request, response, duracao_ms, coletor, config=None):
+    config = config or config_desempenho()
+    view = nome_da_view(request)
+    orcamento = orcamento_da_view(view, config)
+    acima = duracao_ms > orcamento["ms"] or coletor.total > orcamento["consultas"]
+    if acima:
+        logger.warning(
+            "Orçamento excedido em %s (%s %s): %.0f ms (limite %s), %s consultas (limite %s).",
+            view,
+            request.method,
+            request.path,
+            duracao_ms,
+            orcamento["ms"],
+            coletor.total,
+            orcamento["consultas"],
+        )
+    registrar(AmostraRequisicao(
+        view=view[:255],
+        path=request.path[:1024],
+        method=request.method or "",
+        status=getattr(response, "status_code", 0),
+        duracao_ms=round(duracao_ms, 2),
+        consultas=coletor.total,
+        tempo_sql_ms=round(coletor.tempo_ms, 2),
+        consultas_lentas=coletor.mais_lentas(),
+        acima_do_orcamento=acima,
+    ))
+
+
+def balde_ms(duracao_ms):
+    """Índice do balde (BASE^(i-1), BASE^i] que contém a duração."""
+    return math.ceil(math.log(max(duracao_ms, MENOR_DURACAO_MS), BASE_HISTOGRAMA))
+
+
+def valor_do_balde(balde):
+    """Valor representativo do balde: o meio geométrico dos limites."""
+    return BASE_HISTOGRAMA ** (int(balde) - 0.5)
+
+
+def inicio_da_hora(momento):
+    return momento.astimezone(timezone.utc).replace(minute=0, second=0, microsecond=0)
+
+
+def _somar_histograma(histograma, contagens):
+    for chave, quantidade in contagens.items():
+        histograma[str(chave)] = histograma.get(str(chave), 0) + quantidade
+
+
+def somar_amostras(modelo_resumo, amostras):
+    """
+    Soma as amostras aos resumos por (view, hora) de `modelo_resumo`. Recebe
+    o model como parâmetro para servir também à migração que consolida as
+    amostras antigas.
+    """
+    grupos = defaultdict(list)
+    for amostra in amostras:
+        grupos[(amostra.view, inicio_da_hora(amostra.timestamp))].append(amostra)
+
+    for (view, hora), do_grupo in grupos.items():
+        with transaction.atomic():
+            resumo, _ = modelo_resumo.objects.select_for_update().get_or_create(view=view, hora=hora)
+            resumo.amostras += len(do_grupo)
+            resumo.soma_sql_ms += sum(amostra.tempo_sql_ms for amostra in do_grupo)
+            resumo.violacoes += sum(1 for amostra in do_grupo if amostra.acima_do_orcamento)
+            resumo.max_consultas = max(resumo.max_consultas, *(amostra.consultas for amostra in do_grupo))
+            _somar_histograma(resumo.histograma_ms, Counter(balde_ms(a.duracao_ms) for a in do_grupo))
+            _somar_histograma(resumo.histograma_consultas, Counter(a.consultas for a in do_grupo))
+            pior = max(do_grupo, key=lambda amostra: amostra.duracao_ms)
+            if pior.duracao_ms > resumo.pior_ms:
+                resumo.pior_ms = pior.duracao_ms
+                resumo.pior_consultas_lentas = pior.consultas_lentas
+            resumo.save()
+
+
+def consolidar(amostras):
+    """Chamada pelo buffer depois de gravar um lote de amostras."""
+    somar_amostras(ResumoDesempenhoHora, amostras)
+
+
+APOS_GRAVAR[AmostraRequisicao] = consolidar
+
+
+def _valor_no_rank(itens, rank):
+    acumulado = 0
+    for valor, quantidade in itens:
+        acumulado += quantidade
+        if rank < acumulado:
+            return valor
+    return itens[-1][0]
+
+
+def percentil_histograma(histograma, p):
+    """
+    Percentil `p` (0-100) dos valores de um histograma {valor: quantidade},
+    com interpolação linear entre os valores vizinhos (como sobre a lista
+    ordenada de todos eles).
+    """
+    total = sum(histograma.values())
+    if not total:
+        return 0
+    itens = sorted(histograma.items())
+    posicao = (total - 1) * p / 100
+    abaixo = int(posicao)
+    inferior = _valor_no_rank(itens, abaixo)
+    superior = _valor_no_rank(itens, min(abaixo + 1, total - 1))
+    return inferior + (superior - inferior) * (posicao - abaixo)
+
+
+def relatorio(desde, ordem="duracao", limite=30):
+    """
+    Views com amostras desde a hora de `desde`, com p50/p95/p99 de tempo,
+    p95/máximo de consultas, tempo médio de SQL, violações de orçamento e as
+    consultas mais lentas da pior amostra. Ordenado pelo p95 de tempo ou de
+    consultas. Lê só os resumos por hora.
+    """
+    config = config_desempenho()
+    por_view = defaultdict(lambda: {
+        "amostras": 0, "ms": Counter(), "consultas": Counter(), "sql": 0.0,
+        "violacoes": 0, "max_consultas": 0, "pior": (0, []),
+    })
+    resumos = ResumoDesempenhoHora.objects.filter(hora__gte=inicio_da_hora(desde)).values_list(
+        "view", "amostras", "histograma_ms", "histograma_consultas", "soma_sql_ms",
+        "violacoes", "max_consultas", "pior_ms", "pior_consultas_lentas",
+    )
+    for view, amostras, hist_ms, hist_consultas, sql, violacoes, max_consultas, pior_ms, lentas in resumos:
+        dados = por_view[view]
+        dados["amostras"] += amostras
+        dados["ms"].update({int(balde): quantidade for balde, quantidade in hist_ms.items()})
+        dados["consultas"].update({int(valor): quantidade for valor, quantidade in hist_consultas.items()})
+        dados["sql"] += sql
+        dados["violacoes"] += violacoes
+        dados["max_consultas"] = max(dados["max_consultas"], max_consultas)
+        if pior_ms > dados["pior"][0]:
+            dados["pior"] = (pior_ms, lentas)
+
+    resultado = []
+    for view, dados in por_view.items():
+        if not dados["amostras"]:
+            continue
+        duracoes = {valor_do_balde(balde): quantidade for balde, quantidade in dados["ms"].items()}
+        resultado.append({
+            "view": view,
+            "amostras": dados["amostras"],
+            "p50_ms": percentil_histograma(duracoes, 50),
+            "p95_ms": percentil_histograma(duracoes, 95),
+            "p99_ms": percentil_histograma(duracoes, 99),
+            "p95_consultas": percentil_histograma(dados["consultas"], 95),
+            "max_consultas": dados["max_consultas"],
+            "media_sql_ms": dados["sql"] / dados["amostras"],
+            "violacoes": dados["violacoes"],
+            "orcamento": orcamento_da_view(view, config),
+            "consultas_lentas": dados["pior"][1],
+        })
+
+    chave = "p95_consultas" if ordem == "consultas" else "p95_ms"
+    resultado.sort(key=lambda linha: linha[chave], reverse=True)
+    return resultado[:limite]
+
+
+def limpar_amostras(antes_de):
+    """Apaga as amostras e os resumos anteriores a `antes_de`; retorna a quantidade de amostras."""
+    ResumoDesempenhoHora.objects.filter(hora__lt=inicio_da_hora(antes_de)).delete()
+    apagadas, _ = AmostraRequisicao.objects.filter(timestamp__lt=antes_de).delete()
+    return apagadas
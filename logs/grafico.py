@@ -0,0 +1,81 @@
+"""
+Dados do gráfico de atividade da página de logs.
+
+As contagens por (dia ou hora, ação) são feitas no banco com TruncDay /
+TruncHour + GROUP BY, então o tamanho da resposta depende só do número de
+intervalos, não do número de registros. Registros do arquivo morto no
+período entram na mesma contagem, pelas contagens por hora do índice de cada
+mês (logs/arquivo.py) quando não há filtros de texto.
+"""
+from collections import Counter
+from datetime import datetime, timedelta
+
+from django.db.models import Count
+from django.db.models.functions import Lower, TruncDay, TruncHour
+from django.utils import timezone
+
+ACOES_GRAFICO = ["criou", "atualizou", "deletou", "visualizou"]
+
+# Até este número de dias o gráfico é por hora
+LIMITE_DIAS_POR_HORA = 2
+
+
+def _intervalos(inicio, fim, por_hora):
+    """Todos os intervalos (datetime local truncado) entre inicio e fim."""
+    atual = timezone.localtime(inicio)
+    if por_hora:
+        atual = atual.replace(minute=0, second=0, microsecond=0)
+        passo = timedelta(hours=1)
+    else:
+        atual = atual.replace(hour=0, minute=0, second=0, microsecond=0)
+        passo = timedelta(days=1)
+    fim = timezone.localtime(fim)
+    intervalos = []
+    while atual <= fim:
+        intervalos.append(atual)
+        # Soma no horário "de parede" e normaliza, para atravessar mudanças de fuso
+        atual = timezone.localtime(timezone.make_aware(atual.replace(tzinfo=None) + passo))
+    return intervalos
+
+
+def dados_grafico(logs_qs, inicio, dias, arquivados=()):
+    """
+    Séries por ação para o Chart.js e os totais do período.
+
+    `logs_qs` é o queryset já filtrado; `arquivados` é o `Arquivados` do
+    arquivo morto com os mesmos filtros (ou vazio).
+    """
+    por_hora = dias <= LIMITE_DIAS_POR_HORA
+    truncar = TruncHour if por_hora else TruncDay
+
+    contagens = Counter()
+    linhas = (
+        logs_qs.order_by()
+        .annotate(intervalo=truncar("timestamp"), acao=Lower("action"))
+        .values("intervalo", "acao")
+        .annotate(total=Count("pk"))
+    )
+    for linha in linhas:
+        contagens[(timezone.localtime(linha["intervalo"]), linha["acao"])] += linha["total"]
+
+    if arquivados:
+        for (hora, acao), total in arquivados.por_hora().items():
+            local = timezone.make_aware(datetime.strptime(hora, "%Y-%m-%dT%H"))
+            if not por_hora:
+                local = local.replace(hour=0)
+            contagens[(local, acao)] += total
+
+    intervalos = _intervalos(inicio, timezone.now(), por_hora)
+    formato = "%d/%m %H:00" if por_hora else "%d/%m/%Y"
+    return {
+        "granularidade": "hora" if por_hora else "dia",
+        "labels": [intervalo.strftime(formato) for intervalo in intervalos],
+        "series": {
+            acao: [contagens[(intervalo, acao)] for intervalo in intervalos]
+            for acao in ACOES_GRAFICO
+        },
+        "totais": {
+            acao: sum(total for (_, a), total in contagens.items() if a == acao)
+            for acao in ACOES_GRAFICO
+        },
+    }
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from logs.arquivo import arquivar, diretorio_arquivo
+from logs.desempenho import config_desempenho, limpar_amostras
+
+
+class Command(BaseCommand):
+    help = (
+        'Move os registros de auditoria mais antigos que o período de retenção para '
+        'arquivos mensais compactados (JSONL + gzip) e os apaga da tabela em lotes.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dias', type=int, default=getattr(settings, 'AUDIT_LOG_RETENCAO_DIAS', 90),
+            help='Quantos dias de registros mantém na tabela (padrão: AUDIT_LOG_RETENCAO_DIAS).',
+        )
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Quantidade de registros arquivados e apagados por vez (padrão: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        if options['dias'] < 1:
+            raise CommandError('O período de retenção deve ser de pelo menos 1 dia.')
+
+        antes_de = timezone.now() - timedelta(days=options['dias'])
+        self.stdout.write(f"Arquivando registros anteriores a {timezone.localtime(antes_de):%d/%m/%Y %H:%M}...")
+        arquivados = arquivar(antes_de, lote=options['lote'])
+
+        for mes, quantidade in sorted(arquivados.items()):
+            self.stdout.write(f"  {mes:%m/%Y}: {quantidade} registro(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"{sum(arquivados.values())} registro(s) arquivado(s) em {diretorio_arquivo()}."
+        ))
+
+        # Amostras de desempenho não são arquivadas, só expiram
+        retencao = config_desempenho()['RETENCAO_DIAS']
+        apagadas = limpar_amostras(timezone.now() - timedelta(days=retencao))
+        self.stdout.write(f"{apagadas} amostra(s) de desempenho com mais de {retencao} dia(s) apagada(s).")
@@ -1,7 +1,18 @@
+import logging
+import random
+import time
+from contextlib import ExitStack
+
+from django.db import connections
+
 from .request_util import set_current_request
 from django.utils.deprecation import MiddlewareMixin
+from .buffer import registrar
+from .desempenho import IGNORED_PATHS, ColetorConsultas, config_desempenho, registrar_medicao
 from .models import AuditLog
 
+logger = logging.getLogger(__name__)
+
 
 def get_client_ip(request):
     x_forwarded_for = request.META.get("HTTP_X_FORWARDED_FOR")
@@ -21,7 +32,45 @@ class RequestMiddleware:
 
     def __call__(self, request):
         set_current_request(request)
-        response = self.get_response(request)
+        try:
+            return self.get_response(request)
+        finally:
+            # Comandos e tarefas que rodam depois na mesma thread não devem
+            # herdar o usuário desta requisição
+            set_current_request(None)
+
+
+class DesempenhoMiddleware:
+    """
+    Mede tempo total, consultas e tempo de SQL de cada requisição (ver
+    logs/desempenho.py). Deve ser o primeiro da lista para cobrir os demais
+    middlewares. Em respostas em streaming mede só até o início do envio.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        config = config_desempenho()
+        if (
+            not config["ATIVO"]
+            or request.path.startswith(IGNORED_PATHS)
+            or random.random() >= config["AMOSTRAGEM"]
+        ):
+            return self.get_response(request)
+
+        coletor = ColetorConsultas(config["CONSULTAS_LENTAS"], config["TAMANHO_SQL"])
+        inicio = time.perf_counter()
+        with ExitStack() as wrappers:
+            for conexao in connections.all():
+                wrappers.enter_context(conexao.execute_wrapper(coletor))
+            response = self.get_response(request)
+        duracao_ms = (time.perf_counter() - inicio) * 1000
+
+        try:
+            registrar_medicao(request, response, duracao_ms, coletor, config)
+        except Exception:
+            logger.exception("Falha ao registrar a medição de %s.", request.path)
         return response
 
 
@@ -78,7 +127,8 @@ class AuditMiddleware(MiddlewareMixin):
                     "method": request.method,
                 }
 
-            AuditLog.objects.create(
+            # Enfileirado: a gravação acontece em lote, fora da requisição
+            registrar(AuditLog(
                 user=user if user and user.is_authenticated else None,
                 username=username,
                 ip_address=ip,
@@ -90,7 +140,7 @@ class AuditMiddleware(MiddlewareMixin):
                 resource_name=resource_name,
                 detail=detail,
                 tags=f"http,{action}",
-            )
+            ))
         except Exception:
             pass  # Falha silenciosa em logs de visualização para não travar o app
 
@@ -0,0 +1,79 @@
+from django.db import migrations
+
+TABELA = "logs_auditlog_busca"
+
+# Valores (e chaves de objetos) do JSON de detalhes, separados por espaço
+DETALHE = """(
+    SELECT group_concat(
+        CASE WHEN typeof(key) = 'text' THEN key || ' ' ELSE '' END || coalesce(atom, ''),
+        ' '
+    )
+    FROM json_tree(CASE WHEN json_valid({linha}.detail) THEN {linha}.detail END)
+)"""
+
+INSERIR = f"""
+    INSERT INTO {TABELA} (rowid, resource_name, resource_id, username, tags, detail)
+    VALUES (
+        {{linha}}.id, {{linha}}.resource_name, {{linha}}.resource_id,
+        {{linha}}.username, {{linha}}.tags, {DETALHE}
+    );
+"""
+
+CRIAR = [
+    f"""
+    CREATE VIRTUAL TABLE {TABELA} USING fts5(
+        resource_name, resource_id, username, tags, detail,
+        tokenize = 'trigram'
+    )
+    """,
+    f"""
+    CREATE TRIGGER {TABELA}_ai AFTER INSERT ON logs_auditlog BEGIN
+        {INSERIR.format(linha="NEW")}
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABELA}_ad AFTER DELETE ON logs_auditlog BEGIN
+        DELETE FROM {TABELA} WHERE rowid = OLD.id;
+    END
+    """,
+    f"""
+    CREATE TRIGGER {TABELA}_au AFTER UPDATE ON logs_auditlog BEGIN
+        DELETE FROM {TABELA} WHERE rowid = OLD.id;
+        {INSERIR.format(linha="NEW")}
+    END
+    """,
+    f"""
+    INSERT INTO {TABELA} (rowid, resource_name, resource_id, username, tags, detail)
+    SELECT a.id, a.resource_name, a.resource_id, a.username, a.tags, {DETALHE.format(linha="a")}
+    FROM logs_auditlog a
+    """,
+]
+
+REMOVER = [
+    f"DROP TRIGGER IF EXISTS {TABELA}_ai",
+    f"DROP TRIGGER IF EXISTS {TABELA}_ad",
+    f"DROP TRIGGER IF EXISTS {TABELA}_au",
+    f"DROP TABLE IF EXISTS {TABELA}",
+]
+
+
+def _executar(comandos):
+    def executar(apps, schema_editor):
+        # FTS5 só existe no SQLite; nos outros bancos a busca usa icontains
+        if schema_editor.connection.vendor != "sqlite":
+            return
+        for sql in comandos:
+            schema_editor.execute(sql)
+
+    return executar
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("logs", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.RunPython(_executar(CRIAR), _executar(REMOVER)),
+    ]
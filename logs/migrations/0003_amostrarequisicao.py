@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:39
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0002_indice_busca'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AmostraRequisicao',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+                ('view', models.CharField(max_length=255)),
+                ('path', models.CharField(blank=True, max_length=1024)),
+                ('method', models.CharField(blank=True, max_length=10)),
+                ('status', models.PositiveSmallIntegerField(default=200)),
+                ('duracao_ms', models.FloatField()),
+                ('consultas', models.PositiveIntegerField(default=0)),
+                ('tempo_sql_ms', models.FloatField(default=0)),
+                ('consultas_lentas', models.JSONField(blank=True, default=list)),
+                ('acima_do_orcamento', models.BooleanField(default=False)),
+            ],
+            options={
+                'ordering': ['-timestamp'],
+                'indexes': [models.Index(fields=['timestamp'], name='logs_amostr_timesta_8bd391_idx'), models.Index(fields=['view', 'timestamp'], name='logs_amostr_view_5baad1_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-18 02:37
+
+from django.db import migrations, models
+
+
+def consolidar_amostras(apps, schema_editor):
+    """Soma as amostras já gravadas aos resumos por hora, em lotes."""
+    from itertools import islice
+
+    from logs.desempenho import somar_amostras
+
+    AmostraRequisicao = apps.get_model("logs", "AmostraRequisicao")
+    ResumoDesempenhoHora = apps.get_model("logs", "ResumoDesempenhoHora")
+    amostras = AmostraRequisicao.objects.order_by("pk").iterator(chunk_size=5000)
+    while lote := list(islice(amostras, 5000)):
+        somar_amostras(ResumoDesempenhoHora, lote)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('logs', '0003_amostrarequisicao'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumoDesempenhoHora',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('view', models.CharField(max_length=255)),
+                ('hora', models.DateTimeField(help_text='Início da hora (UTC).')),
+                ('amostras', models.PositiveIntegerField(default=0)),
+                ('soma_sql_ms', models.FloatField(default=0)),
+                ('violacoes', models.PositiveIntegerField(default=0)),
+                ('max_consultas', models.PositiveIntegerField(default=0)),
+                ('histograma_ms', models.JSONField(default=dict)),
+                ('histograma_consultas', models.JSONField(default=dict)),
+                ('pior_ms', models.FloatField(default=0)),
+                ('pior_consultas_lentas', models.JSONField(blank=True, default=list)),
+            ],
+            options={
+                'ordering': ['-hora'],
+                'indexes': [models.Index(fields=['hora'], name='logs_resumo_hora_9e505e_idx')],
+                'unique_together': {('view', 'hora')},
+            },
+        ),
+        migrations.RunPython(consolidar_amostras, migrations.RunPython.noop),
+    ]
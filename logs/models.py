@@ -33,3 +33,56 @@ class AuditLog(models.Model):
 
     def __str__(self):
         return f"[{self.timestamp}] {self.action} {self.resource_type}#{self.resource_id} by {self.username or 'anon'}"
+
+
+class AmostraRequisicao(models.Model):
+    """Tempo e consultas de uma requisição, medidos pelo DesempenhoMiddleware."""
+
+    timestamp = models.DateTimeField(default=timezone.now)
+    view = models.CharField(max_length=255)
+    path = models.CharField(max_length=1024, blank=True)
+    method = models.CharField(max_length=10, blank=True)
+    status = models.PositiveSmallIntegerField(default=200)
+    duracao_ms = models.FloatField()
+    consultas = models.PositiveIntegerField(default=0)
+    tempo_sql_ms = models.FloatField(default=0)
+    consultas_lentas = models.JSONField(default=list, blank=True)
+    acima_do_orcamento = models.BooleanField(default=False)
+
+    class Meta:
+        ordering = ["-timestamp"]
+        indexes = [
+            models.Index(fields=["timestamp"]),
+            models.Index(fields=["view", "timestamp"]),
+        ]
+
+    def __str__(self):
+        return f"[{self.timestamp}] {self.view} {self.duracao_ms:.0f} ms / {self.consultas} consultas"
+
+
+class ResumoDesempenhoHora(models.Model):
+    """
+    Amostras de uma view em uma hora, somadas pelo buffer a cada lote gravado
+    (logs/desempenho.py). Os histogramas ({balde: quantidade}) permitem
+    calcular os percentis sem ler as amostras.
+    """
+
+    view = models.CharField(max_length=255)
+    hora = models.DateTimeField(help_text="Início da hora (UTC).")
+    amostras = models.PositiveIntegerField(default=0)
+    soma_sql_ms = models.FloatField(default=0)
+    violacoes = models.PositiveIntegerField(default=0)
+    max_consultas = models.PositiveIntegerField(default=0)
+    histograma_ms = models.JSONField(default=dict)
+    histograma_consultas = models.JSONField(default=dict)
+    # Amostra mais lenta da hora: as amostras expiram antes do resumo
+    pior_ms = models.FloatField(default=0)
+    pior_consultas_lentas = models.JSONField(default=list, blank=True)
+
+    class Meta:
+        ordering = ["-hora"]
+        unique_together = ("view", "hora")
+        indexes = [models.Index(fields=["hora"])]
+
+    def __str__(self):
+        return f"{self.view} {self.hora:%d/%m/%Y %H}h: {self.amostras} amostra(s)"
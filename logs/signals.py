@@ -1,8 +1,11 @@
-from django.db.models.signals import pre_save, post_save, post_delete
+import copy
+
+from django.conf import settings
+from django.db import models
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
-from django.forms.models import model_to_dict
 from .models import AuditLog
-from .request_util import get_current_request, set_model_snapshot, get_model_snapshot
+from .request_util import get_current_request
 
 # Apps que NÃO devem gerar logs
 IGNORED_APPS = [
@@ -15,24 +18,98 @@ IGNORED_APPS = [
     "auditlog",
 ]
 
-
-def safe_model_to_dict(instance):
-    """Serializa a instância de forma segura."""
+# Tabelas derivadas que a própria aplicação apaga e regrava ao recalcular:
+# não são ações de usuários e auditá-las gravaria um log por linha
+IGNORED_MODELS = {
+    "scheduler.EstatisticaAlunoMes",
+    "scheduler.OcupacaoHorario",
+    "finances.ResumoFinanceiroMes",
+    # Fila de PDFs: as mudanças de status são do worker (processar_pdfs)
+    "core.TarefaPDF",
+}
+
+# Campos já carregados usados como nome do recurso, no lugar do __str__ (que
+# em vários models consulta relacionados, ex.: Aula lista os alunos)
+CAMPOS_NOME = ("nome_completo", "nome", "name", "username", "descricao", "titulo")
+
+
+def _ignorado(sender):
+    return sender._meta.app_label in IGNORED_APPS or sender._meta.label in IGNORED_MODELS
+
+# Cache dos campos auditados por model (a lista não muda em tempo de execução)
+_CAMPOS_POR_MODEL = {}
+
+
+def _campos_auditados(model):
+    """Campos editáveis do model (os mesmos do antigo model_to_dict), sem M2M."""
+    campos = _CAMPOS_POR_MODEL.get(model)
+    if campos is None:
+        campos = _CAMPOS_POR_MODEL[model] = [
+            field for field in model._meta.concrete_fields if field.editable
+        ]
+    return campos
+
+
+def _valor_do_campo(instance, field, valor):
+    """Valor serializável; FKs ficam como id, a não ser que se peça a exibição."""
+    if isinstance(field, models.FileField):
+        return getattr(valor, "name", valor) or ""
+    if field.many_to_one and valor is not None and exibir_relacionados():
+        relacionado = field.related_model._base_manager.filter(pk=valor).first()
+        return str(relacionado) if relacionado else valor
+    return valor
+
+
+def _m2m_carregados(instance):
+    """M2M já pré-carregados (prefetch_related) como listas de ids, sem consultar o banco."""
+    cache = getattr(instance, "_prefetched_objects_cache", {})
+    data = {}
+    for field in instance._meta.many_to_many:
+        if field.name in cache:
+            objetos = cache[field.name]
+            data[field.name] = (
+                [str(obj) for obj in objetos] if exibir_relacionados() else [obj.pk for obj in objetos]
+            )
+    return data
+
+
+def exibir_relacionados():
+    return getattr(settings, "AUDIT_LOG_EXIBIR_RELACIONADOS", False)
+
+
+def nome_do_recurso(instance):
+    """Nome exibido no log sem consultas: __str__ só com AUDIT_LOG_EXIBIR_RELACIONADOS."""
+    if exibir_relacionados():
+        return str(instance)[:255]
+    for campo in CAMPOS_NOME:
+        valor = instance.__dict__.get(campo)
+        if valor:
+            return str(valor)[:255]
+    return f"{instance._meta.verbose_name.title()} #{instance.pk}"
+
+
+def valores_atuais(instance):
+    """Valores crus (attname -> valor) dos campos carregados; campos adiados ficam de fora."""
+    carregados = instance.__dict__
+    valores = {}
+    for field in _campos_auditados(type(instance)):
+        if field.attname in carregados:
+            valor = carregados[field.attname]
+            # JSONField pode ser alterado no lugar; a cópia preserva o original
+            valores[field.attname] = copy.deepcopy(valor) if isinstance(valor, (dict, list)) else valor
+    return valores
+
+
+def safe_model_to_dict(instance, valores=None):
+    """Serializa a instância sem consultas extras (FK e M2M como ids)."""
     try:
-        data = model_to_dict(instance)
-        # Tenta enriquecer com representação de FKs e M2M
-        if hasattr(instance, "_meta"):
-            for field in instance._meta.many_to_many:
-                if field.name in data:
-                    related_manager = getattr(instance, field.name, None)
-                    if related_manager:
-                        data[field.name] = [str(obj) for obj in related_manager.all()]
-
-            for field in instance._meta.fields:
-                if field.many_to_one and field.name in data:
-                    val = getattr(instance, field.name, None)
-                    if val:
-                        data[field.name] = str(val)
+        valores = valores_atuais(instance) if valores is None else valores
+        data = {
+            field.name: _valor_do_campo(instance, field, valores[field.attname])
+            for field in _campos_auditados(type(instance))
+            if field.attname in valores
+        }
+        data.update(_m2m_carregados(instance))
         return data
     except Exception:
         return {}
@@ -44,7 +121,7 @@ def log_instance_action(instance, action, detail=None):
 
     resource_type = instance._meta.model_name.title()
     resource_id = str(instance.pk)
-    resource_name = str(instance)
+    resource_name = nome_do_recurso(instance)
 
     username = "Sistema"
     ip = ""
@@ -84,45 +161,48 @@ def log_instance_action(instance, action, detail=None):
 # --- RECEPTORES GLOBAIS ---
 
 
-@receiver(pre_save)
-def global_pre_save(sender, instance, **kwargs):
-    if sender._meta.app_label in IGNORED_APPS:
+@receiver(post_init)
+def global_post_init(sender, instance, **kwargs):
+    # Guarda os valores carregados do banco para o diff do post_save, no
+    # lugar de um SELECT extra antes de cada UPDATE
+    if _ignorado(sender):
         return
-
-    if instance.pk:
-        try:
-            old_instance = sender.objects.get(pk=instance.pk)
-            old_data = safe_model_to_dict(old_instance)
-            set_model_snapshot((sender, instance.pk), old_data)
-        except sender.DoesNotExist:
-            pass
-        except Exception:
-            pass
+    if instance.pk is not None:
+        instance._valores_originais = valores_atuais(instance)
 
 
 @receiver(post_save)
 def global_post_save(sender, instance, created, **kwargs):
-    if sender._meta.app_label in IGNORED_APPS:
+    if _ignorado(sender):
         return
 
     try:
+        novos = valores_atuais(instance)
         if created:
-            log_instance_action(instance, "Criou", detail=safe_model_to_dict(instance))
+            log_instance_action(instance, "Criou", detail=safe_model_to_dict(instance, novos))
         else:
-            old_data = get_model_snapshot((sender, instance.pk))
-            new_data = safe_model_to_dict(instance)
-
-            changes = {}
-            if old_data:
-                for field, old_val in old_data.items():
-                    new_val = new_data.get(field)
+            originais = getattr(instance, "_valores_originais", None)
+            if originais:
+                changes = {}
+                for field in _campos_auditados(sender):
+                    if field.attname not in originais or field.attname not in novos:
+                        continue
+                    old_val = originais[field.attname]
+                    new_val = novos[field.attname]
                     if str(old_val) != str(new_val):
-                        changes[field] = {"old": old_val, "new": new_val}
-
-            if changes:
-                log_instance_action(instance, "Atualizou", detail=changes)
-            elif not old_data:
-                log_instance_action(instance, "Atualizou (Sem Diff)", detail=new_data)
+                        changes[field.name] = {
+                            "old": _valor_do_campo(instance, field, old_val),
+                            "new": _valor_do_campo(instance, field, new_val),
+                        }
+                if changes:
+                    log_instance_action(instance, "Atualizou", detail=changes)
+            else:
+                log_instance_action(
+                    instance, "Atualizou (Sem Diff)", detail=safe_model_to_dict(instance, novos)
+                )
+
+        # Próximos saves da mesma instância comparam com o que acabou de ser gravado
+        instance._valores_originais = novos
 
     except Exception as e:
         print(f"Erro no post_save log: {e}")
@@ -130,7 +210,7 @@ def global_post_save(sender, instance, created, **kwargs):
 
 @receiver(post_delete)
 def global_post_delete(sender, instance, **kwargs):
-    if sender._meta.app_label in IGNORED_APPS:
+    if _ignorado(sender):
         return
 
     try:
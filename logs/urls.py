@@ -9,4 +9,8 @@ urlpatterns = [
     path("", views.logs_page, name="logs_page"),
     # Endpoint da API que retorna logs em JSON
     path("api/", views.logs_api, name="logs_api"),
+    # Contagens agregadas para o gráfico de atividade
+    path("api/grafico/", views.logs_grafico_api, name="logs_grafico_api"),
+    # Tempo e consultas por view (DesempenhoMiddleware)
+    path("desempenho/", views.desempenho_page, name="desempenho"),
 ]
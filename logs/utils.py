@@ -3,7 +3,8 @@ from django.forms.models import model_to_dict
 
 
 def log_action(
-    request=None, instance=None, action="custom", detail_fields=None, tags=None
+    request=None, instance=None, action="custom", detail_fields=None, tags=None,
+    detail=None,
 ):
     """
     Cria um registro de AuditLog para qualquer modelo ou ação.
@@ -14,13 +15,14 @@ def log_action(
     - action: string, ex: "Criou", "Atualizou", "Deletou"
     - detail_fields: lista de campos do modelo que devem entrar no detail dict
     - tags: string ou lista de tags
+    - detail: dict adicional mesclado ao detail (ex: resumo de uma operação em lote)
     """
     resource_type = instance._meta.model_name.title() if instance else "http"
     resource_id = str(instance.pk) if instance else ""
     resource_name = str(instance) if instance else ""
 
     # Montar o dict de detalhes
-    detail = {}
+    detail = dict(detail or {})
     if instance and detail_fields:
         model_dict = model_to_dict(instance)
         for f in detail_fields:
@@ -1,19 +1,54 @@
-import json
 from datetime import timedelta
 
-from django.contrib.auth.decorators import login_required
+from django.contrib.auth.decorators import login_required, user_passes_test
 from django.core.paginator import Paginator
-from django.core.serializers.json import DjangoJSONEncoder
 from django.http import JsonResponse
 from django.shortcuts import render
 from django.utils import timezone
-from django.db.models import (
-    Q,
-)  # <--- IMPORTANTE: Importação necessária para a busca avançada
 
+from .arquivo import Arquivados, RegistrosComArquivo, meses_arquivados, mes_do_registro
+from .busca import filtrar_contem
+from .desempenho import relatorio
+from .grafico import dados_grafico
 from .models import AuditLog
 
 
+def _logs_filtrados(request):
+    """Filtros comuns à página, à API e ao gráfico: (days, início, filtros, queryset)."""
+    days = int(request.GET.get("days", 30))
+    filters = {
+        "username": request.GET.get("username", ""),
+        "resource": request.GET.get("resource", ""),
+        "tags": request.GET.get("tags", ""),
+    }
+    start_date = timezone.now() - timedelta(days=days)
+
+    logs_qs = AuditLog.objects.filter(timestamp__gte=start_date).order_by("-timestamp")
+
+    if filters["username"]:
+        logs_qs = filtrar_contem(logs_qs, ["username"], filters["username"])
+
+    # Busca profunda: nome e id do recurso e valores do JSON de detalhes,
+    # pelo índice de texto (busca.py)
+    if filters["resource"]:
+        logs_qs = filtrar_contem(
+            logs_qs, ["resource_name", "resource_id", "detail"], filters["resource"]
+        )
+
+    if filters["tags"]:
+        logs_qs = filtrar_contem(logs_qs, ["tags"], filters["tags"])
+
+    return days, start_date, filters, logs_qs
+
+
+def _arquivados_no_periodo(start_date, username, resource, tags):
+    """Registros do arquivo morto no período (lidos sob demanda); lista vazia se o filtro não chega lá."""
+    meses = meses_arquivados()
+    if not meses or meses[0] < mes_do_registro(start_date):
+        return []
+    return Arquivados(start_date, username=username, resource=resource, tags=tags)
+
+
 @login_required
 def logs_page(request):
     """Página de logs com filtros avançados e paginação."""
@@ -24,39 +59,15 @@ def logs_page(request):
         {"action": "visualizou", "label": "Visualizou", "color": "primary"},
     ]
 
-    days = int(request.GET.get("days", 30))
-    username_filter = request.GET.get("username", "")
-    resource_filter = request.GET.get("resource", "")
-    tags_filter = request.GET.get("tags", "")
+    days, start_date, filters, logs_qs = _logs_filtrados(request)
     page = int(request.GET.get("page", 1))
 
-    start_date = timezone.now() - timedelta(days=days)
-
-    logs_qs = AuditLog.objects.filter(timestamp__gte=start_date).order_by("-timestamp")
-
-    if username_filter:
-        logs_qs = logs_qs.filter(username__icontains=username_filter)
-
-    # --- ALTERAÇÃO AQUI: Busca Profunda (Deep Search) ---
-    if resource_filter:
-        logs_qs = logs_qs.filter(
-            Q(resource_name__icontains=resource_filter)
-            | Q(detail__icontains=resource_filter)  # Procura dentro do JSON
-            | Q(resource_id__icontains=resource_filter)
-        )
-
-    if tags_filter:
-        logs_qs = logs_qs.filter(tags__icontains=tags_filter)
-
-    # Preparar dados para o gráfico (KPIs globais do filtro)
-    logs_for_chart = list(logs_qs.values("action", "timestamp"))
-    for log_chart in logs_for_chart:
-        log_chart["action"] = log_chart["action"].lower()
-
-    logs_json_for_chart = json.dumps(logs_for_chart, cls=DjangoJSONEncoder)
+    # Meses já movidos para o arquivo morto entram depois dos da tabela.
+    # O gráfico é carregado à parte, já agregado (logs_grafico_api).
+    arquivados = _arquivados_no_periodo(start_date, **filters)
 
     # Paginação
-    paginator = Paginator(logs_qs, 100)
+    paginator = Paginator(RegistrosComArquivo(logs_qs, arquivados) if arquivados else logs_qs, 100)
     page_obj = paginator.get_page(page)
     start_index = page_obj.start_index()
 
@@ -65,13 +76,8 @@ def logs_page(request):
         "logs": page_obj,
         "page_obj": page_obj,
         "start_index": start_index,
-        "filters": {
-            "days": days,
-            "username": username_filter,
-            "resource": resource_filter,
-            "tags": tags_filter,
-        },
-        "logs_json": logs_json_for_chart,
+        "filters": {"days": days, **filters},
+        "meses_fora_da_busca": getattr(arquivados, "meses_fora_da_busca", []),
     }
     return render(request, "logs/logs_page.html", context)
 
@@ -79,32 +85,12 @@ def logs_page(request):
 @login_required
 def logs_api(request):
     """API de logs com suporte a filtros e paginação."""
-    days = int(request.GET.get("days", 30))
-    start_date = timezone.now() - timedelta(days=days)
-
-    username_filter = request.GET.get("username", "")
-    resource_filter = request.GET.get("resource", "")
-    tags_filter = request.GET.get("tags", "")
+    days, start_date, filters, logs_qs = _logs_filtrados(request)
     page = int(request.GET.get("page", 1))
     per_page = 100
 
-    logs_qs = AuditLog.objects.filter(timestamp__gte=start_date).order_by("-timestamp")
-
-    if username_filter:
-        logs_qs = logs_qs.filter(username__icontains=username_filter)
-
-    # Aplica a mesma lógica de busca profunda na API também
-    if resource_filter:
-        logs_qs = logs_qs.filter(
-            Q(resource_name__icontains=resource_filter)
-            | Q(detail__icontains=resource_filter)
-            | Q(resource_id__icontains=resource_filter)
-        )
-
-    if tags_filter:
-        logs_qs = logs_qs.filter(tags__icontains=tags_filter)
-
-    paginator = Paginator(logs_qs, per_page)
+    arquivados = _arquivados_no_periodo(start_date, **filters)
+    paginator = Paginator(RegistrosComArquivo(logs_qs, arquivados) if arquivados else logs_qs, per_page)
     page_obj = paginator.get_page(page)
 
     logs = []
@@ -146,5 +132,28 @@ def logs_api(request):
             "page": page_obj.number,
             "num_pages": paginator.num_pages,
             "total": paginator.count,
+            "arquivo_limitado": bool(getattr(arquivados, "meses_fora_da_busca", [])),
         }
     )
+
+
+@login_required
+def logs_grafico_api(request):
+    """Contagens por dia (ou hora) e ação para o gráfico da página de logs."""
+    days, start_date, filters, logs_qs = _logs_filtrados(request)
+    arquivados = _arquivados_no_periodo(start_date, **filters)
+    return JsonResponse(dados_grafico(logs_qs, start_date, days, arquivados))
+
+
+@login_required
+@user_passes_test(lambda u: u.tipo == "admin")
+def desempenho_page(request):
+    """Views com pior p95 de tempo (ou de consultas) na janela escolhida."""
+    horas = int(request.GET.get("horas", 24))
+    ordem = "consultas" if request.GET.get("ordem") == "consultas" else "duracao"
+    context = {
+        "linhas": relatorio(timezone.now() - timedelta(hours=horas), ordem=ordem),
+        "horas": horas,
+        "ordem": ordem,
+    }
+    return render(request, "logs/desempenho.html", context)
@@ -13,6 +13,9 @@ from .models import (
     PresencaAluno,
     TourVisto
 )
+from .calendario import invalidar_calendario
+from .estatisticas import atualizar_estatisticas_aulas
+from .ocupacao import atualizar_ocupacao_aulas
 
 
 class AnoAlunoFilter(admin.SimpleListFilter):
@@ -294,7 +297,13 @@ class AulaAdmin(admin.ModelAdmin):
 
     @admin.action(description='Marcar aulas selecionadas como "Cancelada"')
     def marcar_como_cancelada(self, request, queryset):
+        aulas = list(queryset)
         updated = queryset.update(status="Cancelada")
+        # update() não dispara signals; invalida o calendário e recalcula as
+        # estatísticas e a grade de horários dos alunos manualmente
+        invalidar_calendario()
+        atualizar_estatisticas_aulas(aulas)
+        atualizar_ocupacao_aulas(aulas)
         self.message_user(request, f"{updated} aulas foram marcadas como canceladas.")
 
     # 7. MÉTODOS PARA MELHORAR A EXIBIÇÃO E PERFORMANCE
@@ -0,0 +1,153 @@
+"""
+Cache do calendário mensal exibido no dashboard.
+
+O HTML de `partials/calendario_content.html` é guardado por
+(ano, mês, filtro de professor, escopo do usuário). Cada mês possui uma
+"versão" própria no cache: os signals de `scheduler.signals` trocam a versão
+apenas dos meses afetados quando uma aula é salva, excluída ou tem seus
+alunos/professores alterados, o que invalida somente as entradas daquele mês.
+
+As versões não expiram e valem para todos os processos só porque o cache
+configurado em `settings.CACHES` é compartilhado (ver core/checks.py).
+"""
+import calendar
+import time
+from collections import defaultdict
+from datetime import date
+
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.utils import timezone
+from django.utils.safestring import mark_safe
+from django.utils.timezone import localtime
+
+from .models import Aula
+
+CALENDARIO_CACHE_TIMEOUT = 60 * 60 * 24
+VERSAO_GLOBAL_KEY = "calendario:versao"
+
+
+def _mes_key(year, month):
+    return f"calendario:versao:{year}-{month:02d}"
+
+
+def _nova_versao():
+    return time.time_ns()
+
+
+def mes_da_data(data_hora):
+    """Retorna (ano, mês) da data no fuso local, igual ao filtro `data_hora__month`."""
+    if data_hora is None:
+        return None
+    if timezone.is_aware(data_hora):
+        data_hora = localtime(data_hora)
+    return data_hora.year, data_hora.month
+
+
+def invalidar_mes(year, month):
+    cache.set(_mes_key(year, month), _nova_versao(), None)
+
+
+def invalidar_datas(*datas_hora):
+    """Invalida os meses (sem repetição) das datas informadas."""
+    for mes in {mes_da_data(d) for d in datas_hora if d is not None}:
+        invalidar_mes(*mes)
+
+
+def invalidar_calendario():
+    """Invalida todos os meses de uma vez (ex: renomear aluno ou modalidade)."""
+    cache.set(VERSAO_GLOBAL_KEY, _nova_versao(), None)
+
+
+def versoes_periodo(inicio, fim):
+    """
+    Versões (global + cada mês) que cobrem o intervalo de datas [inicio, fim].
+    Servem como carimbo barato de "algo mudou" sem consultar o banco.
+    """
+    chaves = [VERSAO_GLOBAL_KEY]
+    ano, mes = inicio.year, inicio.month
+    while (ano, mes) <= (fim.year, fim.month):
+        chaves.append(_mes_key(ano, mes))
+        ano, mes = (ano + 1, 1) if mes == 12 else (ano, mes + 1)
+
+    versoes = cache.get_many(chaves)
+    faltantes = {key: _nova_versao() for key in chaves if key not in versoes}
+    if faltantes:
+        cache.set_many(faltantes, None)
+        versoes.update(faltantes)
+    return [versoes[key] for key in chaves]
+
+
+def escopo_usuario(user):
+    """
+    Admins compartilham o mesmo HTML. Professores veem só as próprias aulas e o
+    template do perfil comercial depende de o usuário estar na aula, então
+    ambos têm cache individual.
+    """
+    if user.tipo == "admin":
+        return "admin"
+    return f"{user.tipo}:{user.pk}"
+
+
+def montar_calendario(aulas_do_mes, year, month):
+    """Distribui as aulas nas semanas do mês (domingo como primeiro dia)."""
+    aulas_por_dia = defaultdict(list)
+    for aula in aulas_do_mes:
+        aulas_por_dia[localtime(aula.data_hora).day].append(aula)
+
+    cal = calendar.Calendar(firstweekday=6)
+    calendario_final = []
+    for semana in cal.monthdayscalendar(year, month):
+        calendario_final.append(
+            [{"dia": dia, "aulas": aulas_por_dia.get(dia, [])} for dia in semana]
+        )
+    return calendario_final
+
+
+def aulas_do_mes_queryset(user, year, month, professor_filtro_id=None):
+    if user.tipo in ["admin", "comercial"]:
+        aulas_qs = Aula.objects.all()
+        if professor_filtro_id:
+            aulas_qs = aulas_qs.filter(professores__id=professor_filtro_id).distinct()
+    else:
+        aulas_qs = Aula.objects.filter(professores=user).distinct()
+
+    return (
+        aulas_qs.filter(data_hora__year=year, data_hora__month=month)
+        .select_related("modalidade")
+        .prefetch_related("alunos", "professores")
+        .order_by("data_hora")
+    )
+
+
+def renderizar_calendario(user, year, month, professor_filtro_id=None, today=None):
+    """
+    Retorna o HTML do calendário do mês, servindo do cache quando possível.
+    Em caso de acerto no cache nenhuma consulta ao banco é feita.
+    """
+    today = today or timezone.localdate()
+    if user.tipo not in ["admin", "comercial"]:
+        professor_filtro_id = None
+    elif professor_filtro_id and not str(professor_filtro_id).isdigit():
+        professor_filtro_id = None
+
+    versao_global, versao_mes = versoes_periodo(date(year, month, 1), date(year, month, 1))
+    cache_key = (
+        f"calendario:html:{versao_global}:{versao_mes}:{year}-{month:02d}:"
+        f"{professor_filtro_id or 'todos'}:{escopo_usuario(user)}:{today.isoformat()}"
+    )
+    html = cache.get(cache_key)
+    if html is not None:
+        return mark_safe(html)
+
+    aulas_do_mes = list(aulas_do_mes_queryset(user, year, month, professor_filtro_id))
+    contexto = {
+        "user": user,
+        "calendario_mes": montar_calendario(aulas_do_mes, year, month),
+        "aulas_do_mes_lista": aulas_do_mes,
+        "mes_atual": date(year, month, 1),
+        "today": today,
+    }
+    html = render_to_string("scheduler/partials/calendario_content.html", contexto)
+    cache.set(cache_key, str(html), CALENDARIO_CACHE_TIMEOUT)
+    return mark_safe(html)
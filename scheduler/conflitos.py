@@ -0,0 +1,157 @@
+"""
+Motor de detecção de conflitos de horário.
+
+Verifica uma lista inteira de horários candidatos (ex: todas as datas de uma
+recorrência) para um conjunto de professores e alunos com uma consulta por
+tipo de participante, considerando a duração das aulas para detectar
+sobreposições e não apenas horários idênticos.
+"""
+from datetime import timedelta
+
+from .models import Aula, DURACAO_MAXIMA_AULA_MINUTOS
+
+DURACAO_PADRAO_MINUTOS = 60
+
+# Aulas canceladas ou já repostas não bloqueiam o horário do aluno
+STATUS_DE_CONFLITO_ALUNO = ["Agendada", "Realizada", "Aluno Ausente"]
+
+SEM_CONFLITO_PROFESSOR = {"conflito": False, "mensagem": "Horário disponível."}
+SEM_CONFLITO_ALUNO = {"conflito": False}
+
+
+def _sobrepoe(inicio, fim, outro_inicio, outro_fim):
+    return outro_inicio < fim and inicio < outro_fim
+
+
+def _ocupacoes(through, campo, ids, inicio, fim, aula_id=None, status=None):
+    """
+    Lista (aula_id, participante_id, nome, data_hora, duração) das aulas dos
+    participantes que começam dentro da janela [inicio, fim).
+    """
+    ocupacoes = through.objects.filter(
+        **{f"{campo}_id__in": ids},
+        aula__data_hora__gte=inicio,
+        aula__data_hora__lt=fim,
+    )
+    if status:
+        ocupacoes = ocupacoes.filter(aula__status__in=status)
+    if aula_id:
+        ocupacoes = ocupacoes.exclude(aula_id=aula_id)
+
+    nome = "aluno__nome_completo" if campo == "aluno" else f"{campo}__username"
+    return list(
+        ocupacoes.values_list(
+            "aula_id",
+            f"{campo}_id",
+            nome,
+            "aula__data_hora",
+            "aula__modalidade__duracao_minutos",
+        ).order_by("aula__data_hora")
+    )
+
+
+def _primeiro_conflito(ocupacoes, inicio, fim):
+    for ocupacao in ocupacoes:
+        outro_inicio = ocupacao[3]
+        outro_fim = outro_inicio + timedelta(minutes=ocupacao[4] or DURACAO_PADRAO_MINUTOS)
+        if _sobrepoe(inicio, fim, outro_inicio, outro_fim):
+            return ocupacao
+    return None
+
+
+def verificar_conflitos(
+    datas_hora, professor_ids=None, aluno_ids=None, duracao_minutos=None, aula_id=None
+):
+    """
+    Retorna, na mesma ordem de `datas_hora`, um diagnóstico por data:
+
+        {"data_hora": dt,
+         "professor": {"conflito": bool, "mensagem": str},
+         "aluno": {"conflito": bool, "aluno_nome": ..., "aula_conflitante_pk": ...,
+                   "aula_conflitante_nome": ..., "professores_conflito": ...}}
+
+    `aula_id` exclui a própria aula da verificação (edição).
+    """
+    datas_hora = list(datas_hora)
+    professor_ids = list(professor_ids or [])
+    aluno_ids = list(aluno_ids or [])
+    duracao = timedelta(minutes=duracao_minutos or DURACAO_PADRAO_MINUTOS)
+
+    diagnosticos = [
+        {
+            "data_hora": data_hora,
+            "professor": dict(SEM_CONFLITO_PROFESSOR),
+            "aluno": dict(SEM_CONFLITO_ALUNO),
+        }
+        for data_hora in datas_hora
+    ]
+    if not datas_hora or not (professor_ids or aluno_ids):
+        return diagnosticos
+
+    # Qualquer aula que comece antes de (início - duração máxima) já terminou.
+    janela_inicio = min(datas_hora) - timedelta(minutes=DURACAO_MAXIMA_AULA_MINUTOS)
+    janela_fim = max(datas_hora) + duracao
+
+    ocupacoes_professores = []
+    if professor_ids:
+        ocupacoes_professores = _ocupacoes(
+            Aula.professores.through, "customuser", professor_ids,
+            janela_inicio, janela_fim, aula_id,
+        )
+
+    ocupacoes_alunos = []
+    if aluno_ids:
+        ocupacoes_alunos = _ocupacoes(
+            Aula.alunos.through, "aluno", aluno_ids,
+            janela_inicio, janela_fim, aula_id, status=STATUS_DE_CONFLITO_ALUNO,
+        )
+
+    conflitos_alunos = {}
+    for diagnostico in diagnosticos:
+        inicio = diagnostico["data_hora"]
+        fim = inicio + duracao
+
+        ocupacao = _primeiro_conflito(ocupacoes_professores, inicio, fim)
+        if ocupacao:
+            diagnostico["professor"] = {
+                "conflito": True,
+                "mensagem": "Conflito de horário detectado.",
+                "aula_conflitante_pk": ocupacao[0],
+                "professor_nome": ocupacao[2],
+            }
+
+        ocupacao = _primeiro_conflito(ocupacoes_alunos, inicio, fim)
+        if ocupacao:
+            diagnostico["aluno"] = {
+                "conflito": True,
+                "aluno_nome": ocupacao[2],
+                "aula_conflitante_pk": ocupacao[0],
+            }
+            conflitos_alunos[ocupacao[0]] = None
+
+    if conflitos_alunos:
+        # Detalhes para a mensagem só são buscados quando há conflito
+        aulas = (
+            Aula.objects.filter(pk__in=conflitos_alunos)
+            .select_related("modalidade")
+            .prefetch_related("alunos", "professores")
+        )
+        for aula in aulas:
+            prof_nomes = [p.username.title() for p in aula.professores.all()]
+            conflitos_alunos[aula.pk] = {
+                "aula_conflitante_nome": str(aula),
+                "professores_conflito": ", ".join(prof_nomes) if prof_nomes else "N/A",
+            }
+        for diagnostico in diagnosticos:
+            if diagnostico["aluno"]["conflito"]:
+                detalhes = conflitos_alunos.get(diagnostico["aluno"]["aula_conflitante_pk"])
+                diagnostico["aluno"].update(detalhes or {})
+
+    return diagnosticos
+
+
+def verificar_conflito(data_hora, professor_ids=None, aluno_ids=None, duracao_minutos=None, aula_id=None):
+    """Atalho para verificar um único horário."""
+    return verificar_conflitos(
+        [data_hora], professor_ids, aluno_ids, duracao_minutos, aula_id
+    )[0]
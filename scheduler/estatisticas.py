@@ -0,0 +1,208 @@
+"""
+Estatísticas materializadas por aluno e mês (`EstatisticaAlunoMes`).
+
+Cada linha guarda os totais de um aluno em um mês: aulas, realizadas (com
+presença), ausências, canceladas, agendadas e a contagem de aulas com
+presença por professor e por modalidade. Os signals de `scheduler.signals`
+recalculam apenas os pares (aluno, mês) afetados quando uma aula, seus
+participantes ou as presenças mudam; o comando `recalcular_estatisticas_alunos`
+reconstrói a tabela inteira.
+
+As regras são as mesmas que o perfil do aluno sempre usou:
+
+- realizada: aula "Realizada"/"Aluno Ausente" com presença "presente";
+- ausência: aula "Realizada"/"Aluno Ausente" com presença "ausente";
+- top professores/modalidades: aulas com presença "presente" (qualquer status).
+"""
+from collections import Counter, defaultdict
+from datetime import date, datetime, time
+
+from django.db import transaction
+from django.db.models import OuterRef, Q, Subquery
+from django.utils import timezone
+from django.utils.timezone import localtime
+
+from .models import Aluno, Aula, CustomUser, EstatisticaAlunoMes, Modalidade, PresencaAluno
+
+STATUS_COM_PRESENCA = ["Realizada", "Aluno Ausente"]
+
+CAMPOS_CONTADORES = ["total_aulas", "realizadas", "ausencias", "canceladas", "agendadas"]
+
+
+def mes_de_referencia(data_hora):
+    """Primeiro dia do mês (no fuso local) de uma data/hora de aula."""
+    if data_hora is None:
+        return None
+    if timezone.is_aware(data_hora):
+        data_hora = localtime(data_hora)
+    return date(data_hora.year, data_hora.month, 1)
+
+
+def _inicio_do_mes(mes):
+    return timezone.make_aware(datetime.combine(mes, time.min))
+
+
+def _mes_seguinte(mes):
+    return date(mes.year + mes.month // 12, mes.month % 12 + 1, 1)
+
+
+def _calcular(aluno_ids, meses=None):
+    """
+    Calcula as estatísticas dos alunos, agrupadas por (aluno_id, mês).
+    Com `meses`, só as aulas desses meses são lidas.
+    """
+    participacoes = Aula.alunos.through.objects.filter(aluno_id__in=aluno_ids)
+    if meses:
+        participacoes = participacoes.filter(
+            aula__data_hora__gte=_inicio_do_mes(min(meses)),
+            aula__data_hora__lt=_inicio_do_mes(_mes_seguinte(max(meses))),
+        )
+
+    presenca = PresencaAluno.objects.filter(
+        aula_id=OuterRef("aula_id"), aluno_id=OuterRef("aluno_id")
+    ).values("status")[:1]
+    linhas = participacoes.annotate(presenca=Subquery(presenca)).values_list(
+        "aluno_id", "aula_id", "aula__status", "aula__data_hora", "aula__modalidade_id", "presenca"
+    )
+
+    estatisticas = defaultdict(lambda: {
+        **{campo: 0 for campo in CAMPOS_CONTADORES},
+        "presencas_por_professor": Counter(),
+        "presencas_por_modalidade": Counter(),
+    })
+    presentes = defaultdict(list)  # aula_id -> chaves (aluno_id, mês) com presença
+
+    for aluno_id, aula_id, status, data_hora, modalidade_id, presenca in linhas:
+        mes = mes_de_referencia(data_hora)
+        if meses and mes not in meses:
+            continue
+        item = estatisticas[(aluno_id, mes)]
+        item["total_aulas"] += 1
+        if status == "Cancelada":
+            item["canceladas"] += 1
+        elif status == "Agendada":
+            item["agendadas"] += 1
+        if status in STATUS_COM_PRESENCA and presenca == "presente":
+            item["realizadas"] += 1
+        elif status in STATUS_COM_PRESENCA and presenca == "ausente":
+            item["ausencias"] += 1
+        if presenca == "presente":
+            item["presencas_por_modalidade"][str(modalidade_id)] += 1
+            presentes[aula_id].append((aluno_id, mes))
+
+    if presentes:
+        professores = Aula.professores.through.objects.filter(
+            aula_id__in=list(presentes)
+        ).values_list("aula_id", "customuser_id")
+        for aula_id, professor_id in professores:
+            for chave in presentes[aula_id]:
+                estatisticas[chave]["presencas_por_professor"][str(professor_id)] += 1
+
+    return estatisticas
+
+
+def _gravar(estatisticas):
+    EstatisticaAlunoMes.objects.bulk_create(
+        [
+            EstatisticaAlunoMes(
+                aluno_id=aluno_id,
+                mes=mes,
+                **{campo: valores[campo] for campo in CAMPOS_CONTADORES},
+                presencas_por_professor=dict(valores["presencas_por_professor"]),
+                presencas_por_modalidade=dict(valores["presencas_por_modalidade"]),
+            )
+            for (aluno_id, mes), valores in estatisticas.items()
+        ],
+        # Duas requisições podem materializar o mesmo aluno ao mesmo tempo
+        ignore_conflicts=True,
+    )
+
+
+def atualizar_estatisticas(pares):
+    """Recalcula os pares (aluno_id, mês) informados. `mês` é o primeiro dia do mês."""
+    pares = {(aluno_id, mes) for aluno_id, mes in pares if aluno_id and mes}
+    if not pares:
+        return
+
+    aluno_ids = {aluno_id for aluno_id, _ in pares}
+    meses = {mes for _, mes in pares}
+    estatisticas = _calcular(aluno_ids, meses)
+
+    filtro = Q()
+    for aluno_id, mes in pares:
+        filtro |= Q(aluno_id=aluno_id, mes=mes)
+
+    with transaction.atomic():
+        EstatisticaAlunoMes.objects.filter(filtro).delete()
+        _gravar({chave: valores for chave, valores in estatisticas.items() if chave in pares})
+
+
+def atualizar_estatisticas_aulas(aulas, aluno_ids=None):
+    """
+    Recalcula os meses das aulas para os seus alunos (ou para `aluno_ids`,
+    útil quando os vínculos já foram removidos).
+    """
+    meses = {mes_de_referencia(aula.data_hora) for aula in aulas}
+    if aluno_ids is None:
+        aluno_ids = set(
+            Aula.alunos.through.objects.filter(aula__in=aulas).values_list("aluno_id", flat=True)
+        )
+    atualizar_estatisticas((aluno_id, mes) for aluno_id in aluno_ids for mes in meses)
+
+
+def recalcular_todas(alunos_por_lote=200):
+    """Reconstrói a tabela inteira, em lotes de alunos. Retorna o nº de linhas gravadas."""
+    aluno_ids = list(Aluno.objects.order_by("pk").values_list("pk", flat=True))
+    total = 0
+    with transaction.atomic():
+        EstatisticaAlunoMes.objects.all().delete()
+        for inicio in range(0, len(aluno_ids), alunos_por_lote):
+            estatisticas = _calcular(aluno_ids[inicio:inicio + alunos_por_lote])
+            _gravar(estatisticas)
+            total += len(estatisticas)
+    return total
+
+
+def estatisticas_aluno(aluno):
+    """
+    Totais do aluno a partir das linhas mensais (uma consulta indexada), no
+    mesmo formato que o perfil do aluno usava com as consultas ao histórico.
+    """
+    linhas = list(EstatisticaAlunoMes.objects.filter(aluno=aluno))
+    if not linhas:
+        # Aluno ainda não materializado (ex: antes do primeiro recálculo completo)
+        estatisticas = _calcular([aluno.pk])
+        if estatisticas:
+            _gravar(estatisticas)
+            linhas = list(EstatisticaAlunoMes.objects.filter(aluno=aluno))
+
+    totais = {campo: 0 for campo in CAMPOS_CONTADORES}
+    por_professor = Counter()
+    por_modalidade = Counter()
+    for linha in linhas:
+        for campo in CAMPOS_CONTADORES:
+            totais[campo] += getattr(linha, campo)
+        por_professor.update(linha.presencas_por_professor)
+        por_modalidade.update(linha.presencas_por_modalidade)
+
+    top_professores = por_professor.most_common(3)
+    nomes_professores = dict(
+        CustomUser.objects.filter(pk__in=[int(pk) for pk, _ in top_professores]).values_list("pk", "username")
+    )
+    top_modalidades = por_modalidade.most_common(3)
+    nomes_modalidades = dict(
+        Modalidade.objects.filter(pk__in=[int(pk) for pk, _ in top_modalidades]).values_list("pk", "nome")
+    )
+
+    # Professores/modalidades excluídos depois da última atualização são ignorados
+    totais["top_professores"] = [
+        {"professores__pk": int(pk), "professores__username": nomes_professores[int(pk)], "contagem": contagem}
+        for pk, contagem in top_professores
+        if int(pk) in nomes_professores
+    ]
+    totais["top_modalidades"] = [
+        {"modalidade__nome": nomes_modalidades[int(pk)], "contagem": contagem}
+        for pk, contagem in top_modalidades
+        if int(pk) in nomes_modalidades
+    ]
+    return totais
@@ -0,0 +1,186 @@
+"""
+Exportação em streaming das atividades das aulas (CSV, opcionalmente gzip).
+
+As aulas são lidas com `values()` e `iterator(chunk_size=...)`, em lotes de
+TAMANHO_LOTE. Para cada lote, alunos, professores e os itens de rudimento,
+ritmo e virada dos relatórios vêm em uma consulta por tabela (`__in` com os
+ids do lote), então a memória fica limitada a um lote por vez, qualquer que
+seja o período exportado. As linhas CSV são agrupadas em partes de ~64 KB
+antes de ir para a resposta.
+
+Cada linha representa uma atividade da aula (teoria, item de exercício,
+repertório ou observações); aulas sem relatório ou com relatório vazio
+geram uma linha "N/A".
+"""
+import csv
+import io
+import zlib
+from collections import defaultdict
+from itertools import islice
+
+from django.utils import timezone
+
+from .models import Aula, ItemRitmo, ItemRudimento, ItemVirada
+
+TAMANHO_LOTE = 2000
+TAMANHO_PARTE = 64 * 1024
+
+CABECALHO = [
+    "ID Aula",
+    "Data e Hora",
+    "Status",
+    "Alunos",
+    "Prof. Atribuído(s)",
+    "Prof. Realizou",
+    "Categoria",
+    "Tipo de Conteúdo",
+    "Descrição",
+    "Detalhes (BPM, Livro, Duração)",
+    "Observações do Conteúdo",
+]
+
+CAMPOS_AULA = [
+    "pk",
+    "data_hora",
+    "status",
+    "modalidade__nome",
+    "relatorioaula__aula_id",
+    "relatorioaula__conteudo_teorico",
+    "relatorioaula__observacoes_teoria",
+    "relatorioaula__repertorio_musicas",
+    "relatorioaula__observacoes_repertorio",
+    "relatorioaula__observacoes_gerais",
+    "relatorioaula__professor_que_validou__username",
+]
+
+STATUS_EXIBICAO = dict(Aula.STATUS_AULA_CHOICES)
+
+
+def _detalhes_rudimento(item):
+    return f"BPM: {item['bpm'] or 'N/A'} / Duração: {item['duracao_min'] or 'N/A'} min"
+
+
+def _detalhes_ritmo(item):
+    return (
+        f"Livro: {item['livro_metodo'] or 'N/A'} / BPM: {item['bpm'] or 'N/A'} / "
+        f"Duração: {item['duracao_min'] or 'N/A'} min"
+    )
+
+
+# (tipo, model, campos extras, formatação dos detalhes), na ordem de exibição
+ITENS = [
+    ("Rudimento", ItemRudimento, [], _detalhes_rudimento),
+    ("Ritmo", ItemRitmo, ["livro_metodo"], _detalhes_ritmo),
+    ("Virada", ItemVirada, [], _detalhes_rudimento),
+]
+
+
+def _nomes_por_aula(through, campo, aula_ids):
+    nomes = defaultdict(list)
+    linhas = (
+        through.objects.filter(aula_id__in=aula_ids)
+        .order_by("pk")
+        .values_list("aula_id", campo)
+    )
+    for aula_id, nome in linhas:
+        nomes[aula_id].append(nome.title())
+    return nomes
+
+
+def _itens_por_relatorio(aula_ids):
+    itens = {tipo: defaultdict(list) for tipo, *_ in ITENS}
+    for tipo, model, extras, _ in ITENS:
+        linhas = (
+            model.objects.filter(relatorio_id__in=aula_ids)
+            .order_by("pk")
+            .values("relatorio_id", "descricao", "bpm", "duracao_min", "observacoes", *extras)
+        )
+        for item in linhas:
+            itens[tipo][item["relatorio_id"]].append(item)
+    return itens
+
+
+def _atividades(aula, itens):
+    """Linhas (tipo, descrição, detalhes, observações) de uma aula."""
+    if aula["relatorioaula__aula_id"] is None:
+        return [["N/A", "Aula sem relatório criado.", "", ""]]
+
+    atividades = []
+    if aula["relatorioaula__conteudo_teorico"]:
+        atividades.append([
+            "Teoria",
+            aula["relatorioaula__conteudo_teorico"],
+            "",
+            aula["relatorioaula__observacoes_teoria"] or "",
+        ])
+    for tipo, _, _, detalhes in ITENS:
+        for item in itens[tipo].get(aula["pk"], []):
+            atividades.append([tipo, item["descricao"], detalhes(item), item["observacoes"] or ""])
+    if aula["relatorioaula__repertorio_musicas"]:
+        atividades.append([
+            "Repertório",
+            aula["relatorioaula__repertorio_musicas"],
+            "",
+            aula["relatorioaula__observacoes_repertorio"] or "",
+        ])
+    if aula["relatorioaula__observacoes_gerais"]:
+        atividades.append(["Observações Gerais", aula["relatorioaula__observacoes_gerais"], "", ""])
+    return atividades or [["N/A", "Relatório existe, mas está vazio.", "", ""]]
+
+
+def linhas_atividades(aulas_queryset, tamanho_lote=TAMANHO_LOTE):
+    """Gera as linhas de atividades (sem o cabeçalho) das aulas filtradas, lote a lote."""
+    aulas = (
+        aulas_queryset.order_by("data_hora", "pk")
+        .values(*CAMPOS_AULA)
+        .distinct()
+        .iterator(chunk_size=tamanho_lote)
+    )
+    while lote := list(islice(aulas, tamanho_lote)):
+        aula_ids = [aula["pk"] for aula in lote]
+        alunos = _nomes_por_aula(Aula.alunos.through, "aluno__nome_completo", aula_ids)
+        professores = _nomes_por_aula(Aula.professores.through, "customuser__username", aula_ids)
+        itens = _itens_por_relatorio(aula_ids)
+
+        for aula in lote:
+            realizou = aula["relatorioaula__professor_que_validou__username"]
+            base = [
+                aula["pk"],
+                timezone.localtime(aula["data_hora"]).strftime("%d/%m/%Y %H:%M"),
+                STATUS_EXIBICAO.get(aula["status"], aula["status"]),
+                ", ".join(alunos.get(aula["pk"], [])),
+                ", ".join(professores.get(aula["pk"], [])),
+                realizou.title() if realizou else "N/A",
+                aula["modalidade__nome"] or "",
+            ]
+            for atividade in _atividades(aula, itens):
+                yield base + atividade
+
+
+def partes_csv(linhas, cabecalho=CABECALHO, tamanho=TAMANHO_PARTE):
+    """
+    Converte as linhas em CSV (";" como separador, BOM UTF-8 para o Excel)
+    e gera partes de ~`tamanho` bytes.
+    """
+    buffer = io.StringIO()
+    escritor = csv.writer(buffer, delimiter=";")
+    buffer.write("\ufeff")
+    escritor.writerow(cabecalho)
+    for linha in linhas:
+        escritor.writerow(linha)
+        if buffer.tell() >= tamanho:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def comprimir_gzip(partes):
+    """Comprime as partes em um único fluxo gzip, sem juntar tudo na memória."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31: cabeçalho gzip
+    for parte in partes:
+        comprimida = compressor.compress(parte)
+        if comprimida:
+            yield comprimida
+    yield compressor.flush()
@@ -12,6 +12,7 @@ from .models import (
     PresencaAluno,
     PresencaProfessor,
 )
+from .recorrencia import UNIDADE_MESES, UNIDADE_SEMANAS, MAX_MESES, MAX_SEMANAS
 
 
 class TitlecaseModelChoiceField(forms.ModelChoiceField):
@@ -31,6 +32,24 @@ class AulaForm(forms.ModelForm):
         label="Agendar recorrentemente (todas as semanas do mês)",
         widget=forms.CheckboxInput(attrs={"class": "form-check-input"}),
     )
+    recorrencia_quantidade = forms.IntegerField(
+        required=False,
+        min_value=1,
+        max_value=MAX_SEMANAS,
+        label="Repetir por",
+        help_text=(
+            f"Deixe em branco para agendar apenas até o fim do mês "
+            f"(máximo de {MAX_MESES} meses ou {MAX_SEMANAS} semanas)."
+        ),
+        widget=forms.NumberInput(attrs={"class": "form-control", "placeholder": "Mês atual"}),
+    )
+    recorrencia_unidade = forms.ChoiceField(
+        required=False,
+        choices=((UNIDADE_MESES, "Meses"), (UNIDADE_SEMANAS, "Semanas")),
+        initial=UNIDADE_MESES,
+        label="Unidade",
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
     modalidade = TitlecaseModelChoiceField(
         queryset=Modalidade.objects.all().order_by("nome"),
         label="Categoria",
@@ -67,6 +86,19 @@ class AulaForm(forms.ModelForm):
                 self.fields["status"].choices = [
                     choice for choice in choices if choice[0] not in status_finais
                 ]
+
+    def clean(self):
+        cleaned_data = super().clean()
+        # O limite depende da unidade: o max_value do campo só cobre as semanas
+        quantidade = cleaned_data.get("recorrencia_quantidade")
+        if quantidade:
+            if cleaned_data.get("recorrencia_unidade") == UNIDADE_SEMANAS:
+                limite, nome = MAX_SEMANAS, "semanas"
+            else:
+                limite, nome = MAX_MESES, "meses"
+            if quantidade > limite:
+                self.add_error("recorrencia_quantidade", f"O máximo é de {limite} {nome}.")
+        return cleaned_data
     
 
 
@@ -146,7 +178,7 @@ class AlunoForm(forms.ModelForm):
 class ModalidadeForm(forms.ModelForm):
     class Meta:
         model = Modalidade
-        fields = ["nome", "valor_pagamento_professor", "tipo_pagamento"]
+        fields = ["nome", "valor_pagamento_professor", "tipo_pagamento", "duracao_minutos"]
         widgets = {
             "nome": forms.TextInput(
                 attrs={
@@ -164,6 +196,12 @@ class ModalidadeForm(forms.ModelForm):
                 attrs={
                     "class": "form-select"
                 }
+            ),
+            "duracao_minutos": forms.NumberInput(
+                attrs={
+                    "class": "form-control",
+                    "placeholder": "60"
+                }
             )
         }
 
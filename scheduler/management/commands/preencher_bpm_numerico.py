@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from scheduler.models import ItemRitmo, ItemRudimento, ItemVirada, extrair_bpm
+
+CAMPOS_BPM = ["bpm_valor", "bpm_min", "bpm_max"]
+
+
+class Command(BaseCommand):
+    help = 'Preenche os campos numéricos de BPM (valor/mín/máx) dos exercícios já cadastrados a partir do texto.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=1000,
+            help='Quantidade de exercícios gravados por consulta (padrão: 1000).',
+        )
+
+    def handle(self, *args, **options):
+        lote = options['lote']
+        for model in (ItemRudimento, ItemRitmo, ItemVirada):
+            pendentes = []
+            total = 0
+            for item in model.objects.only('pk', 'bpm', *CAMPOS_BPM).iterator(chunk_size=lote):
+                numeros = extrair_bpm(item.bpm)
+                if numeros == (item.bpm_valor, item.bpm_min, item.bpm_max):
+                    continue
+                item.bpm_valor, item.bpm_min, item.bpm_max = numeros
+                pendentes.append(item)
+                if len(pendentes) >= lote:
+                    model.objects.bulk_update(pendentes, CAMPOS_BPM)
+                    total += len(pendentes)
+                    pendentes = []
+            if pendentes:
+                model.objects.bulk_update(pendentes, CAMPOS_BPM)
+                total += len(pendentes)
+
+            self.stdout.write(self.style.SUCCESS(
+                f"{model._meta.verbose_name_plural}: {total} exercício(s) atualizado(s)."
+            ))
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+
+from scheduler.estatisticas import recalcular_todas
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói do zero a tabela de estatísticas mensais dos alunos a partir do histórico de aulas.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--lote', type=int, default=200,
+            help='Quantidade de alunos processados por consulta (padrão: 200).',
+        )
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recalculando estatísticas dos alunos...")
+        total = recalcular_todas(alunos_por_lote=options['lote'])
+        self.stdout.write(self.style.SUCCESS(f"{total} registro(s) mensal(is) gravado(s)."))
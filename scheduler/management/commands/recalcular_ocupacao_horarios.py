@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from scheduler.ocupacao import recalcular_ocupacao
+
+
+class Command(BaseCommand):
+    help = 'Reconstrói do zero a grade de horários fixos/variáveis (OcupacaoHorario) a partir das aulas recentes.'
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recalculando a grade de horários...")
+        total = recalcular_ocupacao()
+        self.stdout.write(self.style.SUCCESS(f"{total} horário(s) de aluno gravado(s)."))
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.18 on 2026-10-18 00:59
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0023_relatorioaula_ultimo_editor'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='modalidade',
+            name='duracao_minutos',
+            field=models.PositiveIntegerField(default=60, help_text='Usada para detectar aulas que se sobrepõem no mesmo horário.', validators=[django.core.validators.MinValueValidator(1), django.core.validators.MaxValueValidator(240)], verbose_name='Duração da Aula (min)'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0024_modalidade_duracao_minutos'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EstatisticaAlunoMes',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(help_text='Primeiro dia do mês de referência.')),
+                ('total_aulas', models.PositiveIntegerField(default=0)),
+                ('realizadas', models.PositiveIntegerField(default=0)),
+                ('ausencias', models.PositiveIntegerField(default=0)),
+                ('canceladas', models.PositiveIntegerField(default=0)),
+                ('agendadas', models.PositiveIntegerField(default=0)),
+                ('presencas_por_professor', models.JSONField(blank=True, default=dict)),
+                ('presencas_por_modalidade', models.JSONField(blank=True, default=dict)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='estatisticas_mensais', to='scheduler.aluno')),
+            ],
+            options={
+                'ordering': ['aluno', 'mes'],
+                'unique_together': {('aluno', 'mes')},
+            },
+        ),
+    ]
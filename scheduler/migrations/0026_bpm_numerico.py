@@ -0,0 +1,70 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0025_estatisticaalunomes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='itemritmo',
+            name='bpm_max',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemritmo',
+            name='bpm_min',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemritmo',
+            name='bpm_valor',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemrudimento',
+            name='bpm_max',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemrudimento',
+            name='bpm_min',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemrudimento',
+            name='bpm_valor',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemvirada',
+            name='bpm_max',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemvirada',
+            name='bpm_min',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddField(
+            model_name='itemvirada',
+            name='bpm_valor',
+            field=models.PositiveIntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='itemritmo',
+            index=models.Index(fields=['relatorio', 'descricao'], name='scheduler_i_relator_994963_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemrudimento',
+            index=models.Index(fields=['relatorio', 'descricao'], name='scheduler_i_relator_e167ba_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='itemvirada',
+            index=models.Index(fields=['relatorio', 'descricao'], name='scheduler_i_relator_1c9da2_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 5.2.18 on 2026-10-18 01:15
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('scheduler', '0026_bpm_numerico'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='OcupacaoHorario',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dia_semana', models.PositiveSmallIntegerField(help_text='0 = segunda-feira.')),
+                ('hora', models.PositiveSmallIntegerField()),
+                ('ocorrencias', models.JSONField(blank=True, default=list)),
+                ('atualizado_em', models.DateTimeField(auto_now=True)),
+                ('aluno', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='ocupacoes_horario', to='scheduler.aluno')),
+            ],
+            options={
+                'ordering': ['dia_semana', 'hora'],
+                'unique_together': {('dia_semana', 'hora', 'aluno')},
+            },
+        ),
+    ]
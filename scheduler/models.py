@@ -1,6 +1,9 @@
+import re
+
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.core.exceptions import ValidationError
+from django.core.validators import MinValueValidator, MaxValueValidator
 from django.conf import settings
 from django.urls import reverse
 from django.utils import timezone
@@ -110,6 +113,10 @@ class Aluno(models.Model):
         return self.nome_completo
 
 
+# Limite usado pelo motor de conflitos para delimitar a janela de busca
+DURACAO_MAXIMA_AULA_MINUTOS = 240
+
+
 class Modalidade(models.Model):
     TIPO_PAGAMENTO_CHOICES = (
         ('aula', 'Por Aula (Valor Fixo)'),
@@ -132,6 +139,12 @@ class Modalidade(models.Model):
         verbose_name="Método de Cálculo do Pagamento",
         help_text="Define se o pagamento é um valor fixo por aula ou multiplicado pelo número de alunos presentes."
     )
+    duracao_minutos = models.PositiveIntegerField(
+        default=60,
+        validators=[MinValueValidator(1), MaxValueValidator(DURACAO_MAXIMA_AULA_MINUTOS)],
+        verbose_name="Duração da Aula (min)",
+        help_text="Usada para detectar aulas que se sobrepõem no mesmo horário."
+    )
 
     class Meta:
         ordering = ['nome']
@@ -289,7 +302,37 @@ class RelatorioAula(models.Model):
 
 
 # --- NOVOS MODELOS PARA OS ITENS DINÂMICOS ---
-class ItemRudimento(models.Model):
+def extrair_bpm(texto):
+    """
+    Converte o BPM digitado pelo professor em números.
+    Ex: "120" -> (120, 120, 120); "80-100 bpm" -> (100, 80, 100); "" -> (None, None, None).
+    O valor principal é o maior número, que é o andamento alcançado.
+    """
+    numeros = [int(n) for n in re.findall(r"\d+", str(texto or ""))]
+    if not numeros:
+        return None, None, None
+    return max(numeros), min(numeros), max(numeros)
+
+
+class ExercicioComBpm(models.Model):
+    """Campos numéricos de BPM, preenchidos a partir do texto em cada save()."""
+
+    bpm_valor = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    bpm_min = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    bpm_max = models.PositiveIntegerField(null=True, blank=True, editable=False)
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        self.bpm_valor, self.bpm_min, self.bpm_max = extrair_bpm(self.bpm)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "bpm" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "bpm_valor", "bpm_min", "bpm_max"}
+        super().save(*args, **kwargs)
+
+
+class ItemRudimento(ExercicioComBpm):
     """Armazena um único exercício de rudimento associado a um relatório."""
 
     relatorio = models.ForeignKey(
@@ -302,11 +345,14 @@ class ItemRudimento(models.Model):
     )
     observacoes = models.TextField(verbose_name="Observações", blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["relatorio", "descricao"])]
+
     def __str__(self):
         return f"Rudimento: {self.descricao} para {self.relatorio}"
 
 
-class ItemRitmo(models.Model):
+class ItemRitmo(ExercicioComBpm):
     """Armazena um único exercício de ritmo associado a um relatório."""
 
     relatorio = models.ForeignKey(
@@ -324,11 +370,14 @@ class ItemRitmo(models.Model):
     )
     observacoes = models.TextField(verbose_name="Observações", blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["relatorio", "descricao"])]
+
     def __str__(self):
         return f"Ritmo: {self.descricao} para {self.relatorio}"
 
 
-class ItemVirada(models.Model):
+class ItemVirada(ExercicioComBpm):
     """Armazena um único exercício de virada associado a um relatório."""
 
     relatorio = models.ForeignKey(
@@ -343,6 +392,9 @@ class ItemVirada(models.Model):
     )
     observacoes = models.TextField(verbose_name="Observações", blank=True, null=True)
 
+    class Meta:
+        indexes = [models.Index(fields=["relatorio", "descricao"])]
+
     def __str__(self):
         return f"Virada: {self.descricao} para {self.relatorio}"
 
@@ -420,3 +472,48 @@ class TourVisto(models.Model):
 
     def __str__(self):
         return f"{self.usuario.username} viu o tour {self.tour_id}"
+
+
+class EstatisticaAlunoMes(models.Model):
+    """
+    Totais de aulas de um aluno em um mês, mantidos por `scheduler.estatisticas`
+    para que o perfil do aluno não precise varrer todo o histórico de aulas.
+    """
+    aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name="estatisticas_mensais")
+    mes = models.DateField(help_text="Primeiro dia do mês de referência.")
+    total_aulas = models.PositiveIntegerField(default=0)
+    realizadas = models.PositiveIntegerField(default=0)
+    ausencias = models.PositiveIntegerField(default=0)
+    canceladas = models.PositiveIntegerField(default=0)
+    agendadas = models.PositiveIntegerField(default=0)
+    # Aulas com presença confirmada, por id do professor / id da modalidade
+    presencas_por_professor = models.JSONField(default=dict, blank=True)
+    presencas_por_modalidade = models.JSONField(default=dict, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("aluno", "mes")
+        ordering = ["aluno", "mes"]
+
+    def __str__(self):
+        return f"{self.aluno.nome_completo} - {self.mes:%m/%Y}"
+
+
+class OcupacaoHorario(models.Model):
+    """
+    Ocorrências de aulas de um aluno em um horário semanal (dia da semana +
+    hora cheia), mantidas por `scheduler.ocupacao` para a grade de horários.
+    Cada ocorrência é {"data": "AAAA-MM-DD", "profs": [...], "modalidade": "..."}.
+    """
+    aluno = models.ForeignKey(Aluno, on_delete=models.CASCADE, related_name="ocupacoes_horario")
+    dia_semana = models.PositiveSmallIntegerField(help_text="0 = segunda-feira.")
+    hora = models.PositiveSmallIntegerField()
+    ocorrencias = models.JSONField(default=list, blank=True)
+    atualizado_em = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        unique_together = ("dia_semana", "hora", "aluno")
+        ordering = ["dia_semana", "hora"]
+
+    def __str__(self):
+        return f"{self.aluno.nome_completo} - dia {self.dia_semana} às {self.hora:02d}:00"
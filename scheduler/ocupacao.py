@@ -0,0 +1,213 @@
+"""
+Grade de horários fixos/variáveis (`OcupacaoHorario`).
+
+Para cada aluno e horário semanal (dia da semana, hora cheia) é guardada a
+lista de aulas "Realizada"/"Agendada" a partir do início da janela de
+análise, com professores e modalidade já formatados. Os signals de
+`scheduler.signals` recalculam apenas os alunos afetados quando aulas são
+criadas, remarcadas, validadas ou têm participantes alterados; o comando
+`recalcular_ocupacao_horarios` reconstrói tudo.
+
+A janela (últimas `JANELA_SEMANAS` semanas até hoje) é aplicada na leitura,
+então as linhas continuam corretas com o passar dos dias.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+from django.utils.timezone import localtime
+
+from .models import Aula, OcupacaoHorario
+
+JANELA_SEMANAS = 6
+LIMITE_HORARIO_FIXO = 3
+STATUS_OCUPACAO = ["Realizada", "Agendada"]
+
+DIAS_GRADE = 6  # segunda a sábado
+HORARIOS_VISIVEIS = [f"{h:02d}:00" for h in range(8, 21)]
+HORARIOS_INTERVALO = ["12:00", "13:00"]
+
+CONECTIVOS = {"da", "de", "do", "das", "dos", "di", "du"}
+
+
+def formatar_nome(nome, vazio="?"):
+    """Primeiro e segundo nome ("Ana de Souza" -> "Ana de Souza", "Ana Maria Souza" -> "Ana Maria")."""
+    partes = nome.strip().split()
+    if not partes:
+        return vazio
+    if len(partes) == 1:
+        return partes[0].capitalize()
+    if partes[1].lower() in CONECTIVOS and len(partes) > 2:
+        return f"{partes[0].capitalize()} {partes[1].lower()} {partes[2].capitalize()}"
+    return f"{partes[0].capitalize()} {partes[1].capitalize()}"
+
+
+def inicio_da_janela(hoje=None):
+    return (hoje or timezone.localdate()) - timedelta(weeks=JANELA_SEMANAS)
+
+
+def _calcular(aluno_ids=None, hoje=None):
+    """Ocorrências agrupadas por (aluno_id, dia_semana, hora)."""
+    participacoes = Aula.alunos.through.objects.filter(
+        aula__status__in=STATUS_OCUPACAO,
+        aula__data_hora__date__gte=inicio_da_janela(hoje),
+    )
+    if aluno_ids is not None:
+        participacoes = participacoes.filter(aluno_id__in=aluno_ids)
+    linhas = list(
+        participacoes.values_list(
+            "aluno_id", "aula_id", "aula__data_hora", "aula__modalidade__nome"
+        ).order_by("aula__data_hora")
+    )
+
+    profs_por_aula = defaultdict(list)
+    if linhas:
+        professores = Aula.professores.through.objects.filter(
+            aula_id__in={aula_id for _, aula_id, _, _ in linhas}
+        ).values_list("aula_id", "customuser__username")
+        for aula_id, username in professores:
+            profs_por_aula[aula_id].append(formatar_nome(username))
+
+    ocupacoes = defaultdict(list)
+    for aluno_id, aula_id, data_hora, modalidade in linhas:
+        dt_local = localtime(data_hora)
+        ocupacoes[(aluno_id, dt_local.weekday(), dt_local.hour)].append({
+            "data": dt_local.date().isoformat(),
+            "profs": profs_por_aula[aula_id],
+            "modalidade": modalidade.title(),
+        })
+    return ocupacoes
+
+
+def _sincronizar(ocupacoes, aluno_ids=None):
+    """
+    Grava as linhas calculadas e remove as dos horários que deixaram de
+    existir. As linhas são atualizadas no lugar (upsert), então um
+    recálculo sem mudança de horário não apaga nada.
+    """
+    existentes = OcupacaoHorario.objects.all()
+    if aluno_ids is not None:
+        existentes = existentes.filter(aluno_id__in=aluno_ids)
+    obsoletas = [
+        pk
+        for pk, *chave in existentes.values_list("pk", "aluno_id", "dia_semana", "hora")
+        if tuple(chave) not in ocupacoes
+    ]
+
+    with transaction.atomic():
+        if obsoletas:
+            OcupacaoHorario.objects.filter(pk__in=obsoletas).delete()
+        OcupacaoHorario.objects.bulk_create(
+            [
+                OcupacaoHorario(aluno_id=aluno_id, dia_semana=dia_semana, hora=hora, ocorrencias=ocorrencias)
+                for (aluno_id, dia_semana, hora), ocorrencias in ocupacoes.items()
+            ],
+            update_conflicts=True,
+            unique_fields=["dia_semana", "hora", "aluno"],
+            update_fields=["ocorrencias", "atualizado_em"],
+        )
+
+
+def atualizar_ocupacao(aluno_ids):
+    """Recalcula todas as linhas dos alunos informados."""
+    aluno_ids = {aluno_id for aluno_id in aluno_ids if aluno_id}
+    if aluno_ids:
+        _sincronizar(_calcular(aluno_ids), aluno_ids)
+
+
+def atualizar_ocupacao_aulas(aulas):
+    """Recalcula os alunos das aulas informadas."""
+    atualizar_ocupacao(
+        Aula.alunos.through.objects.filter(aula__in=aulas).values_list("aluno_id", flat=True)
+    )
+
+
+def recalcular_ocupacao():
+    """Reconstrói a tabela inteira. Retorna o nº de linhas gravadas."""
+    ocupacoes = _calcular()
+    _sincronizar(ocupacoes)
+    return len(ocupacoes)
+
+
+def grade_horarios(hoje=None):
+    """
+    Monta a grade {"HH:00": {dia_semana: {...}}} com uma única consulta.
+
+    Para cada aluno vale o horário mais frequente na janela (empate: o mais
+    recente); professores e modalidade vêm da aula mais recente nesse
+    horário. O horário é "fixo" a partir de LIMITE_HORARIO_FIXO aulas.
+    """
+    hoje = hoje or timezone.localdate()
+    inicio = inicio_da_janela(hoje).isoformat()
+    fim = hoje.isoformat()
+
+    principal_por_aluno = {}
+    for ocupacao in OcupacaoHorario.objects.select_related("aluno"):
+        na_janela = [o for o in ocupacao.ocorrencias if inicio <= o["data"] <= fim]
+        if not na_janela:
+            continue
+        recente = max(na_janela, key=lambda o: o["data"])
+        chave = (len(na_janela), recente["data"])
+        atual = principal_por_aluno.get(ocupacao.aluno_id)
+        if atual is None or chave > atual["chave"]:
+            principal_por_aluno[ocupacao.aluno_id] = {
+                "chave": chave,
+                "slot": (ocupacao.dia_semana, f"{ocupacao.hora:02d}:00"),
+                "aluno": formatar_nome(ocupacao.aluno.nome_completo, vazio="Aluno ?"),
+                "profs": recente["profs"],
+                "modalidade": recente["modalidade"],
+            }
+
+    grade = defaultdict(dict)
+    for info in principal_por_aluno.values():
+        dia_semana, horario = info["slot"]
+        status_aluno = "fixo" if info["chave"][0] >= LIMITE_HORARIO_FIXO else "variavel"
+        slot = grade[horario].setdefault(
+            dia_semana,
+            {"status": status_aluno, "alunos": set(), "profs": set(), "modalidades": set()},
+        )
+        slot["alunos"].add(info["aluno"])
+        slot["profs"].update(info["profs"])
+        slot["modalidades"].add(info["modalidade"])
+        if status_aluno == "fixo":
+            slot["status"] = "fixo"
+
+    for dias in grade.values():
+        for slot in dias.values():
+            slot["alunos_texto"] = "\n".join(sorted(slot.pop("alunos")))
+            slot["profs_texto"] = "\n".join(sorted(slot.pop("profs")))
+            slot["modalidades_texto"] = "\n".join(sorted(slot.pop("modalidades")))
+    return grade
+
+
+def kpis_ocupacao(grade):
+    """Totais de horários fixos, variáveis e livres (segunda a sábado, 08h às 20h)."""
+    total_fixo = total_variavel = slots_intervalo_livres = 0
+    aulas_por_dia = [0] * DIAS_GRADE
+
+    for horario in HORARIOS_VISIVEIS:
+        for dia_index in range(DIAS_GRADE):
+            slot_info = grade.get(horario, {}).get(dia_index)
+            if slot_info:
+                if slot_info["status"] == "fixo":
+                    total_fixo += 1
+                else:
+                    total_variavel += 1
+                aulas_por_dia[dia_index] += 1
+            elif horario in HORARIOS_INTERVALO:
+                slots_intervalo_livres += 1
+
+    total_slots_disponiveis = DIAS_GRADE * len(HORARIOS_VISIVEIS)
+    total_ocupados = total_fixo + total_variavel
+    total_slots_agendaveis = total_slots_disponiveis - slots_intervalo_livres
+    taxa_ocupacao = (
+        (total_ocupados / total_slots_agendaveis) * 100 if total_slots_agendaveis > 0 else 0
+    )
+    return {
+        "total_fixo": total_fixo,
+        "total_variavel": total_variavel,
+        "total_livres": total_slots_agendaveis - total_ocupados,
+        "taxa_ocupacao": taxa_ocupacao,
+        "aulas_por_dia": aulas_por_dia,
+    }
@@ -0,0 +1,203 @@
+"""
+Gerador do PDF do relatório anual do aluno para a fila de core/pdfs.py.
+
+`entradas_relatorio_anual` roda na requisição: lê o curso e os pontos de BPM
+dos rudimentos (consultas leves). O gráfico do matplotlib, o markdown e o
+HTML ficam para o worker, em `html_relatorio_anual`.
+"""
+import base64
+import io
+import os
+from collections import defaultdict
+
+import markdown
+import matplotlib
+import matplotlib.pyplot as plt
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.template.loader import render_to_string
+
+from .models import Aluno, Aula, ItemRudimento
+
+matplotlib.use('Agg')
+
+TEMPLATE_RELATORIO_ANUAL = 'scheduler/pdf/relatorio_anual_pdf.html'
+
+
+def link_callback(uri, rel):
+    """
+    Converte URLs de arquivos estáticos (ex: /static/img/logo.png)
+    em caminhos absolutos do sistema de arquivos (ex: C:/Users/.../static/img/logo.png)
+    para que o xhtml2pdf consiga carregar as imagens.
+    """
+    sUrl = settings.STATIC_URL
+    sRoot = settings.STATIC_ROOT
+    mUrl = settings.MEDIA_URL
+    mRoot = settings.MEDIA_ROOT
+
+    if uri.startswith(mUrl):
+        path = os.path.join(mRoot, uri.replace(mUrl, ""))
+    elif uri.startswith(sUrl):
+        path = os.path.join(sRoot, uri.replace(sUrl, ""))
+    else:
+        return uri
+
+    if not os.path.isfile(path):
+        result = finders.find(uri.replace(sUrl, ""))
+        if result:
+            if isinstance(result, (list, tuple)):
+                path = result[0]
+            else:
+                path = result
+
+    if not os.path.isfile(path):
+        raise Exception(f'media URI must start with {sUrl} or {mUrl}. Path: {path}')
+
+    return path
+
+
+def entradas_relatorio_anual(texto_markdown, nome_aluno, ano):
+    aluno = Aluno.objects.filter(nome_completo=nome_aluno).first()
+
+    curso_str = "Curso não identificado"
+    top_rudimentos = []
+    if aluno:
+        modalidades = set(
+            Aula.objects.filter(
+                alunos=aluno, data_hora__year=ano, status='Realizada', modalidade__isnull=False
+            ).values_list('modalidade__nome', flat=True)
+        )
+        if modalidades:
+            curso_str = ", ".join(sorted(modalidades))
+
+        itens = ItemRudimento.objects.filter(
+            relatorio__aula__alunos=aluno,
+            relatorio__aula__data_hora__year=ano,
+            bpm_valor__isnull=False,
+        ).order_by('relatorio__aula__data_hora').values_list(
+            'descricao', 'bpm_valor', 'relatorio__aula__data_hora'
+        )
+
+        dados_rudimentos = defaultdict(list)
+        for descricao, bpm_valor, data_hora in itens:
+            chave = descricao.strip().title()
+            dados_rudimentos[chave].append((data_hora.strftime('%d/%m'), float(bpm_valor)))
+
+        top_rudimentos = sorted(dados_rudimentos.items(), key=lambda x: len(x[1]), reverse=True)[:5]
+
+    return {
+        "template": TEMPLATE_RELATORIO_ANUAL,
+        "texto": texto_markdown,
+        "aluno": nome_aluno,
+        "ano": ano,
+        "curso": curso_str,
+        "rudimentos": [[nome, [list(ponto) for ponto in pontos]] for nome, pontos in top_rudimentos],
+    }
+
+
+def _grafico_base64(top_rudimentos, ano):
+    if not top_rudimentos:
+        return None
+
+    plt.figure(figsize=(10, 4))
+
+    tem_dados = False
+
+    # Jitter horizontal (em índice, pois datas são strings)
+    jitter_valores = [-0.15, -0.05, 0.05, 0.15, 0.25]  # até 5 rudimentos
+    idx_rudi = 0
+
+    for nome, pontos in top_rudimentos:
+        if len(pontos) >= 1:
+            datas, bpms = zip(*pontos)
+
+            # converte datas "dd/mm" para índice numérico
+            x_base = list(range(len(datas)))
+
+            # aplica jitter diferente para cada linha
+            jitter = jitter_valores[idx_rudi % len(jitter_valores)]
+            x_jitter = [x + jitter for x in x_base]
+
+            plt.plot(
+                x_jitter,
+                bpms,
+                marker='o',
+                linewidth=2,
+                label=nome
+            )
+
+            tem_dados = True
+            idx_rudi += 1
+
+    if not tem_dados:
+        plt.close()
+        return None
+
+    # substitui números do eixo por suas datas originais
+    plt.xticks(range(len(datas)), datas)
+
+    plt.title(f'Evolução Técnica (BPM) - {ano}', fontsize=12, fontweight='bold')
+    plt.xlabel('Aulas', fontsize=9)
+    plt.ylabel('BPM', fontsize=9)
+    plt.legend(title="Exercícios", fontsize='small')
+    plt.grid(True, linestyle='--', alpha=0.5)
+    plt.tight_layout()
+
+    buffer = io.BytesIO()
+    plt.savefig(buffer, format='png', transparent=True)
+    buffer.seek(0)
+    image_png = buffer.getvalue()
+    buffer.close()
+    plt.close()
+
+    return base64.b64encode(image_png).decode('utf-8')
+
+
+def html_relatorio_anual(entradas):
+    grafico_base64 = _grafico_base64(entradas["rudimentos"], entradas["ano"])
+
+    html_conteudo = markdown.markdown(entradas["texto"])
+
+    html_grafico = ""
+    if grafico_base64:
+        html_grafico = f"""
+        <div style="text-align: center; margin: 30px 0; page-break-inside: avoid;">
+            <h4 style="color: #333; border-bottom: 2px solid #ffc107; display: inline-block; margin-bottom: 15px;">
+                Gráfico de Evolução Técnica
+            </h4><br>
+            <img src="data:image/png;base64,{grafico_base64}" style="width: 100%; max-width: 17cm;">
+            <p style="font-size: 9px; color: #666; margin-top: 5px;">
+                * Evolução de velocidade (BPM) nos principais rudimentos praticados.
+            </p>
+        </div>
+        """
+
+    if '[GRAFICO_EVOLUCAO]' in html_conteudo and html_grafico:
+        html_conteudo = html_conteudo.replace('[GRAFICO_EVOLUCAO]', html_grafico)
+    elif html_grafico:
+        if '<h2>Técnica' in html_conteudo:
+            partes = html_conteudo.split('<h2>Técnica')
+            if len(partes) > 1:
+                subpartes = partes[1].split('<h2>')
+                if len(subpartes) > 1:
+                    nova_parte = subpartes[0] + html_grafico
+                    html_conteudo = partes[0] + '<h2>Técnica' + nova_parte + '<h2>' + '<h2>'.join(subpartes[1:])
+                else:
+                    html_conteudo += f"<br>{html_grafico}"
+            else:
+                html_conteudo += f"<br><hr>{html_grafico}"
+        else:
+            html_conteudo += f"<br><hr>{html_grafico}"
+
+    logo_path = finders.find('scheduler/img/logo_relatorio.png')
+    if not logo_path:
+        logo_path = os.path.join(settings.BASE_DIR, 'scheduler', 'static', 'scheduler', 'img', 'logo_relatorio.png')
+
+    context = {
+        'conteudo': html_conteudo,
+        'aluno': entradas["aluno"],
+        'curso': entradas["curso"],
+        'ano': entradas["ano"],
+        'logo_path': logo_path,
+    }
+    return render_to_string(TEMPLATE_RELATORIO_ANUAL, context), link_callback
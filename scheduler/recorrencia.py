@@ -0,0 +1,116 @@
+"""
+Criação em lote de aulas recorrentes.
+
+As ocorrências são inseridas com `bulk_create` (aulas e tabelas intermediárias
+de alunos/professores), então o custo em consultas é constante seja qual for
+o horizonte escolhido. Como `bulk_create` não dispara signals, o cache do
+calendário e as estatísticas dos alunos são atualizados aqui e a auditoria
+registra uma única entrada resumida.
+
+Inserções e estatísticas rodam numa transação: se uma etapa falha, nenhuma
+aula fica gravada sem alunos ou professores. O cache do calendário só é
+invalidado depois do commit.
+"""
+import logging
+from datetime import date, timedelta
+
+from django.db import transaction
+
+from logs.utils import log_action
+
+from .calendario import invalidar_datas
+from .estatisticas import atualizar_estatisticas_aulas
+from .ocupacao import atualizar_ocupacao
+from .models import Aula
+
+UNIDADE_SEMANAS = "semanas"
+UNIDADE_MESES = "meses"
+
+MAX_SEMANAS = 52
+MAX_MESES = 12
+
+logger = logging.getLogger(__name__)
+
+
+def _primeiro_dia_mes_seguinte(dia, meses):
+    indice = dia.month - 1 + meses
+    return date(dia.year + indice // 12, indice % 12 + 1, 1)
+
+
+def datas_recorrencia(data_hora_inicial, quantidade=None, unidade=UNIDADE_MESES, incluir_inicial=True):
+    """
+    Gera as datas semanais (mesmo dia da semana e horário) a partir de
+    `data_hora_inicial`.
+
+    - sem `quantidade`: até o fim do mês da data inicial (comportamento antigo);
+    - `quantidade` semanas: `quantidade` ocorrências, uma por semana;
+    - `quantidade` meses: até o fim do (quantidade - 1)-ésimo mês seguinte.
+    """
+    if unidade == UNIDADE_SEMANAS and quantidade:
+        total = min(quantidade, MAX_SEMANAS)
+        datas = [data_hora_inicial + timedelta(weeks=i) for i in range(total)]
+    else:
+        meses = min(quantidade or 1, MAX_MESES)
+        limite = _primeiro_dia_mes_seguinte(data_hora_inicial.date(), meses)
+        datas = []
+        data_hora = data_hora_inicial
+        while data_hora.date() < limite:
+            datas.append(data_hora)
+            data_hora += timedelta(weeks=1)
+
+    if not incluir_inicial:
+        datas = datas[1:]
+    return datas
+
+
+def criar_aulas_em_lote(datas_hora, modalidade, status, aluno_ids, professor_ids, request=None):
+    """
+    Cria uma aula por data com os mesmos alunos e professores.
+    Retorna a lista de aulas criadas (com pk) na ordem das datas.
+    """
+    if not datas_hora:
+        return []
+
+    with transaction.atomic():
+        aulas = Aula.objects.bulk_create(
+            [Aula(modalidade=modalidade, data_hora=data_hora, status=status) for data_hora in datas_hora]
+        )
+
+        AlunosThrough = Aula.alunos.through
+        AlunosThrough.objects.bulk_create(
+            [AlunosThrough(aula_id=aula.pk, aluno_id=aluno_id) for aula in aulas for aluno_id in aluno_ids]
+        )
+        ProfessoresThrough = Aula.professores.through
+        ProfessoresThrough.objects.bulk_create(
+            [
+                ProfessoresThrough(aula_id=aula.pk, customuser_id=professor_id)
+                for aula in aulas
+                for professor_id in professor_ids
+            ]
+        )
+
+        atualizar_estatisticas_aulas(aulas, aluno_ids=aluno_ids)
+        atualizar_ocupacao(aluno_ids)
+        transaction.on_commit(lambda: invalidar_datas(*datas_hora))
+
+    try:
+        log_action(
+            request=request,
+            instance=aulas[0],
+            action="criou",
+            tags=["aula", "criou", "recorrencia"],
+            detail={
+                "recorrencia": True,
+                "quantidade": len(aulas),
+                "aula_ids": [aula.pk for aula in aulas],
+                "datas": [aula.data_hora.isoformat() for aula in aulas],
+                "modalidade": modalidade.nome,
+                "status": status,
+                "alunos": sorted(aluno_ids),
+                "professores": sorted(professor_ids),
+            },
+        )
+    except Exception:
+        logger.exception("Falha ao registrar a criação das aulas recorrentes na auditoria.")
+
+    return aulas
@@ -0,0 +1,244 @@
+from django.db.models.signals import (
+    post_init,
+    post_save,
+    pre_delete,
+    post_delete,
+    m2m_changed,
+)
+from django.dispatch import receiver
+
+from .calendario import invalidar_datas, invalidar_calendario
+from .estatisticas import (
+    atualizar_estatisticas,
+    atualizar_estatisticas_aulas,
+    mes_de_referencia,
+)
+from .ocupacao import atualizar_ocupacao, atualizar_ocupacao_aulas, inicio_da_janela
+from .models import Aula, Aluno, Modalidade, CustomUser, RelatorioAula, PresencaAluno
+
+
+# --- INVALIDAÇÃO DO CACHE DO CALENDÁRIO ---
+
+
+@receiver(post_init, sender=Aula)
+def guardar_data_hora_original(sender, instance, **kwargs):
+    # Guarda a data carregada do banco para invalidar também o mês antigo
+    # quando a aula for remarcada para outro mês.
+    instance._data_hora_original = instance.__dict__.get("data_hora")
+
+
+@receiver(post_save, sender=Aula)
+def aula_salva(sender, instance, created, **kwargs):
+    data_hora_original = getattr(instance, "_data_hora_original", None)
+    invalidar_datas(data_hora_original, instance.data_hora)
+
+    if not created:
+        # Status, data ou modalidade podem ter mudado: recalcula os alunos da
+        # aula no mês antigo e no novo. Aulas novas ainda não têm alunos.
+        aluno_ids = list(
+            Aula.alunos.through.objects.filter(aula=instance).values_list("aluno_id", flat=True)
+        )
+        meses = {mes_de_referencia(d) for d in (data_hora_original, instance.data_hora) if d}
+        atualizar_estatisticas((aluno_id, mes) for aluno_id in aluno_ids for mes in meses)
+
+    instance._data_hora_original = instance.data_hora
+
+
+@receiver(post_delete, sender=Aula)
+def invalidar_calendario_aula_excluida(sender, instance, **kwargs):
+    invalidar_datas(instance.data_hora)
+
+
+@receiver(m2m_changed, sender=Aula.alunos.through)
+@receiver(m2m_changed, sender=Aula.professores.through)
+def invalidar_calendario_participantes(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        invalidar_datas(instance.data_hora)
+    elif pk_set:
+        # Alteração feita pelo lado do aluno/professor: pk_set contém ids de aulas
+        invalidar_datas(
+            *Aula.objects.filter(pk__in=pk_set).values_list("data_hora", flat=True)
+        )
+    else:
+        invalidar_calendario()
+
+
+@receiver(post_save, sender=RelatorioAula)
+def invalidar_calendario_relatorio(sender, instance, **kwargs):
+    # O professor que validou aparece nos eventos do FullCalendar
+    if RelatorioAula.aula.is_cached(instance):
+        invalidar_datas(instance.aula.data_hora)
+    else:
+        invalidar_datas(
+            *Aula.objects.filter(pk=instance.aula_id).values_list("data_hora", flat=True)
+        )
+
+
+@receiver(post_save, sender=Aluno)
+@receiver(post_delete, sender=Aluno)
+@receiver(post_save, sender=Modalidade)
+@receiver(post_delete, sender=Modalidade)
+def invalidar_calendario_nomes(sender, **kwargs):
+    # Nomes de alunos e modalidades aparecem no HTML de todos os meses
+    invalidar_calendario()
+
+
+@receiver(post_save, sender=CustomUser)
+def invalidar_calendario_usuario(sender, instance, update_fields=None, **kwargs):
+    # O login atualiza apenas 'last_login', o que não muda o calendário
+    if update_fields and set(update_fields) <= {"last_login"}:
+        return
+    invalidar_calendario()
+
+
+# --- ESTATÍSTICAS MATERIALIZADAS DOS ALUNOS ---
+
+
+@receiver(pre_delete, sender=Aula)
+def guardar_alunos_aula_excluida(sender, instance, **kwargs):
+    # Os vínculos somem junto com a aula; guarda os alunos para o recálculo
+    instance._aluno_ids_estatisticas = list(
+        Aula.alunos.through.objects.filter(aula=instance).values_list("aluno_id", flat=True)
+    )
+
+
+@receiver(post_delete, sender=Aula)
+def estatisticas_aula_excluida(sender, instance, **kwargs):
+    atualizar_estatisticas_aulas(
+        [instance], aluno_ids=getattr(instance, "_aluno_ids_estatisticas", [])
+    )
+
+
+@receiver(post_save, sender=PresencaAluno)
+@receiver(post_delete, sender=PresencaAluno)
+def estatisticas_presenca(sender, instance, **kwargs):
+    if PresencaAluno.aula.is_cached(instance):
+        datas = [instance.aula.data_hora]
+    else:
+        datas = Aula.objects.filter(pk=instance.aula_id).values_list("data_hora", flat=True)
+    atualizar_estatisticas((instance.aluno_id, mes_de_referencia(d)) for d in datas)
+
+
+def _guardar_ids_antes_clear(instance, relacionados):
+    instance._ids_antes_clear = set(relacionados.values_list("pk", flat=True))
+
+
+@receiver(m2m_changed, sender=Aula.alunos.through)
+def estatisticas_alunos_da_aula(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        _guardar_ids_antes_clear(instance, instance.aulas_aluno if reverse else instance.alunos)
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    ids = getattr(instance, "_ids_antes_clear", set()) if action == "post_clear" else pk_set
+    if not ids:
+        return
+    if reverse:
+        # Alteração feita pelo lado do aluno: ids são de aulas
+        datas = Aula.objects.filter(pk__in=ids).values_list("data_hora", flat=True)
+        atualizar_estatisticas((instance.pk, mes_de_referencia(d)) for d in datas)
+    else:
+        mes = mes_de_referencia(instance.data_hora)
+        atualizar_estatisticas((aluno_id, mes) for aluno_id in ids)
+
+
+@receiver(m2m_changed, sender=Aula.professores.through)
+def estatisticas_professores_da_aula(sender, instance, action, reverse, pk_set, **kwargs):
+    # Professores entram no "top professores" dos alunos presentes
+    if action == "pre_clear" and reverse:
+        _guardar_ids_antes_clear(instance, instance.aulas_lecionadas)
+        return
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+
+    if not reverse:
+        atualizar_estatisticas_aulas([instance])
+        return
+    aula_ids = getattr(instance, "_ids_antes_clear", set()) if action == "post_clear" else pk_set
+    if aula_ids:
+        atualizar_estatisticas_aulas(list(Aula.objects.filter(pk__in=aula_ids)))
+
+
+# --- GRADE DE HORÁRIOS (OcupacaoHorario) ---
+
+
+@receiver(post_save, sender=Aula)
+def ocupacao_aula_salva(sender, instance, created, **kwargs):
+    # Aulas novas ainda não têm alunos; os vínculos disparam m2m_changed
+    if not created:
+        atualizar_ocupacao_aulas([instance])
+
+
+@receiver(post_delete, sender=Aula)
+def ocupacao_aula_excluida(sender, instance, **kwargs):
+    atualizar_ocupacao(getattr(instance, "_aluno_ids_estatisticas", []))
+
+
+@receiver(m2m_changed, sender=Aula.alunos.through)
+def ocupacao_alunos_da_aula(sender, instance, action, reverse, pk_set, **kwargs):
+    # O pre_clear é guardado por estatisticas_alunos_da_aula
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if reverse:
+        atualizar_ocupacao([instance.pk])
+    else:
+        ids = getattr(instance, "_ids_antes_clear", set()) if action == "post_clear" else pk_set
+        atualizar_ocupacao(ids or [])
+
+
+@receiver(m2m_changed, sender=Aula.professores.through)
+def ocupacao_professores_da_aula(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        atualizar_ocupacao_aulas([instance])
+        return
+    aula_ids = getattr(instance, "_ids_antes_clear", set()) if action == "post_clear" else pk_set
+    if aula_ids:
+        atualizar_ocupacao_aulas(list(Aula.objects.filter(pk__in=aula_ids)))
+
+
+def _alunos_na_janela(**filtros):
+    return Aula.alunos.through.objects.filter(
+        aula__data_hora__date__gte=inicio_da_janela(), **filtros
+    ).values_list("aluno_id", flat=True)
+
+
+@receiver(post_init, sender=Modalidade)
+def guardar_nome_modalidade(sender, instance, **kwargs):
+    instance._nome_original = instance.__dict__.get("nome")
+
+
+@receiver(post_save, sender=Modalidade)
+def ocupacao_modalidade_renomeada(sender, instance, created, **kwargs):
+    # O nome da modalidade fica gravado nas ocorrências da grade
+    if not created and instance.nome != instance._nome_original:
+        atualizar_ocupacao(_alunos_na_janela(aula__modalidade=instance))
+    instance._nome_original = instance.nome
+
+
+@receiver(post_init, sender=CustomUser)
+def guardar_username_original(sender, instance, **kwargs):
+    instance._username_original = instance.__dict__.get("username")
+
+
+@receiver(post_save, sender=CustomUser)
+def ocupacao_professor_renomeado(sender, instance, created, **kwargs):
+    if not created and instance.username != instance._username_original:
+        atualizar_ocupacao(_alunos_na_janela(aula__professores=instance))
+    instance._username_original = instance.username
+
+
+@receiver(pre_delete, sender=CustomUser)
+def guardar_alunos_professor_excluido(sender, instance, **kwargs):
+    # Os vínculos com as aulas somem junto com o usuário
+    instance._aluno_ids_ocupacao = list(_alunos_na_janela(aula__professores=instance))
+
+
+@receiver(post_delete, sender=CustomUser)
+def ocupacao_professor_excluido(sender, instance, **kwargs):
+    atualizar_ocupacao(getattr(instance, "_aluno_ids_ocupacao", []))
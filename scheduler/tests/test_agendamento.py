@@ -85,4 +85,123 @@ def test_admin_ve_campo_de_professores(client, admin_user):
     
     # ★★★ CORREÇÃO AQUI ★★★
     # Alterado de "Professores Atribuídos" para "Professores" para corresponder ao template.
-    assert 'Professores</h5>' in response.content.decode()
\ No newline at end of file
+    assert 'Professores</h5>' in response.content.decode()
+
+def _dados_recorrencia(modalidade, aluno, data_hora, quantidade, unidade):
+    return {
+        'modalidade': modalidade.pk,
+        'data_hora': data_hora.strftime('%Y-%m-%dT%H:%M'),
+        'status': 'Agendada',
+        'recorrente_mensal': 'on',
+        'recorrencia_quantidade': quantidade,
+        'recorrencia_unidade': unidade,
+        'alunos-TOTAL_FORMS': '1',
+        'alunos-INITIAL_FORMS': '0',
+        'alunos-0-aluno': aluno.pk,
+    }
+
+
+@pytest.mark.django_db
+def test_recorrencia_em_lote_por_semanas(client, professor_user, aluno, modalidade):
+    """
+    GIVEN um professor logado
+    WHEN ele agenda uma recorrência de 8 semanas
+    THEN 8 aulas são criadas com aluno e professor
+    AND apenas uma entrada de auditoria resumida é gravada para as aulas.
+    """
+    from logs.models import AuditLog
+
+    client.login(username='prof_teste', password='password123')
+    url = reverse('scheduler:aula_agendar')
+    inicio = timezone.now() + timedelta(days=1)
+
+    response = client.post(url, data=_dados_recorrencia(modalidade, aluno, inicio, 8, 'semanas'))
+
+    assert response.status_code == 302
+    assert Aula.objects.count() == 8
+    assert Aula.objects.filter(alunos=aluno, professores=professor_user).count() == 8
+    assert AuditLog.objects.filter(resource_type='Aula').count() == 1
+    assert AuditLog.objects.get(resource_type='Aula').detail['quantidade'] == 8
+
+
+@pytest.mark.django_db
+def test_recorrencia_custo_constante_em_consultas(client, professor_user, aluno, modalidade):
+    """
+    GIVEN horizontes de recorrência diferentes
+    WHEN as aulas são agendadas
+    THEN o número de consultas é o mesmo para 2 e para 12 semanas.
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+
+    client.login(username='prof_teste', password='password123')
+    url = reverse('scheduler:aula_agendar')
+    inicio = timezone.now() + timedelta(days=1)
+
+    with CaptureQueriesContext(connection) as curta:
+        client.post(url, data=_dados_recorrencia(modalidade, aluno, inicio, 2, 'semanas'))
+    with CaptureQueriesContext(connection) as longa:
+        client.post(url, data=_dados_recorrencia(modalidade, aluno, inicio + timedelta(days=120), 12, 'semanas'))
+
+    assert Aula.objects.count() == 14
+    assert len(longa.captured_queries) == len(curta.captured_queries)
+
+
+@pytest.mark.django_db
+def test_recorrencia_sem_aulas_orfas_quando_uma_etapa_falha(
+    professor_user, aluno, modalidade, monkeypatch, django_capture_on_commit_callbacks
+):
+    """
+    GIVEN uma falha ao atualizar a ocupação, depois das aulas e vínculos inseridos
+    WHEN as aulas recorrentes são criadas em lote
+    THEN nenhuma aula fica gravada e o cache do calendário não é invalidado;
+         sem a falha, a invalidação roda no commit.
+    """
+    from scheduler import recorrencia
+
+    invalidadas = []
+    monkeypatch.setattr(recorrencia, 'invalidar_datas', lambda *datas: invalidadas.extend(datas))
+    monkeypatch.setattr(recorrencia, 'atualizar_ocupacao', lambda aluno_ids: 1 / 0)
+    datas = [timezone.now() + timedelta(weeks=semana) for semana in range(3)]
+
+    with django_capture_on_commit_callbacks(execute=True), pytest.raises(ZeroDivisionError):
+        recorrencia.criar_aulas_em_lote(datas, modalidade, 'Agendada', [aluno.pk], [professor_user.pk])
+
+    assert not Aula.objects.exists()
+    assert invalidadas == []
+
+    monkeypatch.setattr(recorrencia, 'atualizar_ocupacao', lambda aluno_ids: None)
+    with django_capture_on_commit_callbacks(execute=True):
+        recorrencia.criar_aulas_em_lote(datas, modalidade, 'Agendada', [aluno.pk], [professor_user.pk])
+
+    assert Aula.objects.filter(alunos=aluno, professores=professor_user).count() == 3
+    assert invalidadas == datas
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize('quantidade, unidade, valido', [
+    (12, 'meses', True),
+    (24, 'meses', False),
+    (52, 'semanas', True),
+    (53, 'semanas', False),
+])
+def test_limite_de_recorrencia_por_unidade(modalidade, quantidade, unidade, valido):
+    """
+    GIVEN uma recorrência pedida em meses ou em semanas
+    WHEN o AulaForm é validado
+    THEN o limite é de 12 meses ou 52 semanas, sem cortar o valor em silêncio.
+    """
+    from scheduler.forms import AulaForm
+
+    form = AulaForm(data={
+        'modalidade': modalidade.pk,
+        'data_hora': '2025-08-04T10:00',
+        'status': 'Agendada',
+        'recorrente_mensal': 'on',
+        'recorrencia_quantidade': quantidade,
+        'recorrencia_unidade': unidade,
+    })
+
+    assert form.is_valid() is valido
+    if not valido:
+        assert 'recorrencia_quantidade' in form.errors
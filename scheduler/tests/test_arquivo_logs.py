@@ -0,0 +1,220 @@
+import gzip
+import os
+from datetime import datetime, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.core.paginator import Paginator
+from django.urls import reverse
+from django.utils import timezone
+
+from logs import arquivo
+from logs.arquivo import Arquivados, RegistrosComArquivo, arquivar, ler_arquivados
+from logs.models import AuditLog
+
+
+def _log(quando, action="criou", username="Maria", resource_name="Aula #1", detail=None, tags=""):
+    log = AuditLog.objects.create(
+        username=username,
+        action=action,
+        resource_type="Aula",
+        resource_id="1",
+        resource_name=resource_name,
+        detail=detail,
+        tags=tags or f"aula,{action}",
+    )
+    AuditLog.objects.filter(pk=log.pk).update(timestamp=quando)
+    return log.pk
+
+
+def _em(ano, mes, dia, hora=10):
+    return timezone.make_aware(datetime(ano, mes, dia, hora))
+
+
+@pytest.fixture
+def logs_antigos(db):
+    """Dois registros de janeiro, um de fevereiro e um recente."""
+    AuditLog.objects.all().delete()  # log da criação do Site padrão
+    return {
+        "jan1": _log(_em(2025, 1, 10), username="Maria"),
+        "jan2": _log(_em(2025, 1, 20), action="atualizou", username="João", detail={"status": "Realizada"}),
+        "fev": _log(_em(2025, 2, 5), action="deletou", username="Maria"),
+        "recente": _log(timezone.now()),
+    }
+
+
+@pytest.mark.django_db
+def test_arquivar_move_para_o_arquivo_e_apaga_da_tabela(logs_antigos):
+    """
+    GIVEN registros de janeiro, fevereiro e um recente
+    WHEN o comando arquivar_logs roda com a retenção de 90 dias
+    THEN os antigos vão para um arquivo por mês, saem da tabela e o índice conta cada mês.
+    """
+    call_command("arquivar_logs", dias=90, lote=2)
+
+    assert list(AuditLog.objects.values_list("pk", flat=True)) == [logs_antigos["recente"]]
+    assert os.path.exists(arquivo.caminho_do_mes(datetime(2025, 1, 1)))
+    assert arquivo.indice_do_mes(datetime(2025, 1, 1))["total"] == 2
+    assert arquivo.indice_do_mes(datetime(2025, 2, 1))["por_hora"] == {"2025-02-05T10": {"deletou": 1}}
+
+    arquivados = ler_arquivados(_em(2024, 12, 1))
+    assert [log.pk for log in arquivados] == [logs_antigos["fev"], logs_antigos["jan2"], logs_antigos["jan1"]]
+    assert arquivados[1].detail == {"status": "Realizada"}
+
+
+@pytest.mark.django_db
+def test_repetir_depois_de_interrupcao_nao_duplica(logs_antigos):
+    """
+    GIVEN uma execução interrompida depois de gravar janeiro e antes de apagar da tabela
+    WHEN o arquivamento roda de novo
+    THEN os registros aparecem uma vez só na leitura e na contagem do índice.
+    """
+    janeiro = list(
+        AuditLog.objects.filter(timestamp__lt=_em(2025, 2, 1)).order_by("pk").values(*arquivo.CAMPOS)
+    )
+    arquivo._acrescentar(datetime(2025, 1, 1), janeiro)
+
+    arquivar(_em(2025, 3, 1))
+    arquivar(_em(2025, 3, 1))
+
+    assert arquivo.indice_do_mes(datetime(2025, 1, 1))["total"] == 2
+    assert len(Arquivados(_em(2024, 12, 1))) == 3
+    assert len(ler_arquivados(_em(2024, 12, 1))) == 3
+
+
+@pytest.mark.django_db
+def test_filtros_da_leitura(logs_antigos):
+    """
+    GIVEN registros arquivados de janeiro e fevereiro
+    WHEN a leitura usa início, usuário, recurso (no JSON de detalhes) e tags
+    THEN cada filtro devolve só os registros que o contêm.
+    """
+    arquivar(_em(2025, 3, 1))
+
+    assert [log.pk for log in ler_arquivados(_em(2025, 1, 15))] == [logs_antigos["fev"], logs_antigos["jan2"]]
+    assert [log.pk for log in ler_arquivados(_em(2024, 12, 1), username="maria")] == [
+        logs_antigos["fev"], logs_antigos["jan1"],
+    ]
+    assert [log.pk for log in ler_arquivados(_em(2024, 12, 1), resource="realizada")] == [logs_antigos["jan2"]]
+    assert [log.pk for log in ler_arquivados(_em(2024, 12, 1), tags="deletou")] == [logs_antigos["fev"]]
+
+
+@pytest.mark.django_db
+def test_busca_com_filtros_limitada_aos_meses_recentes(settings, logs_antigos):
+    """
+    GIVEN dois meses arquivados e a busca limitada a um mês
+    WHEN a leitura tem filtro de usuário
+    THEN só o mês mais recente é lido e o de fora é informado.
+    """
+    settings.AUDIT_LOG_ARQUIVO_MESES_BUSCA = 1
+    arquivar(_em(2025, 3, 1))
+
+    arquivados = Arquivados(_em(2024, 12, 1), username="maria")
+
+    assert [log.pk for log in arquivados] == [logs_antigos["fev"]]
+    assert arquivados.meses_fora_da_busca == [datetime(2025, 1, 1).date()]
+
+
+@pytest.mark.django_db
+def test_paginas_da_tabela_e_do_arquivo(monkeypatch, logs_antigos):
+    """
+    GIVEN um registro na tabela e três arquivados
+    WHEN a sequência é paginada de 2 em 2
+    THEN as páginas seguem a ordem tabela -> arquivo e cada uma só descompacta
+    o mês que ela alcança.
+    """
+    arquivar(_em(2025, 3, 1))
+    for mes in (datetime(2025, 1, 1), datetime(2025, 2, 1)):
+        arquivo.indice_do_mes(mes)
+    tabela = AuditLog.objects.order_by("-timestamp")
+
+    meses_lidos = []
+    ler_mes = arquivo._ler_mes
+    monkeypatch.setattr(arquivo, "_ler_mes", lambda mes: meses_lidos.append(mes) or ler_mes(mes))
+
+    paginator = Paginator(RegistrosComArquivo(tabela, Arquivados(_em(2024, 12, 15))), 2)
+    assert paginator.count == 4
+    assert meses_lidos == []
+
+    assert [log.pk for log in paginator.page(1)] == [logs_antigos["recente"], logs_antigos["fev"]]
+    assert meses_lidos == [datetime(2025, 2, 1).date()]
+    assert [log.pk for log in paginator.page(2)] == [logs_antigos["jan2"], logs_antigos["jan1"]]
+    assert meses_lidos == [datetime(2025, 2, 1).date(), datetime(2025, 1, 1).date()]
+
+
+@pytest.mark.django_db
+def test_pagina_do_arquivo_monta_so_os_registros_das_horas_dela(monkeypatch, logs_antigos):
+    """
+    GIVEN um mês arquivado com um registro em cada uma de várias horas
+    WHEN uma fatia do meio é pedida, com e sem filtro
+    THEN ela bate com a leitura completa e, sem filtro, só os registros das
+         horas da fatia viram AuditLog (o índice diz quais são).
+    """
+    for hora in range(11, 17):
+        _log(_em(2025, 1, 25, hora), username="Maria")
+    arquivar(_em(2025, 3, 1))
+    completos = [log.pk for log in ler_arquivados(_em(2025, 1, 1))]
+    da_maria = [log.pk for log in ler_arquivados(_em(2025, 1, 1), username="maria")]
+
+    montados = []
+    modelo = arquivo.AuditLog
+    monkeypatch.setattr(arquivo, "AuditLog", lambda **dados: montados.append(dados["id"]) or modelo(**dados))
+
+    assert [log.pk for log in Arquivados(_em(2025, 1, 1))[2:5]] == completos[2:5]
+    assert montados == completos[2:5]
+    assert [log.pk for log in Arquivados(_em(2025, 1, 1), username="maria")[2:5]] == da_maria[2:5]
+
+
+@pytest.mark.django_db
+def test_pagina_so_da_tabela_nao_descompacta_o_arquivo(monkeypatch, logs_antigos):
+    """
+    GIVEN meses arquivados com índice e o período começando antes deles
+    WHEN a página pedida está toda na tabela
+    THEN nenhum arquivo mensal é descompactado (a contagem vem do índice).
+    """
+    arquivar(_em(2025, 3, 1))
+    for mes in (datetime(2025, 1, 1), datetime(2025, 2, 1)):
+        arquivo.indice_do_mes(mes)
+    monkeypatch.setattr(arquivo, "_ler_mes", lambda mes: pytest.fail(f"leu {mes}"))
+
+    paginator = Paginator(RegistrosComArquivo(AuditLog.objects.order_by("-timestamp"), Arquivados(_em(2024, 11, 1))), 1)
+
+    assert paginator.count == 4
+    assert [log.pk for log in paginator.page(1)] == [logs_antigos["recente"]]
+
+
+@pytest.mark.django_db
+def test_membro_truncado_nao_derruba_a_leitura(logs_antigos):
+    """
+    GIVEN um arquivo de janeiro cuja última gravação foi interrompida no meio
+    WHEN o arquivo é lido
+    THEN os registros completos são devolvidos e o índice é refeito com eles.
+    """
+    arquivar(_em(2025, 3, 1))
+    caminho = arquivo.caminho_do_mes(datetime(2025, 1, 1))
+    with open(caminho, "ab") as bruto:
+        bruto.write(gzip.compress(b'{"id": 999, "timestamp": "2025-01-30T10:00:00Z"}\n')[:20])
+
+    assert [log.pk for log in ler_arquivados(_em(2025, 1, 1))][-2:] == [logs_antigos["jan2"], logs_antigos["jan1"]]
+    assert arquivo.indice_do_mes(datetime(2025, 1, 1))["total"] == 2
+
+
+@pytest.mark.django_db
+def test_api_de_logs_pagina_sobre_o_arquivo(client, admin_user, logs_antigos):
+    """
+    GIVEN registros arquivados e um recente na tabela
+    WHEN a API de logs é pedida com um período que alcança o arquivo
+    THEN o total e a página incluem os arquivados, depois dos da tabela.
+    """
+    arquivar(_em(2025, 3, 1))
+    client.login(username="admin_teste", password="password123")
+    AuditLog.objects.exclude(pk=logs_antigos["recente"]).delete()  # logs do admin e do login
+    dias = (timezone.now() - _em(2024, 12, 1)).days
+
+    resposta = client.get(reverse("logs:logs_api"), {"days": dias}).json()
+
+    assert resposta["total"] == 4
+    assert [log["id"] for log in resposta["logs"]] == [
+        logs_antigos["recente"], logs_antigos["fev"], logs_antigos["jan2"], logs_antigos["jan1"],
+    ]
+    assert resposta["arquivo_limitado"] is False
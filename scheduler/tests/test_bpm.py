@@ -0,0 +1,81 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from scheduler.models import Aula, ItemRudimento, PresencaAluno, RelatorioAula, extrair_bpm
+from scheduler.views import _evolucao_bpm
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("120", (120, 120, 120)),
+    ("120bpm", (120, 120, 120)),
+    ("80-100 bpm", (100, 80, 100)),
+    ("", (None, None, None)),
+    (None, (None, None, None)),
+    ("livre", (None, None, None)),
+])
+def test_extrair_bpm(texto, esperado):
+    assert extrair_bpm(texto) == esperado
+
+
+@pytest.fixture
+def relatorio(professor_user, modalidade, aluno):
+    aula = Aula.objects.create(
+        modalidade=modalidade,
+        data_hora=timezone.make_aware(timezone.datetime(2025, 8, 10, 10, 0)),
+        status="Realizada",
+    )
+    aula.professores.set([professor_user])
+    aula.alunos.set([aluno])
+    PresencaAluno.objects.create(aula=aula, aluno=aluno, status="presente")
+    return RelatorioAula.objects.create(aula=aula)
+
+
+@pytest.mark.django_db
+def test_bpm_numerico_preenchido_ao_salvar_e_pelo_comando(relatorio):
+    """
+    GIVEN exercícios com BPM em texto livre
+    WHEN são salvos, ou gravados sem passar pelo save() e depois preenchidos pelo comando
+    THEN os campos numéricos ficam corretos.
+    """
+    item = ItemRudimento.objects.create(relatorio=relatorio, descricao="Paradiddle", bpm="80-100")
+    assert (item.bpm_valor, item.bpm_min, item.bpm_max) == (100, 80, 100)
+
+    ItemRudimento.objects.filter(pk=item.pk).update(bpm="130", bpm_valor=None, bpm_min=None, bpm_max=None)
+    call_command("preencher_bpm_numerico")
+
+    item.refresh_from_db()
+    assert (item.bpm_valor, item.bpm_min, item.bpm_max) == (130, 130, 130)
+
+
+@pytest.mark.django_db
+def test_grafico_de_evolucao_usa_bpm_numerico(client, admin_user, aluno, relatorio):
+    """
+    GIVEN um exercício registrado com faixa de BPM
+    WHEN o perfil do aluno é aberto
+    THEN o gráfico de evolução usa o maior valor da faixa.
+    """
+    ItemRudimento.objects.create(relatorio=relatorio, descricao="paradiddle ", bpm="80-100 bpm")
+    client.login(username="admin_teste", password="password123")
+
+    contexto = client.get(reverse("scheduler:aluno_detalhe", args=[aluno.pk])).context
+
+    assert contexto["lista_exercicios_unicos"] == ["Paradiddle"]
+    assert contexto["dados_grafico_por_exercicio"]["Paradiddle"]["data"] == [{"x": "2025-08-10", "y": 100}]
+    assert contexto["evolucao_total_aulas"] == 1
+
+
+@pytest.mark.django_db
+def test_evolucao_anual_junta_exercicios_com_acento_em_caixas_diferentes(relatorio):
+    """
+    GIVEN o mesmo exercício registrado como "ACENTUAÇÃO" e "acentuação " (o LOWER do SQLite não converte o "Ç" e o "Ã")
+    WHEN a evolução de BPM do relatório anual é calculada
+    THEN os registros formam um único exercício, com o menor e o maior BPM dos dois.
+    """
+    ItemRudimento.objects.create(relatorio=relatorio, descricao="ACENTUAÇÃO", bpm="80")
+    ItemRudimento.objects.create(relatorio=relatorio, descricao="acentuação ", bpm="120")
+
+    assert _evolucao_bpm(ItemRudimento.objects.all()) == [
+        {"nome": "Acentuação", "min": 80, "max": 120, "delta": 40},
+    ]
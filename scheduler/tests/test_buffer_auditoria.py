@@ -0,0 +1,125 @@
+import time
+
+import pytest
+
+from logs import buffer as buffer_auditoria
+from logs.buffer import DESCARTAR_ANTIGOS, DESCARTAR_NOVOS, BufferAuditoria
+
+
+class BufferDeTeste(BufferAuditoria):
+    """Buffer que guarda os lotes em memória no lugar do bulk_create."""
+
+    def __init__(self, lote=100, intervalo=60, max_pendentes=100, overflow=DESCARTAR_ANTIGOS, com_thread=True):
+        super().__init__(lote, intervalo, max_pendentes, overflow)
+        self.lotes = []
+        self.com_thread = com_thread
+
+    def _iniciar(self):
+        if self.com_thread:
+            super()._iniciar()
+
+    def _gravar(self, registros):
+        if registros:
+            self.lotes.append(list(registros))
+
+
+def _esperar(condicao, timeout=3):
+    limite = time.monotonic() + timeout
+    while time.monotonic() < limite:
+        if condicao():
+            return True
+        time.sleep(0.01)
+    return condicao()
+
+
+@pytest.fixture
+def buffers():
+    criados = []
+    yield criados
+    for buffer in criados:
+        buffer.encerrar(timeout=2)
+
+
+def test_grava_quando_o_lote_enche(buffers):
+    """
+    GIVEN um buffer com lote de 3 e intervalo longo
+    WHEN 3 registros são enfileirados
+    THEN eles são gravados juntos, sem esperar o intervalo.
+    """
+    buffer = BufferDeTeste(lote=3)
+    buffers.append(buffer)
+
+    for registro in range(3):
+        buffer.enfileirar(registro)
+
+    assert _esperar(lambda: buffer.lotes == [[0, 1, 2]])
+
+
+def test_grava_quando_o_intervalo_vence(buffers):
+    """
+    GIVEN um buffer com lote grande e intervalo de 0,2 s
+    WHEN um único registro é enfileirado
+    THEN ele é gravado quando o intervalo vence.
+    """
+    buffer = BufferDeTeste(lote=100, intervalo=0.2)
+    buffers.append(buffer)
+
+    buffer.enfileirar("registro")
+
+    assert _esperar(lambda: buffer.lotes == [["registro"]])
+
+
+@pytest.mark.parametrize("overflow, esperado", [
+    (DESCARTAR_ANTIGOS, [2, 3]),
+    (DESCARTAR_NOVOS, [1, 2]),
+])
+def test_politicas_de_overflow(overflow, esperado):
+    """
+    GIVEN uma fila de 2 posições sem thread consumindo
+    WHEN 3 registros são enfileirados
+    THEN a política descarta o mais antigo ou o novo, e o descarte é contado.
+    """
+    buffer = BufferDeTeste(max_pendentes=2, overflow=overflow, com_thread=False)
+
+    for registro in (1, 2, 3):
+        buffer.enfileirar(registro)
+
+    assert [buffer.fila.get_nowait() for _ in range(buffer.fila.qsize())] == esperado
+    assert buffer.descartados == 1
+
+
+def test_encerrar_esvazia_a_fila():
+    """
+    GIVEN registros pendentes abaixo do lote e antes do intervalo
+    WHEN o buffer é encerrado (atexit)
+    THEN todos são gravados e a thread termina.
+    """
+    buffer = BufferDeTeste(lote=100, intervalo=60)
+    for registro in range(5):
+        buffer.enfileirar(registro)
+
+    buffer.encerrar(timeout=3)
+
+    assert [registro for lote in buffer.lotes for registro in lote] == [0, 1, 2, 3, 4]
+    assert not buffer._thread.is_alive()
+
+
+def test_reinicia_a_thread_depois_de_fork(buffers, monkeypatch):
+    """
+    GIVEN um buffer com a thread iniciada no processo pai
+    WHEN um registro é enfileirado em outro pid (processo filho após fork)
+    THEN uma nova thread é iniciada para o filho e grava o registro.
+    """
+    buffer = BufferDeTeste(lote=1)
+    buffers.append(buffer)
+    buffer.enfileirar("pai")
+    assert _esperar(lambda: buffer.lotes == [["pai"]])
+    thread_do_pai = buffer._thread
+
+    pid_filho = buffer._pid + 1
+    monkeypatch.setattr(buffer_auditoria.os, "getpid", lambda: pid_filho)
+    buffer.enfileirar("filho")
+
+    assert buffer._thread is not thread_do_pai
+    assert buffer._pid == pid_filho
+    assert _esperar(lambda: ["filho"] in buffer.lotes)
@@ -0,0 +1,98 @@
+import importlib
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.utils import timezone
+
+from logs import busca
+from logs.arquivo import arquivar
+from logs.busca import filtrar_contem
+from logs.models import AuditLog
+
+# O suíte roda com --nomigrations: a tabela FTS5 e os triggers são criados
+# com o mesmo SQL da migração
+migracao = importlib.import_module("logs.migrations.0002_indice_busca")
+
+
+@pytest.fixture
+def indice_fts(db, monkeypatch):
+    AuditLog.objects.all().delete()  # log da criação do Site padrão
+    with connection.cursor() as cursor:
+        for sql in migracao.CRIAR:
+            cursor.execute(sql)
+    monkeypatch.setattr(busca, "_DISPONIVEL", {})
+    yield
+    with connection.cursor() as cursor:
+        for sql in migracao.REMOVER:
+            cursor.execute(sql)
+
+
+def _indexados():
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT rowid FROM {migracao.TABELA} ORDER BY rowid")
+        return [linha[0] for linha in cursor.fetchall()]
+
+
+def _log(**campos):
+    return AuditLog.objects.create(action="atualizou", resource_type="Aula", **campos)
+
+
+def test_busca_substring_no_detalhe_pelo_indice(indice_fts):
+    """
+    GIVEN registros indexados pelo trigger de inserção
+    WHEN a busca usa um pedaço de um valor do JSON de detalhes, em outra caixa
+    THEN o registro é encontrado pela consulta FTS (MATCH), sem icontains.
+    """
+    alvo = _log(resource_name="Aula #1", detail={"status": {"old": "Agendada", "new": "Realizada"}})
+    _log(resource_name="Aula #2", detail={"status": {"old": "Agendada", "new": "Cancelada"}})
+
+    filtrado = filtrar_contem(AuditLog.objects.all(), ["resource_name", "resource_id", "detail"], "ALIZA")
+
+    assert list(filtrado) == [alvo]
+    assert "MATCH" in str(filtrado.query)
+    assert "LIKE" not in str(filtrado.query)
+
+
+def test_trigger_de_atualizacao_reindexa(indice_fts):
+    """
+    GIVEN um registro indexado
+    WHEN o nome do recurso é alterado
+    THEN a busca encontra o nome novo e não o antigo.
+    """
+    log = _log(resource_name="Aluno Joaquim")
+    AuditLog.objects.filter(pk=log.pk).update(resource_name="Aluno Benedito")
+
+    assert not filtrar_contem(AuditLog.objects.all(), ["resource_name"], "joaquim").exists()
+    assert list(filtrar_contem(AuditLog.objects.all(), ["resource_name"], "benedito")) == [log]
+
+
+def test_termo_curto_cai_no_icontains(indice_fts):
+    """
+    GIVEN o índice disponível
+    WHEN o termo tem menos de 3 caracteres (não cabe num trigrama)
+    THEN a busca usa icontains e ainda encontra a substring.
+    """
+    alvo = _log(username="Zé Bá")
+    _log(username="Maria")
+
+    filtrado = filtrar_contem(AuditLog.objects.all(), ["username"], "bá")
+
+    assert list(filtrado) == [alvo]
+    assert "MATCH" not in str(filtrado.query)
+
+
+def test_trigger_de_exclusao_acompanha_o_arquivamento(indice_fts):
+    """
+    GIVEN um registro antigo e um recente indexados
+    WHEN o antigo é arquivado (e apagado da tabela em lote)
+    THEN ele sai do índice e a busca só encontra o recente.
+    """
+    antigo = _log(resource_name="Aluno Joaquim")
+    recente = _log(resource_name="Aluno Joaquim Filho")
+    AuditLog.objects.filter(pk=antigo.pk).update(timestamp=timezone.now() - timedelta(days=200))
+
+    arquivar(timezone.now() - timedelta(days=90))
+
+    assert _indexados() == [recente.pk]
+    assert list(filtrar_contem(AuditLog.objects.all(), ["resource_name"], "joaquim")) == [recente]
@@ -0,0 +1,140 @@
+import pytest
+from django.core.cache import cache, caches
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from core.checks import verificar_cache_compartilhado
+from scheduler.calendario import _mes_key, invalidar_mes
+from scheduler.models import Aula
+
+
+@pytest.fixture(autouse=True)
+def limpar_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+def _criar_aula(modalidade, professor, aluno, dia=10):
+    aula = Aula.objects.create(
+        modalidade=modalidade,
+        data_hora=timezone.make_aware(timezone.datetime(2025, 8, dia, 10, 0)),
+    )
+    aula.professores.set([professor])
+    aula.alunos.set([aluno])
+    return aula
+
+
+@pytest.mark.django_db
+def test_calendario_servido_do_cache_sem_consultas(client, admin_user, professor_user, modalidade, aluno):
+    """
+    GIVEN um mês já renderizado
+    WHEN o mesmo mês é pedido de novo
+    THEN o HTML vem do cache sem consultar as aulas.
+    """
+    _criar_aula(modalidade, professor_user, aluno)
+    client.login(username='admin_teste', password='password123')
+    url = reverse('scheduler:get_calendario_html') + '?year=2025&month=8'
+
+    primeira = client.get(url)
+    assert 'Aluno de Teste Pytest' in primeira.content.decode()
+
+    with CaptureQueriesContext(connection) as ctx:
+        segunda = client.get(url)
+    assert segunda.content == primeira.content
+    assert not any('scheduler_aula' in q['sql'] for q in ctx.captured_queries)
+
+
+@pytest.mark.django_db
+def test_calendario_invalidado_ao_alterar_aula(client, admin_user, professor_user, modalidade, aluno):
+    """
+    GIVEN um mês em cache
+    WHEN uma aula do mês é cancelada ou movida para outro mês
+    THEN os dois meses afetados são renderizados novamente.
+    """
+    aula = _criar_aula(modalidade, professor_user, aluno)
+    client.login(username='admin_teste', password='password123')
+    url_agosto = reverse('scheduler:get_calendario_html') + '?year=2025&month=8'
+    url_setembro = reverse('scheduler:get_calendario_html') + '?year=2025&month=9'
+    client.get(url_agosto)
+    client.get(url_setembro)
+
+    aula.status = 'Cancelada'
+    aula.save()
+    assert 'status-cancelada' in client.get(url_agosto).content.decode()
+
+    aula.data_hora = timezone.make_aware(timezone.datetime(2025, 9, 3, 10, 0))
+    aula.save()
+    assert 'status-cancelada' not in client.get(url_agosto).content.decode()
+    assert 'status-cancelada' in client.get(url_setembro).content.decode()
+
+
+@pytest.mark.django_db
+def test_eventos_calendario_respondem_304_sem_alteracoes(client, admin_user, professor_user, modalidade, aluno):
+    """
+    GIVEN os eventos de um período já baixados pelo FullCalendar
+    WHEN o período é pedido de novo com o mesmo ETag
+    THEN a resposta é 304 sem consultar as aulas, e uma alteração gera novo ETag.
+    """
+    aula = _criar_aula(modalidade, professor_user, aluno)
+    client.login(username='admin_teste', password='password123')
+    url = reverse('scheduler:get_eventos_calendario') + '?start=2025-07-27T00:00:00Z&end=2025-09-07T00:00:00Z'
+
+    primeira = client.get(url)
+    assert primeira.status_code == 200
+    eventos = primeira.json()
+    assert eventos[0]['title'] == 'Aluno (Bateria Pytest)'
+    assert eventos[0]['extendedProps']['professor_atribuido'] == 'Prof_Teste'
+    etag = primeira['ETag']
+
+    with CaptureQueriesContext(connection) as ctx:
+        segunda = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert segunda.status_code == 304
+    assert not any('scheduler_aula' in q['sql'] for q in ctx.captured_queries)
+
+    aula.status = 'Cancelada'
+    aula.save()
+    terceira = client.get(url, HTTP_IF_NONE_MATCH=etag)
+    assert terceira.status_code == 200
+    assert terceira['ETag'] != etag
+    assert terceira.json()[0]['extendedProps']['status'] == 'Cancelada'
+
+
+
+@pytest.mark.django_db
+def test_eventos_sem_etag_com_cache_local(client, settings, admin_user, professor_user, modalidade, aluno):
+    """
+    GIVEN um cache local ao processo (versões não compartilhadas entre workers)
+    WHEN os eventos são pedidos com um If-None-Match
+    THEN não há ETag nem 304: a resposta vem sempre do banco.
+    """
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    _criar_aula(modalidade, professor_user, aluno)
+    client.login(username='admin_teste', password='password123')
+    url = reverse('scheduler:get_eventos_calendario') + '?start=2025-07-27T00:00:00Z&end=2025-09-07T00:00:00Z'
+
+    resposta = client.get(url, HTTP_IF_NONE_MATCH='"qualquer"')
+
+    assert resposta.status_code == 200
+    assert not resposta.has_header('ETag')
+    assert not resposta.has_header('Last-Modified')
+
+def test_versao_do_mes_vale_para_outros_processos(settings):
+    """
+    GIVEN o cache configurado (em arquivos, compartilhado)
+    WHEN um processo invalida um mês
+    THEN uma conexão independente com o cache, como a de outro processo, vê a
+         nova versão; com um cache local ao processo o check core.W001 avisa.
+    """
+    outro_processo = caches.create_connection('default')
+    antes = outro_processo.get(_mes_key(2025, 8))
+
+    invalidar_mes(2025, 8)
+
+    assert outro_processo.get(_mes_key(2025, 8)) not in (None, antes)
+    assert verificar_cache_compartilhado(None) == []
+
+    settings.CACHES = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+    assert [aviso.id for aviso in verificar_cache_compartilhado(None)] == ['core.W001']
@@ -0,0 +1,61 @@
+import pytest
+from datetime import timedelta
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from scheduler.conflitos import verificar_conflitos
+from scheduler.models import Aula
+
+
+@pytest.fixture
+def aula_existente(professor_user, aluno, modalidade):
+    aula = Aula.objects.create(
+        modalidade=modalidade,
+        data_hora=timezone.make_aware(timezone.datetime(2025, 8, 5, 10, 0)),
+    )
+    aula.professores.set([professor_user])
+    aula.alunos.set([aluno])
+    return aula
+
+
+@pytest.mark.django_db
+def test_conflito_considera_duracao_da_aula(aula_existente, professor_user, aluno):
+    """
+    GIVEN uma aula de 60 minutos às 10:00
+    WHEN são verificados horários às 10:30 e às 11:00
+    THEN apenas o horário das 10:30 é apontado como conflito.
+    """
+    inicio = aula_existente.data_hora
+    diagnosticos = verificar_conflitos(
+        [inicio + timedelta(minutes=30), inicio + timedelta(minutes=60)],
+        professor_ids=[professor_user.pk],
+        aluno_ids=[aluno.pk],
+        duracao_minutos=60,
+    )
+
+    assert diagnosticos[0]["professor"]["conflito"] is True
+    assert diagnosticos[0]["aluno"]["conflito"] is True
+    assert diagnosticos[0]["aluno"]["aluno_nome"] == aluno.nome_completo
+    assert diagnosticos[0]["aluno"]["aula_conflitante_pk"] == aula_existente.pk
+    assert diagnosticos[1]["professor"]["conflito"] is False
+    assert diagnosticos[1]["aluno"]["conflito"] is False
+
+
+@pytest.mark.django_db
+def test_recorrencia_verificada_com_numero_fixo_de_consultas(aula_existente, professor_user, aluno):
+    """
+    GIVEN várias datas candidatas sem conflito
+    WHEN a recorrência é verificada
+    THEN o número de consultas não depende da quantidade de datas.
+    """
+    base = aula_existente.data_hora + timedelta(days=1)
+    datas = [base + timedelta(weeks=i) for i in range(12)]
+
+    with CaptureQueriesContext(connection) as ctx:
+        diagnosticos = verificar_conflitos(
+            datas, professor_ids=[professor_user.pk], aluno_ids=[aluno.pk]
+        )
+
+    assert len(ctx.captured_queries) == 2
+    assert not any(d["professor"]["conflito"] or d["aluno"]["conflito"] for d in diagnosticos)
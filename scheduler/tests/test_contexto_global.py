@@ -0,0 +1,91 @@
+# scheduler/tests/test_contexto_global.py
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from core.models import UnidadeNegocio
+
+
+def _logar_com_unidade(client, unidade):
+    client.login(username='admin_teste', password='password123')
+    session = client.session
+    session['unidade_ativa_id'] = unidade.pk
+    session.save()
+
+
+@pytest.mark.django_db
+def test_pagina_simples_nao_consulta_contexto_global(client, admin_user):
+    """
+    GIVEN um admin logado com uma unidade de negócio ativa
+    WHEN uma página simples (reposições pendentes) é aberta pela segunda vez
+    THEN só há as consultas de sessão, usuário, da própria view e do log de acesso:
+         unidades, notificações e formulário de lead não vão ao banco.
+    """
+    _logar_com_unidade(client, UnidadeNegocio.objects.create(nome='Centro'))
+    url = reverse('scheduler:reposicao_listar')
+    client.get(url)
+
+    with CaptureQueriesContext(connection) as consultas:
+        resposta = client.get(url)
+
+    assert resposta.status_code == 200
+    sqls = [consulta['sql'] for consulta in consultas.captured_queries]
+    assert not [sql for sql in sqls if 'core_unidadenegocio' in sql or 'core_notificacao' in sql]
+    assert len(sqls) == 4
+
+
+@pytest.mark.django_db
+def test_cache_de_unidades_invalidado_ao_criar_unidade(client, admin_user):
+    """
+    GIVEN o menu de unidades já carregado em cache
+    WHEN uma nova unidade de negócio é criada
+    THEN a próxima página já mostra a nova unidade no seletor.
+    """
+    _logar_com_unidade(client, UnidadeNegocio.objects.create(nome='Centro'))
+    url = reverse('finances:transaction_list')
+    assert 'Filial Norte' not in client.get(url).content.decode()
+
+    UnidadeNegocio.objects.create(nome='Filial Norte')
+
+    assert 'Filial Norte' in client.get(url).content.decode()
+
+
+@pytest.mark.django_db
+def test_copia_local_das_unidades_expira(monkeypatch):
+    """
+    GIVEN as unidades já lidas pelo processo
+    WHEN uma unidade é renomeada sem signals (queryset.update)
+    THEN a cópia local continua valendo até o TTL e é relida depois dele.
+    """
+    from core import unidades
+
+    unidade = UnidadeNegocio.objects.create(nome='Centro')
+    agora = [1000.0]
+    monkeypatch.setattr(unidades.time, 'monotonic', lambda: agora[0])
+    assert [u.nome for u in unidades.listar_unidades()] == ['Centro']
+
+    UnidadeNegocio.objects.filter(pk=unidade.pk).update(nome='Centro Novo')
+    assert [u.nome for u in unidades.listar_unidades()] == ['Centro']
+
+    agora[0] += unidades.TTL_LOCAL + 1
+    assert [u.nome for u in unidades.listar_unidades()] == ['Centro Novo']
+
+
+@pytest.mark.django_db
+def test_lead_novo_usa_a_unidade_escola_atual():
+    """
+    GIVEN a unidade "Escola" lida pelo cache de unidades
+    WHEN ela é excluída e recriada
+    THEN o default de um Lead novo é o id da nova unidade.
+    """
+    from leads.models import Lead
+
+    antiga = UnidadeNegocio.objects.create(nome='Escola')
+    assert Lead().unidade_negocio_id == antiga.pk
+
+    antiga.delete()
+    nova = UnidadeNegocio.objects.create(nome='Escola')
+
+    assert Lead().unidade_negocio_id == nova.pk
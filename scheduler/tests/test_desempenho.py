@@ -0,0 +1,145 @@
+# scheduler/tests/test_desempenho.py
+
+import pytest
+from django.urls import reverse
+
+from logs.desempenho import consolidar
+from logs.models import AmostraRequisicao, ResumoDesempenhoHora
+
+
+@pytest.fixture
+def medicao_ativa(settings):
+    settings.DESEMPENHO = {
+        **settings.DESEMPENHO,
+        "ATIVO": True,
+        "AMOSTRAGEM": 1.0,
+        "ORCAMENTOS": {"scheduler:reposicao_listar": {"ms": 60000, "consultas": 1}},
+    }
+
+
+@pytest.mark.django_db
+def test_requisicao_medida_com_nome_da_view(client, admin_user, medicao_ativa):
+    """
+    GIVEN a medição de desempenho ligada e um orçamento de 1 consulta para a view
+    WHEN um admin abre a lista de reposições
+    THEN uma amostra é gravada com o nome da view, as consultas feitas e a violação marcada.
+    """
+    client.login(username='admin_teste', password='password123')
+
+    client.get(reverse('scheduler:reposicao_listar'))
+
+    amostra = AmostraRequisicao.objects.get(view='scheduler:reposicao_listar')
+    assert amostra.status == 200
+    assert amostra.consultas > 1
+    assert amostra.acima_do_orcamento is True
+    assert 0 < len(amostra.consultas_lentas) <= 3
+
+
+@pytest.mark.django_db
+def test_relatorio_lista_views_por_pior_p95(client, admin_user):
+    """
+    GIVEN amostras de duas views com tempos diferentes
+    WHEN o admin abre a página de desempenho
+    THEN a view mais lenta vem primeiro, com p95 calculado pelo histograma (erro de até 2%).
+    """
+    consolidar(AmostraRequisicao.objects.bulk_create(
+        [AmostraRequisicao(view='scheduler:dashboard', duracao_ms=ms, consultas=10) for ms in range(1, 101)]
+        + [AmostraRequisicao(view='scheduler:aula_listar', duracao_ms=5, consultas=3) for _ in range(10)]
+    ))
+    client.login(username='admin_teste', password='password123')
+
+    resposta = client.get(reverse('logs:desempenho'))
+
+    linhas = resposta.context['linhas']
+    assert [linha['view'] for linha in linhas] == ['scheduler:dashboard', 'scheduler:aula_listar']
+    assert linhas[0]['amostras'] == 100
+    assert linhas[0]['p95_ms'] == pytest.approx(95.05, rel=0.02)
+
+
+@pytest.mark.django_db
+def test_amostra_gravada_entra_no_resumo_da_hora(client, admin_user, medicao_ativa):
+    """
+    GIVEN a medição de desempenho ligada
+    WHEN a mesma view é aberta duas vezes
+    THEN o resumo da hora da view soma as duas amostras, com a violação e a pior amostra.
+    """
+    client.login(username='admin_teste', password='password123')
+
+    client.get(reverse('scheduler:reposicao_listar'))
+    client.get(reverse('scheduler:reposicao_listar'))
+
+    resumo = ResumoDesempenhoHora.objects.get(view='scheduler:reposicao_listar')
+    amostras = AmostraRequisicao.objects.filter(view='scheduler:reposicao_listar')
+    assert resumo.amostras == 2
+    assert resumo.violacoes == 2
+    assert resumo.max_consultas == max(amostra.consultas for amostra in amostras)
+    assert resumo.pior_ms == max(amostra.duracao_ms for amostra in amostras)
+    assert sum(resumo.histograma_consultas.values()) == 2
+
+
+@pytest.mark.django_db
+def test_relatorio_le_so_os_resumos(client, admin_user):
+    """
+    GIVEN amostras de uma view em duas horas, somadas em lotes diferentes, e uma hora fora da janela
+    WHEN o relatório das últimas 24 horas é montado
+    THEN percentis, máximo, SQL médio, violações e consultas lentas vêm dos resumos da janela,
+    sem consultar as amostras.
+    """
+    from datetime import timedelta
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+
+    from logs.desempenho import relatorio
+
+    agora = timezone.now()
+
+    def amostra(horas_atras, ms, consultas, **extra):
+        return AmostraRequisicao(
+            view='scheduler:dashboard', timestamp=agora - timedelta(hours=horas_atras),
+            duracao_ms=ms, consultas=consultas, tempo_sql_ms=2, **extra,
+        )
+
+    consolidar(AmostraRequisicao.objects.bulk_create([amostra(1, ms, 5) for ms in range(1, 51)]))
+    consolidar(AmostraRequisicao.objects.bulk_create(
+        [amostra(3, ms, 8) for ms in range(51, 100)]
+        + [amostra(3, 400, 30, acima_do_orcamento=True, consultas_lentas=[{"ms": 300, "sql": "SELECT 1"}])]
+    ))
+    consolidar(AmostraRequisicao.objects.bulk_create([amostra(48, 9000, 90)]))
+
+    with CaptureQueriesContext(connection) as consultas:
+        linha, = relatorio(agora - timedelta(hours=24))
+
+    assert not [q for q in consultas.captured_queries if 'logs_amostrarequisicao' in q['sql']]
+    assert linha['amostras'] == 100
+    assert linha['p50_ms'] == pytest.approx(50.5, rel=0.02)
+    assert linha['p99_ms'] == pytest.approx(102.01, rel=0.02)
+    assert linha['p95_consultas'] == pytest.approx(8)
+    assert linha['max_consultas'] == 30
+    assert linha['media_sql_ms'] == pytest.approx(2)
+    assert linha['violacoes'] == 1
+    assert linha['consultas_lentas'] == [{"ms": 300, "sql": "SELECT 1"}]
+
+
+@pytest.mark.django_db
+def test_limpar_amostras_apaga_resumos_antigos():
+    """
+    GIVEN resumos de hoje e de 20 dias atrás
+    WHEN as amostras com mais de 14 dias são apagadas
+    THEN o resumo antigo sai junto e o de hoje fica.
+    """
+    from datetime import timedelta
+
+    from django.utils import timezone
+
+    from logs.desempenho import limpar_amostras
+
+    agora = timezone.now()
+    consolidar(AmostraRequisicao.objects.bulk_create([
+        AmostraRequisicao(view='scheduler:dashboard', timestamp=agora, duracao_ms=10),
+        AmostraRequisicao(view='scheduler:dashboard', timestamp=agora - timedelta(days=20), duracao_ms=10),
+    ]))
+
+    assert limpar_amostras(agora - timedelta(days=14)) == 1
+    assert ResumoDesempenhoHora.objects.count() == 1
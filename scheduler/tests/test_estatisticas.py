@@ -0,0 +1,97 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from logs.models import AuditLog
+from scheduler.estatisticas import estatisticas_aluno
+from scheduler.models import Aula, EstatisticaAlunoMes, PresencaAluno
+
+
+def _criar_aula(modalidade, professor, aluno, mes=8, dia=10):
+    aula = Aula.objects.create(
+        modalidade=modalidade,
+        data_hora=timezone.make_aware(timezone.datetime(2025, mes, dia, 10, 0)),
+    )
+    aula.professores.set([professor])
+    aula.alunos.set([aluno])
+    return aula
+
+
+def _linhas(aluno):
+    return list(
+        EstatisticaAlunoMes.objects.filter(aluno=aluno).values_list(
+            "mes__month", "total_aulas", "realizadas", "ausencias", "canceladas", "agendadas"
+        )
+    )
+
+
+@pytest.mark.django_db
+def test_estatisticas_atualizadas_ao_validar_e_alterar_aulas(professor_user, modalidade, aluno):
+    """
+    GIVEN duas aulas agendadas de um aluno em agosto
+    WHEN uma é validada com presença e a outra é cancelada e movida para setembro
+    THEN as linhas de agosto e setembro refletem cada mudança.
+    """
+    validada = _criar_aula(modalidade, professor_user, aluno, dia=5)
+    movida = _criar_aula(modalidade, professor_user, aluno, dia=12)
+    assert _linhas(aluno) == [(8, 2, 0, 0, 0, 2)]
+
+    validada.status = "Realizada"
+    validada.save()
+    PresencaAluno.objects.create(aula=validada, aluno=aluno, status="presente")
+    movida.status = "Cancelada"
+    movida.data_hora = timezone.make_aware(timezone.datetime(2025, 9, 2, 10, 0))
+    movida.save()
+
+    assert _linhas(aluno) == [(8, 1, 1, 0, 0, 0), (9, 1, 0, 0, 1, 0)]
+    totais = estatisticas_aluno(aluno)
+    assert totais["top_professores"] == [
+        {"professores__pk": professor_user.pk, "professores__username": "prof_teste", "contagem": 1}
+    ]
+    assert totais["top_modalidades"] == [{"modalidade__nome": "Bateria Pytest", "contagem": 1}]
+
+
+@pytest.mark.django_db
+def test_comando_reconstroi_mesmo_resultado(professor_user, modalidade, aluno):
+    """
+    GIVEN estatísticas mantidas incrementalmente
+    WHEN o comando de recálculo completo é executado
+    THEN a tabela reconstruída é idêntica.
+    """
+    aula = _criar_aula(modalidade, professor_user, aluno)
+    aula.status = "Aluno Ausente"  # Aula.save() lança a ausência dos alunos
+    aula.save()
+    _criar_aula(modalidade, professor_user, aluno, mes=10)
+    incremental = _linhas(aluno)
+
+    EstatisticaAlunoMes.objects.all().delete()
+    call_command("recalcular_estatisticas_alunos")
+
+    assert _linhas(aluno) == incremental == [(8, 1, 0, 1, 0, 0), (10, 1, 0, 0, 0, 1)]
+    # Tabela derivada: apagar e regravar as linhas não gera logs de auditoria
+    assert not AuditLog.objects.filter(resource_type="Estatisticaalunomes").exists()
+
+
+@pytest.mark.django_db
+def test_perfil_do_aluno_le_tabela_materializada(client, admin_user, professor_user, modalidade, aluno):
+    """
+    GIVEN um aluno com uma aula realizada
+    WHEN o perfil é aberto sem filtros e com filtro de status
+    THEN os totais batem nos dois caminhos.
+    """
+    aula = _criar_aula(modalidade, professor_user, aluno)
+    aula.status = "Realizada"
+    aula.save()
+    PresencaAluno.objects.create(aula=aula, aluno=aluno, status="presente")
+    _criar_aula(modalidade, professor_user, aluno, dia=20)
+    client.login(username="admin_teste", password="password123")
+    url = reverse("scheduler:aluno_detalhe", args=[aluno.pk])
+
+    materializado = client.get(url).context
+    filtrado = client.get(url + "?data_inicial=2025-01-01").context
+
+    for chave in ["total_aulas", "total_realizadas", "total_aluno_ausente", "chart_data"]:
+        assert materializado[chave] == filtrado[chave]
+    assert materializado["total_aulas"] == 2
+    assert materializado["taxa_presenca"] == 100
@@ -0,0 +1,81 @@
+# scheduler/tests/test_exportacao_relatorio.py
+
+import csv
+import gzip
+import io
+from datetime import timedelta
+
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from openpyxl import load_workbook
+
+from scheduler.models import Aula, ItemRudimento, RelatorioAula
+
+
+@pytest.mark.django_db
+def test_relatorio_agregado_xlsx_em_partes(client, admin_user, professor_user, modalidade):
+    """
+    GIVEN duas aulas do professor, uma realizada e uma cancelada
+    WHEN o admin exporta o relatório gerencial
+    THEN a planilha chega em partes com os KPIs e as tabelas por professor e por categoria.
+    """
+    for status in ("Realizada", "Cancelada"):
+        aula = Aula.objects.create(modalidade=modalidade, data_hora=timezone.now(), status=status)
+        aula.professores.add(professor_user)
+    client.login(username='admin_teste', password='password123')
+
+    resposta = client.get(reverse('scheduler:exportar_relatorio_agregado'))
+
+    assert resposta.streaming
+    ws = load_workbook(io.BytesIO(b''.join(resposta.streaming_content)))['Relatorio Gerencial']
+    linhas = [linha[1:7] for linha in ws.iter_rows(values_only=True) if any(linha)]
+    assert linhas[0][0] == 'Resumo Geral do Período'
+    assert linhas[1][:2] == ('Total de Aulas no Período:', 2)
+    assert ('Prof_Teste', 2, 0, 0, '0.00%', None) in linhas
+    assert linhas[-1] == (modalidade.nome.title(), 2, 1, 0, 1, '50.00%')
+
+
+@pytest.mark.django_db
+def test_exportar_aulas_csv_em_lotes_e_gzip(client, admin_user, professor_user, aluno, modalidade):
+    """
+    GIVEN uma aula com relatório (teoria e dois rudimentos) e outra sem relatório
+    WHEN o admin exporta as atividades em CSV, com e sem gzip
+    THEN cada atividade vira uma linha, as consultas não dependem do número de aulas e o gzip traz o mesmo conteúdo.
+    """
+    com_relatorio = Aula.objects.create(modalidade=modalidade, data_hora=timezone.now(), status="Realizada")
+    com_relatorio.alunos.add(aluno)
+    com_relatorio.professores.add(professor_user)
+    relatorio = RelatorioAula.objects.create(
+        aula=com_relatorio, conteudo_teorico="Leitura", professor_que_validou=professor_user
+    )
+    ItemRudimento.objects.create(relatorio=relatorio, descricao="Toque simples", bpm="80", duracao_min=10)
+    ItemRudimento.objects.create(relatorio=relatorio, descricao="Toque duplo", bpm="70")
+    Aula.objects.create(modalidade=modalidade, data_hora=timezone.now() + timedelta(days=1))
+    client.login(username='admin_teste', password='password123')
+    url = reverse('scheduler:exportar_aulas')
+
+    with CaptureQueriesContext(connection) as consultas:
+        resposta = client.get(url)
+        conteudo = b''.join(resposta.streaming_content)
+
+    assert resposta.streaming
+    assert resposta['Content-Type'].startswith('text/csv')
+    linhas = list(csv.reader(io.StringIO(conteudo.decode('utf-8-sig')), delimiter=';'))
+    assert linhas[0][0] == 'ID Aula'
+    assert [linha[7:9] for linha in linhas[1:]] == [
+        ['Teoria', 'Leitura'],
+        ['Rudimento', 'Toque simples'],
+        ['Rudimento', 'Toque duplo'],
+        ['N/A', 'Aula sem relatório criado.'],
+    ]
+    assert linhas[2][9] == 'BPM: 80 / Duração: 10 min'
+    assert linhas[1][3:6] == [aluno.nome_completo.title(), 'Prof_Teste', 'Prof_Teste']
+    # Aulas + alunos + professores + três tipos de item, além de sessão/usuário
+    assert len([c for c in consultas.captured_queries if 'scheduler_' in c['sql']]) <= 7
+
+    comprimida = client.get(url, {'gzip': '1'})
+    assert comprimida['Content-Disposition'].endswith('.csv.gz"')
+    assert gzip.decompress(b''.join(comprimida.streaming_content)) == conteudo
@@ -0,0 +1,115 @@
+from datetime import timedelta
+
+import pytest
+from django.urls import reverse
+from django.utils import timezone
+
+from logs import arquivo
+from logs.arquivo import Arquivados, arquivar
+from logs.grafico import dados_grafico
+from logs.models import AuditLog
+
+
+def _log(quando, action="criou"):
+    log = AuditLog.objects.create(username="Maria", action=action, resource_type="Aula", tags=f"aula,{action}")
+    AuditLog.objects.filter(pk=log.pk).update(timestamp=quando)
+
+
+@pytest.fixture
+def sem_logs(db):
+    AuditLog.objects.all().delete()  # log da criação do Site padrão
+
+
+@pytest.mark.django_db
+def test_grafico_por_hora_preenche_as_horas_vazias(sem_logs):
+    """
+    GIVEN registros há 3 horas e agora, num período de 1 dia
+    WHEN o gráfico é montado
+    THEN a granularidade é por hora, todas as horas aparecem e as vazias valem zero.
+    """
+    agora = timezone.now()
+    _log(agora - timedelta(hours=3))
+    _log(agora - timedelta(hours=3), action="Atualizou")
+    _log(agora, action="deletou")
+    inicio = agora - timedelta(days=1)
+
+    dados = dados_grafico(AuditLog.objects.filter(timestamp__gte=inicio), inicio, 1)
+
+    assert dados["granularidade"] == "hora"
+    assert len(dados["labels"]) == 25
+    assert dados["labels"][-4] == timezone.localtime(agora - timedelta(hours=3)).strftime("%d/%m %H:00")
+    assert dados["series"]["criou"][-4] == 1
+    assert dados["series"]["atualizou"][-4] == 1
+    assert dados["series"]["deletou"][-1] == 1
+    assert sum(dados["series"]["criou"]) == 1
+    assert dados["series"]["visualizou"] == [0] * 25
+    assert dados["totais"] == {"criou": 1, "atualizou": 1, "deletou": 1, "visualizou": 0}
+
+
+@pytest.mark.django_db
+def test_grafico_por_dia(sem_logs):
+    """
+    GIVEN registros há 2 dias e hoje, num período de 7 dias
+    WHEN o gráfico é montado
+    THEN a granularidade é por dia, com um rótulo por dia e os totais do período.
+    """
+    agora = timezone.now()
+    _log(agora - timedelta(days=2))
+    _log(agora - timedelta(days=2))
+    _log(agora, action="visualizou")
+    inicio = agora - timedelta(days=7)
+
+    dados = dados_grafico(AuditLog.objects.filter(timestamp__gte=inicio), inicio, 7)
+
+    assert dados["granularidade"] == "dia"
+    assert len(dados["labels"]) == 8
+    assert dados["labels"][-1] == timezone.localtime(agora).strftime("%d/%m/%Y")
+    assert dados["series"]["criou"][-3] == 2
+    assert dados["series"]["visualizou"][-1] == 1
+    assert dados["totais"]["criou"] == 2
+
+
+@pytest.mark.django_db
+def test_grafico_conta_arquivados_pelo_indice(monkeypatch, sem_logs):
+    """
+    GIVEN registros arquivados há 40 e 70 dias e um na tabela
+    WHEN o gráfico de 120 dias é montado sem filtros
+    THEN os arquivados entram no dia certo, contados pelo índice sem descompactar os meses.
+    """
+    agora = timezone.now()
+    _log(agora - timedelta(days=70))
+    _log(agora - timedelta(days=40), action="deletou")
+    _log(agora - timedelta(days=40), action="deletou")
+    _log(agora)
+    arquivar(agora - timedelta(days=30))
+    inicio = agora - timedelta(days=120)
+    arquivados = Arquivados(inicio)
+    for mes in arquivados.meses:
+        arquivo.indice_do_mes(mes)
+    monkeypatch.setattr(arquivo, "_ler_mes", lambda mes: pytest.fail(f"leu {mes}"))
+
+    dados = dados_grafico(AuditLog.objects.filter(timestamp__gte=inicio), inicio, 120, arquivados)
+
+    rotulo = timezone.localtime(agora - timedelta(days=40)).strftime("%d/%m/%Y")
+    assert dados["series"]["deletou"][dados["labels"].index(rotulo)] == 2
+    assert dados["totais"] == {"criou": 2, "atualizou": 0, "deletou": 2, "visualizou": 0}
+
+
+@pytest.mark.django_db
+def test_api_do_grafico_com_filtro_conta_o_arquivo(client, admin_user, sem_logs):
+    """
+    GIVEN um registro arquivado e outro na tabela
+    WHEN a API do gráfico é pedida com filtro de ação
+    THEN as contagens somam tabela e arquivo com o mesmo filtro.
+    """
+    agora = timezone.now()
+    _log(agora - timedelta(days=40), action="deletou")
+    _log(agora - timedelta(days=40))
+    _log(agora - timedelta(hours=1), action="deletou")
+    arquivar(agora - timedelta(days=30))
+    client.login(username="admin_teste", password="password123")
+
+    dados = client.get(reverse("logs:logs_grafico_api"), {"days": 60, "tags": "deletou"}).json()
+
+    assert dados["granularidade"] == "dia"
+    assert dados["totais"] == {"criou": 0, "atualizou": 0, "deletou": 2, "visualizou": 0}
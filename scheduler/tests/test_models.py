@@ -57,4 +57,35 @@ def test_aula_nao_foi_substituida_property(admin_user, modalidade):
     aula.refresh_from_db()
 
     # Assert: A propriedade deve retornar False
-    assert aula.foi_substituida is False
\ No newline at end of file
+    assert aula.foi_substituida is False
+
+@pytest.mark.django_db
+def test_log_de_alteracao_da_aula_nao_consulta_os_alunos(admin_user, aluno, modalidade):
+    """
+    GIVEN uma Aula com aluno carregada do banco
+    WHEN só o status é alterado e salvo
+    THEN o log de auditoria usa um nome sem consultas (sem o __str__ que lista os alunos).
+    """
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from logs.models import AuditLog
+
+    aula = Aula.objects.create(
+        modalidade=modalidade,
+        data_hora=timezone.make_aware(timezone.datetime(2025, 8, 1, 10, 0)),
+        status='Agendada'
+    )
+    aula.alunos.set([aluno])
+    aula = Aula.objects.get(pk=aula.pk)
+
+    aula.status = 'Cancelada'
+    with CaptureQueriesContext(connection) as consultas:
+        aula.save()
+
+    # Até o INSERT do log: só o UPDATE da aula (o resto é dos recálculos derivados)
+    sqls = [q["sql"] for q in consultas.captured_queries]
+    ate_o_log = sqls[:next(i for i, sql in enumerate(sqls) if "logs_auditlog" in sql) + 1]
+    assert not any("scheduler_aula_alunos" in sql for sql in ate_o_log)
+    log = AuditLog.objects.filter(resource_type='Aula', action='atualizou').get()
+    assert log.resource_name == f"Aula #{aula.pk}"
+    assert log.detail == {"status": {"old": "Agendada", "new": "Cancelada"}}
@@ -0,0 +1,100 @@
+from datetime import datetime, time, timedelta
+
+import pytest
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from logs.models import AuditLog
+from scheduler.models import Aluno, Aula, OcupacaoHorario
+from scheduler.ocupacao import grade_horarios
+
+
+def _segunda_recente(semanas_atras):
+    hoje = timezone.localdate()
+    return hoje - timedelta(days=hoje.weekday(), weeks=semanas_atras)
+
+
+def _criar_aula(modalidade, professor, alunos, dia, hora=10, status="Agendada"):
+    aula = Aula.objects.create(
+        modalidade=modalidade,
+        data_hora=timezone.make_aware(datetime.combine(dia, time(hora))),
+        status=status,
+    )
+    aula.professores.set([professor])
+    aula.alunos.set(alunos)
+    return aula
+
+
+@pytest.mark.django_db
+def test_grade_mantida_pelos_signals(professor_user, modalidade, aluno):
+    """
+    GIVEN três aulas do aluno às segundas 10h e uma às quartas 15h
+    WHEN a grade é montada e uma das aulas de segunda é cancelada
+    THEN o horário principal deixa de ser fixo e vira variável.
+    """
+    aulas = [
+        _criar_aula(modalidade, professor_user, [aluno], _segunda_recente(s), status="Realizada")
+        for s in (1, 2, 3)
+    ]
+    _criar_aula(modalidade, professor_user, [aluno], _segunda_recente(4) + timedelta(days=2), hora=15)
+
+    grade = grade_horarios()
+    assert grade == {
+        "10:00": {0: {
+            "status": "fixo",
+            "alunos_texto": "Aluno de Teste",
+            "profs_texto": "Prof_teste",
+            "modalidades_texto": "Bateria Pytest",
+        }}
+    }
+
+    aulas[0].status = "Cancelada"
+    aulas[0].save()
+
+    assert grade_horarios()["10:00"][0]["status"] == "variavel"
+
+
+@pytest.mark.django_db
+def test_linhas_obsoletas_da_grade_nao_sao_auditadas(professor_user, modalidade, aluno):
+    """
+    GIVEN um aluno com aula às quartas 15h na grade
+    WHEN a aula é cancelada e a linha do horário deixa de existir
+    THEN a linha some da grade sem gerar log de auditoria (tabela derivada).
+    """
+    aula = _criar_aula(modalidade, professor_user, [aluno], _segunda_recente(1) + timedelta(days=2), hora=15)
+    assert OcupacaoHorario.objects.filter(aluno=aluno).exists()
+
+    aula.status = "Cancelada"
+    aula.save()
+
+    assert not OcupacaoHorario.objects.filter(aluno=aluno).exists()
+    assert not AuditLog.objects.filter(resource_type="Ocupacaohorario").exists()
+
+
+@pytest.mark.django_db
+def test_comando_reconstroi_e_view_usa_uma_consulta(client, admin_user, professor_user, modalidade, aluno):
+    """
+    GIVEN uma grade com vários alunos mantida incrementalmente
+    WHEN o comando de recálculo é executado e a grade é pedida via AJAX
+    THEN as linhas são idênticas e a grade é lida com uma única consulta.
+    """
+    outros = [Aluno.objects.create(nome_completo=f"{nome} Souza") for nome in ("Ana", "Bia", "Caio")]
+    for semanas in (1, 2):
+        _criar_aula(modalidade, professor_user, [aluno, *outros], _segunda_recente(semanas))
+    incremental = sorted(OcupacaoHorario.objects.values_list("aluno_id", "dia_semana", "hora", "ocorrencias"))
+
+    OcupacaoHorario.objects.all().delete()
+    call_command("recalcular_ocupacao_horarios")
+    assert sorted(OcupacaoHorario.objects.values_list("aluno_id", "dia_semana", "hora", "ocorrencias")) == incremental
+
+    with CaptureQueriesContext(connection) as consultas:
+        grade_horarios()
+    assert len(consultas) == 1
+
+    client.login(username="admin_teste", password="password123")
+    resposta = client.get(reverse("scheduler:get_horario_fixo_data"), HTTP_X_REQUESTED_WITH="XMLHttpRequest")
+    assert resposta.json()["10:00"]["0"]["status"] == "variavel"
+    assert len(resposta.json()["10:00"]["0"]["alunos_texto"].split("\n")) == 4
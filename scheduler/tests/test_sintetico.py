@@ -0,0 +1,52 @@
+# scheduler/tests/test_sintetico.py
+
+from datetime import date
+
+import pytest
+
+from core.sintetico import gerar_escola
+from finances.models import Receita
+from scheduler.models import Aula, ItemRudimento, PresencaAluno, RelatorioAula
+
+
+@pytest.mark.django_db
+def test_escola_sintetica_consistente():
+    """
+    GIVEN uma escola sintética pequena gerada com semente e data fixas
+    WHEN os dados são gravados em lote
+    THEN as contagens batem com o banco e as aulas têm aluno, professor,
+         presença e relatório coerentes com o status.
+    """
+    contagens = gerar_escola(alunos=6, professores=2, anos=1, semente=7, hoje=date(2025, 6, 30))
+
+    assert contagens['aulas'] == Aula.objects.count() > 0
+    assert not Aula.objects.filter(alunos__isnull=True).exists()
+    assert not Aula.objects.filter(professores__isnull=True).exists()
+    realizadas = Aula.objects.filter(status='Realizada')
+    assert RelatorioAula.objects.count() == realizadas.count()
+    assert PresencaAluno.objects.filter(status='ausente').count() == Aula.objects.filter(status='Aluno Ausente').count()
+    assert not ItemRudimento.objects.filter(bpm_valor__isnull=True).exists()
+    assert not Receita.objects.filter(status='recebido', transacao__isnull=True).exists()
+    assert not Aula.objects.filter(status='Agendada', data_hora__date__lte=date(2025, 6, 30)).exists()
+
+
+
+def test_benchmark_mede_com_o_relogio_na_data_dos_dados():
+    """
+    GIVEN a data de referência fixa do benchmark
+    WHEN o relógio é parado nela durante a medição
+    THEN timezone.localdate() e o `now` importado pelas views financeiras devolvem essa data,
+         e o relógio real volta ao sair do bloco.
+    """
+    from django.utils import timezone
+
+    from core.benchmark import relogio_parado
+    from finances import views as finances_views
+
+    hoje = date(2025, 6, 30)
+    with relogio_parado(hoje):
+        assert timezone.localdate() == hoje
+        assert timezone.localtime().date() == hoje
+        assert finances_views.now().date() == hoje
+
+    assert timezone.localdate() != hoje
@@ -3,20 +3,16 @@ import os
 import io
 import base64
 import re
-import matplotlib
 from django.conf import settings
-import matplotlib.pyplot as plt
 import google.generativeai as genai
 import json
-import markdown
 from django.db import transaction, DatabaseError
 from django.core.exceptions import ValidationError
 from django.shortcuts import render, get_object_or_404, redirect
 from django.utils.timezone import localtime
 from django.contrib.auth.decorators import login_required, user_passes_test
-from django.views.decorators.cache import never_cache
+from django.views.decorators.cache import never_cache, cache_control
 from django.template.loader import get_template
-from xhtml2pdf import pisa
 from django.contrib.staticfiles import finders
 from leads.models import Lead, InteracaoLead
 from .models import (
@@ -31,6 +27,14 @@ from .models import (
     TourVisto,
 )
 from finances.models import ReceitaRecorrente, Category, Receita, Transaction
+from finances.mensalidades import situacao_mensalidades, resumo_mensalidades, resumo_vazio
+from .calendario import renderizar_calendario, versoes_periodo, escopo_usuario
+from .conflitos import verificar_conflito, verificar_conflitos
+from .recorrencia import datas_recorrencia, criar_aulas_em_lote
+from .estatisticas import estatisticas_aluno
+from .ocupacao import grade_horarios, kpis_ocupacao
+from . import exportacao
+from .pdfs import entradas_relatorio_anual
 from django.utils import timezone
 
 # --- IMPORTS ATUALIZADOS ---
@@ -52,23 +56,22 @@ from .forms import (
 )
 from django.contrib import messages
 import calendar
-from datetime import datetime, date, timedelta
-from django.db.models import Count, Min, Case, When, Q, OuterRef, Subquery, F, Value as V
-from django.db.models.functions import TruncMonth, Coalesce
+from datetime import datetime, date, timedelta, timezone as dt_timezone
+from django.db.models import Count, Min, Max, Case, When, Q, OuterRef, Subquery, F, Value as V
+from django.db.models.functions import TruncMonth, Coalesce, Lower, Trim
 from django.core.paginator import Paginator
 from collections import defaultdict
 from django.urls import reverse
 from django.utils.safestring import mark_safe
-from django.views.decorators.http import require_POST
-from django.http import JsonResponse, HttpResponse
+from django.views.decorators.http import require_POST, condition
+from django.http import JsonResponse, HttpResponse, StreamingHttpResponse
 from django.template.loader import render_to_string
 from decimal import Decimal
 
-# --- NOVOS IMPORTS PARA O EXCEL ---
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Alignment
-from openpyxl.utils import get_column_letter
-matplotlib.use('Agg')
+# --- EXPORTAÇÕES (Excel em modo write-only, CSV em streaming, PDFs pela fila) ---
+from core.checks import cache_compartilhado
+from core.pdfs import resposta_pdf, solicitar_pdf
+from core.planilhas import Coluna, RelatorioPlanilha
 
 
 GEMINI_API_KEY = os.environ.get("GEMINI_API_KEY")
@@ -81,66 +84,21 @@ def is_admin(user):
     return user.is_authenticated and user.tipo == "admin"
 
 
-# --- Função auxiliar para verificar conflitos (NÃO É UMA VIEW) ---
-def _check_conflito_aula(professor_ids, data_hora, aula_id=None):
-    if not professor_ids:
-        return {"conflito": False, "mensagem": "Horário disponível."}
-    aulas_conflitantes = Aula.objects.filter(
-        professores__id__in=professor_ids, data_hora=data_hora
-    )
-    if aula_id:
-        aulas_conflitantes = aulas_conflitantes.exclude(pk=aula_id)
-    if aulas_conflitantes.exists():
-        # ... (lógica de mensagem de erro) ...
-        return {"conflito": True, "mensagem": "Conflito de horário detectado."}
-    return {"conflito": False, "mensagem": "Horário disponível."}
-
-
-def _check_conflito_aluno(aluno_ids, data_hora, aula_id=None):
-    """
-    Verifica se algum dos alunos já tem uma aula agendada no horário especificado.
-    Ignora aulas canceladas ou que já foram repostas.
-    """
-    if not aluno_ids:
-        return {"conflito": False}
-
-    status_de_conflito = ["Agendada", "Realizada", "Aluno Ausente"]
-
-    # ★ MUDANÇA: Adicionamos prefetch_related para performance ★
-    aulas_conflitantes = Aula.objects.filter(
-        alunos__id__in=aluno_ids,
-        data_hora=data_hora,
-        status__in=status_de_conflito
-    ).prefetch_related('alunos', 'professores').distinct() # Adicionado prefetch
-
-    if aula_id:
-        aulas_conflitantes = aulas_conflitantes.exclude(pk=aula_id)
+# --- Função auxiliar para mensagens de conflito (NÃO É UMA VIEW) ---
+def _mensagem_conflito_aluno(conflito_info_aluno):
+    aluno_nome = conflito_info_aluno.get('aluno_nome', 'Um dos alunos')
+    aula_pk = conflito_info_aluno.get('aula_conflitante_pk')
+    prof_nomes = conflito_info_aluno.get('professores_conflito', 'N/A')
 
-    aula_conflitante = aulas_conflitantes.first()
+    link_aula = reverse('scheduler:aula_validar', args=[aula_pk])
+    link_substituicao = reverse('scheduler:aulas_para_substituir')
 
-    if aula_conflitante:
-        aluno_nome = "Um dos alunos"
-        try:
-            ids_na_aula = aula_conflitante.alunos.values_list('id', flat=True)
-            id_comum = set(aluno_ids).intersection(ids_na_aula).pop()
-            aluno = Aluno.objects.get(id=id_comum)
-            aluno_nome = aluno.nome_completo
-        except:
-            pass 
-
-        # ★ NOVO: Pega os nomes dos professores da aula conflitante ★
-        prof_nomes = [p.username.title() for p in aula_conflitante.professores.all()]
-        professores_conflito = ", ".join(prof_nomes) if prof_nomes else "N/A"
-
-        return {
-            "conflito": True,
-            "aluno_nome": aluno_nome,
-            "aula_conflitante_pk": aula_conflitante.pk,
-            "aula_conflitante_nome": str(aula_conflitante),
-            "professores_conflito": professores_conflito, # ★ NOVO CAMPO RETORNADO ★
-        }
-    
-    return {"conflito": False}
+    return mark_safe(
+        f"<b>Conflito:</b> O aluno <strong>{aluno_nome}</strong> já tem uma aula com <strong>{prof_nomes}</strong> neste horário. "
+        f"<a href='{link_aula}' target='_blank' class='alert-link'>Clique para substituir essa aula</a>."
+        f"<br><small>Caso queira substituir outro professor, acesse a página de "
+        f"<a href='{link_substituicao}' target='_blank' class='alert-link'>Substituições</a>.</small>"
+    )
 
 
 # --- Views Principais (dashboard) ---
@@ -190,59 +148,17 @@ def dashboard(request):
             data_criacao__year=today.year, data_criacao__month=today.month
         ).count()
 
-        # 3. Stats Financeiros
-        kpi_recebido = kpi_atrasado = kpi_em_aberto = kpi_previsto = Decimal("0.00")
-        count_recebido = count_atrasado = count_em_aberto = count_previsto = 0
+        # 3. Stats Financeiros (mesmas regras da lista de mensalidades)
         kpi_mes_ref, kpi_ano_ref = today.month, today.year
-        
+        kpis_mensalidade = resumo_vazio()
+
         unidade_id = request.session.get("unidade_ativa_id")
         if unidade_id:
             cat_mensalidade = Category.objects.filter(name__iexact="Mensalidade", unidade_negocio_id=unidade_id).first()
             if cat_mensalidade:
-                receitas_dict = {r.aluno_id: r for r in Receita.objects.filter(
-                    unidade_negocio_id=unidade_id, categoria=cat_mensalidade,
-                    data_competencia__year=kpi_ano_ref, data_competencia__month=kpi_mes_ref
-                ).select_related('transacao')}
-                
-                transacoes_dict = {t.student_id: t for t in Transaction.objects.filter(
-                    unidade_negocio_id=unidade_id, category=cat_mensalidade,
-                    transaction_date__year=kpi_ano_ref, transaction_date__month=kpi_mes_ref,
-                    receita__isnull=True, student__isnull=False
-                )}
-
-                for aluno in Aluno.objects.filter(status="ativo"):
-                    valor, status = Decimal("0.00"), ""
-                    
-                    # Cálculo seguro do último dia do mês para evitar ValueError
-                    _, ultimo_dia_mes = calendar.monthrange(kpi_ano_ref, kpi_mes_ref)
-                    
-                    if aluno.id in receitas_dict:
-                        r = receitas_dict[aluno.id]
-                        valor, status = r.valor, ('Paga' if r.status == 'recebido' or r.transacao else 'Pendente')
-                        if status == 'Pendente':
-                            dia_vencimento = min(aluno.dia_vencimento or 28, ultimo_dia_mes)
-                            venc = r.data_recebimento or date(kpi_ano_ref, kpi_mes_ref, dia_vencimento)
-                            status = 'Atrasada' if today > venc else 'Em aberto'
-                    elif aluno.id in transacoes_dict:
-                        valor, status = transacoes_dict[aluno.id].amount, 'Paga'
-                    elif aluno.valor_mensalidade and aluno.dia_vencimento:
-                        valor = aluno.valor_mensalidade
-                        dia_vencimento = min(aluno.dia_vencimento, ultimo_dia_mes)
-                        venc = date(kpi_ano_ref, kpi_mes_ref, dia_vencimento)
-                        status = 'Atrasada' if today > venc else 'Em aberto'
-                    
-                    if status == 'Paga': 
-                        kpi_recebido += valor
-                        count_recebido += 1
-                    elif status == 'Atrasada': 
-                        kpi_atrasado += valor
-                        count_atrasado += 1
-                    elif status == 'Em aberto': 
-                        kpi_em_aberto += valor
-                        count_em_aberto += 1
-
-                kpi_previsto = kpi_recebido + kpi_atrasado + kpi_em_aberto
-                count_previsto = count_recebido + count_atrasado + count_em_aberto
+                kpis_mensalidade = resumo_mensalidades(
+                    situacao_mensalidades(unidade_id, cat_mensalidade, kpi_ano_ref, kpi_mes_ref, hoje=today)
+                )
 
         contexto = {
             "titulo": f"Painel de Controle - {request.user.get_tipo_display()}",
@@ -254,10 +170,7 @@ def dashboard(request):
             "primeiro_dia_mes": today.replace(day=1).strftime("%Y-%m-%d"),
             "ultimo_dia_mes": today.replace(day=calendar.monthrange(today.year, today.month)[1]).strftime("%Y-%m-%d"),
             "aulas_pendentes_validacao": aulas_pendentes_validacao,
-            "kpi_recebido": kpi_recebido, "count_recebido": count_recebido,
-            "kpi_atrasado": kpi_atrasado, "count_atrasado": count_atrasado,
-            "kpi_em_aberto": kpi_em_aberto, "count_em_aberto": count_em_aberto,
-            "kpi_previsto": kpi_previsto, "count_previsto": count_previsto,
+            **kpis_mensalidade,
             "kpi_mes_ref": kpi_mes_ref, "kpi_ano_ref": kpi_ano_ref,
         }
         ja_viu_tour = request.user.tours_vistos.filter(tour_id="horarios_fixos_v1").exists()
@@ -275,25 +188,10 @@ def dashboard(request):
         }
 
     # --- Lógica do Calendário e Agenda Lateral ---
-    aulas_do_mes = (
-        aulas_qs.filter(data_hora__year=year, data_hora__month=month)
-        .select_related("modalidade")
-        .prefetch_related("alunos", "professores")
-        .order_by("data_hora")
+    # O HTML do mês vem do cache e só é reconstruído quando alguma aula do mês muda.
+    calendario_html = renderizar_calendario(
+        request.user, year, month, professor_filtro_id, today=today
     )
-    
-    aulas_por_dia = defaultdict(list)
-    for aula in aulas_do_mes:
-        aulas_por_dia[localtime(aula.data_hora).day].append(aula)
-
-    cal = calendar.Calendar(firstweekday=6)
-    semanas_do_mes = cal.monthdayscalendar(year, month)
-    calendario_final = []
-    for semana in semanas_do_mes:
-        semana_com_aulas = []
-        for dia in semana:
-            semana_com_aulas.append({"dia": dia, "aulas": aulas_por_dia.get(dia, [])})
-        calendario_final.append(semana_com_aulas)
 
     AlunoFormSetModal = formset_factory(AlunoChoiceForm, extra=1, can_delete=False)
     ProfessorFormSetModal = formset_factory(ProfessorChoiceForm, extra=1, can_delete=False)
@@ -301,8 +199,7 @@ def dashboard(request):
     contexto.update({
         "today": today,
         "mes_atual": date(year, month, 1),
-        "calendario_mes": calendario_final,
-        "aulas_do_mes_lista": aulas_do_mes,
+        "calendario_html": calendario_html,
         "today_iso": today_iso,
         "week_start_iso": week_start_iso,
         "week_end_iso": week_end_iso,
@@ -323,47 +220,9 @@ def get_calendario_html(request):
     except (ValueError, TypeError):
         return HttpResponse("Parâmetros de ano/mês inválidos.", status=400)
 
-    # ★★★ LÓGICA DE FILTRO ATUALIZADA ★★★
     professor_filtro_id = request.GET.get("professor_filtro_id")
-
-    if request.user.tipo in ["admin", "comercial"]:
-        aulas_qs = Aula.objects.all()
-        if professor_filtro_id and professor_filtro_id.isdigit():
-            # Usamos distinct() para evitar duplicatas e garantimos que o ID é válido
-            aulas_qs = aulas_qs.filter(professores__id=professor_filtro_id).distinct()
-    else:
-        aulas_qs = Aula.objects.filter(professores=request.user).distinct()
-
-    # O resto da função permanece igual
-    aulas_do_mes = (
-        aulas_qs.filter(data_hora__year=year, data_hora__month=month)
-        .select_related("modalidade")
-        .prefetch_related("alunos", "professores")
-        .order_by("data_hora")
-    )
-
-    aulas_por_dia = defaultdict(list)
-    for aula in aulas_do_mes:
-        aulas_por_dia[localtime(aula.data_hora).day].append(aula)
-
-    cal = calendar.Calendar(firstweekday=6)
-    semanas_do_mes = cal.monthdayscalendar(year, month)
-    calendario_final = []
-    for semana in semanas_do_mes:
-        semana_com_aulas = []
-        for dia in semana:
-            semana_com_aulas.append({"dia": dia, "aulas": aulas_por_dia.get(dia, [])})
-        calendario_final.append(semana_com_aulas)
-
-    contexto = {
-        "calendario_mes": calendario_final,
-        "aulas_do_mes_lista": aulas_do_mes,
-        "mes_atual": date(year, month, 1),
-        "today": date.today(),
-    }
-
-    html = render_to_string(
-        "scheduler/partials/calendario_content.html", contexto, request=request
+    html = renderizar_calendario(
+        request.user, year, month, professor_filtro_id, today=date.today()
     )
     return HttpResponse(html)
 
@@ -471,29 +330,26 @@ def agendar_aula(request):
                     is_recorrente = False
 
                 if is_recorrente:
-                    dia_semana = data_hora_inicial.weekday()
-                    mes, ano = data_hora_inicial.month, data_hora_inicial.year
-                    cal = calendar.Calendar()
-                    for dia in cal.itermonthdates(ano, mes):
-                        if (
-                            dia.month == mes
-                            and dia.weekday() == dia_semana
-                            and dia >= data_hora_inicial.date()
-                        ):
-                            datas_para_agendar.append(
-                                data_hora_inicial.replace(
-                                    year=dia.year, month=dia.month, day=dia.day
-                                )
-                            )
+                    datas_para_agendar = datas_recorrencia(
+                        data_hora_inicial,
+                        form.cleaned_data.get("recorrencia_quantidade"),
+                        form.cleaned_data.get("recorrencia_unidade"),
+                    )
                 else:
                     datas_para_agendar.append(data_hora_inicial)
 
+                # Todas as datas são verificadas de uma vez (uma consulta por tipo de participante)
+                diagnosticos = verificar_conflitos(
+                    datas_para_agendar,
+                    professor_ids=professores_ids,
+                    aluno_ids=alunos_ids if not is_ac else None,
+                    duracao_minutos=modalidade.duracao_minutos,
+                )
+
                 conflitos_encontrados = []
-                for data_agendamento in datas_para_agendar:
-                    # 1. Checagem de professor (já existe)
-                    conflito_info_prof = _check_conflito_aula(
-                        list(professores_ids), data_agendamento
-                    )
+                for diagnostico in diagnosticos:
+                    data_agendamento = diagnostico["data_hora"]
+                    conflito_info_prof = diagnostico["professor"]
                     if conflito_info_prof["conflito"]:
                         mensagem = conflito_info_prof.get("mensagem", "Conflito de horário de professor")
                         conflitos_encontrados.append(
@@ -501,28 +357,10 @@ def agendar_aula(request):
                         )
                         continue  # Se o prof não pode, nem checa o aluno
 
-                    if not is_ac: 
-                        conflito_info_aluno = _check_conflito_aluno(
-                            list(alunos_ids), data_agendamento
+                    if diagnostico["aluno"]["conflito"]:
+                        conflitos_encontrados.append(
+                            _mensagem_conflito_aluno(diagnostico["aluno"])
                         )
-                        if conflito_info_aluno["conflito"]:
-                            aluno_nome = conflito_info_aluno.get('aluno_nome', 'Um dos alunos')
-                            aula_pk = conflito_info_aluno.get('aula_conflitante_pk')
-                            prof_nomes = conflito_info_aluno.get('professores_conflito', 'N/A')
-                            
-                            # Constrói a mensagem
-                            link_aula = reverse('scheduler:aula_validar', args=[aula_pk])
-                            # ★ LINK CORRIGIDO ★
-                            link_substituicao = reverse('scheduler:aulas_para_substituir') 
-                            
-                            mensagem_html = (
-                                f"<b>Conflito:</b> O aluno <strong>{aluno_nome}</strong> já tem uma aula com <strong>{prof_nomes}</strong> neste horário. "
-                                f"<a href='{link_aula}' target='_blank' class='alert-link'>Clique para substituir essa aula</a>."
-                                f"<br><small>Caso queira substituir outro professor, acesse a página de "
-                                f"<a href='{link_substituicao}' target='_blank' class='alert-link'>Substituições</a>.</small>"
-                            )
-                            
-                            conflitos_encontrados.append(mark_safe(mensagem_html))
 
                 if conflitos_encontrados:
                     if is_ajax:
@@ -533,20 +371,24 @@ def agendar_aula(request):
                     for erro in conflitos_encontrados:
                         messages.error(request, erro)
                 else:
-                    aulas_criadas_count = 0
-                    aula_principal_criada = None
-                    for data_agendamento in datas_para_agendar:
-                        # Agora, a variável 'status' sempre terá um valor válido.
+                    if is_recorrente:
+                        # Recorrência: inserção em lote com número fixo de consultas
+                        aulas_criadas = criar_aulas_em_lote(
+                            datas_para_agendar, modalidade, status,
+                            alunos_ids, professores_ids, request=request,
+                        )
+                    else:
                         nova_aula = Aula.objects.create(
                             modalidade=modalidade,
-                            data_hora=data_agendamento,
+                            data_hora=datas_para_agendar[0],
                             status=status,
                         )
                         nova_aula.alunos.set(list(alunos_ids))
                         nova_aula.professores.set(list(professores_ids))
-                        if aulas_criadas_count == 0:
-                            aula_principal_criada = nova_aula
-                        aulas_criadas_count += 1
+                        aulas_criadas = [nova_aula]
+
+                    aulas_criadas_count = len(aulas_criadas)
+                    aula_principal_criada = aulas_criadas[0] if aulas_criadas else None
 
                     if reposicao_de_id_hidden and aula_principal_criada:
                         try:
@@ -657,17 +499,15 @@ def editar_aula(request, pk):
             modalidade = form.cleaned_data.get("modalidade")
             is_ac = "atividade complementar" in modalidade.nome.lower()
 
-            # 1. Checa conflito de Professor
-            conflito_info_prof = _check_conflito_aula(
-                list(professores_ids), data_hora_nova, aula_id=aula.pk
+            diagnostico = verificar_conflito(
+                data_hora_nova,
+                professor_ids=professores_ids,
+                aluno_ids=alunos_ids if not is_ac else None,  # Só checa aluno se não for AC
+                duracao_minutos=modalidade.duracao_minutos,
+                aula_id=aula.pk,
             )
-            
-            # 2. Checa conflito de Aluno
-            conflito_info_aluno = {"conflito": False} # Valor padrão
-            if not is_ac: # Só checa aluno se não for AC
-                conflito_info_aluno = _check_conflito_aluno(
-                    list(alunos_ids), data_hora_nova, aula_id=aula.pk
-                )
+            conflito_info_prof = diagnostico["professor"]
+            conflito_info_aluno = diagnostico["aluno"]
 
             if conflito_info_prof["conflito"]:
                 messages.error(
@@ -675,22 +515,7 @@ def editar_aula(request, pk):
                     f"Não foi possível atualizar a aula: {conflito_info_prof['mensagem']}",
                 )
             elif conflito_info_aluno["conflito"]:
-                # ★ MENSAGEM RICA E LINK CORRETO APLICADOS AQUI ★
-                aluno_nome = conflito_info_aluno.get('aluno_nome', 'Um dos alunos')
-                aula_pk = conflito_info_aluno.get('aula_conflitante_pk')
-                prof_nomes = conflito_info_aluno.get('professores_conflito', 'N/A')
-                
-                link_aula = reverse('scheduler:aula_validar', args=[aula_pk])
-                # ★ LINK CORRIGIDO ★
-                link_substituicao = reverse('scheduler:aulas_para_substituir')
-                
-                mensagem_html = (
-                    f"<b>Conflito:</b> O aluno <strong>{aluno_nome}</strong> já tem uma aula com <strong>{prof_nomes}</strong> neste horário. "
-                    f"<a href='{link_aula}' target='_blank' class='alert-link'>Clique para substituir essa aula</a>."
-                    f"<br><small>Caso queira substituir outro professor, acesse a página de "
-                    f"<a href='{link_substituicao}' target='_blank' class='alert-link'>Substituições</a>.</small>"
-                )
-                messages.error(request, mark_safe(mensagem_html))
+                messages.error(request, _mensagem_conflito_aluno(conflito_info_aluno))
             else:
                 aula_salva = form.save(
                     commit=False
@@ -700,28 +525,22 @@ def editar_aula(request, pk):
                 aula_salva.save()  # Salva o M2M
 
                 if is_recorrente:
-                    datas_para_agendar = []
-                    dia_semana = data_hora_nova.weekday()
-                    mes, ano = data_hora_nova.month, data_hora_nova.year
-                    cal = calendar.Calendar()
-
-                    for dia in cal.itermonthdates(ano, mes):
-                        if (
-                            dia.month == mes
-                            and dia.weekday() == dia_semana
-                            and dia > data_hora_nova.date()
-                        ):
-                            nova_data_hora = data_hora_nova.replace(
-                                year=dia.year, month=dia.month, day=dia.day
-                            )
-                            datas_para_agendar.append(nova_data_hora)
+                    datas_para_agendar = datas_recorrencia(
+                        data_hora_nova,
+                        form.cleaned_data.get("recorrencia_quantidade"),
+                        form.cleaned_data.get("recorrencia_unidade"),
+                        incluir_inicial=False,
+                    )
 
                     conflitos_novos = [
-                        info["mensagem"]
-                        for dt in datas_para_agendar
-                        if (info := _check_conflito_aula(list(professores_ids), dt))[
-                            "conflito"
-                        ]
+                        diagnostico["professor"]["mensagem"]
+                        for diagnostico in verificar_conflitos(
+                            datas_para_agendar,
+                            professor_ids=professores_ids,
+                            duracao_minutos=aula_salva.modalidade.duracao_minutos,
+                            aula_id=aula_salva.pk,
+                        )
+                        if diagnostico["professor"]["conflito"]
                     ]
 
                     if conflitos_novos:
@@ -732,16 +551,12 @@ def editar_aula(request, pk):
                         for erro in conflitos_novos:
                             messages.error(request, erro)
                     else:
-                        aulas_criadas_count = 0
-                        for data_agendamento in datas_para_agendar:
-                            nova_aula = Aula.objects.create(
-                                modalidade=aula_salva.modalidade,
-                                data_hora=data_agendamento,
-                                status=aula_salva.status,
+                        aulas_criadas_count = len(
+                            criar_aulas_em_lote(
+                                datas_para_agendar, aula_salva.modalidade, aula_salva.status,
+                                alunos_ids, professores_ids, request=request,
                             )
-                            nova_aula.alunos.set(list(alunos_ids))
-                            nova_aula.professores.set(list(professores_ids))
-                            aulas_criadas_count += 1
+                        )
 
                         if aulas_criadas_count > 0:
                             messages.success(
@@ -1094,6 +909,38 @@ def calculate_moving_average(data_points, window_size=3):
     return result
 
 
+def _estatisticas_aluno_filtradas(aulas_do_aluno, aulas_com_presenca):
+    """
+    Totais do perfil do aluno calculados direto do histórico, usados quando há
+    filtro de período ou status (a tabela materializada guarda o mês inteiro).
+    """
+    aulas_presente = aulas_com_presenca.filter(status_presenca_aluno="presente")
+    return {
+        "realizadas": aulas_com_presenca.filter(
+            status__in=["Realizada", "Aluno Ausente"], status_presenca_aluno="presente"
+        ).count(),
+        "ausencias": aulas_com_presenca.filter(
+            status__in=["Realizada", "Aluno Ausente"], status_presenca_aluno="ausente"
+        )
+        .exclude(status="Reposta")
+        .count(),
+        "canceladas": aulas_com_presenca.filter(status="Cancelada").count(),
+        "agendadas": aulas_com_presenca.filter(status="Agendada").count(),
+        "total_aulas": aulas_do_aluno.count(),
+        "top_professores": (
+            aulas_presente.filter(professores__isnull=False)
+            .values("professores__pk", "professores__username")
+            .annotate(contagem=Count("professores__pk"))
+            .order_by("-contagem")[:3]
+        ),
+        "top_modalidades": (
+            aulas_presente.values("modalidade__nome")
+            .annotate(contagem=Count("modalidade"))
+            .order_by("-contagem")[:3]
+        ),
+    }
+
+
 @login_required
 def detalhe_aluno(request, pk):
     aluno = get_object_or_404(Aluno, pk=pk)
@@ -1137,19 +984,21 @@ def detalhe_aluno(request, pk):
         status_presenca_aluno=Subquery(presenca_status_subquery)
     )
 
-    total_realizadas = aulas_com_presenca.filter(
-        status__in=["Realizada", "Aluno Ausente"], status_presenca_aluno="presente"
-    ).count()
-    total_ausencias = (
-        aulas_com_presenca.filter(
-            status__in=["Realizada", "Aluno Ausente"], status_presenca_aluno="ausente"
-        )
-        .exclude(status="Reposta")
-        .count()
-    )
-    total_canceladas = aulas_com_presenca.filter(status="Cancelada").count()
-    total_agendadas = aulas_com_presenca.filter(status="Agendada").count()
-    total_aulas = aulas_do_aluno.count()
+    aulas_presente = aulas_com_presenca.filter(status_presenca_aluno="presente")
+
+    if data_inicial_str or data_final_str or status_filtro:
+        estatisticas = _estatisticas_aluno_filtradas(aulas_do_aluno, aulas_com_presenca)
+    else:
+        # Sem filtros, os totais vêm da tabela materializada por mês
+        estatisticas = estatisticas_aluno(aluno)
+
+    total_realizadas = estatisticas["realizadas"]
+    total_ausencias = estatisticas["ausencias"]
+    total_canceladas = estatisticas["canceladas"]
+    total_agendadas = estatisticas["agendadas"]
+    total_aulas = estatisticas["total_aulas"]
+    top_professores = estatisticas["top_professores"]
+    top_modalidades = estatisticas["top_modalidades"]
 
     aulas_contabilizadas_para_presenca = total_realizadas + total_ausencias
     taxa_presenca = (
@@ -1158,20 +1007,6 @@ def detalhe_aluno(request, pk):
         else 0
     )
 
-    aulas_presente = aulas_com_presenca.filter(status_presenca_aluno="presente")
-
-    top_professores = (
-        aulas_presente.filter(professores__isnull=False)
-        .values("professores__pk", "professores__username")
-        .annotate(contagem=Count("professores__pk"))
-        .order_by("-contagem")[:3]
-    )
-    top_modalidades = (
-        aulas_presente.values("modalidade__nome")
-        .annotate(contagem=Count("modalidade"))
-        .order_by("-contagem")[:3]
-    )
-
     chart_labels = ["Realizadas", "Ausências", "Canceladas", "Agendadas"]
     chart_data = [
         total_realizadas,
@@ -1188,43 +1023,31 @@ def detalhe_aluno(request, pk):
     dados_evolucao = (
         ItemRudimento.objects.filter(
             relatorio_id__in=list(relatorios_de_aulas_presente_ids),
-            bpm__isnull=False,
+            bpm_valor__isnull=False,
         )
-        .exclude(bpm__exact="")
         .order_by("relatorio__aula__data_hora")
+        .values_list("descricao", "bpm_valor", "relatorio__aula__data_hora")
     )
 
     dados_grafico_por_exercicio = {}
-    lista_exercicios_unicos = []
-    evolucao_total_aulas = 0
-
-    if dados_evolucao.exists():
-        dados_agrupados = defaultdict(list)
-
-        for item in dados_evolucao:
-            try:
-                bpm = int(str(item.bpm).strip().replace("bpm", ""))
-                item_date = item.relatorio.aula.data_hora.date()
-                descricao = item.descricao.strip().title()
-                dados_agrupados[descricao].append(
-                    {"x": item_date.isoformat(), "y": bpm}
-                )
-            except (ValueError, AttributeError):
-                continue
+    dados_agrupados = defaultdict(list)
+    datas_com_pratica = set()
+
+    for descricao, bpm, data_hora in dados_evolucao:
+        item_date = localtime(data_hora).date()
+        datas_com_pratica.add(item_date)
+        dados_agrupados[descricao.strip().title()].append(
+            {"x": item_date.isoformat(), "y": bpm}
+        )
 
-        for descricao, pontos in dados_agrupados.items():
-            pontos_ordenados = sorted(pontos, key=lambda p: p["x"])
-            dados_grafico_por_exercicio[descricao] = {
-                "data": pontos_ordenados,
-                "moving_average": calculate_moving_average(
-                    pontos_ordenados, window_size=3
-                ),
-            }
+    for descricao, pontos in dados_agrupados.items():
+        dados_grafico_por_exercicio[descricao] = {
+            "data": pontos,
+            "moving_average": calculate_moving_average(pontos, window_size=3),
+        }
 
-        lista_exercicios_unicos = sorted(dados_agrupados.keys())
-        evolucao_total_aulas = (
-            dados_evolucao.values("relatorio__aula__data_hora__date").distinct().count()
-        )
+    lista_exercicios_unicos = sorted(dados_agrupados.keys())
+    evolucao_total_aulas = len(datas_com_pratica)
 
     historico_aulas_qs = aulas_com_presenca.order_by("-data_hora")
     paginator = Paginator(historico_aulas_qs, 10)
@@ -2176,6 +1999,7 @@ def verificar_conflito_aula(request):
         professor_id = request.GET.get("professor_id")
         data_hora_str = request.GET.get("data_hora")
         aula_id = request.GET.get("aula_id")  # ID da aula sendo editada (se houver)
+        modalidade_id = request.GET.get("modalidade_id")
 
         if not professor_id or not data_hora_str:
             return JsonResponse(
@@ -2188,14 +2012,28 @@ def verificar_conflito_aula(request):
             data_hora = datetime.fromisoformat(
                 data_hora_str
             )  # Converte a string ISO (YYYY-MM-DDTHH:MM) para datetime
+            if timezone.is_naive(data_hora):
+                data_hora = timezone.make_aware(data_hora)
             aula_id = int(aula_id) if aula_id else None  # Converte para int ou None
+            modalidade_id = int(modalidade_id) if modalidade_id else None
         except (ValueError, TypeError):
             return JsonResponse(
                 {"conflito": True, "mensagem": "Formato de dados inválido."}, status=400
             )
 
-        conflito_info = _check_conflito_aula(professor_id, data_hora, aula_id)
-        return JsonResponse(conflito_info)
+        duracao_minutos = None
+        if modalidade_id:
+            duracao_minutos = (
+                Modalidade.objects.filter(pk=modalidade_id)
+                .values_list("duracao_minutos", flat=True)
+                .first()
+            )
+
+        diagnostico = verificar_conflito(
+            data_hora, professor_ids=[professor_id],
+            duracao_minutos=duracao_minutos, aula_id=aula_id,
+        )
+        return JsonResponse(diagnostico["professor"])
 
     return JsonResponse(
         {"conflito": True, "mensagem": "Requisição inválida."}, status=400
@@ -2559,117 +2397,30 @@ def exportar_relatorio_agregado(request):
         .order_by("-total_aulas")
     )
 
-    # 5. Criação e Estilização da Planilha Excel
-    workbook = Workbook()
-    ws = workbook.active
-    ws.title = "Relatorio Gerencial"
-
-    # Estilos
-    font_bold = Font(bold=True)
-    font_header = Font(bold=True, color="FFFFFF")
-    fill_header = PatternFill(
-        start_color="2F75B5", end_color="2F75B5", fill_type="solid"
-    )
-    fill_subheader = PatternFill(
-        start_color="DDEBF7", end_color="DDEBF7", fill_type="solid"
-    )
-
-    # --- Bloco de KPIs Gerais ---
-    ws.merge_cells("B2:E2")
-    cell_kpi_header = ws["B2"]
-    cell_kpi_header.value = "Resumo Geral do Período"
-    cell_kpi_header.font = font_header
-    cell_kpi_header.fill = fill_header
-    cell_kpi_header.alignment = Alignment(horizontal="center")
-
-    ws["B4"] = "Total de Aulas no Período:"
-    ws["B4"].font = font_bold
-    ws["C4"] = total_aulas
-    ws["B5"] = "Aulas Realizadas:"
-    ws["B5"].font = font_bold
-    ws["C5"] = total_realizadas
-    ws["B6"] = "Aulas com Ausência:"
-    ws["B6"].font = font_bold
-    ws["C6"] = total_aluno_ausente
-    ws["B7"] = "Aulas Canceladas:"
-    ws["B7"].font = font_bold
-    ws["C7"] = total_canceladas
-
-    # --- Tabela de Resumo por Professor ---
-    current_row = 10
-    ws.merge_cells(f"B{current_row}:F{current_row}")
-    cell_prof_header = ws[f"B{current_row}"]
-    cell_prof_header.value = "Resumo por Professor"
-    cell_prof_header.font = font_header
-    cell_prof_header.fill = fill_header
-    cell_prof_header.alignment = Alignment(horizontal="center")
-    current_row += 1
-
-    prof_headers = [
-        "Professor",
-        "Aulas Atribuídas",
-        "Aulas Realizadas",
-        "Aulas c/ Ausência",
-        "Taxa de Realização (%)",
-    ]
-    ws.append(
-        [""] + prof_headers
-    )  # Adiciona uma coluna vazia no início para espaçamento
-    for cell in ws[current_row]:
-        cell.font = font_bold
-        cell.fill = fill_subheader
-
-    current_row += 1
-    for p in professores:
-        taxa = (
-            (p.total_realizadas / p.total_atribuidas * 100)
-            if p.total_atribuidas > 0
-            else 0
-        )
-        ws.append(
-            [
-                "",
+    # 5. Planilha em modo write-only: as linhas são geradas enquanto o arquivo é escrito
+    def linhas_professores():
+        for p in professores.iterator():
+            taxa = (
+                (p.total_realizadas / p.total_atribuidas * 100)
+                if p.total_atribuidas > 0
+                else 0
+            )
+            yield [
                 p.username.title(),
                 p.total_atribuidas,
                 p.total_realizadas,
                 p.total_ausencias,
                 f"{taxa:.2f}%",
             ]
-        )
 
-    # --- Tabela de Resumo por Categoria ---
-    current_row += 3  # Espaço entre as tabelas
-    ws.merge_cells(f"B{current_row}:G{current_row}")
-    cell_cat_header = ws[f"B{current_row}"]
-    cell_cat_header.value = "Resumo por Categoria"
-    cell_cat_header.font = font_header
-    cell_cat_header.fill = fill_header
-    cell_cat_header.alignment = Alignment(horizontal="center")
-    current_row += 1
-
-    cat_headers = [
-        "Categoria",
-        "Total de Aulas",
-        "Aulas Realizadas",
-        "Ausências",
-        "Canceladas",
-        "Taxa de Realização (%)",
-    ]
-    ws.append([""] + cat_headers)
-    for cell in ws[current_row]:
-        cell.font = font_bold
-        cell.fill = fill_subheader
-
-    current_row += 1
-    for item in aulas_por_modalidade:
-        taxa = (
-            (item["aulas_realizadas"] / item["total_aulas"] * 100)
-            if item["total_aulas"] > 0
-            else 0
-        )
-        ws.append(
-            [
-                "",
+    def linhas_modalidades():
+        for item in aulas_por_modalidade.iterator():
+            taxa = (
+                (item["aulas_realizadas"] / item["total_aulas"] * 100)
+                if item["total_aulas"] > 0
+                else 0
+            )
+            yield [
                 item["modalidade__nome"].title(),
                 item["total_aulas"],
                 item["aulas_realizadas"],
@@ -2677,29 +2428,60 @@ def exportar_relatorio_agregado(request):
                 item["aulas_canceladas"],
                 f"{taxa:.2f}%",
             ]
-        )
 
-    # Ajuste final das colunas
-    for i, column_cells in enumerate(ws.columns):
-        max_length = 0
-        column = get_column_letter(i + 1)
-        for cell in column_cells:
-            try:
-                if len(str(cell.value)) > max_length:
-                    max_length = len(str(cell.value))
-            except:
-                pass
-        adjusted_width = max_length + 2
-        ws.column_dimensions[column].width = adjusted_width
-
-    # 6. Preparação da resposta HTTP
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={"Content-Disposition": 'attachment; filename="Resumo Gerencial.xlsx"'},
+    # Coluna A fica em branco como margem
+    relatorio = RelatorioPlanilha(
+        "Relatorio Gerencial", larguras=[30, 18, 18, 18, 18, 24], coluna_inicial=2
     )
-    workbook.save(response)
 
-    return response
+    # --- Bloco de KPIs Gerais ---
+    relatorio.secao(
+        [Coluna(estilo="rotulo"), Coluna(), Coluna(), Coluna()],
+        [
+            [],
+            ["Total de Aulas no Período:", total_aulas],
+            ["Aulas Realizadas:", total_realizadas],
+            ["Aulas com Ausência:", total_aluno_ausente],
+            ["Aulas Canceladas:", total_canceladas],
+        ],
+        titulo="Resumo Geral do Período",
+        cabecalho=False,
+        espaco_antes=1,
+    )
+
+    # --- Tabela de Resumo por Professor ---
+    relatorio.secao(
+        [
+            Coluna("Professor"),
+            Coluna("Aulas Atribuídas"),
+            Coluna("Aulas Realizadas"),
+            Coluna("Aulas c/ Ausência"),
+            Coluna("Taxa de Realização (%)"),
+        ],
+        linhas_professores(),
+        titulo="Resumo por Professor",
+        estilo_cabecalho="subcabecalho",
+        espaco_antes=2,
+    )
+
+    # --- Tabela de Resumo por Categoria ---
+    relatorio.secao(
+        [
+            Coluna("Categoria"),
+            Coluna("Total de Aulas"),
+            Coluna("Aulas Realizadas"),
+            Coluna("Ausências"),
+            Coluna("Canceladas"),
+            Coluna("Taxa de Realização (%)"),
+        ],
+        linhas_modalidades(),
+        titulo="Resumo por Categoria",
+        estilo_cabecalho="subcabecalho",
+        espaco_antes=2,
+    )
+
+    # 6. Resposta em streaming
+    return relatorio.resposta("Resumo Gerencial.xlsx")
 
 
 # --- NOVA VIEW PARA EXPORTAÇÃO DE DADOS ---
@@ -2708,6 +2490,8 @@ def exportar_aulas(request):
     """
     Exporta um relatório detalhado de atividades das aulas para um arquivo CSV,
     respeitando os filtros aplicados. Cada linha representa uma atividade.
+    O arquivo é gerado e enviado em partes (ver scheduler/exportacao.py);
+    com `?gzip=1` sai comprimido (.csv.gz).
     """
     # 1. Reaplica a lógica de filtros da página de listagem (nenhuma mudança aqui)
     aulas_queryset = Aula.objects.all()
@@ -2760,173 +2544,18 @@ def exportar_aulas(request):
                 alunos__id__in=aluno_filtro_ids
             ).distinct()
 
-    # 2. Otimiza a consulta para performance, buscando todos os dados relacionados de uma vez
-    aulas_list = list(
-        aulas_queryset.order_by("data_hora")
-        .select_related("modalidade", "relatorioaula__professor_que_validou")
-        .prefetch_related(
-            "alunos",
-            "professores",
-            "relatorioaula__itens_rudimentos",
-            "relatorioaula__itens_ritmo",
-            "relatorioaula__itens_viradas",
-        )
-    )
-
-    # 3. Workbook e Estilos...
-    workbook = Workbook()
-    worksheet = workbook.active
-    worksheet.title = "Relatorio Detalhado de Aulas"
-    header_font = Font(bold=True, color="FFFFFF")
-    header_fill = PatternFill(
-        start_color="4F81BD", end_color="4F81BD", fill_type="solid"
-    )
-    center_alignment = Alignment(horizontal="center", vertical="center")
-    cores_atividades = {
-        "Teoria": PatternFill(
-            start_color="DCE6F1", end_color="DCE6F1", fill_type="solid"
-        ),
-        "Repertório": PatternFill(
-            start_color="F2DCDB", end_color="F2DCDB", fill_type="solid"
-        ),
-        "Rudimento": PatternFill(
-            start_color="EAF1DD", end_color="EAF1DD", fill_type="solid"
-        ),
-        "Ritmo": PatternFill(
-            start_color="DBEEF3", end_color="DBEEF3", fill_type="solid"
-        ),
-        "Virada": PatternFill(
-            start_color="E5E0EC", end_color="E5E0EC", fill_type="solid"
-        ),
-        "Observações Gerais": PatternFill(
-            start_color="FDE9D9", end_color="FDE9D9", fill_type="solid"
-        ),
-        "N/A": PatternFill(start_color="F2F2F2", end_color="F2F2F2", fill_type="solid"),
-    }
-
-    # 4. Cabeçalho
-    headers = [
-        "ID Aula",
-        "Data e Hora",
-        "Status",
-        "Alunos",
-        "Prof. Atribuído(s)",
-        "Prof. Realizou",
-        "Categoria",
-        "Tipo de Conteúdo",
-        "Descrição",
-        "Detalhes (BPM, Livro, Duração)",
-        "Observações do Conteúdo",
-    ]
-    worksheet.append(headers)
-    for col_num, header_title in enumerate(headers, 1):
-        cell = worksheet.cell(row=1, column=col_num)
-        cell.font = header_font
-        cell.fill = header_fill
-        cell.alignment = center_alignment
-
-    # 5. Loop principal com a lógica corrigida
-    for i, aula in enumerate(aulas_list):
-        if i > 0:
-            worksheet.append([])
-
-        alunos_str = ", ".join([al.nome_completo.title() for al in aula.alunos.all()])
-        professores_str = ", ".join(
-            [p.username.title() for p in aula.professores.all()]
-        )
-        relatorio = getattr(aula, "relatorioaula", None)
-        professor_realizou_str = (
-            relatorio.professor_que_validou.username.title()
-            if relatorio and relatorio.professor_que_validou
-            else "N/A"
-        )
-        data_hora_naive = timezone.localtime(aula.data_hora).replace(tzinfo=None)
-        base_row_data = [
-            aula.id,
-            data_hora_naive,
-            aula.get_status_display(),
-            alunos_str,
-            professores_str,
-            professor_realizou_str,
-            aula.modalidade.nome,
-        ]
+    # 2. Linhas geradas lote a lote (values + iterator) e enviadas em partes
+    partes = exportacao.partes_csv(exportacao.linhas_atividades(aulas_queryset))
+    nome_arquivo = "Relatório de Aulas.csv"
+    if request.GET.get("gzip"):
+        partes = exportacao.comprimir_gzip(partes)
+        nome_arquivo += ".gz"
+        content_type = "application/gzip"
+    else:
+        content_type = "text/csv; charset=utf-8"
 
-        def adicionar_linha_estilizada(dados_atividade):
-            worksheet.append(base_row_data + dados_atividade)
-            cor_tipo = dados_atividade[0]
-            fill_style = cores_atividades.get(cor_tipo, cores_atividades["N/A"])
-            for cell in worksheet[worksheet.max_row]:
-                cell.fill = fill_style
-
-        if relatorio:
-            conteudo_adicionado = False
-            if relatorio.conteudo_teorico:
-                adicionar_linha_estilizada(
-                    [
-                        "Teoria",
-                        relatorio.conteudo_teorico,
-                        "",
-                        relatorio.observacoes_teoria or "",
-                    ]
-                )
-                conteudo_adicionado = True
-            for item in relatorio.itens_rudimentos.all():
-                detalhes = f"BPM: {item.bpm or 'N/A'} / Duração: {item.duracao_min or 'N/A'} min"
-                adicionar_linha_estilizada(
-                    ["Rudimento", item.descricao, detalhes, item.observacoes or ""]
-                )
-                conteudo_adicionado = True
-            for item in relatorio.itens_ritmo.all():
-                detalhes = f"Livro: {item.livro_metodo or 'N/A'} / BPM: {item.bpm or 'N/A'} / Duração: {item.duracao_min or 'N/A'} min"
-                adicionar_linha_estilizada(
-                    ["Ritmo", item.descricao, detalhes, item.observacoes or ""]
-                )
-                conteudo_adicionado = True
-            for item in relatorio.itens_viradas.all():
-                detalhes = f"BPM: {item.bpm or 'N/A'} / Duração: {item.duracao_min or 'N/A'} min"
-                adicionar_linha_estilizada(
-                    ["Virada", item.descricao, detalhes, item.observacoes or ""]
-                )
-                conteudo_adicionado = True
-            if relatorio.repertorio_musicas:
-                adicionar_linha_estilizada(
-                    [
-                        "Repertório",
-                        relatorio.repertorio_musicas,
-                        "",
-                        relatorio.observacoes_repertorio or "",
-                    ]
-                )
-                conteudo_adicionado = True
-            if relatorio.observacoes_gerais:
-                adicionar_linha_estilizada(
-                    ["Observações Gerais", relatorio.observacoes_gerais, "", ""]
-                )
-                conteudo_adicionado = True
-            if not conteudo_adicionado:
-                adicionar_linha_estilizada(
-                    ["N/A", "Relatório existe, mas está vazio.", "", ""]
-                )
-        else:
-            adicionar_linha_estilizada(["N/A", "Aula sem relatório criado.", "", ""])
-
-    # 7. Ajuste de colunas
-    for col_num, _ in enumerate(headers, 1):
-        column_letter = get_column_letter(col_num)
-        worksheet.column_dimensions[column_letter].width = 20
-    worksheet.column_dimensions["D"].width = 40
-    worksheet.column_dimensions["I"].width = 40
-    worksheet.column_dimensions["J"].width = 50
-    worksheet.column_dimensions["K"].width = 50
-
-    # 8. Retorno da resposta
-    response = HttpResponse(
-        content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
-        headers={
-            "Content-Disposition": 'attachment; filename="Relatório de Aulas.xlsx"'
-        },
-    )
-    workbook.save(response)
+    response = StreamingHttpResponse(partes, content_type=content_type)
+    response["Content-Disposition"] = f'attachment; filename="{nome_arquivo}"'
     return response
 
 
@@ -3005,20 +2634,91 @@ def get_horarios_ocupados(request):
 
 
 #  --- NOVA VIEW PARA OBTER EVENTOS DO CALENDÁRIO (FULLCALENDAR) ---
-@login_required
-def get_eventos_calendario(request):
+def _periodo_eventos(request):
+    """Lê start/end (ISO) do FullCalendar. Lança ValueError/TypeError se inválidos."""
     start_str = request.GET.get("start")
     end_str = request.GET.get("end")
+    start_date = datetime.fromisoformat(start_str.replace("Z", "+00:00")).date()
+    end_date = datetime.fromisoformat(end_str.replace("Z", "+00:00")).date()
+    return start_date, end_date
+
+
+def _eventos_etag(request):
+    """
+    Carimbo de versão do período: combina as versões de cache dos meses da
+    janela (trocadas pelos signals a cada alteração de aula) com o escopo do
+    usuário e o filtro. Não consulta o banco.
+
+    Sem cache compartilhado a versão trocada por um processo não chega aos
+    outros, que responderiam 304 para eventos antigos; nesse caso não há ETag.
+    """
+    if not cache_compartilhado():
+        return None
+    try:
+        start_date, end_date = _periodo_eventos(request)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    versoes = versoes_periodo(start_date, end_date)
     professor_filtro_id = request.GET.get("professor_filtro_id", "")
+    return "-".join(
+        [escopo_usuario(request.user), professor_filtro_id or "todos"]
+        + [str(v) for v in versoes]
+    )
+
 
-    events = []
+def _eventos_last_modified(request):
+    if not cache_compartilhado():
+        return None
+    try:
+        start_date, end_date = _periodo_eventos(request)
+    except (ValueError, TypeError, AttributeError):
+        return None
+    return datetime.fromtimestamp(
+        max(versoes_periodo(start_date, end_date)) / 1e9, tz=dt_timezone.utc
+    )
 
-    if not (start_str and end_str):
+
+def _serializar_evento(aula, alunos, professores):
+    """Monta o evento do FullCalendar a partir da projeção `values()` da aula."""
+    if len(alunos) == 1:
+        # Se há apenas um aluno, o título é o nome dele
+        title = f"{alunos[0].split()[0].title()} ({aula['modalidade__nome']})"
+        aluno_prop_str = alunos[0]
+    elif len(alunos) > 1:
+        title = f"Grupo: {aula['modalidade__nome']}"
+        aluno_prop_str = f"{len(alunos)} alunos"
+    else:
+        # Se não houver alunos (Ex: Atividade Complementar)
+        title = aula["modalidade__nome"]
+        aluno_prop_str = "Nenhum aluno"
+
+    professor_realizou = aula["relatorioaula__professor_que_validou__username"]
+    return {
+        "title": title,
+        "start": aula["data_hora"].isoformat(),
+        "url": f"/aula/{aula['id']}/validar/",
+        "classNames": [f'status-{aula["status"].replace(" ", "")}'],
+        "extendedProps": {
+            "status": aula["status"],
+            "aluno": aluno_prop_str,
+            "professor_atribuido": ", ".join(p.title() for p in professores) or "N/A",
+            "professor_realizou": professor_realizou.title() if professor_realizou else "N/A",
+            "modalidade": aula["modalidade__nome"].title(),
+        },
+    }
+
+
+@login_required
+@cache_control(private=True, no_cache=True)
+@condition(etag_func=_eventos_etag, last_modified_func=_eventos_last_modified)
+def get_eventos_calendario(request):
+    if not (request.GET.get("start") and request.GET.get("end")):
         return JsonResponse({"error": "Período não fornecido."}, status=400)
 
+    professor_filtro_id = request.GET.get("professor_filtro_id", "")
+
     try:
-        start_date = datetime.fromisoformat(start_str.replace("Z", "+00:00")).date()
-        end_date = datetime.fromisoformat(end_str.replace("Z", "+00:00")).date()
+        start_date, end_date = _periodo_eventos(request)
 
         aulas_no_periodo = Aula.objects.filter(
             data_hora__date__range=(start_date, end_date)
@@ -3032,69 +2732,36 @@ def get_eventos_calendario(request):
                 professores__id=professor_filtro_id
             )
 
-        # --- OTIMIZAÇÃO E CORREÇÃO PRINCIPAL ---
-        # Usamos prefetch_related para buscar todos os alunos e professores de uma vez,
-        # evitando múltiplas queries ao banco de dados e melhorando a performance.
-        aulas_no_periodo = (
-            aulas_no_periodo.select_related(
-                "modalidade", "relatorioaula", "relatorioaula__professor_que_validou"
-            )
-            .prefetch_related("alunos", "professores")
-            .distinct()
+        # Projeções: só as colunas usadas no JSON, sem instanciar modelos.
+        aulas = list(
+            aulas_no_periodo.values(
+                "id",
+                "data_hora",
+                "status",
+                "modalidade__nome",
+                "relatorioaula__professor_que_validou__username",
+            ).distinct()
         )
-
-        for aula in aulas_no_periodo:
-            # --- NOVA LÓGICA PARA LIDAR COM MÚLTIPLOS ALUNOS/PROFESSORES ---
-            alunos_list = list(aula.alunos.all())
-            professores_list = list(aula.professores.all())
-
-            title = ""
-            aluno_prop_str = ""
-
-            # Define o título do evento e a string de alunos para o popover
-            if len(alunos_list) == 1:
-                # Se há apenas um aluno, o título é o nome dele
-                title = f"{alunos_list[0].nome_completo.split()[0].title()} ({aula.modalidade.nome})"
-                aluno_prop_str = alunos_list[0].nome_completo
-            elif len(alunos_list) > 1:
-                # Se for em grupo, o título é genérico
-                title = f"Grupo: {aula.modalidade.nome}"
-                aluno_prop_str = f"{len(alunos_list)} alunos"
-            else:
-                # Se não houver alunos (Ex: Atividade Complementar)
-                title = aula.modalidade.nome
-                aluno_prop_str = "Nenhum aluno"
-
-            # Junta os nomes dos professores para o popover
-            prof_atribuido_str = (
-                ", ".join([p.username.title() for p in professores_list]) or "N/A"
-            )
-
-            event_class = f'status-{aula.status.replace(" ", "")}'
-            professor_realizou = getattr(aula, "relatorioaula", None) and getattr(
-                aula.relatorioaula, "professor_que_validou", None
-            )
-
-            events.append(
-                {
-                    "title": title,
-                    "start": aula.data_hora.isoformat(),
-                    "url": f"/aula/{aula.pk}/validar/",  # A URL pode ser a de validar/ver relatório
-                    "classNames": [event_class],
-                    "extendedProps": {
-                        "status": aula.status,
-                        "aluno": aluno_prop_str,
-                        "professor_atribuido": prof_atribuido_str,
-                        "professor_realizou": (
-                            professor_realizou.username.title()
-                            if professor_realizou
-                            else "N/A"
-                        ),
-                        "modalidade": aula.modalidade.nome.title(),
-                    },
-                }
+        ids_subquery = aulas_no_periodo.values("id")
+
+        alunos_por_aula = defaultdict(list)
+        for aula_id, nome in Aula.alunos.through.objects.filter(
+            aula_id__in=ids_subquery
+        ).values_list("aula_id", "aluno__nome_completo"):
+            alunos_por_aula[aula_id].append(nome)
+
+        professores_por_aula = defaultdict(list)
+        for aula_id, username in Aula.professores.through.objects.filter(
+            aula_id__in=ids_subquery
+        ).values_list("aula_id", "customuser__username"):
+            professores_por_aula[aula_id].append(username)
+
+        events = [
+            _serializar_evento(
+                aula, alunos_por_aula[aula["id"]], professores_por_aula[aula["id"]]
             )
-
+            for aula in aulas
+        ]
         return JsonResponse(events, safe=False)
 
     except (ValueError, TypeError) as e:
@@ -3131,178 +2798,28 @@ def perfil_usuario(request):
 @user_passes_test(lambda u: u.tipo in ["admin", "comercial"])
 def get_horario_fixo_data(request):
     is_ajax = request.headers.get("x-requested-with") == "XMLHttpRequest"
-    today = timezone.now().date()
-    start_date = today - timedelta(weeks=6)
-
-    aulas_periodo = Aula.objects.filter(
-        data_hora__date__gte=start_date,
-        data_hora__date__lte=today,
-        status__in=["Realizada", "Agendada"],
-    ).prefetch_related("alunos", "professores").select_related("modalidade")
-
-    ocorrencias_aluno = defaultdict(list)
-    for aula in aulas_periodo:
-        if not aula.alunos.exists():
-            continue
-        dt_local = localtime(aula.data_hora)
-        dia_semana = dt_local.weekday()
-        horario = dt_local.strftime("%H:00")
-        data_aula = dt_local.date()
-
-        # Professores formatados igual aos alunos
-        conectivos = {"da", "de", "do", "das", "dos", "di", "du"}
-        def formatar_nome(nome):
-            partes = nome.strip().split()
-            if not partes:
-                return "?"
-            elif len(partes) == 1:
-                return partes[0].capitalize()
-            elif partes[1].lower() in conectivos and len(partes) > 2:
-                p1 = partes[0].capitalize()
-                p2 = partes[1].lower()
-                p3 = partes[2].capitalize()
-                return f"{p1} {p2} {p3}"
-            else:
-                return f"{partes[0].capitalize()} {partes[1].capitalize()}"
-
-        prof_nomes = [formatar_nome(p.username) for p in aula.professores.all()]
-        modalidade_nome = aula.modalidade.nome.title()
-
-        payload = {
-            "slot": (dia_semana, horario),
-            "data": data_aula,
-            "profs": prof_nomes,
-            "modalidade": modalidade_nome
-        }
-        for aluno in aula.alunos.all():
-            ocorrencias_aluno[aluno.id].append(payload)
-
-    horario_principal_aluno = {}
-    for aluno_id, aulas in ocorrencias_aluno.items():
-        frequencia_slots = defaultdict(int)
-        data_recente_slot = {}
-        payload_recente_slot = {}
-        for aula_data in aulas:
-            slot = aula_data["slot"]
-            frequencia_slots[slot] += 1
-            if aula_data["data"] > data_recente_slot.get(slot, date.min):
-                data_recente_slot[slot] = aula_data["data"]
-                payload_recente_slot[slot] = aula_data
-        if frequencia_slots:
-            slot_principal = max(
-                frequencia_slots.keys(),
-                key=lambda slot: (frequencia_slots[slot], data_recente_slot[slot]),
-            )
-            payload_principal = payload_recente_slot[slot_principal]
-            horario_principal_aluno[aluno_id] = {
-                "slot": slot_principal,
-                "contagem": frequencia_slots[slot_principal],
-                "profs": payload_principal["profs"],
-                "modalidade": payload_principal["modalidade"]
-            }
-
-    aluno_ids = list(horario_principal_aluno.keys())
-    alunos_map = {}
-    conectivos = {"da", "de", "do", "das", "dos", "di", "du"}
-
-    def formatar_nome(nome):
-        partes = nome.strip().split()
-        if not partes:
-            return "Aluno ?"
-        elif len(partes) == 1:
-            return partes[0].capitalize()
-        elif partes[1].lower() in conectivos and len(partes) > 2:
-            p1 = partes[0].capitalize()
-            p2 = partes[1].lower()
-            p3 = partes[2].capitalize()
-            return f"{p1} {p2} {p3}"
-        else:
-            return f"{partes[0].capitalize()} {partes[1].capitalize()}"
-
-    for aluno in Aluno.objects.filter(id__in=aluno_ids):
-        alunos_map[aluno.id] = formatar_nome(aluno.nome_completo)
-
-    LIMITE_HORARIO_FIXO = 3
-    grade_horarios = defaultdict(dict)
-
-    for aluno_id, info in horario_principal_aluno.items():
-        dia_semana, horario = info["slot"]
-        contagem = info["contagem"]
-        aluno_nome = alunos_map.get(aluno_id, "Aluno ?")
-        status_aluno = "fixo" if contagem >= LIMITE_HORARIO_FIXO else "variavel"
-        prof_nomes = info["profs"]
-        modalidade = info["modalidade"]
-        if not grade_horarios[horario].get(dia_semana):
-            grade_horarios[horario][dia_semana] = {
-                "status": status_aluno,
-                "alunos": {aluno_nome},
-                "profs": set(prof_nomes),
-                "modalidades": {modalidade}
-            }
-        else:
-            grade_horarios[horario][dia_semana]["alunos"].add(aluno_nome)
-            grade_horarios[horario][dia_semana]["profs"].update(prof_nomes)
-            grade_horarios[horario][dia_semana]["modalidades"].add(modalidade)
-            if status_aluno == "fixo":
-                grade_horarios[horario][dia_semana]["status"] = "fixo"
-
-    for horario, dias in grade_horarios.items():
-        for dia, slot in dias.items():
-            slot["alunos_texto"] = "\n".join(sorted(slot["alunos"]))
-            slot["profs_texto"] = "\n".join(sorted(slot["profs"]))
-            slot["modalidades_texto"] = "\n".join(sorted(slot["modalidades"]))
-            del slot["alunos"]
-            del slot["profs"]
-            del slot["modalidades"]
+    # Grade lida da tabela OcupacaoHorario, mantida pelos signals (ver scheduler/ocupacao.py)
+    grade = grade_horarios(timezone.localdate())
 
     if is_ajax:
-        return JsonResponse(grade_horarios)
-    else:
-        total_fixo = 0
-        total_variavel = 0
-        aulas_por_dia = [0] * 6
-        horarios_visiveis = [f"{h:02d}:00" for h in range(8, 21)]
-        horarios_intervalo = ['12:00', '13:00']
-        slots_intervalo_livres = 0
-
-        for horario in horarios_visiveis:
-            for dia_index in range(6):
-                slot_info = grade_horarios[horario].get(dia_index)
-                if slot_info:
-                    if slot_info["status"] == "fixo":
-                        total_fixo += 1
-                    else:
-                        total_variavel += 1
-                    aulas_por_dia[dia_index] += 1
-                else:
-                    if horario in horarios_intervalo:
-                        slots_intervalo_livres += 1
-
-        total_slots_disponiveis = 6 * 13
-        total_ocupados = total_fixo + total_variavel
-        total_livres = (total_slots_disponiveis - total_ocupados) - slots_intervalo_livres
-        total_slots_agendaveis = total_slots_disponiveis - slots_intervalo_livres
-        taxa_ocupacao = (
-            (total_ocupados / total_slots_agendaveis) * 100
-            if total_slots_agendaveis > 0
-            else 0
-        )
+        return JsonResponse(grade)
+
+    kpis = kpis_ocupacao(grade)
+    dias_semana_nomes = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado"]
+    ja_viu_tour = request.user.tours_vistos.filter(tour_id="horarios_fixos_v1").exists()
+
+    context = {
+        "titulo": "Grade de Horários",
+        "mostrar_tour_horarios": not ja_viu_tour,
+        "total_fixo": kpis["total_fixo"],
+        "total_variavel": kpis["total_variavel"],
+        "total_livres": kpis["total_livres"],
+        "taxa_ocupacao": f"{kpis['taxa_ocupacao']:.1f}",
+        "ocupacao_chart_labels": dias_semana_nomes,
+        "ocupacao_chart_data": kpis["aulas_por_dia"],
+    }
+    return render(request, "scheduler/horarios_grid.html", context)
 
-        dias_semana_nomes = ["Segunda", "Terça", "Quarta", "Quinta", "Sexta", "Sábado"]
-        ja_viu_tour = request.user.tours_vistos.filter(tour_id="horarios_fixos_v1").exists()
-
-        context = {
-            "titulo": "Grade de Horários",
-            "mostrar_tour_horarios": not ja_viu_tour,
-            "total_fixo": total_fixo,
-            "total_variavel": total_variavel,
-            "total_livres": total_livres,
-            "taxa_ocupacao": f"{taxa_ocupacao:.1f}",
-            "ocupacao_chart_labels": dias_semana_nomes,
-            "ocupacao_chart_data": aulas_por_dia,
-        }
-        return render(request, "scheduler/horarios_grid.html", context)
-  
 
 @login_required
 @require_POST
@@ -3355,6 +2872,35 @@ def listar_reposicoes_pendentes(request):
     return render(request, "scheduler/reposicoes_listar.html", contexto)
 
 
+def _evolucao_bpm(itens):
+    """
+    Menor e maior BPM de cada exercício, agregados no banco pela descrição em
+    minúsculas. O LOWER do SQLite só converte ASCII ("ACENTUAÇÃO" e
+    "acentuação" chegam em linhas separadas), então as linhas com o mesmo
+    nome em minúsculas no Python são unidas aqui.
+    """
+    stats = (
+        itens.filter(bpm_valor__isnull=False)
+        .annotate(nome=Lower(Trim('descricao')))
+        .values('nome')
+        .annotate(mini=Min('bpm_valor'), maxi=Max('bpm_valor'))
+        .order_by()
+    )
+    por_nome = {}
+    for r in stats:
+        nome = r['nome'].lower()
+        if nome in por_nome:
+            mini, maxi = por_nome[nome]
+            por_nome[nome] = (min(mini, r['mini']), max(maxi, r['maxi']))
+        else:
+            por_nome[nome] = (r['mini'], r['maxi'])
+    return [
+        {'nome': nome.title(), 'min': mini, 'max': maxi, 'delta': maxi - mini}
+        for nome, (mini, maxi) in por_nome.items()
+        if maxi > mini
+    ]
+
+
 @login_required
 @require_POST
 def gerar_relatorio_anual_ia(request, aluno_id):
@@ -3366,7 +2912,9 @@ def gerar_relatorio_anual_ia(request, aluno_id):
             alunos=aluno,
             data_hora__year=ano_atual,
             status='Realizada'
-        ).exclude(relatorioaula__isnull=True).order_by('data_hora')
+        ).exclude(relatorioaula__isnull=True).order_by('data_hora').select_related(
+            'modalidade', 'relatorioaula'
+        ).prefetch_related('relatorioaula__itens_rudimentos')
 
         if not aulas.exists():
             return JsonResponse({
@@ -3375,7 +2923,6 @@ def gerar_relatorio_anual_ia(request, aluno_id):
             })
 
         historico_aulas = []
-        rudimentos_stats = defaultdict(list)
         repertorio_set = set()
         cursos_reais = set()
 
@@ -3387,14 +2934,9 @@ def gerar_relatorio_anual_ia(request, aluno_id):
             if not rel:
                 continue
 
-            rudimentos_txt_aula = []
-            for item in rel.itens_rudimentos.all():
-                rudimentos_txt_aula.append(f"{item.descricao} ({item.bpm}bpm)")
-                if item.bpm:
-                    nums = re.findall(r'\d+', str(item.bpm))
-                    if nums:
-                        val = int(max(nums, key=int))
-                        rudimentos_stats[item.descricao.strip().title()].append(val)
+            rudimentos_txt_aula = [
+                f"{item.descricao} ({item.bpm}bpm)" for item in rel.itens_rudimentos.all()
+            ]
 
             if rel.repertorio_musicas:
                 musicas = re.split(r'[,\n]+', rel.repertorio_musicas)
@@ -3423,15 +2965,7 @@ def gerar_relatorio_anual_ia(request, aluno_id):
 
         curso_str = ", ".join(cursos_reais) if cursos_reais else "Curso não definido"
 
-        lista_evolucao = []
-        for nome, valores in rudimentos_stats.items():
-            if valores:
-                mini = min(valores)
-                maxi = max(valores)
-                delta = maxi - mini 
-                
-                if delta > 0: 
-                    lista_evolucao.append({'nome': nome, 'min': mini, 'max': maxi, 'delta': delta})
+        lista_evolucao = _evolucao_bpm(ItemRudimento.objects.filter(relatorio__aula__in=aulas))
 
         top_5_rudimentos = sorted(lista_evolucao, key=lambda x: x['delta'], reverse=True)[:5]
 
@@ -3543,197 +3077,22 @@ def gerar_relatorio_anual_ia(request, aluno_id):
         return JsonResponse({'status': 'error', 'message': f"Erro interno: {str(e)}"})
 
 
-def link_callback(uri, rel):
-    """
-    Converte URLs de arquivos estáticos (ex: /static/img/logo.png)
-    em caminhos absolutos do sistema de arquivos (ex: C:/Users/.../static/img/logo.png)
-    para que o xhtml2pdf consiga carregar as imagens.
-    """
-    sUrl = settings.STATIC_URL
-    sRoot = settings.STATIC_ROOT
-    mUrl = settings.MEDIA_URL
-    mRoot = settings.MEDIA_ROOT
-
-    if uri.startswith(mUrl):
-        path = os.path.join(mRoot, uri.replace(mUrl, ""))
-    elif uri.startswith(sUrl):
-        path = os.path.join(sRoot, uri.replace(sUrl, ""))
-    else:
-        return uri
-
-    if not os.path.isfile(path):
-        result = finders.find(uri.replace(sUrl, ""))
-        if result:
-            if isinstance(result, (list, tuple)):
-                path = result[0]
-            else:
-                path = result
-
-    if not os.path.isfile(path):
-        raise Exception(f'media URI must start with {sUrl} or {mUrl}. Path: {path}')
-
-    return path
-
-
 @login_required
 def baixar_relatorio_pdf(request):
     if request.method == 'POST':
         texto_markdown = request.POST.get('texto_relatorio', '')
         nome_aluno_post = request.POST.get('nome_aluno', 'Aluno')
-
-        aluno = Aluno.objects.filter(nome_completo=nome_aluno_post).first()
         ano_atual = 2025
 
-        curso_str = "Curso não identificado"
-        if aluno:
-            aulas_ano = Aula.objects.filter(
-                alunos=aluno,
-                data_hora__year=ano_atual,
-                status='Realizada'
-            ).select_related('modalidade')
-
-            modalidades = set()
-            for aula in aulas_ano:
-                if aula.modalidade:
-                    modalidades.add(aula.modalidade.nome)
-
-            if modalidades:
-                curso_str = ", ".join(modalidades)
-
-        grafico_base64 = None
-        if aluno:
-            itens = ItemRudimento.objects.filter(
-                relatorio__aula__alunos=aluno,
-                relatorio__aula__data_hora__year=ano_atual
-            ).select_related('relatorio__aula').order_by('relatorio__aula__data_hora')
-
-            dados_rudimentos = defaultdict(list)
-
-            for item in itens:
-                if item.bpm:
-                    bpm_match = re.findall(r'\d+', str(item.bpm))
-                    if bpm_match:
-                        bpm_valor = int(max(bpm_match, key=int))
-                        chave = item.descricao.strip().title()
-                        data_aula = item.relatorio.aula.data_hora.strftime('%d/%m')
-                        dados_rudimentos[chave].append((data_aula, bpm_valor))
-
-            top_rudimentos = sorted(dados_rudimentos.items(), key=lambda x: len(x[1]), reverse=True)[:5]
-
-            if top_rudimentos:
-                plt.figure(figsize=(10, 4))
-
-                tem_dados = False
-
-                # Jitter horizontal (em índice, pois datas são strings)
-                jitter_valores = [-0.15, -0.05, 0.05, 0.15, 0.25]  # até 5 rudimentos
-                idx_rudi = 0
-
-                for nome, pontos in top_rudimentos:
-                    if len(pontos) >= 1:
-                        datas, bpms = zip(*pontos)
-
-                        # converte datas "dd/mm" para índice numérico
-                        x_base = list(range(len(datas)))
-
-                        # aplica jitter diferente para cada linha
-                        jitter = jitter_valores[idx_rudi % len(jitter_valores)]
-                        x_jitter = [x + jitter for x in x_base]
-
-                        plt.plot(
-                            x_jitter,
-                            bpms,
-                            marker='o',
-                            linewidth=2,
-                            label=nome
-                        )
-
-                        tem_dados = True
-                        idx_rudi += 1
-
-                if tem_dados:
-                    # substitui números do eixo por suas datas originais
-                    plt.xticks(range(len(datas)), datas)
-
-                    plt.title(f'Evolução Técnica (BPM) - {ano_atual}', fontsize=12, fontweight='bold')
-                    plt.xlabel('Aulas', fontsize=9)
-                    plt.ylabel('BPM', fontsize=9)
-                    plt.legend(title="Exercícios", fontsize='small')
-                    plt.grid(True, linestyle='--', alpha=0.5)
-                    plt.tight_layout()
-
-                    buffer = io.BytesIO()
-                    plt.savefig(buffer, format='png', transparent=True)
-                    buffer.seek(0)
-                    image_png = buffer.getvalue()
-                    buffer.close()
-                    plt.close()
-
-                    grafico_base64 = base64.b64encode(image_png).decode('utf-8')
-
-        html_conteudo = markdown.markdown(texto_markdown)
-
-        html_grafico = ""
-        if grafico_base64:
-            html_grafico = f"""
-            <div style="text-align: center; margin: 30px 0; page-break-inside: avoid;">
-                <h4 style="color: #333; border-bottom: 2px solid #ffc107; display: inline-block; margin-bottom: 15px;">
-                    Gráfico de Evolução Técnica
-                </h4><br>
-                <img src="data:image/png;base64,{grafico_base64}" style="width: 100%; max-width: 17cm;">
-                <p style="font-size: 9px; color: #666; margin-top: 5px;">
-                    * Evolução de velocidade (BPM) nos principais rudimentos praticados.
-                </p>
-            </div>
-            """
-
-        if '[GRAFICO_EVOLUCAO]' in html_conteudo and html_grafico:
-            html_conteudo = html_conteudo.replace('[GRAFICO_EVOLUCAO]', html_grafico)
-        elif html_grafico:
-            if '<h2>Técnica' in html_conteudo:
-                partes = html_conteudo.split('<h2>Técnica')
-                if len(partes) > 1:
-                    subpartes = partes[1].split('<h2>')
-                    if len(subpartes) > 1:
-                        nova_parte = subpartes[0] + html_grafico
-                        html_conteudo = partes[0] + '<h2>Técnica' + nova_parte + '<h2>' + '<h2>'.join(subpartes[1:])
-                    else:
-                        html_conteudo += f"<br>{html_grafico}"
-                else:
-                    html_conteudo += f"<br><hr>{html_grafico}"
-            else:
-                html_conteudo += f"<br><hr>{html_grafico}"
-
-        nome_arquivo_imagem = 'scheduler/img/logo_relatorio.png'
-        logo_path = finders.find(nome_arquivo_imagem)
-
-        if not logo_path:
-            logo_path = os.path.join(settings.BASE_DIR, 'scheduler', 'static', 'scheduler', 'img', 'logo_relatorio.png')
-
-        context = {
-            'conteudo': html_conteudo,
-            'aluno': nome_aluno_post,
-            'curso': curso_str,
-            'ano': ano_atual,
-            'logo_path': logo_path,
-        }
-
-        template_path = 'scheduler/pdf/relatorio_anual_pdf.html'
-        template = get_template(template_path)
-        html = template.render(context)
-
-        response = HttpResponse(content_type='application/pdf')
-        response['Content-Disposition'] = f'attachment; filename="Relatorio {nome_aluno_post} - {ano_atual}.pdf"'
-
-        pisa_status = pisa.CreatePDF(
-            html,
-            dest=response,
-            link_callback=link_callback
+        # Gráfico e PDF ficam para o worker (processar_pdfs); o mesmo texto
+        # com os mesmos dados do aluno é servido do cache em disco
+        tarefa = solicitar_pdf(
+            'relatorio_anual',
+            entradas_relatorio_anual(texto_markdown, nome_aluno_post, ano_atual),
+            f'Relatorio {nome_aluno_post} - {ano_atual}.pdf',
+            usuario=request.user,
         )
-
-        if pisa_status.err:
-            return HttpResponse(f'Erro ao gerar PDF: {pisa_status.err}')
-        return response
+        return resposta_pdf(tarefa)
 
     return HttpResponse("Método não permitido")
 